@@ -19,9 +19,9 @@ from trazy_analysis.strategy.strategies.arbitrage_strategy import ArbitrageStrat
 from trazy_analysis.common.helper import get_or_create_nested_dict
 
 from trazy_analysis.models.asset import Asset
-import re
 
 from trazy_analysis.common.ccxt_connector import CcxtConnector
+from trazy_analysis.common.metadata_cache import default_metadata_cache
 
 from airflow import DAG
 from airflow.models import Variable
@@ -82,19 +82,6 @@ def ccxt_exchange_fees(**kwargs):
     ccxt_connector = kwargs["ccxt_connector"]
 
     # Get fees
-
-    # Tickers format
-    format1 = re.compile("^[a-zA-Z0-9_]+/[a-zA-Z0-9_]+$")
-    format2 = re.compile("^\.[a-zA-Z0-9_]+$")
-    format3 = re.compile("^\$[a-zA-Z0-9_]+/[a-zA-Z0-9_]+$")
-    format4 = re.compile("^[a-zA-Z0-9_]+-[a-zA-Z0-9_]+$")
-    format5 = re.compile("^[a-zA-Z0-9_]+FP$")
-    format6 = re.compile("^[a-zA-Z0-9_]+_BQX$")
-    format7 = re.compile("^[a-zA-Z0-9_]+_[0-9]{6}$")
-    format8 = re.compile("^CMT_[a-zA-Z0-9_]+$")
-    format9 = re.compile("^[a-zA-Z0-9_]+-[a-zA-Z0-9_]+-[0-9]{6}$")
-    format10 = re.compile("^[a-zA-Z0-9_]+-[a-zA-Z0-9_]+-SWAP$")
-
     LOG.info(f"Building fee models for exchange {exchange}")
     exchange_to_lower = exchange.lower()
     exchange_instance = ccxt_connector.get_exchange_instance(exchange_to_lower)
@@ -113,7 +100,8 @@ def ccxt_exchange_fees(**kwargs):
         LOG.info(f"ccxt doesn't have fetchMarkets function for {exchange}")
         return
     try:
-        market_info = exchange_instance.fetchMarkets()
+        # The markets are shared with the bots and the backtests through the metadata cache
+        market_info = ccxt_connector.fetch_markets(exchange_to_lower)
     except Exception as e:
         LOG.error(str(e))
         return
@@ -121,29 +109,9 @@ def ccxt_exchange_fees(**kwargs):
     exchange_fees = {}
     symbol_mapping = {}
     for symbol_info in market_info:
-        symbol = symbol_info["symbol"]
-        symbol_before = symbol
-        if format1.match(symbol) is not None:
-            symbol = symbol.replace("/", "").upper()
-        elif format2.match(symbol) is not None:
-            symbol = symbol.replace(".", "").upper()
-        elif format3.match(symbol) is not None:
-            symbol = symbol.replace("$", "").upper()
-        elif format4.match(symbol) is not None:
-            symbol = symbol.replace("-", "").upper()
-        elif format5.match(symbol) is not None:
-            symbol = symbol[:-2].upper()
-        elif format6.match(symbol) is not None:
-            symbol = symbol[:-4].upper()
-        elif format7.match(symbol) is not None:
-            symbol = symbol[:-7].upper()
-        elif format8.match(symbol) is not None:
-            symbol = symbol[:4].upper()
-        elif format9.match(symbol) is not None:
-            symbol = symbol.replace("-", "")[:-6].upper()
-        elif format10.match(symbol) is not None:
-            symbol = symbol.replace("-", "")[:-4].upper()
-        else:
+        symbol_before = symbol_info["symbol"]
+        symbol = CcxtConnector.normalize_symbol(symbol_before)
+        if symbol is None:
             continue
 
         # to simplify we just take the maximum of the 2 fees
@@ -730,7 +698,10 @@ with DAG(
             }
             for exchange in exchanges
         }
-        ccxt_connector = CcxtConnector(exchanges_api_keys=exchanges_api_keys)
+        ccxt_connector = CcxtConnector(
+            exchanges_api_keys=exchanges_api_keys,
+            metadata_cache=default_metadata_cache(),
+        )
         ccxt_exchange_fees_tasks = [
             PythonOperator(
                 task_id=f"get_{exchange.lower()}_fees",
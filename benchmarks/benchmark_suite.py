@@ -0,0 +1,352 @@
+"""
+Throughput benchmarks of the engine on synthetic data: end to end backtests and component microbenchmarks. Each
+scenario runs in its own process so that its peak RSS is measured alone. The results can be saved to a JSON baseline and
+compared with a previous baseline to detect regressions.
+
+Usage: python -m trazy_analysis.benchmarks.benchmark_suite [--scenarios NAME ...] [--nb-assets N] [--nb-bars M]
+    [--repeat R] [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from trazy_analysis.benchmarks.synthetic_data import generate_candle_dataframes
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.broker.kucoin_fee_model import KucoinFeeModel
+from trazy_analysis.broker.simulated_broker import SimulatedBroker
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.clock import SimulatedClock
+from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.feed.feed import PandasFeed
+from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
+from trazy_analysis.models.enums import Action, Direction, IndicatorMode
+from trazy_analysis.models.order import Order
+from trazy_analysis.statistics.statistics import Statistics
+from trazy_analysis.strategy.strategies.arbitrage_strategy import ArbitrageStrategy
+from trazy_analysis.strategy.strategies.smart_money_concept import SmartMoneyConcept
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+TIME_UNITS = [timedelta(minutes=1), timedelta(minutes=5), timedelta(minutes=15)]
+
+
+def create_backtest(
+    candle_dataframes: list[CandleDataFrame], fee_models: Any = None
+) -> Backtest:
+    assets = {}
+    for candle_dataframe in candle_dataframes:
+        assets.setdefault(candle_dataframe.asset, []).append(candle_dataframe.time_unit)
+    start = min(candle_dataframe.index[0] for candle_dataframe in candle_dataframes)
+    end = max(candle_dataframe.index[-1] for candle_dataframe in candle_dataframes)
+    backtest_config = BacktestConfig(
+        assets=assets,
+        fee_models=fee_models if fee_models is not None else BinanceFeeModel(),
+        start=start.to_pydatetime(),
+        end=(end + timedelta(days=1)).to_pydatetime(),
+        candle_dataframes=candle_dataframes,
+        close_at_end_of_day=False,
+    )
+    return Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+
+
+def count_bars(candle_dataframes: list[CandleDataFrame]) -> int:
+    return sum(len(candle_dataframe) for candle_dataframe in candle_dataframes)
+
+
+def prepare_backtest(
+    candle_dataframes: list[CandleDataFrame],
+    strategy_class: type,
+    parameters: dict[str, Any],
+    fee_models: Any = None,
+) -> tuple[Callable[[], Any], int]:
+    def run() -> Backtest:
+        backtest = create_backtest(candle_dataframes, fee_models)
+        backtest.run_strategy(strategy_class, parameters)
+        return backtest
+
+    return run, count_bars(candle_dataframes)
+
+
+# A scenario prepares its data then returns the function to measure, which returns the objects it created so that
+# they can be inspected before they are freed, and the number of items that function processes
+
+
+def backtest_sma_crossover(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(nb_assets, nb_bars, TIME_UNITS)
+    return prepare_backtest(
+        candle_dataframes, SmaCrossoverStrategy, SmaCrossoverStrategy.DEFAULT_PARAMETERS
+    )
+
+
+def backtest_arbitrage(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(
+        nb_assets, nb_bars, exchanges=["BINANCE", "KUCOIN"]
+    )
+    fee_models = {
+        candle_dataframe.asset: BinanceFeeModel()
+        if candle_dataframe.asset.exchange == "BINANCE"
+        else KucoinFeeModel()
+        for candle_dataframe in candle_dataframes
+    }
+    return prepare_backtest(
+        candle_dataframes,
+        ArbitrageStrategy,
+        ArbitrageStrategy.DEFAULT_PARAMETERS,
+        fee_models,
+    )
+
+
+def backtest_smart_money_concept(
+    nb_assets: int, nb_bars: int
+) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(nb_assets, nb_bars)
+    return prepare_backtest(
+        candle_dataframes, SmartMoneyConcept, SmartMoneyConcept.DEFAULT_PARAMETERS
+    )
+
+
+def feed_replay(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(nb_assets, nb_bars, TIME_UNITS)
+
+    def run() -> PandasFeed:
+        events = deque()
+        feed = PandasFeed(candle_dataframes, events)
+        while not feed.completed:
+            feed.update_latest_data()
+            events.clear()
+        return feed
+
+    return run, count_bars(candle_dataframes)
+
+
+def indicators_stream(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(nb_assets, nb_bars)
+    closes = [candle_dataframe["close"].tolist() for candle_dataframe in candle_dataframes]
+
+    def run() -> ReactiveIndicators:
+        indicators = ReactiveIndicators(memoize=True, mode=IndicatorMode.LIVE)
+        sources = []
+        for _ in candle_dataframes:
+            source = indicators.Indicator(size=1)
+            short_sma = indicators.Sma(source=source, period=9)
+            long_sma = indicators.Sma(source=source, period=65)
+            indicators.Crossover(
+                source_stream_data1=short_sma, source_stream_data2=long_sma
+            )
+            sources.append(source)
+        for bar in range(nb_bars):
+            for source, asset_closes in zip(sources, closes):
+                source.push(asset_closes[bar])
+        return indicators
+
+    return run, nb_bars * len(candle_dataframes)
+
+
+def broker_fills(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    candle_dataframes = generate_candle_dataframes(nb_assets, nb_bars)
+    candles = [candle_dataframe.to_candles() for candle_dataframe in candle_dataframes]
+
+    def run() -> SimulatedBroker:
+        clock = SimulatedClock()
+        events = deque()
+        broker = SimulatedBroker(
+            clock, events, initial_funds=10000000.0, fee_models=BinanceFeeModel()
+        )
+        broker.subscribe_funds_to_portfolio(10000000.0)
+        for bar in range(nb_bars):
+            clock.update(candles[0][bar].epoch_ns)
+            for asset_candles in candles:
+                candle = asset_candles[bar]
+                broker.update_price(candle)
+                action = Action.BUY if bar % 2 == 0 else Action.SELL
+                broker.submit_order(
+                    Order(
+                        asset=candle.asset,
+                        time_unit=candle.time_unit,
+                        action=action,
+                        direction=Direction.LONG,
+                        size=1,
+                        signal_id=str(bar),
+                        clock=clock,
+                    )
+                )
+            broker.execute_open_orders()
+        return broker
+
+    return run, nb_bars * len(candles)
+
+
+def statistics_tearsheet(nb_assets: int, nb_bars: int) -> tuple[Callable[[], Any], int]:
+    rng = np.random.default_rng(0)
+    nb_points = nb_assets * nb_bars
+    index = pd.date_range(
+        start=datetime(2022, 1, 3, tzinfo=pytz.UTC), periods=nb_points, freq="1min"
+    )
+    equity_df = pd.DataFrame(
+        {"Equity": 10000.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, nb_points)))},
+        index=pd.Index(index, name="Timestamp"),
+    )
+
+    def run() -> pd.DataFrame:
+        return Statistics(equity=equity_df).get_tearsheet()
+
+    return run, nb_points
+
+
+# Name of each scenario: the function preparing it and the unit of the items it processes
+SCENARIOS: dict[str, tuple[Callable[[int, int], tuple[Callable[[], Any], int]], str]] = {
+    "backtest_sma_crossover": (backtest_sma_crossover, "bars"),
+    "backtest_arbitrage": (backtest_arbitrage, "bars"),
+    "backtest_smart_money_concept": (backtest_smart_money_concept, "bars"),
+    "feed": (feed_replay, "bars"),
+    "indicators": (indicators_stream, "updates"),
+    "broker_fills": (broker_fills, "fills"),
+    "statistics": (statistics_tearsheet, "points"),
+}
+
+
+def peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return max_rss / (1024 * 1024)
+    return max_rss / 1024
+
+
+def run_scenario(name: str, nb_assets: int, nb_bars: int) -> dict[str, Any]:
+    logging.disable(logging.CRITICAL)
+    function, unit = SCENARIOS[name]
+    run, count = function(nb_assets, nb_bars)
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "count": count,
+        "unit": unit,
+        "throughput": count / seconds if seconds > 0 else float("inf"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(
+    scenarios: list[str], nb_assets: int, nb_bars: int, repeat: int = 1
+) -> dict[str, dict[str, Any]]:
+    """
+    Run each scenario repeat times, each time in a new process, and keep the run with the best throughput
+
+    :return: The results of each scenario
+    :rtype: dict[str, dict[str, Any]]
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in scenarios:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(run_scenario, name, nb_assets, nb_bars).result())
+        result = max(runs, key=lambda run: run["throughput"])
+        result["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+        result["nb_assets"] = nb_assets
+        result["nb_bars"] = nb_bars
+        results[name] = result
+        print(
+            f"{name}: {result['throughput']:.0f} {result['unit']}/s "
+            f"({result['count']} {result['unit']} in {result['seconds']:.2f}s), "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    tolerance: float = 0.2,
+) -> list[str]:
+    """
+    Compare results with a baseline of the same sizes
+
+    :param results: The results, as returned by run_benchmarks
+    :type results: dict[str, dict[str, Any]]
+    :param baseline: The results of the baseline
+    :type baseline: dict[str, dict[str, Any]]
+    :param tolerance: The relative throughput loss or peak RSS increase tolerated
+    :type tolerance: float
+    :return: The description of each regression
+    :rtype: list[str]
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        baseline_result = baseline[name]
+        if (result["nb_assets"], result["nb_bars"]) != (
+            baseline_result["nb_assets"],
+            baseline_result["nb_bars"],
+        ):
+            regressions.append(f"{name}: the baseline was run with different sizes")
+            continue
+        if result["throughput"] < baseline_result["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.0f} {result['unit']}/s, "
+                f"baseline {baseline_result['throughput']:.0f} {result['unit']}/s"
+            )
+        if result["peak_rss_mb"] > baseline_result["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB, "
+                f"baseline {baseline_result['peak_rss_mb']:.0f} MB"
+            )
+    return regressions
+
+
+def metadata() -> dict[str, Any]:
+    return {
+        "created": datetime.now(pytz.UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the engine on synthetic data")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--nb-assets", type=int, default=4)
+    parser.add_argument("--nb-bars", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scenarios, args.nb_assets, args.nb_bars, args.repeat)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"metadata": metadata(), "results": results}, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,279 @@
+"""
+Memory profile of the benchmark scenarios: each scenario runs under tracemalloc in its own process, the allocations
+still alive at the end of the scenario are grouped by subsystem with their top allocation sites, and the peak traced
+memory is reported per bar and per asset. Thresholds on these metrics fail the run when they are exceeded.
+
+Usage: python -m trazy_analysis.benchmarks.memory_profile [--scenarios NAME ...] [--nb-assets N] [--nb-bars M]
+    [--top T] [--frames F] [--output report.json] [--thresholds thresholds.json] [--max-bytes-per-bar B]
+    [--max-bytes-per-asset B] [--with-logging]
+
+The thresholds file maps the scenario names to the maximum of their metrics, for instance:
+    {"backtest_sma_crossover": {"bytes_per_bar": 20000, "subsystems": {"portfolio": 1000000}}}
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from trazy_analysis.benchmarks.benchmark_suite import SCENARIOS
+from trazy_analysis.settings import ROOT_PATH
+
+# Subsystems of the package, by path prefix relative to the package root. An allocation belongs to the subsystem of
+# the innermost frame of the package in its traceback.
+SUBSYSTEMS = [
+    ("candles", ("models/candle.py",)),
+    ("feed", ("feed/", "market_data/", "common/types.py")),
+    ("indicators", ("indicators/",)),
+    ("strategies", ("strategy/",)),
+    ("event_loop", ("bot/",)),
+    (
+        "orders",
+        (
+            "order_manager/",
+            "models/order.py",
+            "models/multiple_order.py",
+            "models/signal.py",
+        ),
+    ),
+    ("broker", ("broker/",)),
+    ("portfolio", ("portfolio/", "position/")),
+    ("statistics", ("statistics/",)),
+    ("logging", ("logger/",)),
+]
+LOGGING_PATH = os.path.dirname(os.path.abspath(logging.__file__))
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def subsystem_of(filename: str) -> str | None:
+    """
+    :return: The subsystem of a file of the package, "package" for the files outside of the subsystems, None for the
+    files outside of the package and for the benchmarks
+    :rtype: str | None
+    """
+    filename = os.path.abspath(filename)
+    if not filename.startswith(ROOT_PATH + os.sep) or filename.startswith(
+        BENCHMARKS_PATH + os.sep
+    ):
+        return None
+    relative_filename = os.path.relpath(filename, ROOT_PATH).replace(os.sep, "/")
+    for subsystem, prefixes in SUBSYSTEMS:
+        if relative_filename.startswith(prefixes):
+            return subsystem
+    return "package"
+
+
+def attribute(traceback: tracemalloc.Traceback) -> tuple[str, str]:
+    """
+    Find the subsystem responsible for an allocation and the site of the allocation in that subsystem
+
+    :param traceback: The traceback of the allocation, from the oldest to the most recent frame
+    :type traceback: tracemalloc.Traceback
+    :return: The subsystem and the site, as filename:lineno
+    :rtype: tuple[str, str]
+    """
+    innermost_frame = traceback[-1]
+    if os.path.abspath(innermost_frame.filename).startswith(LOGGING_PATH + os.sep):
+        return "logging", f"{innermost_frame.filename}:{innermost_frame.lineno}"
+    for frame in reversed(traceback):
+        subsystem = subsystem_of(frame.filename)
+        if subsystem is not None:
+            relative_filename = os.path.relpath(frame.filename, ROOT_PATH)
+            return subsystem, f"{relative_filename}:{frame.lineno}"
+    return "other", f"{innermost_frame.filename}:{innermost_frame.lineno}"
+
+
+def group_by_subsystem(
+    snapshot: tracemalloc.Snapshot, top: int = 5
+) -> dict[str, dict[str, Any]]:
+    """
+    :return: The bytes and number of blocks allocated by each subsystem with its top allocation sites, the biggest
+    subsystems first
+    :rtype: dict[str, dict[str, Any]]
+    """
+    sites: dict[str, dict[str, list[int]]] = {}
+    for statistic in snapshot.statistics("traceback"):
+        subsystem, site = attribute(statistic.traceback)
+        site_size_count = sites.setdefault(subsystem, {}).setdefault(site, [0, 0])
+        site_size_count[0] += statistic.size
+        site_size_count[1] += statistic.count
+    subsystems = {}
+    for subsystem, subsystem_sites in sites.items():
+        sorted_sites = sorted(
+            subsystem_sites.items(), key=lambda item: item[1][0], reverse=True
+        )
+        subsystems[subsystem] = {
+            "bytes": sum(size for size, _ in subsystem_sites.values()),
+            "count": sum(count for _, count in subsystem_sites.values()),
+            "top_sites": [
+                {"site": site, "bytes": size, "count": count}
+                for site, (size, count) in sorted_sites[:top]
+            ],
+        }
+    return dict(
+        sorted(subsystems.items(), key=lambda item: item[1]["bytes"], reverse=True)
+    )
+
+
+def profile_scenario(
+    name: str,
+    nb_assets: int,
+    nb_bars: int,
+    top: int = 5,
+    nb_frames: int = 25,
+    with_logging: bool = False,
+) -> dict[str, Any]:
+    """
+    Run a scenario under tracemalloc. The data of the scenario is prepared before the tracing starts.
+
+    :return: The peak and retained bytes, the peak bytes per bar and per asset and the retained bytes by subsystem
+    :rtype: dict[str, Any]
+    """
+    if not with_logging:
+        logging.disable(logging.CRITICAL)
+    function, unit = SCENARIOS[name]
+    run, count = function(nb_assets, nb_bars)
+    tracemalloc.start(nb_frames)
+    try:
+        # The objects created by the scenario are kept alive until the snapshot is taken
+        objects = run()
+        snapshot = tracemalloc.take_snapshot()
+        retained_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    return {
+        "nb_assets": nb_assets,
+        "nb_bars": nb_bars,
+        "count": count,
+        "unit": unit,
+        "peak_bytes": peak_bytes,
+        "retained_bytes": retained_bytes,
+        "bytes_per_bar": peak_bytes / count if count else 0.0,
+        "bytes_per_asset": peak_bytes / nb_assets if nb_assets else 0.0,
+        "subsystems": group_by_subsystem(snapshot, top),
+    }
+
+
+def profile(
+    scenarios: list[str],
+    nb_assets: int,
+    nb_bars: int,
+    top: int = 5,
+    nb_frames: int = 25,
+    with_logging: bool = False,
+) -> dict[str, dict[str, Any]]:
+    """
+    Profile each scenario in a new process so that the allocations of a scenario don't outlive it
+    """
+    reports = {}
+    context = multiprocessing.get_context("spawn")
+    for name in scenarios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            reports[name] = executor.submit(
+                profile_scenario, name, nb_assets, nb_bars, top, nb_frames, with_logging
+            ).result()
+    return reports
+
+
+def format_report(name: str, report: dict[str, Any]) -> str:
+    lines = [
+        f"{name}: peak {report['peak_bytes'] / 1024 / 1024:.1f} MB, "
+        f"retained {report['retained_bytes'] / 1024 / 1024:.1f} MB, "
+        f"{report['bytes_per_bar']:.0f} bytes per {report['unit'][:-1]}, "
+        f"{report['bytes_per_asset'] / 1024:.0f} KB per asset"
+    ]
+    for subsystem, subsystem_report in report["subsystems"].items():
+        lines.append(
+            f"  {subsystem}: {subsystem_report['bytes'] / 1024:.0f} KB "
+            f"in {subsystem_report['count']} blocks"
+        )
+        for site in subsystem_report["top_sites"]:
+            lines.append(
+                f"    {site['site']}: {site['bytes'] / 1024:.0f} KB in {site['count']} blocks"
+            )
+    return "\n".join(lines)
+
+
+def check_thresholds(
+    reports: dict[str, dict[str, Any]],
+    thresholds: dict[str, dict[str, Any]],
+    default_thresholds: dict[str, float] = None,
+) -> list[str]:
+    """
+    Compare the reports with the thresholds of their scenario, the metrics without threshold are not checked
+
+    :param reports: The reports, as returned by profile
+    :type reports: dict[str, dict[str, Any]]
+    :param thresholds: The maximum of the metrics of each scenario: peak_bytes, retained_bytes, bytes_per_bar,
+        bytes_per_asset and subsystems, the maximum retained bytes of each subsystem
+    :type thresholds: dict[str, dict[str, Any]]
+    :param default_thresholds: The maximum of the metrics of the scenarios, when they have no threshold of their own
+    :type default_thresholds: dict[str, float]
+    :return: The description of each exceeded threshold
+    :rtype: list[str]
+    """
+    default_thresholds = default_thresholds if default_thresholds is not None else {}
+    exceeded = []
+    for name, report in reports.items():
+        scenario_thresholds = {**default_thresholds, **thresholds.get(name, {})}
+        for metric, maximum in scenario_thresholds.items():
+            if metric == "subsystems":
+                for subsystem, subsystem_maximum in maximum.items():
+                    subsystem_bytes = report["subsystems"].get(subsystem, {}).get("bytes", 0)
+                    if subsystem_bytes > subsystem_maximum:
+                        exceeded.append(
+                            f"{name}: {subsystem} retains {subsystem_bytes} bytes, "
+                            f"threshold {subsystem_maximum}"
+                        )
+            elif maximum is not None and report[metric] > maximum:
+                exceeded.append(f"{name}: {metric} {report[metric]:.0f}, threshold {maximum}")
+    return exceeded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the memory of the engine on synthetic data")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--nb-assets", type=int, default=4)
+    parser.add_argument("--nb-bars", type=int, default=2000)
+    parser.add_argument("--top", type=int, default=5, help="Number of allocation sites per subsystem")
+    parser.add_argument("--frames", type=int, default=25, help="Number of frames kept per allocation")
+    parser.add_argument("--output", help="Save the reports to this JSON file")
+    parser.add_argument("--thresholds", help="JSON file of the thresholds of each scenario")
+    parser.add_argument("--max-bytes-per-bar", type=float)
+    parser.add_argument("--max-bytes-per-asset", type=float)
+    parser.add_argument("--with-logging", action="store_true", help="Keep the logging enabled")
+    args = parser.parse_args()
+
+    reports = profile(
+        args.scenarios, args.nb_assets, args.nb_bars, args.top, args.frames, args.with_logging
+    )
+    for name, report in reports.items():
+        print(format_report(name, report))
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(reports, file, indent=2)
+
+    thresholds = {}
+    if args.thresholds is not None:
+        with open(args.thresholds) as file:
+            thresholds = json.load(file)
+    exceeded = check_thresholds(
+        reports,
+        thresholds,
+        {
+            "bytes_per_bar": args.max_bytes_per_bar,
+            "bytes_per_asset": args.max_bytes_per_asset,
+        },
+    )
+    for description in exceeded:
+        print(f"THRESHOLD EXCEEDED {description}")
+    if exceeded:
+        sys.exit(1)
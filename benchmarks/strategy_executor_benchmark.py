@@ -0,0 +1,81 @@
+"""
+Compare the sequential execution of the strategy instances of an event loop with the ParallelStrategyExecutor.
+
+Usage: python -m trazy_analysis.benchmarks.strategy_executor_benchmark [nb_assets] [nb_workers]
+"""
+import logging
+import sys
+import time
+from collections import deque
+from datetime import timedelta
+
+from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.broker.broker_manager import BrokerManager
+from trazy_analysis.broker.simulated_broker import SimulatedBroker
+from trazy_analysis.common.clock import SimulatedClock
+from trazy_analysis.feed.feed import CsvFeed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import IndicatorMode
+from trazy_analysis.order_manager.order_creator import OrderCreator
+from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.order_manager.position_sizer import PositionSizer
+from trazy_analysis.settings import ROOT_PATH
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategy_executor import ParallelStrategyExecutor
+
+EXCHANGE = "BINANCE"
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = f"{ROOT_PATH}/test/data/btc_usdt_one_day.csv"
+
+
+def run(nb_assets: int, strategy_executor: ParallelStrategyExecutor = None) -> tuple[float, float]:
+    assets = [Asset(symbol=f"BTC{i}USDT", exchange=EXCHANGE) for i in range(nb_assets)]
+    events = deque()
+    feed = CsvFeed(
+        csv_filenames={asset: {TIME_UNIT: CSV_FILENAME} for asset in assets},
+        events=events,
+    )
+    clock = SimulatedClock()
+    broker = SimulatedBroker(clock, events, initial_funds=10000.0)
+    broker.subscribe_funds_to_portfolio(10000.0)
+    broker_manager = BrokerManager(brokers={EXCHANGE: broker})
+    order_manager = OrderManager(
+        events=events,
+        broker_manager=broker_manager,
+        position_sizer=PositionSizer(broker_manager=broker_manager),
+        order_creator=OrderCreator(broker_manager=broker_manager),
+        clock=clock,
+    )
+    start = time.perf_counter()
+    event_loop = EventLoop(
+        events=events,
+        assets={asset: TIME_UNIT for asset in assets},
+        feed=feed,
+        order_manager=order_manager,
+        strategies_parameters={
+            SmaCrossoverStrategy: SmaCrossoverStrategy.DEFAULT_PARAMETERS
+        },
+        indicator_mode=IndicatorMode.LIVE,
+        strategy_executor=strategy_executor,
+    )
+    event_loop.loop()
+    return time.perf_counter() - start, broker.get_portfolio_cash_balance()
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    nb_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    nb_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    sequential_time, sequential_cash = run(nb_assets)
+    print(f"sequential: {sequential_time:.2f}s")
+    for use_processes in [False, True]:
+        parallel_time, parallel_cash = run(
+            nb_assets, ParallelStrategyExecutor(nb_workers, use_processes=use_processes)
+        )
+        assert parallel_cash == sequential_cash
+        print(
+            f"{'processes' if use_processes else 'threads'} ({nb_workers} workers): "
+            f"{parallel_time:.2f}s, speedup x{sequential_time / parallel_time:.2f}"
+        )
@@ -0,0 +1,76 @@
+"""
+Compare running a parameter sweep with Backtest.run_strategies in a loop, with Backtest.run_strategies_fan_out and
+with the BacktestSweep.
+
+Usage: python -m trazy_analysis.benchmarks.sweep_benchmark [nb_parameters] [nb_workers]
+"""
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.sweep import BacktestSweep
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.settings import ROOT_PATH
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = f"{ROOT_PATH}/test/data/btc_usdt_one_day.csv"
+
+
+def strategies_parameters_list(nb_parameters: int) -> list[dict[type, dict]]:
+    return [
+        {SmaCrossoverStrategy: {"short_sma": 5 + i, "long_sma": 50 + 5 * i}}
+        for i in range(nb_parameters)
+    ]
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    nb_parameters = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    nb_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    backtest_config = BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+    )
+    parameters_list = strategies_parameters_list(nb_parameters)
+
+    start = time.perf_counter()
+    backtest = Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+    serial_results = []
+    for strategies_parameters in parameters_list:
+        backtest.run_strategies(strategies_parameters)
+        serial_results.append(backtest.get_statistics())
+    serial_time = time.perf_counter() - start
+    print(f"serial: {serial_time:.2f}s")
+
+    start = time.perf_counter()
+    fan_out_results = backtest.run_strategies_fan_out(parameters_list)
+    fan_out_time = time.perf_counter() - start
+    for serial_result, fan_out_result in zip(serial_results, fan_out_results):
+        assert fan_out_result.equals(serial_result)
+    print(f"fan out: {fan_out_time:.2f}s, speedup x{serial_time / fan_out_time:.2f}")
+
+    start = time.perf_counter()
+    with BacktestSweep(backtest_config, nb_workers=nb_workers) as backtest_sweep:
+        sweep_results = backtest_sweep.run(parameters_list)
+    sweep_time = time.perf_counter() - start
+    for serial_result, sweep_result in zip(serial_results, sweep_results):
+        assert sweep_result.statistics.equals(serial_result)
+    print(
+        f"sweep ({nb_workers} workers): {sweep_time:.2f}s, speedup x{serial_time / sweep_time:.2f}"
+    )
@@ -0,0 +1,148 @@
+"""
+Deterministic synthetic OHLCV data for the benchmarks: the same seed always gives the same candles.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.models.asset import Asset
+
+DEFAULT_START = datetime(2022, 1, 3, 0, 0, 0, 0, tzinfo=pytz.UTC)
+
+
+def random_walk_prices(
+    rng: np.random.Generator,
+    nb_bars: int,
+    initial_price: float = 100.0,
+    volatility: float = 0.001,
+) -> np.ndarray:
+    """
+    Close prices following a geometric random walk
+
+    :param rng: The random generator
+    :type rng: np.random.Generator
+    :param nb_bars: The number of prices
+    :type nb_bars: int
+    :param initial_price: The price before the first bar
+    :type initial_price: float
+    :param volatility: The standard deviation of the log returns of a bar
+    :type volatility: float
+    :return: The close prices
+    :rtype: np.ndarray
+    """
+    return initial_price * np.exp(np.cumsum(rng.normal(0.0, volatility, nb_bars)))
+
+
+def ohlcv_from_closes(
+    rng: np.random.Generator,
+    closes: np.ndarray,
+    index: pd.DatetimeIndex,
+    volatility: float = 0.001,
+    asset: Asset = None,
+    time_unit: timedelta = timedelta(minutes=1),
+) -> CandleDataFrame:
+    """
+    Build consistent candles around close prices: each candle opens at the previous close and its high and low wrap its
+    open and close
+    """
+    opens = np.empty_like(closes)
+    opens[0] = closes[0]
+    opens[1:] = closes[:-1]
+    wicks = np.abs(rng.normal(0.0, volatility / 2, (2, len(closes))))
+    highs = np.maximum(opens, closes) * (1 + wicks[0])
+    lows = np.minimum(opens, closes) * (1 - wicks[1])
+    volumes = np.round(rng.lognormal(mean=3.0, sigma=1.0, size=len(closes)), 4)
+    dataframe = pd.DataFrame(
+        {
+            "open": np.round(opens, 4),
+            "high": np.round(highs, 4),
+            "low": np.round(lows, 4),
+            "close": np.round(closes, 4),
+            "volume": volumes,
+        },
+        index=index,
+    )
+    return CandleDataFrame.from_dataframe(dataframe, asset, time_unit)
+
+
+def rescale(candle_dataframe: CandleDataFrame, time_unit: timedelta) -> CandleDataFrame:
+    """
+    Aggregate candles to a bigger time unit, the candles are labelled with the start of their period
+    """
+    dataframe = (
+        pd.DataFrame(candle_dataframe)
+        .resample(time_unit, label="left", closed="left")
+        .agg(
+            {
+                "open": "first",
+                "high": "max",
+                "low": "min",
+                "close": "last",
+                "volume": "sum",
+            }
+        )
+        .dropna()
+    )
+    return CandleDataFrame.from_dataframe(dataframe, candle_dataframe.asset, time_unit)
+
+
+def generate_candle_dataframes(
+    nb_assets: int,
+    nb_bars: int,
+    time_units: list[timedelta] = None,
+    exchanges: list[str] = None,
+    start: datetime = DEFAULT_START,
+    seed: int = 0,
+    volatility: float = 0.001,
+    spread_volatility: float = 0.002,
+) -> list[CandleDataFrame]:
+    """
+    Generate nb_bars candles of the smallest time unit for nb_assets symbols, then aggregate them to the other time
+    units. When there are several exchanges, each symbol is listed on all of them: the prices of a symbol on the
+    different exchanges follow the same random walk, each exchange adding its own noise, so that there are arbitrage
+    opportunities between the exchanges.
+
+    :param nb_assets: The number of symbols
+    :type nb_assets: int
+    :param nb_bars: The number of candles of the smallest time unit
+    :type nb_bars: int
+    :param time_units: The time units, one minute by default
+    :type time_units: list[timedelta]
+    :param exchanges: The exchanges listing the symbols, BINANCE by default
+    :type exchanges: list[str]
+    :param start: The timestamp of the first candle
+    :type start: datetime
+    :param seed: The seed of the random generator
+    :type seed: int
+    :param volatility: The standard deviation of the log returns of a bar
+    :type volatility: float
+    :param spread_volatility: The standard deviation of the relative noise of each exchange
+    :type spread_volatility: float
+    :return: The candles of each asset and time unit
+    :rtype: list[CandleDataFrame]
+    """
+    time_units = sorted(time_units) if time_units is not None else [timedelta(minutes=1)]
+    exchanges = exchanges if exchanges is not None else ["BINANCE"]
+    base_time_unit = time_units[0]
+    index = pd.date_range(start=start, periods=nb_bars, freq=base_time_unit, name="timestamp")
+    rng = np.random.default_rng(seed)
+    candle_dataframes = []
+    for asset_index in range(nb_assets):
+        symbol = f"SYN{asset_index}USDT"
+        initial_price = float(rng.uniform(10.0, 1000.0))
+        closes = random_walk_prices(rng, nb_bars, initial_price, volatility)
+        for exchange in exchanges:
+            asset = Asset(symbol=symbol, exchange=exchange)
+            exchange_closes = closes
+            if len(exchanges) > 1:
+                exchange_closes = closes * (1 + rng.normal(0.0, spread_volatility, nb_bars))
+            candle_dataframe = ohlcv_from_closes(
+                rng, exchange_closes, index, volatility, asset, base_time_unit
+            )
+            candle_dataframes.append(candle_dataframe)
+            for time_unit in time_units[1:]:
+                candle_dataframes.append(rescale(candle_dataframe, time_unit))
+    return candle_dataframes
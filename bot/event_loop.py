@@ -1,8 +1,12 @@
+import asyncio
+import logging
 import os
+import pickle
+import tempfile
 from collections import deque
 from datetime import timedelta
 from threading import Thread
-from typing import Any, Dict, List, Union, Tuple
+from typing import Any, Callable, Dict, List, Union, Tuple
 
 import pandas as pd
 import plotly.graph_objects as go
@@ -10,8 +14,15 @@ from plotly.subplots import make_subplots
 
 import trazy_analysis.logger
 import trazy_analysis.settings
-from trazy_analysis.common.constants import MAX_TIMESTAMP
+from trazy_analysis.common.constants import MAX_EPOCH_NS, MAX_TIMESTAMP
 from trazy_analysis.common.helper import get_or_create_nested_dict, normalize_assets
+from trazy_analysis.common.latency import LatencyStats
+from trazy_analysis.common.notification import NotificationDispatcher, TelegramSink
+from trazy_analysis.common.utils import (
+    NANOSECONDS_IN_SECOND,
+    epoch_ns_to_datetime,
+    timedelta_to_ns,
+)
 from trazy_analysis.common.types import CandleDataFrame
 from trazy_analysis.feed.feed import Feed
 from trazy_analysis.indicators.indicator import CandleData
@@ -19,7 +30,6 @@ from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.candle import Candle
 from trazy_analysis.models.enums import (
-    Action,
     Direction,
     EventType,
     BrokerIsolation,
@@ -32,19 +42,31 @@ from trazy_analysis.models.event import (
     DataEvent,
     MarketEodDataEvent,
     PendingSignalEvent,
+    SignalEvent,
 )
 from trazy_analysis.models.order import Order
 from trazy_analysis.models.signal import SignalBase, Signal, MultipleSignal
 from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.portfolio.portfolio import Portfolio
 from trazy_analysis.position.transaction import Transaction
+from trazy_analysis.statistics.running_metrics import Checkpoint, RunningMetrics
 from trazy_analysis.statistics.statistics_manager import StatisticsManager
 from trazy_analysis.strategy.context import Context
-from trazy_analysis.strategy.strategy import StrategyBase, Strategy, MultiAssetsStrategy
+from trazy_analysis.strategy.strategy import (
+    StrategyBase,
+    Strategy,
+    MultiAssetsStrategy,
+    VectorizedStrategy,
+)
+from trazy_analysis.strategy.strategy_executor import ParallelStrategyExecutor
 
 LOG = trazy_analysis.logger.get_root_logger(
     __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
 )
 
+ONE_MINUTE_NS = timedelta_to_ns(timedelta(minutes=1))
+TWO_MINUTES_NS = timedelta_to_ns(timedelta(minutes=2))
+
 
 # It's a thread that propagates exceptions to the main thread
 class PropagatingThread(Thread):
@@ -111,6 +133,8 @@ class EventLoop:
                             self.indicators,
                         )
                         strategy.set_context(self.context)
+                        if isinstance(strategy, VectorizedStrategy):
+                            strategy.prepare(self.data.candles[asset][time_unit])
                         self.strategy_instances.append(strategy)
         elif issubclass(strategy_class, MultiAssetsStrategy):
             strategy = strategy_class(self.data, parameters, self.indicators)
@@ -144,77 +168,175 @@ class EventLoop:
         """
         strategy.process_context(self.context, self.clock)
 
+    def _init_sub_accounts(self):
+        """
+        It creates the sub-accounts of each strategy and asset upfront, so that their equity curves start with the
+        backtest
+        """
+        if self.broker_manager.sub_account_isolation == BrokerIsolation.EXCHANGE:
+            return
+        strategies_names = [
+            strategy_class.__name__ for strategy_class in self.strategies_parameters
+        ]
+        for asset in self.assets:
+            broker = self.broker_manager.get_broker(asset.exchange)
+            for strategy_name in strategies_names:
+                broker.portfolio_of(
+                    self.broker_manager.sub_account(asset, strategy_name)
+                )
+
+    def accounts(self) -> dict[tuple[str, str, str], list[Portfolio]]:
+        """
+        The portfolios recorded together, keyed by (exchange, symbol, strategy name) as in the statistics manager:
+        the portfolio of the broker of each exchange or, when the orders are booked in sub-accounts, the portfolios of
+        the sub-accounts sharing the same isolation key
+
+        :return: The portfolios of each recorded account
+        :rtype: dict[tuple[str, str, str], list[Portfolio]]
+        """
+        accounts = {}
+        isolation = self.broker_manager.sub_account_isolation
+        exchanges = {asset.exchange for asset in self.assets}
+        for exchange in exchanges:
+            broker = self.broker_manager.get_broker(exchange)
+            if isolation == BrokerIsolation.EXCHANGE:
+                accounts[(exchange, None, None)] = [broker.portfolio]
+                continue
+            account_exchange = None if isolation == BrokerIsolation.STRATEGY else exchange
+            for (symbol, strategy_name), portfolio in broker.sub_portfolios.items():
+                accounts.setdefault((account_exchange, symbol, strategy_name), []).append(
+                    portfolio
+                )
+        return accounts
+
+    def result_key(self, account_key: tuple[str, str, str]) -> str | tuple[str, str, str]:
+        """
+        :return: The key of the results of an account, like the equity dataframes: the exchange when the brokers
+            aren't split into sub-accounts, the (exchange, symbol, strategy name) key of the account otherwise
+        :rtype: str | tuple[str, str, str]
+        """
+        if self.broker_manager.sub_account_isolation == BrokerIsolation.EXCHANGE:
+            return account_key[0]
+        return account_key
+
     def update_equity_curves(self):
         """
         If the current time is greater than the most recent time in the equity curve, then add the current time and the
         current equity to the equity curve
-        :return: The equity curves for each exchange.
+        :return: The equity curves for each account.
         """
-        exchanges = {asset.exchange for asset in self.assets}
-        for exchange in exchanges:
-            if self.statistics_manager.get_equity_curves(exchange) is None:
-                self.statistics_manager.set_equity_curves(deque(), exchange)
+        for account_key, portfolios in self.accounts().items():
+            if self.statistics_manager.get_equity_curves(*account_key) is None:
+                self.statistics_manager.set_equity_curves(deque(), *account_key)
 
             if not self.clock.updated:
                 return
 
-            current_time = self.clock.current_time()
-            equity_curves: deque = self.statistics_manager.get_equity_curves(exchange)
+            current_time = self.clock.current_epoch_ns()
+            equity = sum(portfolio.total_equity for portfolio in portfolios)
+            equity_curves: deque = self.statistics_manager.get_equity_curves(*account_key)
             if len(equity_curves) != 0:
                 if len(equity_curves) == 1:
                     equity_curves.appendleft(
                         (
-                            current_time - timedelta(minutes=2),
-                            self.broker_manager.get_broker(exchange).get_portfolio_total_equity(),
+                            current_time - TWO_MINUTES_NS,
+                            equity,
                         )
                     )
                 most_recent_time = equity_curves[-1][0]
                 if most_recent_time >= current_time:
-                    return
+                    continue
 
             equity_curves.append(
                 (
                     current_time,
-                    self.broker_manager.get_broker(exchange).get_portfolio_total_equity(),
+                    equity,
                 )
             )
 
+    def update_running_metrics(self) -> bool:
+        """
+        Update the running metrics with the current equity and report a checkpoint each time checkpoint_interval has
+        elapsed since the previous one
+
+        :return: True if the checkpoint callback asked to stop the backtest, False otherwise
+        :rtype: bool
+        """
+        self.running_metrics.update(
+            sum(
+                portfolio.total_equity
+                for portfolios in self.accounts().values()
+                for portfolio in portfolios
+            )
+        )
+        current_epoch_ns = self.context.current_epoch_ns
+        if self.next_checkpoint_epoch_ns is None:
+            self.next_checkpoint_epoch_ns = current_epoch_ns + self.checkpoint_interval_ns
+            return False
+        if current_epoch_ns < self.next_checkpoint_epoch_ns:
+            return False
+        while self.next_checkpoint_epoch_ns <= current_epoch_ns:
+            self.next_checkpoint_epoch_ns += self.checkpoint_interval_ns
+        self.checkpoint_step += 1
+        checkpoint = Checkpoint(
+            step=self.checkpoint_step,
+            timestamp=epoch_ns_to_datetime(current_epoch_ns),
+            metrics=self.running_metrics,
+        )
+        LOG.info("Checkpoint: %s", checkpoint)
+        return self.checkpoint_callback is not None and self.checkpoint_callback(
+            checkpoint
+        )
+
+    def prune(self) -> None:
+        """
+        Stop the backtest before the end of the data. The equity curves up to now are kept but no statistics are
+        computed, the backtest being considered worthless.
+        """
+        LOG.info("Backtest pruned at checkpoint %s", self.checkpoint_step)
+        self.pruned = True
+        self.update_equity_dfs()
+        self.statistics_df = pd.DataFrame()
+
     def update_equity_dfs(self):
         """
         It takes the equity curves from the statistics manager and puts them into a dataframe
         """
-        exchanges = {asset.exchange for asset in self.assets}
+        accounts = self.accounts()
         self.equity_dfs = {}
-        LOG.info("exchanges = %s", exchanges)
-        for exchange in exchanges:
+        LOG.info("accounts = %s", list(accounts))
+        for account_key in accounts:
+            equity_curves = self.statistics_manager.get_equity_curves(*account_key)
             equity_df = pd.DataFrame(
-                list(self.statistics_manager.get_equity_curves(exchange)),
+                list(equity_curves) if equity_curves is not None else [],
                 columns=["Timestamp", "Equity"],
-            ).set_index("Timestamp")
-            self.statistics_manager.set_equity_dfs(equity_df, exchange)
-            self.equity_dfs[exchange] = equity_df
+            )
+            equity_df["Timestamp"] = pd.to_datetime(equity_df["Timestamp"], utc=True)
+            equity_df = equity_df.set_index("Timestamp")
+            self.statistics_manager.set_equity_dfs(equity_df, *account_key)
+            self.equity_dfs[self.result_key(account_key)] = equity_df
 
     def update_positions(self):
         """
         It updates the positions of the assets in the portfolio
         """
-        exchanges = {asset.exchange for asset in self.assets}
-        for exchange in exchanges:
-            if self.statistics_manager.get_positions(exchange) is None:
-                self.statistics_manager.set_positions([], exchange)
+        for account_key, portfolios in self.accounts().items():
+            if self.statistics_manager.get_positions(*account_key) is None:
+                self.statistics_manager.set_positions([], *account_key)
 
             if not self.clock.updated:
                 return
 
-            current_time = self.clock.current_time()
-            if len(self.statistics_manager.get_positions(exchange)) != 0:
-                most_recent_time = self.statistics_manager.get_positions(exchange)[-1][
-                    0
-                ]
+            current_time = self.clock.current_epoch_ns()
+            account_positions = self.statistics_manager.get_positions(*account_key)
+            if len(account_positions) != 0:
+                most_recent_time = account_positions[-1][0]
                 if most_recent_time >= current_time:
-                    return
+                    continue
 
-            portfolio_dict = self.broker_manager.get_broker(exchange).get_portfolio_as_dict()
+            portfolio_dict = {}
+            for portfolio in portfolios:
+                portfolio_dict.update(portfolio.portfolio_to_dict())
 
             positions = []
             new_pos = False
@@ -256,9 +378,9 @@ class EventLoop:
             if not new_pos:
                 continue
 
-            cash = self.broker_manager.get_broker(exchange).get_portfolio_cash_balance()
+            cash = sum(portfolio.cash for portfolio in portfolios)
             for position in positions:
-                self.statistics_manager.get_positions(exchange).append(
+                account_positions.append(
                     (
                         current_time,
                         *position,
@@ -268,13 +390,12 @@ class EventLoop:
 
     def update_positions_dfs(self):
         """
-        > It takes the positions from the statistics manager and creates a dataframe for each exchange
+        > It takes the positions from the statistics manager and creates a dataframe for each account
         """
-        exchanges = {asset.exchange for asset in self.assets}
         self.positions_dfs = {}
-        for exchange in exchanges:
+        for account_key in self.accounts():
             positions_df = pd.DataFrame(
-                self.statistics_manager.get_positions(exchange),
+                self.statistics_manager.get_positions(*account_key),
                 columns=[
                     "Timestamp",
                     "Exchange",
@@ -284,76 +405,75 @@ class EventLoop:
                     "Size",
                     "Cash",
                 ],
-            ).set_index("Timestamp")
-            self.statistics_manager.set_positions_dfs(positions_df, exchange)
-            self.positions_dfs[exchange] = positions_df
+            )
+            positions_df["Timestamp"] = pd.to_datetime(
+                positions_df["Timestamp"], utc=True
+            )
+            positions_df = positions_df.set_index("Timestamp")
+            self.statistics_manager.set_positions_dfs(positions_df, *account_key)
+            self.positions_dfs[self.result_key(account_key)] = positions_df
 
     def update_transactions(self):
         """
         > If the clock has been updated, and the most recent transaction time is less than the current time, then update the
         transactions
         """
-        exchanges = {asset.exchange for asset in self.assets}
-        for exchange in exchanges:
+        for account_key, portfolios in self.accounts().items():
             if not self.clock.updated:
                 return
 
             current_time = self.clock.current_time()
-            if (
-                self.statistics_manager.get_transactions(exchange) is not None
-                and len(self.statistics_manager.get_transactions(exchange)) != 0
-            ):
-                most_recent_time = self.statistics_manager.get_transactions(exchange)[
-                    -1
-                ][0]
+            account_transactions = self.statistics_manager.get_transactions(*account_key)
+            if account_transactions is not None and len(account_transactions) != 0:
+                most_recent_time = account_transactions.index[-1]
                 if most_recent_time >= current_time:
-                    return
+                    continue
 
-            portfolio = self.broker_manager.get_broker(exchange).portfolio
-            self.statistics_manager.set_transactions(
-                [
-                    (
-                        transaction.timestamp,
-                        transaction.size
-                        if transaction.action == Action.BUY
-                        else -transaction.size,
-                        transaction.price,
-                        transaction.asset.key(),
-                    )
-                    for transaction in portfolio.transactions
-                ],
-                exchange,
+            transactions_dfs = [
+                portfolio.ledger.transactions_df() for portfolio in portfolios
+            ]
+            transactions_df = (
+                transactions_dfs[0]
+                if len(transactions_dfs) == 1
+                else pd.concat(transactions_dfs).sort_index(kind="stable")
             )
+            self.statistics_manager.set_transactions(transactions_df, *account_key)
 
     def update_transactions_dfs(self):
         """
         It takes the transactions from the statistics manager and puts them into a dataframe
         """
-        exchanges = {asset.exchange for asset in self.assets}
         self.transactions_dfs = {}
-        for exchange in exchanges:
-            if self.statistics_manager.get_transactions(exchange) is not None:
-                transactions_df = pd.DataFrame(
-                    self.statistics_manager.get_transactions(exchange),
-                    columns=["Timestamp", "amount", "price", "symbol"],
-                ).set_index("Timestamp")
-                self.statistics_manager.set_transactions_dfs(transactions_df, exchange)
+        for account_key in self.accounts():
+            if self.statistics_manager.get_transactions(*account_key) is not None:
+                transactions_df = self.statistics_manager.get_transactions(*account_key)
+                self.statistics_manager.set_transactions_dfs(transactions_df, *account_key)
             else:
                 transactions_df = pd.DataFrame(
                     columns=["Timestamp", "amount", "price", "symbol"]
                 ).set_index("Timestamp")
                 self.statistics_manager.set_transactions_dfs(
                     transactions_df,
-                    exchange,
+                    *account_key,
                 )
-            self.transactions_dfs[exchange] = transactions_df
+            self.transactions_dfs[self.result_key(account_key)] = transactions_df
 
     def run_strategies(self):
         """
         It runs the strategy, then logs the cash balance, portfolio, and total equity for each exchange
         """
+        if self.strategy_executor is not None:
+            signals_list = self.strategy_executor.run(
+                self.context.get_last_candles(), self.clock.current_epoch_ns(), self.clock
+            )
+            for signals in signals_list:
+                self.context.add_event(SignalEvent(signals))
+            return
         for strategy in self.strategy_instances:
             self.run_strategy(strategy)
+            # The portfolio dict is rebuilt from every position, don't build it when nothing is logged
+            if not LOG.isEnabledFor(logging.INFO):
+                continue
             exchanges = {asset.exchange for asset in self.context.candles}
             for exchange in exchanges:
                 LOG.info(
@@ -418,28 +538,74 @@ class EventLoop:
         broker_isolation=BrokerIsolation.EXCHANGE,
         statistics_class: type = None,
         real_time_plotting=False,
+        live_sync_interval: timedelta = timedelta(seconds=10),
+        live_signals_and_orders_interval: timedelta = timedelta(seconds=10),
+        live_data_interval: timedelta = timedelta(minutes=1),
+        live_data_delay: timedelta = timedelta(seconds=1),
+        max_live_latency: timedelta = timedelta(seconds=5),
+        strategy_executor: ParallelStrategyExecutor = None,
+        indicators: ReactiveIndicators = None,
+        data: CandleData = None,
+        update_data: bool = True,
+        checkpoint_interval: timedelta = None,
+        checkpoint_callback: Callable[[Checkpoint], bool] = None,
+        snapshot_path: str = None,
+        notification_dispatcher: NotificationDispatcher = None,
     ):
+        # Fail before running the whole backtest rather than when the snapshot is saved at its end
+        if snapshot_path is not None:
+            self.check_snapshot_support(indicator_mode, strategy_executor)
         self.events: deque = events
         self.asset_delayed_events = {}
         self.delayed_events = []
         self.assets = normalize_assets(assets)
         self.feed = feed
-        self.indicators = ReactiveIndicators(mode=indicator_mode, memoize=True)
-        self.data = CandleData(candles=feed.candles, indicators=self.indicators)
+        # Event loops replaying the same feed in lockstep can share their indicators and candle data, only one of
+        # them has to push the new candles to the data
+        self.indicators = (
+            indicators
+            if indicators is not None
+            else ReactiveIndicators(mode=indicator_mode, memoize=True)
+        )
+        self.data = (
+            data
+            if data is not None
+            else CandleData(candles=feed.candles, indicators=self.indicators)
+        )
+        self.update_data = update_data
         self.order_manager = order_manager
         self.broker_manager = self.order_manager.broker_manager
         self.clock = self.order_manager.clock
         self.strategies_parameters = strategies_parameters if strategies_parameters is not None else {}
         self.strategy_instances: list[StrategyBase] = []
+        # The notifications of the strategies are sent to telegram when running live and dropped otherwise
+        if notification_dispatcher is None:
+            notification_dispatcher = (
+                NotificationDispatcher([TelegramSink()])
+                if mode == EventLoopMode.LIVE
+                else NotificationDispatcher(enabled=False)
+            )
+        self.notification_dispatcher = notification_dispatcher
         self.context = Context(
             assets=self.assets,
             order_manager=self.order_manager,
             broker_manager=self.broker_manager,
             events=self.events,
+            notification_dispatcher=self.notification_dispatcher,
         )
         self.indicator_mode = indicator_mode
         self.mode = mode
-        self._init_strategy_instances()
+        self.strategy_executor = strategy_executor
+        if self.strategy_executor is None:
+            self._init_strategy_instances()
+        else:
+            self.strategy_executor.start(
+                self.strategies_parameters,
+                self.assets,
+                feed.candles,
+                indicator_mode,
+                self.clock.market_cal,
+            )
         self.seen_candles = {}
         self._init_seen_candles()
         self.close_at_end_of_day = close_at_end_of_day
@@ -448,9 +614,18 @@ class EventLoop:
         self.signals_and_orders_last_update = None
         self.current_timestamp = MAX_TIMESTAMP
         self.broker_isolation = broker_isolation
-        self.statistics_manager = StatisticsManager(isolation=self.broker_isolation)
+        # The simulated brokers book the orders of each isolation key in its own sub-account, the live brokers
+        # reconcile their portfolio with the whole exchange account
+        if self.mode != EventLoopMode.LIVE:
+            self.broker_manager.sub_account_isolation = self.broker_isolation
+        self._init_sub_accounts()
+        self.statistics_manager = StatisticsManager(
+            isolation=self.broker_manager.sub_account_isolation
+        )
         self.statistics_class = statistics_class
         self.statistics_df = None
+        # The statistics of each account, keyed like the equity dataframes
+        self.accounts_statistics_dfs = {}
         self.signals = {
             asset: {time_unit: [] for time_unit in self.assets[asset]}
             for asset in self.assets
@@ -462,164 +637,430 @@ class EventLoop:
         self.figs = None
         self.trading_event_trace_index = {}
         self.indicator_trace_index = {}
+        self.live_sync_interval = live_sync_interval
+        self.live_signals_and_orders_interval = live_signals_and_orders_interval
+        self.live_data_interval = live_data_interval
+        self.live_data_delay = live_data_delay
+        self.max_live_latency = max_live_latency
+        self.latency_stats = LatencyStats(bound=max_live_latency)
+        self.live_start_epoch_ns = MAX_EPOCH_NS
+        self.stop_event = None
+        self.state_lock = None
+        self.asyncio_loop = None
+        # Intermediate reporting: the callback gets a checkpoint every checkpoint_interval of data and returns True to
+        # stop the backtest
+        self.checkpoint_interval_ns = (
+            timedelta_to_ns(checkpoint_interval)
+            if checkpoint_interval is not None
+            else None
+        )
+        self.checkpoint_callback = checkpoint_callback
+        self.running_metrics = RunningMetrics()
+        self.next_checkpoint_epoch_ns = None
+        self.checkpoint_step = 0
+        self.pruned = False
+        # When set, a snapshot of the event loop is saved when the end of the data is reached, before the positions
+        # are closed and the results computed, so that the backtest can be resumed once new data is appended to the
+        # feed
+        self.snapshot_path = snapshot_path
+
+    @staticmethod
+    def check_snapshot_support(
+        indicator_mode: IndicatorMode, strategy_executor: ParallelStrategyExecutor
+    ) -> None:
+        if strategy_executor is not None:
+            raise Exception("Cannot snapshot an event loop running its strategies in worker processes")
+        if indicator_mode == IndicatorMode.BATCH:
+            raise Exception(
+                "Cannot snapshot an event loop in BATCH indicator mode, the indicators are computed upfront on the "
+                "whole data"
+            )
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Save the whole state of the event loop: the feed and its cursors, the context, the indicators, the
+        strategies, the brokers and their portfolios, the open orders, the clock and the recorded curves. The file is
+        written atomically.
+
+        :param path: The path of the snapshot file
+        :type path: str
+        """
+        self.check_snapshot_support(self.indicator_mode, self.strategy_executor)
+        directory = os.path.dirname(os.path.abspath(path))
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        LOG.info("Event loop snapshot saved to %s", path)
+
+    @staticmethod
+    def load_snapshot(path: str) -> "EventLoop":
+        """
+        Load an event loop saved by save_snapshot. Append the new candles to its feed then call loop() to resume it.
+
+        :param path: The path of the snapshot file
+        :type path: str
+        :return: The event loop, in the state it had when the snapshot was taken
+        :rtype: EventLoop
+        """
+        with open(path, "rb") as file:
+            event_loop = pickle.load(file)
+        LOG.info("Event loop snapshot loaded from %s", path)
+        return event_loop
 
     def loop(self):
         """
         The function loops through the events queue and processes each event
         """
-        data_to_process = True
-        while data_to_process:
+        try:
             if self.mode == EventLoopMode.LIVE:
-                # tasks to be done regularly
-                for exchange in self.broker_manager.brokers:
-                    self.broker_manager.get_broker(exchange).synchronize()
-                now = self.clock.current_time()
-                if (
-                    self.signals_and_orders_last_update is None
-                    or now - self.signals_and_orders_last_update
-                    >= timedelta(seconds=10)
-                ):
-                    self.order_manager.process_pending_signals()
-                    for exchange in self.broker_manager.brokers:
-                        self.broker_manager.get_broker(exchange).execute_open_orders()
-                    self.signals_and_orders_last_update = self.clock.current_time()
-
-                now = self.clock.current_time()
-                if self.last_update is not None and now - self.last_update < timedelta(
-                    minutes=1
-                ):
-                    continue
+                asyncio.run(self.live_loop())
+                return
 
-                self.last_update = self.clock.current_time()
+            data_to_process = True
+            while data_to_process:
+                self.feed.update_latest_data()
+                data_to_process = self.process_events()
+        finally:
+            if self.strategy_executor is not None:
+                self.strategy_executor.stop()
 
-            self.feed.update_latest_data()
+    def process_events(self) -> bool:
+        """
+        Handle all the events currently in the events queue
 
-            # Handle the events
-            while True:
-                if len(self.events) == 0:
-                    break
-                event = self.events.popleft()
-                if event is None:
-                    continue
+        :return: False if the end of the data has been reached, True otherwise
+        :rtype: bool
+        """
+        while True:
+            if len(self.events) == 0:
+                break
+            event = self.events.popleft()
+            if event is None:
+                continue
 
-                if event.bars_delay > 0:
-                    if isinstance(event, AssetSpecificEvent):
-                        if event.asset not in self.asset_delayed_events:
-                            self.asset_delayed_events[event.asset] = [event]
-                        else:
-                            self.asset_delayed_events[event.asset].append(event)
-                    elif isinstance(event, DataEvent) or isinstance(
-                        event, PendingSignalEvent
-                    ):
-                        self.delayed_events.append(event)
-                    continue
+            if event.bars_delay > 0:
+                if isinstance(event, AssetSpecificEvent):
+                    if event.asset not in self.asset_delayed_events:
+                        self.asset_delayed_events[event.asset] = [event]
+                    else:
+                        self.asset_delayed_events[event.asset].append(event)
+                elif isinstance(event, DataEvent) or isinstance(
+                    event, PendingSignalEvent
+                ):
+                    self.delayed_events.append(event)
+                continue
 
-                match event.event_type:
-                    case EventType.MARKET_DATA:
-                        candles_dict = event.candles
-                        eod_assets = {}
-                        for asset in candles_dict:
-                            for time_unit in candles_dict[asset]:
-                                candles = candles_dict[asset][time_unit]
-                                for candle in candles:
-                                    timestamp_str = str(candle.timestamp)
-                                    if (
-                                        timestamp_str
-                                        in self.seen_candles[candle.asset][candle.time_unit]
-                                    ):
-                                        continue
-                                    self.seen_candles[candle.asset][candle.time_unit].add(
-                                        timestamp_str
-                                    )
-                                    self.context.add_candle(candle)
-                                    self.handle_asset_delayed_events(candle)
-                                    self.handle_delayed_events()
-                                    if self.close_at_end_of_day and self.clock.end_of_day():
-                                        if asset not in eod_assets:
-                                            eod_assets[asset] = []
-                                        eod_assets[asset].append(candle.time_unit)
-                        candles_are_processed = False
-                        while not candles_are_processed:
-                            self.context.update()
-                            last_candles = self.context.get_last_candles()
-                            if len(last_candles) == 0:
-                                candles_are_processed = True
-                                break
-                            self.update_equity_curves()
-                            self.update_positions()
-                            self.clock.update(
-                                self.context.current_timestamp + timedelta(minutes=1)
-                            )
-                            for candle in last_candles:
-                                LOG.info("Process new candle: %s", candle.to_json())
+            match event.event_type:
+                case EventType.MARKET_DATA:
+                    candles_dict = event.candles
+                    eod_assets = {}
+                    for asset in candles_dict:
+                        for time_unit in candles_dict[asset]:
+                            candles = candles_dict[asset][time_unit]
+                            for candle in candles:
+                                seen_candles = self.seen_candles[candle.asset][
+                                    candle.time_unit
+                                ]
+                                if candle.epoch_ns in seen_candles:
+                                    continue
+                                seen_candles.add(candle.epoch_ns)
+                                self.context.add_candle(candle)
+                                self.handle_asset_delayed_events(candle)
+                                self.handle_delayed_events()
+                                if self.close_at_end_of_day and self.clock.end_of_day():
+                                    if asset not in eod_assets:
+                                        eod_assets[asset] = []
+                                    eod_assets[asset].append(candle.time_unit)
+                    candles_are_processed = False
+                    while not candles_are_processed:
+                        self.context.update()
+                        last_candles = self.context.get_last_candles()
+                        if len(last_candles) == 0:
+                            candles_are_processed = True
+                            break
+                        self.update_equity_curves()
+                        self.update_positions()
+                        if (
+                            self.checkpoint_interval_ns is not None
+                            and self.update_running_metrics()
+                        ):
+                            self.prune()
+                            return False
+                        self.clock.update(
+                            self.context.current_epoch_ns + ONE_MINUTE_NS
+                        )
+                        for candle in last_candles:
+                            LOG.info("Process new candle: %s", candle)
+                            if self.update_data:
                                 self.data(candle.asset, candle.time_unit).push(candle)
-                                if (
-                                    self.mode == EventLoopMode.LIVE
-                                    and self.real_time_plotting
-                                ):
-                                    self.real_time_plot(candle.asset, candle.time_unit)
-                                self.broker_manager.get_broker(candle.asset.exchange).update_price(candle)
-                            self.run_strategies()
-                            for candle in last_candles:
-                                self.broker_manager.get_broker(candle.asset.exchange).execute_open_orders()
-                        if len(eod_assets) != 0:
-                            bars_delay = 0
-                            if self.mode != EventLoopMode.LIVE:
-                                bars_delay = 1
-                            timestamp = min([self.clock.current_time() for _ in eod_assets])
-                            self.events.append(
-                                MarketEodDataEvent(
-                                    assets=eod_assets,
-                                    timestamp=timestamp,
-                                    bars_delay=bars_delay,
-                                )
-                            )
-                    case EventType.OPEN_ORDERS:
-                        for exchange in self.broker_manager.brokers:
+                            if (
+                                self.mode == EventLoopMode.LIVE
+                                and self.real_time_plotting
+                            ):
+                                self.real_time_plot(candle.asset, candle.time_unit)
+                            self.broker_manager.get_broker(candle.asset.exchange).update_price(candle)
+                        self.run_strategies()
+                        if self.mode == EventLoopMode.LIVE:
+                            self.record_latencies(last_candles)
+                        # Each broker executes its open orders once, whatever the number of its assets having a new candle
+                        for exchange in dict.fromkeys(candle.asset.exchange for candle in last_candles):
                             self.broker_manager.get_broker(exchange).execute_open_orders()
-                    case EventType.PENDING_SIGNAL:
-                        self.order_manager.process_pending_signals()
-                    case EventType.MARKET_EOD_DATA:
+                    if len(eod_assets) != 0:
+                        bars_delay = 0
+                        if self.mode != EventLoopMode.LIVE:
+                            bars_delay = 1
+                        timestamp = min([self.clock.current_time() for _ in eod_assets])
+                        self.events.append(
+                            MarketEodDataEvent(
+                                assets=eod_assets,
+                                timestamp=timestamp,
+                                bars_delay=bars_delay,
+                            )
+                        )
+                case EventType.OPEN_ORDERS:
+                    for exchange in self.broker_manager.brokers:
+                        self.broker_manager.get_broker(exchange).execute_open_orders()
+                case EventType.PENDING_SIGNAL:
+                    self.order_manager.process_pending_signals()
+                case EventType.MARKET_EOD_DATA:
+                    assets = event.assets
+                    for asset in assets:
+                        self.broker_manager.get_broker(asset.exchange).close_all_open_positions(asset)
+                case EventType.SIGNAL:
+                    signals = event.signals
+                    for signal in signals:
+                        self.add_signal(signal)
+                        self.order_manager.check_signal(signal)
+                case EventType.MARKET_DATA_END:
+                    if self.snapshot_path is not None:
+                        self.save_snapshot(self.snapshot_path)
+                    if self.close_at_end_of_data:
                         assets = event.assets
                         for asset in assets:
-                            self.broker_manager.get_broker(asset.exchange).close_all_open_positions(asset)
-                    case EventType.SIGNAL:
-                        signals = event.signals
-                        for signal in signals:
-                            self.add_signal(signal)
-                            self.order_manager.check_signal(signal)
-                    case EventType.MARKET_DATA_END:
-                        if self.close_at_end_of_data:
-                            assets = event.assets
-                            for asset in assets:
-                                self.broker_manager.get_broker(asset.exchange).close_all_open_positions(asset=asset, end_of_day=False)
-                        self.update_equity_curves()
-                        self.update_positions()
-                        self.update_equity_dfs()
-                        self.update_positions_dfs()
-                        self.update_transactions()
-                        self.update_transactions_dfs()
-                        self.update_signals_df()
-                        self.order_manager.update_orders_df()
-                        self.orders_df = self.order_manager.orders_df
-
-                        exchanges = [asset.exchange for asset in self.assets]
-                        if self.statistics_class is not None:
-                            for exchange in exchanges:
-                                if self.statistics_manager.get_equity_dfs(exchange).empty:
-                                    self.statistics_df = pd.DataFrame()
-                                    continue
+                            self.broker_manager.get_broker(asset.exchange).close_all_open_positions(asset=asset, end_of_day=False)
+                    self.update_equity_curves()
+                    self.update_positions()
+                    self.update_equity_dfs()
+                    self.update_positions_dfs()
+                    self.update_transactions()
+                    self.update_transactions_dfs()
+                    self.update_signals_df()
+                    self.order_manager.update_orders_df()
+                    self.orders_df = self.order_manager.orders_df
+
+                    if self.statistics_class is not None:
+                        for account_key in self.accounts():
+                            if self.statistics_manager.get_equity_dfs(*account_key).empty:
+                                self.statistics_df = pd.DataFrame()
+                            else:
                                 self.statistics_df = self.statistics_class(
-                                    equity=self.statistics_manager.get_equity_dfs(exchange),
+                                    equity=self.statistics_manager.get_equity_dfs(*account_key),
                                     positions=self.statistics_manager.get_positions_dfs(
-                                        exchange
+                                        *account_key
                                     ),
                                     transactions=self.statistics_manager.get_transactions_dfs(
-                                        exchange
+                                        *account_key
                                     ),
                                 ).get_tearsheet()
-                        data_to_process = False
+                            self.accounts_statistics_dfs[
+                                self.result_key(account_key)
+                            ] = self.statistics_df
+                    return False
+        return True
+
+    async def _sleep(self, seconds: float) -> None:
+        """
+        Sleep for the given number of seconds or until the loop is stopped
+        """
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_periodically(self, callback: Callable, interval: timedelta) -> None:
+        """
+        Await callback every interval until the live loop is stopped. Errors are logged so that a failing timer
+        doesn't bring down the whole live loop.
+        """
+        while not self.stop_event.is_set():
+            await self._sleep(interval.total_seconds())
+            if self.stop_event.is_set():
+                break
+            try:
+                await callback()
+            except Exception as e:
+                LOG.error("Live timer %s failed: %s", callback.__name__, e)
+
+    async def synchronize_brokers(self) -> None:
+        """
+        Synchronize all the brokers concurrently. Brokers hold independent states, only the event processing has to
+        be kept out while they are updated.
+        """
+        async with self.state_lock:
+            await asyncio.gather(
+                *[
+                    asyncio.to_thread(self.broker_manager.get_broker(exchange).synchronize)
+                    for exchange in self.broker_manager.brokers
+                ]
+            )
+        self.last_update = self.clock.current_time()
+
+    def brokers_exchanges(self) -> list[tuple[Any, list[str]]]:
+        """
+        :return: Each broker once, with the exchanges it trades on
+        :rtype: list[tuple[Any, list[str]]]
+        """
+        brokers_exchanges = []
+        for exchange in self.broker_manager.brokers:
+            broker = self.broker_manager.get_broker(exchange)
+            for other_broker, exchanges in brokers_exchanges:
+                if other_broker is broker:
+                    exchanges.append(exchange.lower())
+                    break
+            else:
+                brokers_exchanges.append((broker, [exchange.lower()]))
+        return brokers_exchanges
+
+    async def consume_user_data_stream(self, broker: Any, exchanges: list[str]) -> None:
+        """
+        Apply the order updates pushed by the user data stream of a broker as soon as they arrive, so that the fills
+        reach the portfolio and the orders callbacks fire without waiting for the next synchronization. The broker
+        polls its trades at its usual period again once the stream is disconnected.
+        """
+        user_data_stream = broker.user_data_stream
+        try:
+            await user_data_stream.connect(exchanges)
+            broker.streaming = True
+            async for update in user_data_stream.updates():
+                async with self.state_lock:
+                    broker.apply_order_update(update)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOG.error("User data stream of %s failed: %s", exchanges, e)
+        finally:
+            broker.streaming = False
+            await user_data_stream.close()
+
+    async def process_signals_and_orders(self) -> None:
+        async with self.state_lock:
+            await asyncio.to_thread(self._process_signals_and_orders)
+        self.signals_and_orders_last_update = self.clock.current_time()
+
+    def _process_signals_and_orders(self) -> None:
+        self.order_manager.process_pending_signals()
+        for exchange in self.broker_manager.brokers:
+            self.broker_manager.get_broker(exchange).execute_open_orders()
+
+    def seconds_until_next_data(self) -> float:
+        """
+        Candles are only available once closed, so the feed is polled right after the next minute boundary
+        """
+        data_interval_ns = timedelta_to_ns(self.live_data_interval)
+        now_ns = self.clock.current_epoch_ns()
+        next_data_ns = (
+            now_ns - now_ns % data_interval_ns + data_interval_ns + timedelta_to_ns(self.live_data_delay)
+        )
+        return (next_data_ns - now_ns) / NANOSECONDS_IN_SECOND
+
+    def record_latencies(self, candles: list[Candle]) -> None:
+        """
+        Record the latency between the close of the candles and the moment the strategies processed them. Candles
+        closed before the live loop started are history being caught up and are ignored.
+        """
+        now_ns = self.clock.current_epoch_ns()
+        for candle in candles:
+            close_ns = candle.epoch_ns + timedelta_to_ns(candle.time_unit)
+            if close_ns < self.live_start_epoch_ns:
+                continue
+            if not self.latency_stats.record(now_ns - close_ns):
+                LOG.warning(
+                    "Candle %s processed %s ms after its close, above the %s bound",
+                    candle,
+                    (now_ns - close_ns) / 1e6,
+                    self.max_live_latency,
+                )
+
+    async def wait_for_next_data(self) -> None:
+        """
+        Sleep until the next candles are expected, or until a streaming feed signals new candles
+        """
+        seconds = self.seconds_until_next_data()
+        new_data = getattr(self.feed, "new_data", None)
+        if new_data is None:
+            await self._sleep(seconds)
+            return
+        waiters = [
+            asyncio.ensure_future(self.stop_event.wait()),
+            asyncio.ensure_future(new_data.wait()),
+        ]
+        await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+        new_data.clear()
+
+    async def update_latest_data(self) -> None:
+        if hasattr(self.feed, "async_update_latest_data"):
+            await self.feed.async_update_latest_data()
+        else:
+            await asyncio.to_thread(self.feed.update_latest_data)
+
+    async def live_loop(self) -> None:
+        """
+        Live runtime: brokers synchronization and pending signals/open orders execution run on their own timers while
+        the main task sleeps until new candles are available, then dispatches them to the strategies right away.
+        """
+        self.stop_event = asyncio.Event()
+        self.state_lock = asyncio.Lock()
+        self.asyncio_loop = asyncio.get_running_loop()
+        self.live_start_epoch_ns = self.clock.current_epoch_ns()
+        await self.synchronize_brokers()
+        timers = [
+            asyncio.create_task(
+                self._run_periodically(self.synchronize_brokers, self.live_sync_interval)
+            ),
+            asyncio.create_task(
+                self._run_periodically(
+                    self.process_signals_and_orders, self.live_signals_and_orders_interval
+                )
+            ),
+        ]
+        timers += [
+            asyncio.create_task(self.consume_user_data_stream(broker, exchanges))
+            for broker, exchanges in self.brokers_exchanges()
+            if getattr(broker, "user_data_stream", None) is not None
+        ]
+        try:
+            while not self.stop_event.is_set():
+                await self.update_latest_data()
+                async with self.state_lock:
+                    data_to_process = await asyncio.to_thread(self.process_events)
+                    if not data_to_process:
                         break
+                    # Don't wait for the next timer tick to turn the new signals into orders
+                    await asyncio.to_thread(self._process_signals_and_orders)
+                await self.wait_for_next_data()
+        finally:
+            self.stop_event.set()
+            for timer in timers:
+                timer.cancel()
+            await asyncio.gather(*timers, return_exceptions=True)
+            if hasattr(self.feed, "stop_stream"):
+                await self.feed.stop_stream()
+            await asyncio.to_thread(self.notification_dispatcher.close)
+            self.asyncio_loop = None
+
+    def stop(self) -> None:
+        """
+        Stop the live loop. Can be called from any thread.
+        """
+        if self.asyncio_loop is not None:
+            self.asyncio_loop.call_soon_threadsafe(self.stop_event.set)
 
     def plot_indicators_instances_graph(self):
         self.indicators.plot_instances_graph()
@@ -748,8 +1189,12 @@ class EventLoop:
             )
 
         # transactions
-        portfolio = self.broker_manager.get_broker(candle_dataframe.asset.exchange).portfolio
-        transactions: list[Transaction] = portfolio.transactions
+        broker = self.broker_manager.get_broker(candle_dataframe.asset.exchange)
+        transactions: list[Transaction] = [
+            transaction
+            for portfolio in broker.portfolios()
+            for transaction in portfolio.transactions
+        ]
         buy_transactions = [
             transaction
             for transaction in transactions
@@ -0,0 +1,134 @@
+import os
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable
+
+import pandas as pd
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.feed.feed import Feed
+from trazy_analysis.indicators.indicator import CandleData
+from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import BrokerIsolation, IndicatorMode
+from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.statistics.running_metrics import Checkpoint
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+class FanOutEventLoop:
+    """
+    Replay a feed once for several strategies parameters. Each strategies parameters gets its own event loop, with
+    its own events queue, order manager, brokers and statistics, so that their portfolios stay isolated. All the event
+    loops share the same indicators and candle data: the candles are pushed only once and indicators used with the same
+    parameters by several strategy instances are computed only once thanks to the indicators memoization.
+
+    The feed events are dispatched to every event loop and each one handles them before the next event is read from
+    the feed, so all the event loops see the same bars at the same time. Only the batch mode is supported. An event
+    loop stopped by its checkpoint callback no longer receives events while the others keep running.
+    """
+
+    def __init__(
+        self,
+        events: deque,
+        assets: dict[Asset, timedelta | list[timedelta]],
+        feed: Feed,
+        order_managers: list[OrderManager],
+        strategies_parameters_list: list[dict[type, dict[str, Any]]],
+        indicator_mode: IndicatorMode = IndicatorMode.BATCH,
+        close_at_end_of_day=True,
+        close_at_end_of_data=True,
+        broker_isolation=BrokerIsolation.EXCHANGE,
+        statistics_class: type = None,
+        checkpoint_interval: timedelta = None,
+        checkpoint_callback: Callable[[Checkpoint], bool] = None,
+    ):
+        if len(order_managers) != len(strategies_parameters_list):
+            raise Exception(
+                f"An order manager is needed for each strategies parameters: got {len(order_managers)} order "
+                f"managers for {len(strategies_parameters_list)} strategies parameters"
+            )
+        self.events = events
+        self.feed = feed
+        self.indicators = ReactiveIndicators(mode=indicator_mode, memoize=True)
+        self.data = CandleData(candles=feed.candles, indicators=self.indicators)
+        self.strategies_parameters_list = strategies_parameters_list
+        self.event_loops = [
+            EventLoop(
+                events=order_manager.events,
+                assets=assets,
+                feed=feed,
+                order_manager=order_manager,
+                strategies_parameters=strategies_parameters,
+                indicator_mode=indicator_mode,
+                close_at_end_of_day=close_at_end_of_day,
+                close_at_end_of_data=close_at_end_of_data,
+                broker_isolation=broker_isolation,
+                statistics_class=statistics_class,
+                indicators=self.indicators,
+                data=self.data,
+                update_data=index == 0,
+                checkpoint_interval=checkpoint_interval,
+                checkpoint_callback=checkpoint_callback,
+            )
+            for index, (order_manager, strategies_parameters) in enumerate(
+                zip(order_managers, strategies_parameters_list)
+            )
+        ]
+
+    def loop(self) -> None:
+        data_to_process = True
+        while data_to_process:
+            self.feed.update_latest_data()
+            data_to_process = self.process_events()
+
+    def process_events(self) -> bool:
+        """
+        Dispatch the feed events to every event loop and let them handle them
+
+        :return: False if the end of the data has been reached, True otherwise
+        :rtype: bool
+        """
+        data_to_process = True
+        while len(self.events) != 0:
+            event = self.events.popleft()
+            if event is None:
+                continue
+            # The feed events are read only, the same instance can be handled by all the event loops
+            for event_loop in self.event_loops:
+                if event_loop.pruned:
+                    continue
+                event_loop.events.append(event)
+                if event_loop.process_events():
+                    continue
+                if not event_loop.pruned:
+                    data_to_process = False
+                elif event_loop.update_data:
+                    self.hand_over_data_update(event_loop)
+        return data_to_process and not all(
+            event_loop.pruned for event_loop in self.event_loops
+        )
+
+    def hand_over_data_update(self, pruned_event_loop: EventLoop) -> None:
+        """
+        The event loop pushing the candles to the shared data has been pruned before pushing the current candles, the
+        next event loop still running takes over
+        """
+        pruned_event_loop.update_data = False
+        for event_loop in self.event_loops:
+            if not event_loop.pruned:
+                event_loop.update_data = True
+                return
+
+    @property
+    def statistics_dfs(self) -> list[pd.DataFrame]:
+        return [event_loop.statistics_df for event_loop in self.event_loops]
+
+    @property
+    def equity_dfs(self) -> list[dict[str, pd.DataFrame]]:
+        return [event_loop.equity_dfs for event_loop in self.event_loops]
@@ -0,0 +1,89 @@
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.common.utils import datetime_to_epoch_ns
+from trazy_analysis.feed.feed import Feed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import BrokerIsolation, IndicatorMode
+from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.strategy.strategy import StrategyBase
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+class WalkForwardEventLoop(EventLoop):
+    """
+    Replay a feed once for all the out of sample windows of a walk forward analysis. The strategies of every window
+    are created upfront, so their indicators are fed by every candle from the start of the feed: when a window
+    starts, its strategies already have the indicator state of the end of its training window instead of warming up
+    again. Only the strategies of the current window are run, and the open positions are closed when a window ends,
+    so the equity curve of the event loop is the stitched out of sample equity.
+    """
+
+    def __init__(
+        self,
+        events: deque,
+        assets: dict[Asset, timedelta | list[timedelta]],
+        feed: Feed,
+        order_manager: OrderManager,
+        windows_strategies_parameters: list[
+            tuple[datetime, datetime, dict[type, dict[str, Any]]]
+        ],
+        indicator_mode: IndicatorMode = IndicatorMode.BATCH,
+        close_at_end_of_day=True,
+        close_at_end_of_data=True,
+        broker_isolation=BrokerIsolation.EXCHANGE,
+        statistics_class: type = None,
+    ):
+        super().__init__(
+            events=events,
+            assets=assets,
+            feed=feed,
+            order_manager=order_manager,
+            strategies_parameters={},
+            indicator_mode=indicator_mode,
+            close_at_end_of_day=close_at_end_of_day,
+            close_at_end_of_data=close_at_end_of_data,
+            broker_isolation=broker_isolation,
+            statistics_class=statistics_class,
+        )
+        self.windows: list[tuple[int, int]] = []
+        self.windows_strategy_instances: list[list[StrategyBase]] = []
+        for start, end, strategies_parameters in windows_strategies_parameters:
+            self.strategy_instances = []
+            for strategy_class, parameters in strategies_parameters.items():
+                self._init_strategy_instance(strategy_class, parameters)
+            self.windows.append((datetime_to_epoch_ns(start), datetime_to_epoch_ns(end)))
+            self.windows_strategy_instances.append(self.strategy_instances)
+        self.strategy_instances = []
+        self.window_index = None
+
+    def find_window_index(self, epoch_ns: int) -> int | None:
+        for index, (start_epoch_ns, end_epoch_ns) in enumerate(self.windows):
+            if start_epoch_ns <= epoch_ns < end_epoch_ns:
+                return index
+        return None
+
+    def run_strategies(self):
+        window_index = self.find_window_index(self.context.current_epoch_ns)
+        if window_index != self.window_index:
+            if self.window_index is not None:
+                LOG.info("End of the walk forward window %s", self.window_index)
+                for asset in self.assets:
+                    self.broker_manager.get_broker(asset.exchange).close_all_open_positions(
+                        asset=asset, end_of_day=False
+                    )
+            self.window_index = window_index
+            self.strategy_instances = (
+                self.windows_strategy_instances[window_index]
+                if window_index is not None
+                else []
+            )
+        super().run_strategies()
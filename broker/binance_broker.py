@@ -13,9 +13,14 @@ from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
 from trazy_analysis.broker.broker import Broker
 from trazy_analysis.broker.ccxt_parser import BinanceParser
 from trazy_analysis.broker.common import get_rejected_order_error_message
+from trazy_analysis.broker.user_data_stream import (
+    PARTIALLY_FILLED,
+    OrderUpdate,
+    UserDataStream,
+)
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.common.constants import CONNECTION_ERROR_MESSAGE
-from trazy_analysis.common.helper import get_or_create_nested_dict
+from trazy_analysis.common.metadata_cache import SYMBOLS, MetadataCache
 from trazy_analysis.logger import logger
 from trazy_analysis.market_data.common import datetime_from_epoch
 from trazy_analysis.models.asset import Asset
@@ -37,6 +42,8 @@ class BinanceBroker(Broker):
     UPDATE_LOT_SIZE_INFO = timedelta(days=1)
     UPDATE_BALANCES_PERIOD = pd.Timedelta(value=10, unit="seconds")
     UPDATE_TRANSACTIONS_PERIOD = pd.Timedelta(value=10, unit="seconds")
+    # The trades are only polled to reconcile the fills missed while a user data stream is connected
+    RECONCILIATION_PERIOD = pd.Timedelta(value=1, unit="minutes")
     PRODUCT_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     SYMBOL_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     TRANSACTION_LOOKBACK_PERIOD = timedelta(minutes=10)
@@ -48,6 +55,8 @@ class BinanceBroker(Broker):
         events: deque,
         base_currency: str = "EUR",
         supported_currencies: list[str] = ["EUR", "USDT"],
+        metadata_cache: MetadataCache = None,
+        user_data_stream: UserDataStream = None,
     ):
         fee_model = BinanceFeeModel()
         parser = BinanceParser
@@ -61,6 +70,7 @@ class BinanceBroker(Broker):
             parser=parser,
             execute_at_end_of_day=False,
             exchange=exchange,
+            user_data_stream=user_data_stream,
         )
         self.client = Client(
             trazy_analysis.settings.BINANCE_API_KEY,
@@ -70,6 +80,7 @@ class BinanceBroker(Broker):
         self.currency_pairs_traded = set()
         self.lot_size = {}
         self.lot_size_last_update = None
+        self.metadata_cache = metadata_cache
         self.update_lot_size_info()
         self.update_price()
         self.balances_last_update = None
@@ -86,7 +97,15 @@ class BinanceBroker(Broker):
         ):
             return
         try:
-            exchange_info = self.client.get_exchange_info()
+            if self.metadata_cache is not None:
+                exchange_info = self.metadata_cache.get(
+                    self.exchange,
+                    SYMBOLS,
+                    self.client.get_exchange_info,
+                    BinanceBroker.UPDATE_LOT_SIZE_INFO.total_seconds(),
+                )
+            else:
+                exchange_info = self.client.get_exchange_info()
         except Exception as e:
             LOG.warning(
                 CONNECTION_ERROR_MESSAGE,
@@ -149,7 +168,7 @@ class BinanceBroker(Broker):
     def update_positions(self, open_balances: dict[str, float]) -> None:
         # open positions
         portfolio = self.portfolio
-        positions = portfolio.pos_handler.positions
+        pos_handler = portfolio.pos_handler
         for symbol in open_balances:
             size = open_balances[symbol]
             if size > 0:
@@ -176,13 +195,16 @@ class BinanceBroker(Broker):
                 else 1 / self.last_prices[currency_pair_reversed]
             )
 
-            get_or_create_nested_dict(positions, currency_pair, direction)
-            positions[currency_pair][direction] = Position(
+            pos_handler.set_position(
                 currency_pair,
-                last_price,
-                buy_size,
-                sell_size,
                 direction,
+                Position(
+                    currency_pair,
+                    last_price,
+                    buy_size,
+                    sell_size,
+                    direction,
+                ),
             )
             self.currency_pairs_traded.add(currency_pair)
 
@@ -202,7 +224,9 @@ class BinanceBroker(Broker):
 
         LOG.info("Balances and positions have been updated")
 
-    def has_opened_position(self, asset: Asset, direction: Direction) -> bool:
+    def has_opened_position(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> bool:
         self.update_balances_and_positions()
         portfolio = self.portfolio
         positions = portfolio.pos_handler.positions
@@ -219,12 +243,20 @@ class BinanceBroker(Broker):
         # TODO automate bank transfers to degiro account
         pass
 
+    def transactions_update_period(self) -> timedelta:
+        if self.streaming:
+            return BinanceBroker.RECONCILIATION_PERIOD
+        return BinanceBroker.UPDATE_TRANSACTIONS_PERIOD
+
+    def order_closed(self, order: Order) -> None:
+        self.open_orders_ids.discard(order.order_id)
+
     def update_transactions(self) -> None:
         now = self.clock.current_time()
         if (
             self.transactions_last_update is not None
             and now - self.transactions_last_update
-            < BinanceBroker.UPDATE_TRANSACTIONS_PERIOD
+            < self.transactions_update_period()
         ):
             return
         epoch_ms = int(self.transactions_last_update.timestamp()) * 1000
@@ -252,7 +284,9 @@ class BinanceBroker(Broker):
                     commission,
                     transaction_id,
                 ) = self.parser.parse_trade_info(trade)
-                if trade_epoch_ms < epoch_ms:
+                if trade_epoch_ms < epoch_ms or self.order_tracker.is_processed(
+                    transaction_id
+                ):
                     continue
                 timestamp = datetime_from_epoch(trade_epoch_ms)
                 asset = Asset(symbol=symbol, exchange=self.exchange)
@@ -268,6 +302,12 @@ class BinanceBroker(Broker):
                     timestamp=timestamp,
                     transaction_id=transaction_id,
                 )
+                if self.user_data_stream is not None:
+                    # A fill missed by the stream, the order is completed once its size is filled
+                    self.apply_order_update(
+                        OrderUpdate(self.exchange.lower(), order_id, PARTIALLY_FILLED, transaction)
+                    )
+                    continue
                 description = "%s %s %s %s %s %s" % (
                     action.name,
                     direction.name,
@@ -312,13 +352,17 @@ class BinanceBroker(Broker):
             )
         return self.cash_balances[currency]
 
-    def max_entry_order_size(self, asset: Asset, cash: float = None) -> float:
+    def max_entry_order_size(
+        self, asset: Asset, cash: float = None, sub_account: tuple[str, str] = None
+    ) -> float:
         if cash is None:
             cash = self.portfolio.cash
         price = self.current_price(asset)
         return self.fee_models[asset].calc_max_size_for_cash(cash=cash, price=price)
 
-    def position_size(self, asset: Asset, direction: Direction) -> int:
+    def position_size(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> int:
         return super().position_size(asset, direction)
 
     def get_market_action_func(self, action: Action):
@@ -369,6 +413,7 @@ class BinanceBroker(Broker):
             )
             if order_response["status"] != "FILLED":
                 self.open_orders_ids.add(order.order_id)
+                self.order_tracker.track(self.exchange, order)
             self.currency_pairs_traded.add(order.asset)
         except Exception as e:
             error_message = get_rejected_order_error_message(order)
@@ -403,6 +448,7 @@ class BinanceBroker(Broker):
                 limit_order.order_id,
             )
             self.open_orders_ids.add(limit_order.order_id)
+            self.order_tracker.track(self.exchange, limit_order)
             self.currency_pairs_traded.add(limit_order.asset)
         except Exception as e:
             error_message = get_rejected_order_error_message(limit_order)
@@ -11,6 +11,11 @@ import trazy_analysis.settings
 from trazy_analysis.broker.ccxt_parser import DummyParser
 from trazy_analysis.broker.fee_model import FeeModel, FeeModelManager
 from trazy_analysis.broker.fixed_fee_model import FixedFeeModel
+from trazy_analysis.broker.user_data_stream import (
+    OrderTracker,
+    OrderUpdate,
+    UserDataStream,
+)
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.common.helper import get_or_create_nested_dict
 from trazy_analysis.logger import logger
@@ -46,6 +51,8 @@ class Broker:
     """
 
     __metaclass__ = ABCMeta
+    # How far back the live brokers poll their trades
+    TRANSACTION_LOOKBACK_PERIOD = timedelta(minutes=10)
 
     def __init__(
         self,
@@ -57,8 +64,13 @@ class Broker:
         parser=DummyParser,
         execute_at_end_of_day=True,
         exchange="universal",
+        user_data_stream: UserDataStream = None,
     ):
         self.supported_currencies = supported_currencies
+        # The live event loop consumes the user data stream and sets streaming while it is connected
+        self.user_data_stream = user_data_stream
+        self.streaming = False
+        self.order_tracker = OrderTracker(self.TRANSACTION_LOOKBACK_PERIOD)
 
         self.fee_models = FeeModelManager(fee_models)
         self.parser = parser
@@ -77,6 +89,22 @@ class Broker:
 
         # create portfolio
         self._create_initial_portfolio()
+        # The sub-accounts share the prices and the order book of the broker but have their own cash and positions,
+        # each of them is funded with the funds subscribed to the broker portfolio
+        self.sub_portfolios: dict[tuple[str, str], Portfolio] = {}
+        self.portfolio_funds = 0.0
+
+    def apply_order_update(self, update: OrderUpdate) -> None:
+        """
+        Apply an order update pushed by the user data stream: its fill is transacted in the portfolio and the order
+        is completed or cancelled, which fires its callbacks, as soon as it is closed
+        """
+        closed_order = self.order_tracker.apply(update, self.portfolio)
+        if closed_order is not None:
+            self.order_closed(closed_order)
+
+    def order_closed(self, order: Order) -> None:
+        pass
 
     def _set_base_currency(self, base_currency: str) -> str:
         """
@@ -133,7 +161,7 @@ class Broker:
 
     @abstractmethod
     def has_opened_position(
-        self, asset: str, direction: Direction
+        self, asset: str, direction: Direction, sub_account: tuple[str, str] = None
     ) -> bool:  # pragma: no cover
         raise NotImplementedError("Should implement has_opened_position()")
 
@@ -162,56 +190,103 @@ class Broker:
             "(%s) - portfolio creation: Portfolio created", self.clock.current_time()
         )
 
-    def get_portfolio_total_market_value(self) -> float:
+    def portfolio_of(self, sub_account: tuple[str, str] = None) -> Portfolio:
+        """
+        Return the portfolio of a sub-account, created and funded
+        with the funds subscribed to the broker portfolio the first
+        time it is used.
+        Parameters
+        ----------
+        sub_account : `tuple[str, str]`, optional
+            The (symbol, strategy name) sub-account, the broker
+            portfolio if None.
+        Returns
+        -------
+        `Portfolio`
+            The portfolio of the sub-account.
+        """
+        if sub_account is None:
+            return self.portfolio
+        portfolio = self.sub_portfolios.get(sub_account)
+        if portfolio is None:
+            portfolio = Portfolio(
+                starting_cash=self.portfolio_funds,
+                currency=self.base_currency,
+                name="-".join(str(key) for key in sub_account if key is not None),
+                timestamp=self.clock.current_time(),
+            )
+            self.sub_portfolios[sub_account] = portfolio
+            LOG.info(
+                "(%s) - portfolio creation: sub-account %s created with %s",
+                self.clock.current_time(),
+                sub_account,
+                self.portfolio_funds,
+            )
+        return portfolio
+
+    def portfolios(self) -> list[Portfolio]:
+        return [self.portfolio, *self.sub_portfolios.values()]
+
+    def get_portfolio_total_market_value(
+        self, sub_account: tuple[str, str] = None
+    ) -> float:
         """
         Returns the current total market value of a Portfolio.
         Parameters
         ----------
+        sub_account : `tuple[str, str]`, optional
+            The sub-account, the broker portfolio if None.
         Returns
         -------
         `float`
             The total market value of the portfolio.
         """
-        return self.portfolio.total_market_value
+        return self.portfolio_of(sub_account).total_market_value
 
-    def get_portfolio_total_equity(self) -> float:
+    def get_portfolio_total_equity(self, sub_account: tuple[str, str] = None) -> float:
         """
         Returns the current total equity of a Portfolio.
         Parameters
         ----------
+        sub_account : `tuple[str, str]`, optional
+            The sub-account, the broker portfolio if None.
         Returns
         -------
         `float`
             The total equity of the portfolio.
         """
-        return self.portfolio.total_equity
+        return self.portfolio_of(sub_account).total_equity
 
-    def get_portfolio_as_dict(self) -> dict:
+    def get_portfolio_as_dict(self, sub_account: tuple[str, str] = None) -> dict:
         """
         Return a particular portfolio as
         a dictionary with Asset asset strings as keys, with various
         attributes as sub-dictionaries.
         Parameters
         ----------
+        sub_account : `tuple[str, str]`, optional
+            The sub-account, the broker portfolio if None.
         Returns
         -------
         `dict{str}`
             The portfolio representation of Assets as a dictionary.
         """
-        return self.portfolio.portfolio_to_dict()
+        return self.portfolio_of(sub_account).portfolio_to_dict()
 
-    def get_portfolio_cash_balance(self) -> float:
+    def get_portfolio_cash_balance(self, sub_account: tuple[str, str] = None) -> float:
         """
         Retrieve the cash balance of a sub-portfolio, if
         it exists. Otherwise raise a ValueError.
         Parameters
         ----------
+        sub_account : `tuple[str, str]`, optional
+            The sub-account, the broker portfolio if None.
         Returns
         -------
         `float`
             The cash balance of the portfolio.
         """
-        return self.portfolio.cash
+        return self.portfolio_of(sub_account).cash
 
     def subscribe_funds_to_portfolio(self, amount: float) -> None:
         """
@@ -235,6 +310,7 @@ class Broker:
                 % (amount, self.cash_balances[self.base_currency])
             )
         self.portfolio.subscribe_funds(amount)
+        self.portfolio_funds += amount
         self.cash_balances[self.base_currency] -= amount
         LOG.info(
             "(%s) - subscription: %s subscribed to portfolio",
@@ -266,6 +342,7 @@ class Broker:
                 "balance of %s." % (amount, self.portfolio.cash)
             )
         self.portfolio.withdraw_funds(amount)
+        self.portfolio_funds -= amount
         self.cash_balances[self.base_currency] += amount
         LOG.info("withdrawal: %s withdrawn from portfolio", amount)
 
@@ -274,21 +351,21 @@ class Broker:
             return
 
         if order.is_exit_order:
+            # The exit orders of a position are grouped by sub-account
+            exit_orders = self.exit_orders.setdefault(order.sub_account, {})
             if (
-                order.asset in self.exit_orders
-                and order.direction in self.exit_orders[order.asset]
+                order.asset in exit_orders
+                and order.direction in exit_orders[order.asset]
             ):
-                exit_order = self.exit_orders[order.asset][order.direction]
+                exit_order = exit_orders[order.asset][order.direction]
                 if isinstance(exit_order, OcoOrder):
                     exit_order.add_order(order)
                 else:
                     oco_order = OcoOrder(orders=[exit_order, order])
-                    self.exit_orders[order.asset][order.direction] = oco_order
+                    exit_orders[order.asset][order.direction] = oco_order
             else:
-                get_or_create_nested_dict(
-                    self.exit_orders, order.asset, order.direction
-                )
-                self.exit_orders[order.asset][order.direction] = order
+                get_or_create_nested_dict(exit_orders, order.asset, order.direction)
+                exit_orders[order.asset][order.direction] = order
 
     def put_all_orders_in_queue_recursive(self, order: Order, seen_assets):
         if isinstance(order, MultipleOrder):
@@ -325,13 +402,17 @@ class Broker:
         else:
             LOG.info("Submitted order: %s, qty: %s", order.asset, order.size)
 
-    def max_entry_order_size(self, asset: Asset, cash: float = None) -> float:
+    def max_entry_order_size(
+        self, asset: Asset, cash: float = None, sub_account: tuple[str, str] = None
+    ) -> float:
         if cash is None:
-            cash = self.portfolio.cash
+            cash = self.portfolio_of(sub_account).cash
         return self.fee_models[asset].calc_max_size_for_cash(cash=cash, price=self.current_price(asset))
 
-    def position_size(self, asset: Asset, direction: Direction) -> int:
-        return self.portfolio.pos_handler.position_size(asset, direction)
+    def position_size(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> int:
+        return self.portfolio_of(sub_account).pos_handler.position_size(asset, direction)
 
     @abstractmethod
     def execute_order(self, order: Order) -> None:  # pragma: no cover
@@ -345,8 +426,8 @@ class Broker:
             orders[index] = self.open_orders.popleft()
             index += 1
 
+        now = self.clock.current_time()
         for order in orders:
-            now = self.clock.current_time()
             if (
                 order.status == OrderStatus.SUBMITTED
                 and order.in_force(now)
@@ -364,9 +445,10 @@ class Broker:
 
     def update_price(self, candle: Candle):
         self.last_prices[candle.asset] = candle.close
-        self.portfolio.update_market_value_of_symbol(
-            candle.asset, candle.close, candle.timestamp
-        )
+        for portfolio in self.portfolios():
+            portfolio.update_market_value_of_symbol(
+                candle.asset, candle.close, candle.timestamp
+            )
 
     def synchronize(self):  # pragma: no cover
         pass
@@ -376,27 +458,27 @@ class Broker:
         if end_of_day and not self.clock.end_of_day():
             return
 
-        pos_handler = self.portfolio.pos_handler
-        positions = pos_handler.positions
-
-        if asset not in positions:
-            return
-
         close_orders = []
-        for direction in positions[asset]:
-            position = positions[asset][direction]
-            order = Order(
-                asset=asset,
-                time_unit=timedelta(minutes=1),
-                action=Action.SELL if direction == Direction.LONG else Action.BUY,
-                direction=direction,
-                size=position.net_size,
-                signal_id=f"SimulatedBroker-{asset}",
-                order_type=OrderType.MARKET,
-                clock=self.clock,
-            )
-            order.submit()
-            close_orders.append(order)
+        sub_accounts = [None, *self.sub_portfolios]
+        for sub_account in sub_accounts:
+            positions = self.portfolio_of(sub_account).pos_handler.positions
+            if asset not in positions:
+                continue
+            for direction in positions[asset]:
+                position = positions[asset][direction]
+                order = Order(
+                    asset=asset,
+                    time_unit=timedelta(minutes=1),
+                    action=Action.SELL if direction == Direction.LONG else Action.BUY,
+                    direction=direction,
+                    size=position.net_size,
+                    signal_id=f"SimulatedBroker-{asset}",
+                    order_type=OrderType.MARKET,
+                    clock=self.clock,
+                    sub_account=sub_account,
+                )
+                order.submit()
+                close_orders.append(order)
 
         for order in close_orders:
             self.execute_market_order(order)
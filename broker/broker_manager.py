@@ -3,17 +3,49 @@ from typing import Dict, Any
 
 from trazy_analysis.broker.broker import Broker
 from trazy_analysis.common.helper import get_or_create_nested_dict
+from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.enums import BrokerIsolation
 
 
 class BrokerManager:
+    """
+    The brokers, nested by isolation. The brokers of an exchange can also book the orders in separate sub-accounts,
+    each with its own cash and positions, while sharing the prices and the order book: sub_account_isolation sets how
+    the orders are split between the sub-accounts, by asset, by strategy or by both, so that isolated strategies are
+    backtested with a single broker per exchange.
+    """
+
     def __init__(
         self,
         isolation: BrokerIsolation = BrokerIsolation.EXCHANGE,
         brokers: dict[Any, Any] = {},
+        sub_account_isolation: BrokerIsolation = BrokerIsolation.EXCHANGE,
     ) -> None:
         self.brokers = brokers
         self.isolation = isolation
+        self.sub_account_isolation = sub_account_isolation
+
+    def sub_account(
+        self, asset: Asset, strategy_name: str = None
+    ) -> tuple[str, str] | None:
+        """
+        :param asset: The asset of the order
+        :type asset: Asset
+        :param strategy_name: The name of the strategy which generated the order
+        :type strategy_name: str
+        :return: The (symbol, strategy name) sub-account of the broker of the asset an order is booked in, None for the
+            broker portfolio
+        :rtype: tuple[str, str] | None
+        """
+        match self.sub_account_isolation:
+            case BrokerIsolation.EXCHANGE:
+                return None
+            case BrokerIsolation.ASSET:
+                return (asset.symbol, None)
+            case BrokerIsolation.STRATEGY | BrokerIsolation.STRATEGY_AND_EXCHANGE:
+                return (None, strategy_name)
+            case BrokerIsolation.STRATEGY_AND_ASSET:
+                return (asset.symbol, strategy_name)
 
     def set_broker(
         self,
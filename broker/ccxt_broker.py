@@ -1,18 +1,28 @@
+import functools
 import os
+import threading
 import traceback
 from collections import deque
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_DOWN
-from typing import Dict, List
+from typing import Callable, Dict, List
 
 import pandas as pd
 
 import trazy_analysis.settings
 from trazy_analysis.broker.common import get_rejected_order_error_message
+from trazy_analysis.broker.user_data_stream import (
+    PARTIALLY_FILLED,
+    OrderTracker,
+    OrderUpdate,
+    UserDataStream,
+)
 from trazy_analysis.common.ccxt_connector import CcxtConnector
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.common.constants import CONNECTION_ERROR_MESSAGE
-from trazy_analysis.common.helper import get_or_create_nested_dict
+from trazy_analysis.common.rate_limiter import RateLimiter
+from trazy_analysis.common.request_cache import RequestCache
 from trazy_analysis.logger import logger
 from trazy_analysis.market_data.common import datetime_from_epoch
 from trazy_analysis.models.asset import Asset
@@ -35,10 +45,15 @@ class CcxtBroker:
     UPDATE_LOT_SIZE_INFO = timedelta(days=1)
     UPDATE_BALANCES_PERIOD = pd.Timedelta(value=10, unit="seconds")
     UPDATE_TRANSACTIONS_PERIOD = pd.Timedelta(value=10, unit="seconds")
+    # The trades are only polled to reconcile the fills missed while a user data stream is connected
+    RECONCILIATION_PERIOD = pd.Timedelta(value=1, unit="minutes")
     PRODUCT_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     SYMBOL_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     TRANSACTION_LOOKBACK_PERIOD = timedelta(minutes=10)
     CURRENCY_MAPPING = {"EUR": "EUR", "USD": "USD"}
+    # Time to live of the responses in seconds: the requests prefetched by synchronize are reused by the updates
+    RESPONSE_TTL = 1.0
+    MARKETS_TTL = 60.0
 
     def __init__(
         self,
@@ -48,6 +63,9 @@ class CcxtBroker:
         base_currency: str = "EUR",
         supported_currencies: list[str] = ["EUR", "USDT"],
         execute_at_end_of_day=True,
+        max_workers: int = 8,
+        rate_limiter: RateLimiter = None,
+        user_data_stream: UserDataStream = None,
     ):
         self.supported_currencies = supported_currencies
         self.execute_at_end_of_day = execute_at_end_of_day
@@ -55,6 +73,19 @@ class CcxtBroker:
         self.clock = clock
         self.events = events
         self.ccxt_connector = ccxt_connector
+        self.request_cache = RequestCache(max_workers)
+        # A synchronous ccxt exchange instance shares its HTTP session, nonce and throttling state between its calls,
+        # none of which is thread safe: the requests run concurrently across exchanges but one at a time per exchange
+        self.exchange_locks = {
+            exchange.lower(): threading.Lock()
+            for exchange in self.ccxt_connector.exchanges
+        }
+        # The requests are only throttled by the ccxt exchange instances when there is no rate limiter
+        self.rate_limiter = rate_limiter
+        # The live event loop consumes the user data stream and sets streaming while it is connected
+        self.user_data_stream = user_data_stream
+        self.streaming = False
+        self.order_tracker = OrderTracker(self.TRANSACTION_LOOKBACK_PERIOD)
         self.cash_balances = {
             exchange.lower(): {currency: 0 for currency in self.supported_currencies}
             for exchange in self.ccxt_connector.exchanges
@@ -145,21 +176,120 @@ class CcxtBroker:
             "(%s) - portfolio creation: Portfolio created", self.clock.current_time()
         )
 
-    def update_lot_size_info(self) -> None:
+    def exchange_lock(self, exchange: str) -> threading.Lock:
+        return self.exchange_locks.setdefault(exchange.lower(), threading.Lock())
+
+    def serialized(self, exchange: str, function: Callable) -> Callable:
+        """
+        :return: The function holding the lock of the exchange while it calls its ccxt instance
+        :rtype: Callable
+        """
+        lock = self.exchange_lock(exchange)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with lock:
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def request(self, exchange: str, method: str, ttl: float = 0.0, **kwargs) -> Future:
+        """
+        Send a request to an exchange on the thread pool of the broker. A request identical to one in flight or
+        cached shares its response. The requests to different exchanges are sent concurrently, those to the same
+        exchange one at a time.
+
+        :param exchange: The exchange, in lower case
+        :type exchange: str
+        :param method: The name of the method of the ccxt exchange
+        :type method: str
+        :param ttl: The time to live of the response in seconds
+        :type ttl: float
+        :return: The future of the response, failed if the exchange isn't managed by the connector
+        :rtype: Future
+        """
+        exchange_instance = self.ccxt_connector.get_exchange_instance(exchange)
+        try:
+            function = getattr(exchange_instance, method)
+        except AttributeError as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+        function = self.serialized(exchange, function)
+        if self.rate_limiter is not None:
+            function = self.rate_limiter.limited(exchange, function)
+        key = (exchange, method, tuple(sorted(kwargs.items())))
+        return self.request_cache.submit(key, function, ttl=ttl, **kwargs)
+
+    def request_markets(self, exchange: str) -> Future:
+        """
+        Fetch the markets of an exchange on the thread pool of the broker, through the metadata cache of the
+        connector if it has one
+        """
+        function = self.serialized(
+            exchange, functools.partial(self.ccxt_connector.fetch_markets, exchange)
+        )
+        if self.rate_limiter is not None and self.ccxt_connector.metadata_cache is None:
+            function = self.rate_limiter.limited(exchange, function)
+        key = (exchange, "fetchMarkets", ())
+        return self.request_cache.submit(key, function, ttl=CcxtBroker.MARKETS_TTL)
+
+    def is_due(
+        self, last_update: datetime, period: timedelta, now: datetime = None
+    ) -> bool:
+        now = now if now is not None else self.clock.current_time()
+        return last_update is None or now - last_update >= period
+
+    def prefetch(self) -> None:
+        """
+        Send at once the requests of the updates that are due, so that the updates find their responses in flight
+        or cached instead of waiting for each request in turn. The updates that never succeeded are left to send
+        their own requests.
+        """
         now = self.clock.current_time()
-        if (
-            self.lot_size_last_update is not None
-            and now - self.lot_size_last_update < CcxtBroker.UPDATE_LOT_SIZE_INFO
-        ):
+
+        def is_due(last_update: datetime, period: timedelta) -> bool:
+            return last_update is not None and self.is_due(last_update, period, now)
+
+        exchanges = [exchange.lower() for exchange in self.ccxt_connector.exchanges]
+        if is_due(self.price_last_update, CcxtBroker.UPDATE_PRICE_PERIOD):
+            for exchange in exchanges:
+                self.request(exchange, "fetch_tickers", CcxtBroker.RESPONSE_TTL)
+        if is_due(self.lot_size_last_update, CcxtBroker.UPDATE_LOT_SIZE_INFO):
+            for exchange in exchanges:
+                self.request_markets(exchange)
+        if is_due(self.transactions_last_update, self.transactions_update_period()):
+            epoch_ms = int(self.transactions_last_update.timestamp()) * 1000
+            for exchange in exchanges:
+                for currency_pair in self.currency_pairs_traded:
+                    self.request(
+                        exchange,
+                        "fetchMyTrades",
+                        CcxtBroker.RESPONSE_TTL,
+                        symbol=currency_pair.symbol,
+                        since=epoch_ms,
+                    )
+        if is_due(self.balances_last_update, CcxtBroker.UPDATE_BALANCES_PERIOD):
+            for exchange in exchanges:
+                self.request(exchange, "fetchBalance", CcxtBroker.RESPONSE_TTL)
+
+    def invalidate_account_requests(self, exchange: str) -> None:
+        """
+        Forget the balances and trades of an exchange after an order was sent to it
+        """
+        self.request_cache.invalidate(
+            lambda key: key[0] == exchange and key[1] in ("fetchBalance", "fetchMyTrades")
+        )
+
+    def update_lot_size_info(self) -> None:
+        if not self.is_due(self.lot_size_last_update, CcxtBroker.UPDATE_LOT_SIZE_INFO):
             return
 
-        for exchange in self.ccxt_connector.exchanges:
+        exchanges = [exchange.lower() for exchange in self.ccxt_connector.exchanges]
+        futures = [self.request_markets(exchange) for exchange in exchanges]
+        for exchange_to_lower, future in zip(exchanges, futures):
             try:
-                exchange_to_lower = exchange.lower()
-                exchange_instance = self.ccxt_connector.get_exchange_instance(
-                    exchange_to_lower
-                )
-                symbols_dict = exchange_instance.fetchMarkets()
+                symbols_dict = future.result()
             except Exception as e:
                 LOG.warning(
                     CONNECTION_ERROR_MESSAGE,
@@ -177,18 +307,16 @@ class CcxtBroker:
 
     def update_price(self, candle: Candle = None) -> None:
         now = self.clock.current_time()
-        if (
-            self.price_last_update is not None
-            and now - self.price_last_update < CcxtBroker.UPDATE_PRICE_PERIOD
-        ):
+        if not self.is_due(self.price_last_update, CcxtBroker.UPDATE_PRICE_PERIOD, now):
             return
-        for exchange in self.ccxt_connector.exchanges:
+        exchanges = [exchange.lower() for exchange in self.ccxt_connector.exchanges]
+        futures = [
+            self.request(exchange, "fetch_tickers", CcxtBroker.RESPONSE_TTL)
+            for exchange in exchanges
+        ]
+        for exchange_to_lower, future in zip(exchanges, futures):
             try:
-                exchange_to_lower = exchange.lower()
-                exchange_instance = self.ccxt_connector.get_exchange_instance(
-                    exchange_to_lower
-                )
-                tickers_info = exchange_instance.fetch_tickers()
+                tickers_info = future.result()
             except Exception as e:
                 LOG.warning(
                     CONNECTION_ERROR_MESSAGE,
@@ -208,13 +336,14 @@ class CcxtBroker:
     def update_balances(self) -> dict[str, dict[str, float]]:
         open_balances = {}
         total_cash = 0
-        for exchange in self.ccxt_connector.exchanges:
+        exchanges = [exchange.lower() for exchange in self.ccxt_connector.exchanges]
+        futures = [
+            self.request(exchange, "fetchBalance", CcxtBroker.RESPONSE_TTL)
+            for exchange in exchanges
+        ]
+        for exchange_to_lower, future in zip(exchanges, futures):
             try:
-                exchange_to_lower = exchange.lower()
-                exchange_instance = self.ccxt_connector.get_exchange_instance(
-                    exchange_to_lower
-                )
-                balances_dict = exchange_instance.fetchBalance()
+                balances_dict = future.result()
             except Exception as e:
                 LOG.warning(
                     CONNECTION_ERROR_MESSAGE,
@@ -242,7 +371,7 @@ class CcxtBroker:
     def update_positions(self, open_balances: dict[str, float]) -> None:
         # open positions
         portfolio = self.portfolio
-        positions = portfolio.pos_handler.positions
+        pos_handler = portfolio.pos_handler
         for exchange in open_balances:
             for symbol in open_balances[exchange]:
                 size = open_balances[exchange][symbol]
@@ -270,22 +399,21 @@ class CcxtBroker:
                     else 1 / self.last_prices[currency_pair_reversed]
                 )
 
-                get_or_create_nested_dict(positions, currency_pair, direction)
-                positions[currency_pair][direction] = Position(
+                pos_handler.set_position(
                     currency_pair,
-                    last_price,
-                    buy_size,
-                    sell_size,
                     direction,
+                    Position(
+                        currency_pair,
+                        last_price,
+                        buy_size,
+                        sell_size,
+                        direction,
+                    ),
                 )
                 self.currency_pairs_traded.add(currency_pair)
 
     def update_balances_and_positions(self) -> None:
-        now = self.clock.current_time()
-        if (
-            self.balances_last_update is not None
-            and now - self.balances_last_update < CcxtBroker.UPDATE_BALANCES_PERIOD
-        ):
+        if not self.is_due(self.balances_last_update, CcxtBroker.UPDATE_BALANCES_PERIOD):
             return
 
         open_balances = self.update_balances()
@@ -296,7 +424,9 @@ class CcxtBroker:
 
         LOG.info("Balances and positions have been updated")
 
-    def has_opened_position(self, asset: Asset, direction: Direction) -> bool:
+    def has_opened_position(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> bool:
         self.update_balances_and_positions()
         portfolio = self.portfolio
         positions = portfolio.pos_handler.positions
@@ -313,90 +443,123 @@ class CcxtBroker:
         # TODO automate bank transfers to degiro account
         pass
 
+    def transactions_update_period(self) -> timedelta:
+        if self.streaming:
+            return CcxtBroker.RECONCILIATION_PERIOD
+        return CcxtBroker.UPDATE_TRANSACTIONS_PERIOD
+
+    def apply_order_update(self, update: OrderUpdate) -> None:
+        """
+        Apply an order update pushed by the user data stream: its fill is transacted in the portfolio and the order
+        is completed or cancelled, which fires its callbacks, as soon as it is closed
+        """
+        closed_order = self.order_tracker.apply(update, self.portfolio)
+        if update.transaction is not None:
+            self.currency_pairs_traded.add(update.transaction.asset)
+            self.invalidate_account_requests(update.exchange)
+        if closed_order is not None:
+            self.open_orders_ids.get(update.exchange, set()).discard(update.order_id)
+
     def update_transactions(self) -> None:
-        now = self.clock.current_time()
-        if (
-            self.transactions_last_update is not None
-            and now - self.transactions_last_update
-            < CcxtBroker.UPDATE_TRANSACTIONS_PERIOD
+        if not self.is_due(
+            self.transactions_last_update, self.transactions_update_period()
         ):
             return
         # get confirmed orders that are opened
         epoch_ms = int(self.transactions_last_update.timestamp()) * 1000
-        for exchange in self.ccxt_connector.exchanges:
-            exchange_to_lower = exchange.lower()
-            exchange_instance = self.ccxt_connector.get_exchange_instance(
-                exchange_to_lower
+        # The symbols traded on several exchanges are only requested once per exchange
+        symbols = dict.fromkeys(
+            currency_pair.symbol for currency_pair in self.currency_pairs_traded
+        )
+        requests = [
+            (
+                exchange,
+                self.request(
+                    exchange.lower(),
+                    "fetchMyTrades",
+                    CcxtBroker.RESPONSE_TTL,
+                    symbol=symbol,
+                    since=epoch_ms,
+                ),
             )
-            for currency_pair in self.currency_pairs_traded:
-                try:
-                    trades_dict = exchange_instance.fetchMyTrades(
-                        symbol=currency_pair.symbol,
-                        since=epoch_ms,
-                    )
-                except Exception as e:
-                    LOG.warning(
-                        CONNECTION_ERROR_MESSAGE,
-                        str(e),
-                        traceback.format_exc(),
+            for exchange in self.ccxt_connector.exchanges
+            for symbol in symbols
+        ]
+        for exchange, future in requests:
+            exchange_to_lower = exchange.lower()
+            try:
+                trades_dict = future.result()
+            except Exception as e:
+                LOG.warning(
+                    CONNECTION_ERROR_MESSAGE,
+                    str(e),
+                    traceback.format_exc(),
+                )
+                return
+            for trade_dict in trades_dict:
+                parser = self.ccxt_connector.get_parser(exchange_to_lower)
+                trade_info = trade_dict["info"]
+                (
+                    trade_epoch_ms,
+                    symbol,
+                    size,
+                    action,
+                    price,
+                    order_id,
+                    commission,
+                    transaction_id,
+                ) = parser.parse_trade_info(trade_info)
+                if trade_epoch_ms < epoch_ms or self.order_tracker.is_processed(
+                    transaction_id
+                ):
+                    continue
+                timestamp = datetime_from_epoch(trade_epoch_ms)
+                asset = Asset(symbol=symbol, exchange=exchange)
+                direction = Direction.LONG if size > 0.0 else Direction.SHORT
+                transaction = Transaction(
+                    asset=asset,
+                    size=size,
+                    action=action,
+                    direction=direction,
+                    price=price,
+                    order_id=order_id,
+                    commission=commission,
+                    timestamp=timestamp,
+                    transaction_id=transaction_id,
+                )
+                if self.user_data_stream is not None:
+                    # A fill missed by the stream, the order is completed once its size is filled
+                    self.apply_order_update(
+                        OrderUpdate(exchange_to_lower, order_id, PARTIALLY_FILLED, transaction)
                     )
-                    return
-                for trade_dict in trades_dict:
-                    parser = self.ccxt_connector.get_parser(exchange_to_lower)
-                    trade_info = trade_dict["info"]
-                    (
-                        trade_epoch_ms,
-                        symbol,
-                        size,
-                        action,
-                        price,
-                        order_id,
-                        commission,
-                        transaction_id,
-                    ) = parser.parse_trade_info(trade_info)
-                    if trade_epoch_ms < epoch_ms:
-                        continue
-                    timestamp = datetime_from_epoch(trade_epoch_ms)
-                    asset = Asset(symbol=symbol, exchange=exchange)
-                    direction = Direction.LONG if size > 0.0 else Direction.SHORT
-                    transaction = Transaction(
-                        asset=asset,
-                        size=size,
-                        action=action,
-                        direction=direction,
-                        price=price,
-                        order_id=order_id,
-                        commission=commission,
-                        timestamp=timestamp,
-                        transaction_id=transaction_id,
+                    continue
+                description = "%s %s %s %s %s %s" % (
+                    action.name,
+                    direction.name,
+                    transaction.size,
+                    transaction.asset.key().upper(),
+                    transaction.price,
+                    datetime.strftime(transaction.timestamp, "%d/%m/%Y"),
+                )
+                if transaction.action == Action.BUY:
+                    pe = PortfolioEvent(
+                        timestamp=transaction.timestamp,
+                        type="symbol_transaction",
+                        description=description,
+                        debit=transaction.cost_with_commission,
+                        credit=0.0,
+                        balance=self.portfolio.cash,
                     )
-                    description = "%s %s %s %s %s %s" % (
-                        action.name,
-                        direction.name,
-                        transaction.size,
-                        transaction.asset.key().upper(),
-                        transaction.price,
-                        datetime.strftime(transaction.timestamp, "%d/%m/%Y"),
+                else:
+                    pe = PortfolioEvent(
+                        timestamp=transaction.timestamp,
+                        type="symbol_transaction",
+                        description=description,
+                        debit=0.0,
+                        credit=-1.0 * round(transaction.cost_with_commission, 2),
+                        balance=round(self.portfolio.cash, 2),
                     )
-                    if transaction.action == Action.BUY:
-                        pe = PortfolioEvent(
-                            timestamp=transaction.timestamp,
-                            type="symbol_transaction",
-                            description=description,
-                            debit=transaction.cost_with_commission,
-                            credit=0.0,
-                            balance=self.portfolio.cash,
-                        )
-                    else:
-                        pe = PortfolioEvent(
-                            timestamp=transaction.timestamp,
-                            type="symbol_transaction",
-                            description=description,
-                            debit=0.0,
-                            credit=-1.0 * round(transaction.cost_with_commission, 2),
-                            balance=round(self.portfolio.cash, 2),
-                        )
-                    self.portfolio.history.append(pe)
+                self.portfolio.history.append(pe)
 
         LOG.info("Transactions have been synchronized")
         self.transactions_last_update = self.clock.current_time()
@@ -429,7 +592,9 @@ class CcxtBroker:
         fee_model = self.ccxt_connector.get_fee_model(asset)
         return fee_model.calc_max_size_for_cash(cash=cash, price=price)
 
-    def position_size(self, asset: Asset, direction: Direction) -> int:
+    def position_size(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> int:
         return super().position_size(asset, direction)
 
     def symbol_mapping(self, symbol: str) -> str:
@@ -466,21 +631,24 @@ class CcxtBroker:
             exchange_instance = self.ccxt_connector.get_exchange_instance(
                 exchange_to_lower
             )
-            order_response_dict = exchange_instance.createOrder(
-                symbol=order.asset.symbol,
-                type="market",
-                side=order.action.name.lower(),
-                amount=truncated_size,
-            )
+            with self.exchange_lock(exchange_to_lower):
+                order_response_dict = exchange_instance.createOrder(
+                    symbol=order.asset.symbol,
+                    type="market",
+                    side=order.action.name.lower(),
+                    amount=truncated_size,
+                )
             parser = self.ccxt_connector.get_parser(exchange_to_lower)
             order_info = order_response_dict["info"]
             order_id, order_status = parser.parse_order_info(order_info)
+            self.invalidate_account_requests(exchange_to_lower)
             order.order_id = order_id
             LOG.info(
                 "Market order successfuly submited with order id: %s", order.order_id
             )
             if order_status != "FILLED":
                 self.open_orders_ids[exchange_to_lower].add(order.order_id)
+                self.order_tracker.track(exchange_to_lower, order)
             else:
                 order.complete()
             self.currency_pairs_traded.add(order.asset)
@@ -502,22 +670,25 @@ class CcxtBroker:
             exchange_instance = self.ccxt_connector.get_exchange_instance(
                 exchange_to_lower
             )
-            order_response_dict = exchange_instance.createOrder(
-                symbol=limit_order.asset.symbol,
-                type="limit",
-                side=limit_order.action.name.lower(),
-                amount=truncated_size,
-                price=limit_order.limit,
-            )
+            with self.exchange_lock(exchange_to_lower):
+                order_response_dict = exchange_instance.createOrder(
+                    symbol=limit_order.asset.symbol,
+                    type="limit",
+                    side=limit_order.action.name.lower(),
+                    amount=truncated_size,
+                    price=limit_order.limit,
+                )
             parser = self.ccxt_connector.get_parser(exchange_to_lower)
             order_info = order_response_dict["info"]
             order_id, order_status = parser.parse_order_info(order_info)
+            self.invalidate_account_requests(exchange_to_lower)
             limit_order.order_id = order_id
             LOG.info(
                 "Limit order successfuly submited with order id: %s",
                 limit_order.order_id,
             )
             self.open_orders_ids[exchange_to_lower].add(limit_order.order_id)
+            self.order_tracker.track(exchange_to_lower, limit_order)
             self.currency_pairs_traded.add(limit_order.asset)
         except Exception as e:
             error_message = get_rejected_order_error_message(limit_order)
@@ -612,6 +783,7 @@ class CcxtBroker:
         return self.last_prices[asset]
 
     def synchronize(self) -> None:
+        self.prefetch()
         self.update_price()
         self.update_lot_size_info()
         self.update_transactions()
@@ -3,7 +3,7 @@ import traceback
 from collections import deque
 from datetime import datetime
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
-from typing import List
+from typing import Any, Callable, List
 
 import pandas as pd
 
@@ -13,7 +13,12 @@ from trazy_analysis.broker.broker import Broker
 from trazy_analysis.broker.common import get_rejected_order_error_message
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.common.constants import DEGIRO_DATETIME_FORMAT
-from trazy_analysis.common.helper import get_or_create_nested_dict
+from trazy_analysis.common.metadata_cache import (
+    PRODUCT_INFO,
+    SYMBOLS,
+    MetadataCache,
+    item_kind,
+)
 from trazy_analysis.common.utils import timestamp_to_utc
 from trazy_analysis.logger import logger
 from trazy_analysis.models.asset import Asset
@@ -45,6 +50,7 @@ class DegiroBroker(Broker):
         events: deque,
         base_currency: str = "EUR",
         supported_currencies: list[str] = ["EUR", "USD"],
+        metadata_cache: MetadataCache = None,
     ):
         exchange = "DEGIRO"
         super().__init__(
@@ -59,6 +65,8 @@ class DegiroBroker(Broker):
             trazy_analysis.settings.DEGIRO_BROKER_LOGIN,
             trazy_analysis.settings.DEGIRO_BROKER_PASSWORD,
         )
+        # The product infos are fetched at each update when there is no metadata cache
+        self.metadata_cache = metadata_cache
         self.product_id_to_asset = {}
         self.asset_to_product_id = {}
         self.product_info_last_update = {}
@@ -74,6 +82,16 @@ class DegiroBroker(Broker):
         self.update_transactions()
         self.pending_orders = {}
 
+    def cached_metadata(self, kind: str, fetch_function: Callable[[], Any]) -> Any:
+        if self.metadata_cache is None:
+            return fetch_function()
+        return self.metadata_cache.get(
+            self.exchange,
+            kind,
+            fetch_function,
+            DegiroBroker.PRODUCT_INFO_PERIOD.total_seconds(),
+        )
+
     def update_product_info(self, product_id: str) -> None:
         now = self.clock.current_time()
         if (
@@ -82,7 +100,10 @@ class DegiroBroker(Broker):
             < DegiroBroker.PRODUCT_INFO_PERIOD
         ):
             return
-        info = self.degiro.product_info(product_id)
+        info = self.cached_metadata(
+            item_kind(PRODUCT_INFO, product_id),
+            lambda: self.degiro.product_info(product_id),
+        )
         product_symbol = info["symbol"]
         asset = Asset(symbol=product_symbol, exchange=self.exchange)
         self.product_id_to_asset[product_id] = asset
@@ -97,7 +118,10 @@ class DegiroBroker(Broker):
             < DegiroBroker.PRODUCT_INFO_PERIOD
         ):
             return
-        infos = self.degiro.search_products(asset.symbol, limit=5)
+        infos = self.cached_metadata(
+            item_kind(SYMBOLS, asset.symbol),
+            lambda: self.degiro.search_products(asset.symbol, limit=5),
+        )
         for info in infos:
             if info["symbol"] == asset.symbol:  # TODO check also exchange
                 product_id = info["id"]
@@ -145,7 +169,7 @@ class DegiroBroker(Broker):
                 map_product_id_to_position[product_id] = open_position
 
         portfolio = self.portfolio
-        positions = portfolio.pos_handler.positions
+        pos_handler = portfolio.pos_handler
         for product_id in product_ids:
             self.update_product_info(product_id)
             asset = self.product_id_to_asset[product_id]
@@ -160,17 +184,22 @@ class DegiroBroker(Broker):
                 direction = Direction.SHORT
                 buy_size = 0
                 sell_size = size
-            get_or_create_nested_dict(positions, asset, direction)
-            positions[asset][direction] = Position(
+            pos_handler.set_position(
                 asset,
-                initial_price,
-                buy_size,
-                sell_size,
                 direction,
+                Position(
+                    asset,
+                    initial_price,
+                    buy_size,
+                    sell_size,
+                    direction,
+                ),
             )
         self.open_positions_last_update = self.clock.current_time()
 
-    def has_opened_position(self, asset: Asset, direction: Direction) -> bool:
+    def has_opened_position(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> bool:
         self.update_open_positions()
         portfolio = self.portfolio
         positions = portfolio.pos_handler.positions
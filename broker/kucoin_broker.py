@@ -12,10 +12,16 @@ import trazy_analysis.settings
 from trazy_analysis.broker.broker import Broker
 from trazy_analysis.broker.ccxt_parser import KucoinParser
 from trazy_analysis.broker.common import get_rejected_order_error_message
+from trazy_analysis.broker.user_data_stream import (
+    PARTIALLY_FILLED,
+    OrderUpdate,
+    UserDataStream,
+)
 from trazy_analysis.broker.kucoin_fee_model import KucoinFeeModel
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.common.constants import CONNECTION_ERROR_MESSAGE
-from trazy_analysis.common.helper import datetime_to_epoch, get_or_create_nested_dict
+from trazy_analysis.common.helper import datetime_to_epoch
+from trazy_analysis.common.metadata_cache import SYMBOLS, MetadataCache
 from trazy_analysis.logger import logger
 from trazy_analysis.market_data.common import datetime_from_epoch
 from trazy_analysis.models.asset import Asset
@@ -38,6 +44,8 @@ class KucoinBroker(Broker):
     UPDATE_LOT_SIZE_INFO = timedelta(days=1)
     UPDATE_BALANCES_PERIOD = pd.Timedelta(value=10, unit="seconds")
     UPDATE_TRANSACTIONS_PERIOD = pd.Timedelta(value=10, unit="seconds")
+    # The trades are only polled to reconcile the fills missed while a user data stream is connected
+    RECONCILIATION_PERIOD = pd.Timedelta(value=1, unit="minutes")
     PRODUCT_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     SYMBOL_INFO_PERIOD = pd.Timedelta(value=10, unit="days")
     TRANSACTION_LOOKBACK_PERIOD = timedelta(minutes=10)
@@ -49,6 +57,8 @@ class KucoinBroker(Broker):
         events: deque,
         base_currency: str = "USDT",
         supported_currencies: list[str] = ["EUR", "USDT"],
+        metadata_cache: MetadataCache = None,
+        user_data_stream: UserDataStream = None,
     ):
         fee_model = KucoinFeeModel()
         parser = KucoinParser
@@ -62,6 +72,7 @@ class KucoinBroker(Broker):
             parser=parser,
             execute_at_end_of_day=False,
             exchange=exchange,
+            user_data_stream=user_data_stream,
         )
         self.market_client = Market(url="https://api.kucoin.com")
         self.trade_client = Trade(
@@ -76,6 +87,7 @@ class KucoinBroker(Broker):
         self.currency_pairs_traded = set()
         self.lot_size = {}
         self.lot_size_last_update = None
+        self.metadata_cache = metadata_cache
         self.update_lot_size_info()
         self.update_price()
         self.balances_last_update = None
@@ -92,7 +104,15 @@ class KucoinBroker(Broker):
         ):
             return
         try:
-            symbols_info = self.market_client.get_symbol_list()
+            if self.metadata_cache is not None:
+                symbols_info = self.metadata_cache.get(
+                    self.exchange,
+                    SYMBOLS,
+                    self.market_client.get_symbol_list,
+                    KucoinBroker.UPDATE_LOT_SIZE_INFO.total_seconds(),
+                )
+            else:
+                symbols_info = self.market_client.get_symbol_list()
         except Exception as e:
             LOG.warning(
                 CONNECTION_ERROR_MESSAGE,
@@ -156,7 +176,7 @@ class KucoinBroker(Broker):
     def update_positions(self, open_balances: dict[str, float]) -> None:
         # open positions
         portfolio = self.portfolio
-        positions = portfolio.pos_handler.positions
+        pos_handler = portfolio.pos_handler
         for symbol in open_balances:
             size = open_balances[symbol]
             if size > 0:
@@ -183,13 +203,16 @@ class KucoinBroker(Broker):
                 else 1 / self.last_prices[currency_pair_reversed]
             )
 
-            get_or_create_nested_dict(positions, currency_pair, direction)
-            positions[currency_pair][direction] = Position(
+            pos_handler.set_position(
                 currency_pair,
-                last_price,
-                buy_size,
-                sell_size,
                 direction,
+                Position(
+                    currency_pair,
+                    last_price,
+                    buy_size,
+                    sell_size,
+                    direction,
+                ),
             )
             self.currency_pairs_traded.add(currency_pair)
 
@@ -209,7 +232,9 @@ class KucoinBroker(Broker):
 
         LOG.info("Balances and positions have been updated")
 
-    def has_opened_position(self, asset: Asset, direction: Direction) -> bool:
+    def has_opened_position(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> bool:
         asset_mapped = asset
         self.update_balances_and_positions()
         portfolio = self.portfolio
@@ -227,12 +252,20 @@ class KucoinBroker(Broker):
         # TODO automate bank transfers to degiro account
         pass
 
+    def transactions_update_period(self) -> timedelta:
+        if self.streaming:
+            return KucoinBroker.RECONCILIATION_PERIOD
+        return KucoinBroker.UPDATE_TRANSACTIONS_PERIOD
+
+    def order_closed(self, order: Order) -> None:
+        self.open_orders_ids.discard(order.order_id)
+
     def update_transactions(self) -> None:
         now = self.clock.current_time()
         if (
             self.transactions_last_update is not None
             and now - self.transactions_last_update
-            < KucoinBroker.UPDATE_TRANSACTIONS_PERIOD
+            < self.transactions_update_period()
         ):
             return
 
@@ -261,7 +294,9 @@ class KucoinBroker(Broker):
                 commission,
                 transaction_id,
             ) = self.parser.parse_trade_info(trade)
-            if trade_epoch_ms < epoch_ms:
+            if trade_epoch_ms < epoch_ms or self.order_tracker.is_processed(
+                transaction_id
+            ):
                 continue
             timestamp = datetime_from_epoch(trade_epoch_ms)
             asset = Asset(symbol=symbol, exchange=self.exchange)
@@ -277,6 +312,12 @@ class KucoinBroker(Broker):
                 timestamp=timestamp,
                 transaction_id=transaction_id,
             )
+            if self.user_data_stream is not None:
+                # A fill missed by the stream, the order is completed once its size is filled
+                self.apply_order_update(
+                    OrderUpdate(self.exchange.lower(), order_id, PARTIALLY_FILLED, transaction)
+                )
+                continue
             description = "%s %s %s %s %s %s" % (
                 action.name,
                 direction.name,
@@ -321,13 +362,17 @@ class KucoinBroker(Broker):
             )
         return self.cash_balances[currency]
 
-    def max_entry_order_size(self, asset: Asset, cash: float = None) -> float:
+    def max_entry_order_size(
+        self, asset: Asset, cash: float = None, sub_account: tuple[str, str] = None
+    ) -> float:
         if cash is None:
             cash = self.portfolio.cash
         price = self.current_price(asset)
         return self.fee_models[asset].calc_max_size_for_cash(cash=cash, price=price)
 
-    def position_size(self, asset: Asset, direction: Direction) -> int:
+    def position_size(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> int:
         return super().position_size(asset, direction)
 
     def symbol_mapping(self, symbol: str) -> str:
@@ -397,6 +442,7 @@ class KucoinBroker(Broker):
             )
             limit_order.order_id = str(order_response["orderId"])
             self.open_orders_ids.add(limit_order.order_id)
+            self.order_tracker.track(self.exchange, limit_order)
             self.currency_pairs_traded.add(limit_order.asset)
             LOG.info(
                 "Limit order successfuly submited with order id: %s",
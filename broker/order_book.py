@@ -0,0 +1,413 @@
+import heapq
+from datetime import datetime
+
+import numpy as np
+
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import Action, IntraBarPath, OrderType
+from trazy_analysis.models.order import Order
+
+# The heaps of an asset are rebuilt once they hold more than this number of entries, mostly of orders which left the
+# book
+MIN_COMPACTION_SIZE = 64
+
+
+def intra_bar_path(candle: Candle, path: IntraBarPath) -> tuple[float, ...]:
+    """
+    The successive prices assumed to be reached by an asset during a bar. The price moves in a straight line between
+    them, so an order is triggered between two points of the path when its trigger price lies between them.
+
+    :param candle: The bar
+    :type candle: Candle
+    :param path: The assumption on the order of the open, high, low and close of the bar
+    :type path: IntraBarPath
+    :return: The prices reached during the bar
+    :rtype: tuple[float, ...]
+    """
+    match path:
+        case IntraBarPath.CLOSE:
+            return (candle.close,)
+        case IntraBarPath.OPEN_HIGH_LOW_CLOSE:
+            return candle.open, candle.high, candle.low, candle.close
+        case IntraBarPath.OPEN_LOW_HIGH_CLOSE:
+            return candle.open, candle.low, candle.high, candle.close
+        case IntraBarPath.NEAREST_EXTREMUM_FIRST:
+            if candle.high - candle.open <= candle.open - candle.low:
+                return candle.open, candle.high, candle.low, candle.close
+            return candle.open, candle.low, candle.high, candle.close
+        case _:
+            raise Exception(f"Unknown intra-bar path {path}")
+
+
+class OrderBookEntry:
+    """
+    A resting order. Entries are removed lazily from the heaps holding them: the order of the entry is set to None when
+    it leaves the book and the entry is dropped when it's popped.
+    """
+
+    __slots__ = ("order", "seq")
+
+    def __init__(self, order: Order, seq: int):
+        self.order = order
+        self.seq = seq
+
+
+class TrailingStopGroup:
+    """
+    Trailing stop orders sharing the same stop. The members are entries or the groups merged into this one.
+    """
+
+    __slots__ = ("stop", "members", "alive")
+
+    def __init__(self, stop: float, members: list):
+        self.stop = stop
+        self.members = members
+        self.alive = True
+
+    def entries(self) -> list[OrderBookEntry]:
+        entries = []
+        groups = [self]
+        while groups:
+            group = groups.pop()
+            for member in group.members:
+                if isinstance(member, TrailingStopGroup):
+                    groups.append(member)
+                else:
+                    entries.append(member)
+        return entries
+
+
+class TrailingStops:
+    """
+    The trailing stop orders of an asset sharing the same action and stop percentage. These orders see the same
+    prices, so once the stops of several orders are moved to the same price they stay equal: their groups are merged
+    and moved as a whole afterwards. Moving the stops costs one heap operation per group instead of one per order, and
+    the stops of the orders are only written when they are triggered.
+    """
+
+    def __init__(self, action: Action, stop_pct: float):
+        self.action = action
+        self.stop_pct = stop_pct
+        # The stops of the sell orders follow the price up, the ones of the buy orders follow it down
+        self.sign = 1 if action == Action.SELL else -1
+        # The groups whose stop is the farthest from the price first
+        self.farthest_groups: list[tuple[float, int, TrailingStopGroup]] = []
+        # The groups whose stop is the closest to the price first
+        self.closest_groups: list[tuple[float, int, TrailingStopGroup]] = []
+        self.nb_groups = 0
+        self.groups_seq = 0
+
+    def __len__(self) -> int:
+        return len(self.farthest_groups) + len(self.closest_groups)
+
+    def stop_for_price(self, price: float) -> float:
+        if self.action == Action.BUY:
+            return price + price * self.stop_pct
+        return price - price * self.stop_pct
+
+    def push(self, group: TrailingStopGroup) -> None:
+        heapq.heappush(
+            self.farthest_groups, (self.sign * group.stop, self.groups_seq, group)
+        )
+        heapq.heappush(
+            self.closest_groups, (-self.sign * group.stop, self.groups_seq, group)
+        )
+        self.groups_seq += 1
+        self.nb_groups += 1
+
+    def add(self, entry: OrderBookEntry) -> None:
+        self.push(TrailingStopGroup(entry.order.stop, [entry]))
+
+    def pop_triggered(self, price: float) -> list[OrderBookEntry]:
+        """
+        Move the stops towards the price, then pop the orders whose stop is crossed by the price
+
+        :param price: The current price of the asset
+        :type price: float
+        :return: The entries of the triggered orders, their stops are up-to-date
+        :rtype: list[OrderBookEntry]
+        """
+        stop = self.stop_for_price(price)
+        moved_groups = []
+        while self.farthest_groups and self.farthest_groups[0][0] < self.sign * stop:
+            _, _, group = heapq.heappop(self.farthest_groups)
+            if group.alive:
+                group.alive = False
+                self.nb_groups -= 1
+                moved_groups.append(group)
+        if moved_groups:
+            self.push(TrailingStopGroup(stop, moved_groups))
+
+        triggered_entries = []
+        while self.closest_groups and -self.closest_groups[0][0] >= self.sign * price:
+            _, _, group = heapq.heappop(self.closest_groups)
+            if not group.alive:
+                continue
+            group.alive = False
+            self.nb_groups -= 1
+            for entry in group.entries():
+                if entry.order is not None:
+                    entry.order.stop = group.stop
+                    triggered_entries.append(entry)
+        return triggered_entries
+
+    def live_entries(self) -> list[OrderBookEntry]:
+        """
+        :return: The entries of the live orders, their stops are up-to-date
+        :rtype: list[OrderBookEntry]
+        """
+        entries = []
+        for _, _, group in self.closest_groups:
+            if not group.alive:
+                continue
+            for entry in group.entries():
+                if entry.order is not None:
+                    entry.order.stop = group.stop
+                    entries.append(entry)
+        return entries
+
+
+class AssetOrderBook:
+    """
+    The resting orders of an asset, indexed by trigger price. The limit and target buy orders and the stop sell
+    orders are triggered when the price falls to their trigger price, the limit and target sell orders and the stop
+    buy orders when the price rises to it.
+    """
+
+    def __init__(self):
+        # (-trigger price, seq, entry): the highest trigger price first
+        self.below: list[tuple[float, int, OrderBookEntry]] = []
+        # (trigger price, seq, entry): the lowest trigger price first
+        self.above: list[tuple[float, int, OrderBookEntry]] = []
+        self.trailing_stops: dict[tuple[Action, float], TrailingStops] = {}
+        self.nb_live = 0
+
+    def __len__(self) -> int:
+        return self.nb_live
+
+    def add(self, entry: OrderBookEntry) -> None:
+        order = entry.order
+        match order.order_type:
+            case OrderType.LIMIT:
+                below, trigger_price = order.action == Action.BUY, order.limit
+            case OrderType.TARGET:
+                below, trigger_price = order.action == Action.BUY, order.target
+            case OrderType.STOP:
+                below, trigger_price = order.action == Action.SELL, order.stop
+            case OrderType.TRAILING_STOP:
+                key = (order.action, order.stop_pct)
+                if key not in self.trailing_stops:
+                    self.trailing_stops[key] = TrailingStops(order.action, order.stop_pct)
+                self.trailing_stops[key].add(entry)
+                self.nb_live += 1
+                return
+            case _:
+                raise Exception(
+                    f"{order.order_type.name} orders cannot rest in the order book"
+                )
+        if below:
+            heapq.heappush(self.below, (-trigger_price, entry.seq, entry))
+        else:
+            heapq.heappush(self.above, (trigger_price, entry.seq, entry))
+        self.nb_live += 1
+
+    def remove(self, entry: OrderBookEntry) -> None:
+        entry.order = None
+        self.nb_live -= 1
+        self.compact()
+
+    def pop_triggered(
+        self, path: tuple[float, ...]
+    ) -> list[tuple[int, int, OrderBookEntry, float]]:
+        """
+        Pop the orders crossed by the price path of a bar. The orders with a fixed trigger price crossed by the range of
+        the path are popped from the heaps, then the point where the path first crosses each of them is found in a
+        single vectorized pass. The trailing stops are moved along the path point by point. An order triggered at the
+        first point of the path, when the bar opens beyond its trigger price, is filled at that point, the other ones
+        at their trigger price.
+
+        :param path: The successive prices reached by the asset during the bar
+        :type path: tuple[float, ...]
+        :return: The point of the path where each order is triggered, its seq, its entry and its fill price
+        :rtype: list[tuple[int, int, OrderBookEntry, float]]
+        """
+        candidates = []
+        low = min(path)
+        while self.below and -self.below[0][0] >= low:
+            key, seq, entry = heapq.heappop(self.below)
+            if entry.order is not None:
+                candidates.append((-key, True, seq, entry))
+        high = max(path)
+        while self.above and self.above[0][0] <= high:
+            key, seq, entry = heapq.heappop(self.above)
+            if entry.order is not None:
+                candidates.append((key, False, seq, entry))
+
+        triggered = []
+        if candidates:
+            points = np.array(path, dtype=float)
+            trigger_prices = np.array([candidate[0] for candidate in candidates], dtype=float)
+            below = np.array([candidate[1] for candidate in candidates])
+            crossed = np.where(
+                below[:, np.newaxis],
+                points[np.newaxis, :] <= trigger_prices[:, np.newaxis],
+                points[np.newaxis, :] >= trigger_prices[:, np.newaxis],
+            )
+            crossing_points = crossed.argmax(axis=1)
+            fill_prices = np.where(crossing_points == 0, points[0], trigger_prices)
+            for (_, _, seq, entry), crossing_point, fill_price in zip(
+                candidates, crossing_points, fill_prices
+            ):
+                triggered.append((int(crossing_point), seq, entry, float(fill_price)))
+
+        for trailing_stops in self.trailing_stops.values():
+            for crossing_point, price in enumerate(path):
+                for entry in trailing_stops.pop_triggered(price):
+                    fill_price = price if crossing_point == 0 else entry.order.stop
+                    triggered.append((crossing_point, entry.seq, entry, fill_price))
+        self.nb_live -= len(triggered)
+        self.compact()
+        return triggered
+
+    def live_entries(self) -> list[OrderBookEntry]:
+        entries = [
+            entry
+            for _, _, entry in self.below + self.above
+            if entry.order is not None
+        ]
+        for trailing_stops in self.trailing_stops.values():
+            entries.extend(trailing_stops.live_entries())
+        return entries
+
+    def compact(self) -> None:
+        """
+        Rebuild the heaps once they are mostly made of the entries of the orders which left the book
+        """
+        size = len(self.below) + len(self.above) + sum(
+            len(trailing_stops) for trailing_stops in self.trailing_stops.values()
+        )
+        if size <= MIN_COMPACTION_SIZE or size <= 4 * self.nb_live:
+            return
+        entries = sorted(self.live_entries(), key=lambda entry: entry.seq)
+        self.below = []
+        self.above = []
+        self.trailing_stops = {}
+        self.nb_live = 0
+        for entry in entries:
+            self.add(entry)
+
+
+class OrderBook:
+    """
+    The orders resting at a broker until their trigger price is crossed, indexed by asset. Only the assets whose
+    price was updated are checked, and only the orders crossed by the new bar are touched, so the cost of a price
+    update depends on the number of fills instead of the number of resting orders. The orders are checked against the
+    close of the bar, or against the path of its open, high, low and close given by intra_bar_path.
+    """
+
+    def __init__(self, intra_bar_path: IntraBarPath = IntraBarPath.CLOSE):
+        self.intra_bar_path = intra_bar_path
+        self.asset_books: dict[Asset, AssetOrderBook] = {}
+        # (expiration time, seq, entry): the first expiring order first
+        self.expirations: list[tuple[datetime, int, OrderBookEntry]] = []
+        # The last candle of each asset whose orders have to be checked
+        self.updated_assets: dict[Asset, Candle] = {}
+        self.seq = 0
+
+    def __len__(self) -> int:
+        return sum(len(asset_book) for asset_book in self.asset_books.values())
+
+    def add(self, order: Order) -> None:
+        """
+        Add a submitted order which hasn't been triggered by the current price
+        """
+        entry = OrderBookEntry(order, self.seq)
+        self.seq += 1
+        if order.asset not in self.asset_books:
+            self.asset_books[order.asset] = AssetOrderBook()
+        self.asset_books[order.asset].add(entry)
+        heapq.heappush(
+            self.expirations,
+            (order.submission_time + order.time_in_force, entry.seq, entry),
+        )
+
+    def update_price(self, candle: Candle) -> None:
+        """
+        Mark the orders of the asset of the candle to be checked against it at the next call to pop_triggered. When
+        several candles of the asset are received, the orders are checked against the last close or, when the
+        intra-bar path is used, against the candle of the smallest time unit.
+        """
+        asset = candle.asset
+        if asset not in self.asset_books or len(self.asset_books[asset]) == 0:
+            return
+        last_candle = self.updated_assets.get(asset)
+        if (
+            last_candle is None
+            or self.intra_bar_path == IntraBarPath.CLOSE
+            or candle.time_unit <= last_candle.time_unit
+        ):
+            self.updated_assets[asset] = candle
+
+    def pop_expired(self, now: datetime) -> list[Order]:
+        """
+        :param now: The current time
+        :type now: datetime
+        :return: The orders which aren't in force anymore, removed from the book
+        :rtype: list[Order]
+        """
+        expired_orders = []
+        while self.expirations and self.expirations[0][0] <= now:
+            _, seq, entry = heapq.heappop(self.expirations)
+            order = entry.order
+            if order is None:
+                continue
+            expiration = order.submission_time + order.time_in_force
+            if expiration > now:
+                # The order was submitted again since it was added
+                heapq.heappush(self.expirations, (expiration, seq, entry))
+                continue
+            self.asset_books[order.asset].remove(entry)
+            expired_orders.append(order)
+        if len(self.expirations) > MIN_COMPACTION_SIZE and len(self.expirations) > 2 * len(self):
+            self.expirations = [
+                expiration for expiration in self.expirations if expiration[2].order is not None
+            ]
+            heapq.heapify(self.expirations)
+        return expired_orders
+
+    def pop_triggered(self) -> list[tuple[Order, float]]:
+        """
+        :return: The orders crossed by the candles received since the last call with their fill price, in the order
+            they are crossed along the intra-bar path then in the order they were added
+        :rtype: list[tuple[Order, float]]
+        """
+        triggered = []
+        for asset, candle in self.updated_assets.items():
+            path = intra_bar_path(candle, self.intra_bar_path)
+            triggered.extend(self.asset_books[asset].pop_triggered(path))
+        self.updated_assets.clear()
+        triggered.sort(key=lambda item: (item[0], item[1]))
+        triggered_orders = []
+        for _, _, entry, fill_price in triggered:
+            triggered_orders.append((entry.order, fill_price))
+            entry.order = None
+        return triggered_orders
+
+    def clear(self) -> list[Order]:
+        """
+        Remove all the orders from the book
+
+        :return: The removed orders, in the order they were added
+        :rtype: list[Order]
+        """
+        entries = [
+            entry
+            for asset_book in self.asset_books.values()
+            for entry in asset_book.live_entries()
+        ]
+        entries.sort(key=lambda entry: entry.seq)
+        self.asset_books = {}
+        self.expirations = []
+        self.updated_assets = {}
+        return [entry.order for entry in entries]
@@ -6,11 +6,20 @@ import trazy_analysis.settings
 from trazy_analysis.broker.broker import Broker
 from trazy_analysis.broker.fee_model import FeeModel
 from trazy_analysis.broker.fixed_fee_model import FixedFeeModel
+from trazy_analysis.broker.order_book import OrderBook
 from trazy_analysis.common.clock import Clock
 from trazy_analysis.logger import logger
 from trazy_analysis.models.asset import Asset
-from trazy_analysis.models.enums import Action, Direction, OrderType
-from trazy_analysis.models.order import Order
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import (
+    Action,
+    Direction,
+    IntraBarPath,
+    OrderStatus,
+    OrderType,
+)
+from trazy_analysis.models.multiple_order import MultipleOrder, SequentialOrder
+from trazy_analysis.models.order import Order, OrderBase
 from trazy_analysis.position.transaction import Transaction
 
 LOG = trazy_analysis.logger.get_root_logger(
@@ -34,6 +43,9 @@ class SimulatedBroker(Broker):
     fee_models : Dictionary of the `FeeModel` for each asset, optional
         The FeeModel is the commission/fee model used to simulate fees/taxes.
         Defaults to the FixedFeeModel.
+    intra_bar_path : `IntraBarPath`, optional
+        The path of the price during a bar the resting orders are checked
+        against. Defaults to the close of the bar.
     """
 
     def __init__(
@@ -45,6 +57,7 @@ class SimulatedBroker(Broker):
         initial_funds: float = 0.0,
         fee_models: FeeModel | dict[Asset, FeeModel] = FixedFeeModel(),
         exchange: str = "universal",
+        intra_bar_path: IntraBarPath = IntraBarPath.CLOSE,
     ) -> None:
         self._check_initial_funds(initial_funds)
         super().__init__(
@@ -57,6 +70,9 @@ class SimulatedBroker(Broker):
         )
         self._set_cash_balances(initial_funds)
         self.open_orders_bars_delay = 1
+        # The orders submitted since the last call to execute_open_orders wait in open_orders, the orders which weren't
+        # triggered then rest in the order book
+        self.order_book = OrderBook(intra_bar_path)
 
         LOG.info("Initialising simulated broker...")
 
@@ -95,8 +111,10 @@ class SimulatedBroker(Broker):
         if initial_funds > 0.0:
             self.cash_balances[self.base_currency] = initial_funds
 
-    def has_opened_position(self, asset: Asset, direction: Direction) -> bool:
-        portfolio = self.portfolio
+    def has_opened_position(
+        self, asset: Asset, direction: Direction, sub_account: tuple[str, str] = None
+    ) -> bool:
+        portfolio = self.portfolio_of(sub_account)
         positions = portfolio.pos_handler.positions
         return asset in positions and direction in positions[asset]
 
@@ -163,20 +181,7 @@ class SimulatedBroker(Broker):
             )
         return self.cash_balances[currency]
 
-    def get_portfolio_cash_balance(self) -> float:
-        """
-        Retrieve the cash balance of a sub-portfolio, if
-        it exists. Otherwise raise a ValueError.
-        Parameters
-        ----------
-        Returns
-        -------
-        `float`
-            The cash balance of the portfolio.
-        """
-        return self.portfolio.cash
-
-    def execute_market_order(self, order: Order) -> None:
+    def execute_market_order(self, order: Order, price: float = None) -> None:
         """
         For a given portfolio ID string, create a Transaction instance from
         the provided Order and ensure the Portfolio is appropriately updated
@@ -185,8 +190,11 @@ class SimulatedBroker(Broker):
         ----------
         order : `Order`
             The Order instance to create the Transaction for.
+        price : `float`, optional
+            The fill price, the current price of the asset by default.
         """
-        price = self.current_price(order.asset)
+        if price is None:
+            price = self.current_price(order.asset)
         consideration = price * order.size
         total_commission = self.fee_models[order.asset].calc_total_cost(
             order.asset, order.size, consideration, self
@@ -194,8 +202,9 @@ class SimulatedBroker(Broker):
 
         # Check that sufficient cash exists to carry out the
         # order, else scale it down
+        portfolio = self.portfolio_of(order.sub_account)
         est_total_cost = consideration + total_commission
-        total_cash = self.portfolio.cash
+        total_cash = portfolio.cash
 
         if order.is_entry_order and est_total_cost > total_cash:
             LOG.error(
@@ -222,7 +231,7 @@ class SimulatedBroker(Broker):
             commission=total_commission,
             timestamp=current_timestamp,
         )
-        self.portfolio.transact_symbol(txn)
+        portfolio.transact_symbol(txn)
         LOG.info(
             "(%s) - executed order: %s, qty: %s, price: %s, "
             "consideration: %s, commission: %s, total: %s",
@@ -235,12 +244,13 @@ class SimulatedBroker(Broker):
             consideration + total_commission,
         )
         order.complete()
+        exit_orders = self.exit_orders.get(order.sub_account, {})
         if (
             order.is_exit_order
-            and order.asset in self.exit_orders
-            and order.direction in self.exit_orders[order.asset]
+            and order.asset in exit_orders
+            and order.direction in exit_orders[order.asset]
         ):
-            del self.exit_orders[order.asset][order.direction]
+            del exit_orders[order.asset][order.direction]
 
     def execute_limit_order(self, limit_order: Order) -> None:
         price = self.current_price(limit_order.asset)
@@ -249,7 +259,7 @@ class SimulatedBroker(Broker):
         ):
             self.execute_market_order(limit_order)
         else:
-            self.open_orders.append(limit_order)
+            self.order_book.add(limit_order)
 
     def execute_stop_order(self, stop_order: Order) -> None:
         price = self.current_price(stop_order.asset)
@@ -261,7 +271,7 @@ class SimulatedBroker(Broker):
         ):
             self.execute_market_order(stop_order)
         else:
-            self.open_orders.append(stop_order)
+            self.order_book.add(stop_order)
 
     def execute_target_order(self, target_order: Order) -> None:
         price = self.current_price(target_order.asset)
@@ -273,7 +283,7 @@ class SimulatedBroker(Broker):
         ):
             self.execute_market_order(target_order)
         else:
-            self.open_orders.append(target_order)
+            self.order_book.add(target_order)
 
     def execute_trailing_stop_order(
         self,
@@ -293,8 +303,6 @@ class SimulatedBroker(Broker):
             else:
                 trailing_stop_order.stop = max(trailing_stop_order.stop, stop)
 
-        LOG.info("stop: %s", stop)
-        LOG.info("last stop: %s", trailing_stop_order.stop)
         if (
             trailing_stop_order.action == Action.BUY
             and price >= trailing_stop_order.stop
@@ -303,7 +311,7 @@ class SimulatedBroker(Broker):
         ):
             self.execute_market_order(trailing_stop_order)
         else:
-            self.open_orders.append(trailing_stop_order)
+            self.order_book.add(trailing_stop_order)
 
     def execute_order(self, order: Order) -> None:
         """
@@ -324,3 +332,77 @@ class SimulatedBroker(Broker):
                 self.execute_trailing_stop_order(order)
             case OrderType.MARKET:
                 self.execute_market_order(order)
+
+    def update_price(self, candle: Candle):
+        super().update_price(candle)
+        self.order_book.update_price(candle)
+
+    def put_all_orders_in_queue_recursive(self, order: OrderBase, seen_assets):
+        if not isinstance(order, SequentialOrder):
+            super().put_all_orders_in_queue_recursive(order, seen_assets)
+            return
+        # The next orders of a sequence are only queued once submitted, when the previous order completes, so that a
+        # bracket or cover order whose initiation order rests in the order book keeps its exit orders
+        self.put_all_orders_in_queue_recursive(order.orders[0], seen_assets)
+        for previous_order, next_order in zip(order.orders[:-1], order.orders[1:]):
+            for single_order in self.single_orders(next_order):
+                self.handle_exit_order(single_order)
+            previous_order.add_on_complete_callback(self.queue_next_order, next_order)
+
+    def single_orders(self, order: OrderBase) -> list[Order]:
+        if isinstance(order, MultipleOrder):
+            return [
+                single_order
+                for order_base in order.orders
+                for single_order in self.single_orders(order_base)
+            ]
+        return [order]
+
+    def queue_next_order(self, order: OrderBase) -> None:
+        """
+        Queue the next order of a sequence right after the completed order, so that it's evaluated during the same
+        call to execute_open_orders
+        """
+        self.open_orders.extendleft(reversed(self.single_orders(order)))
+
+    def drop_order(self, order: Order) -> None:
+        LOG.info(
+            "Order with order id (%s) either expired or has been canceled",
+            order.order_id,
+        )
+
+    def execute_open_orders(self) -> None:
+        """
+        Execute the open orders. The orders submitted since the last call are all evaluated, while the orders resting
+        in the order book are only touched when they expire or when the new price of their asset crosses their trigger
+        price.
+        """
+        now = self.clock.current_time()
+        for order in self.order_book.pop_expired(now):
+            if order.status == OrderStatus.SUBMITTED:
+                order.disable()
+            self.drop_order(order)
+
+        end_of_day = self.execute_at_end_of_day and self.clock.end_of_day()
+        if end_of_day:
+            for order in self.order_book.clear():
+                self.drop_order(order)
+        else:
+            # The OCO orders of the bracket orders and of the exit orders are resolved by the order in which their
+            # orders are crossed: once one of them is filled, the other ones are cancelled and dropped
+            for order, price in self.order_book.pop_triggered():
+                if order.status == OrderStatus.SUBMITTED:
+                    self.execute_market_order(order, price)
+                else:
+                    self.drop_order(order)
+
+        while self.open_orders:
+            order = self.open_orders.popleft()
+            if (
+                order.status == OrderStatus.SUBMITTED
+                and order.in_force(now)
+                and not end_of_day
+            ):
+                self.execute_order(order)
+            else:
+                self.drop_order(order)
@@ -0,0 +1,238 @@
+import abc
+import json
+import os
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+import websockets
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.market_data.common import datetime_from_epoch
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import Action, Direction
+from trazy_analysis.models.order import Order
+from trazy_analysis.portfolio.portfolio import Portfolio
+from trazy_analysis.position.transaction import Transaction
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+# Status of the orders in the order updates
+NEW = "NEW"
+PARTIALLY_FILLED = "PARTIALLY_FILLED"
+FILLED = "FILLED"
+CANCELED = "CANCELED"
+EXPIRED = "EXPIRED"
+REJECTED = "REJECTED"
+CLOSED_STATUSES = {CANCELED, EXPIRED, REJECTED}
+
+
+class OrderUpdate:
+    """
+    A change of the status of an order sent to an exchange, with the fill that caused it if any
+
+    :param exchange: The exchange, in lower case
+    :type exchange: str
+    :param order_id: The id of the order given by the exchange
+    :type order_id: str
+    :param status: The status of the order, one of NEW, PARTIALLY_FILLED, FILLED, CANCELED, EXPIRED, REJECTED
+    :type status: str
+    :param transaction: The fill of the order, None if the status changed without a fill
+    :type transaction: Transaction
+    """
+
+    def __init__(
+        self,
+        exchange: str,
+        order_id: str,
+        status: str,
+        transaction: Transaction = None,
+    ):
+        self.exchange = exchange
+        self.order_id = order_id
+        self.status = status
+        self.transaction = transaction
+
+    def to_json(self) -> str:
+        update_dict = {
+            "exchange": self.exchange,
+            "order_id": self.order_id,
+            "status": self.status,
+        }
+        if self.transaction is not None:
+            transaction = self.transaction
+            update_dict["fill"] = {
+                "asset": transaction.asset.to_dict(),
+                "size": transaction.size,
+                "action": transaction.action.name,
+                "direction": transaction.direction.name,
+                "price": transaction.price,
+                "commission": transaction.commission,
+                "timestamp": int(transaction.timestamp.timestamp() * 1000),
+                "transaction_id": str(transaction.transaction_id),
+            }
+        return json.dumps(update_dict)
+
+    @staticmethod
+    def from_json(update_json: str | bytes) -> "OrderUpdate":
+        update_dict = json.loads(update_json)
+        transaction = None
+        if "fill" in update_dict:
+            fill_dict = update_dict["fill"]
+            transaction = Transaction(
+                asset=Asset.from_dict(fill_dict["asset"]),
+                size=float(fill_dict["size"]),
+                action=Action[fill_dict["action"]],
+                direction=Direction[fill_dict.get("direction", Direction.LONG.name)],
+                price=float(fill_dict["price"]),
+                order_id=update_dict["order_id"],
+                commission=float(fill_dict.get("commission", 0.0)),
+                timestamp=datetime_from_epoch(int(fill_dict["timestamp"])),
+                transaction_id=fill_dict["transaction_id"],
+            )
+        return OrderUpdate(
+            exchange=update_dict["exchange"].lower(),
+            order_id=update_dict["order_id"],
+            status=update_dict["status"],
+            transaction=transaction,
+        )
+
+
+class UserDataStream:
+    """
+    Streaming source of the order updates of an account. The live event loop consumes it so that the fills reach the
+    portfolios and the orders complete as soon as they happen, the brokers only poll the trades to reconcile.
+    """
+
+    @abc.abstractmethod
+    async def connect(self, exchanges: list[str]) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def updates(self) -> AsyncIterator[OrderUpdate]:  # pragma: no cover
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def close(self) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+
+class WebsocketUserDataStream(UserDataStream):
+    """
+    User data stream over a websocket. Once connected, a subscription message listing the exchanges is sent, then
+    each message received is expected to be an order update serialized with OrderUpdate.to_json. The exchanges
+    specific streams override subscription_message and parse_message.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.websocket = None
+
+    @staticmethod
+    def subscription_message(exchanges: list[str]) -> str:
+        return json.dumps({"op": "subscribe", "exchanges": exchanges})
+
+    @staticmethod
+    def parse_message(message: str | bytes) -> OrderUpdate:
+        return OrderUpdate.from_json(message)
+
+    async def connect(self, exchanges: list[str]) -> None:
+        self.websocket = await websockets.connect(self.url)
+        await self.websocket.send(self.subscription_message(exchanges))
+        LOG.info("Subscribed to %s user data stream for %s", self.url, exchanges)
+
+    async def updates(self) -> AsyncIterator[OrderUpdate]:
+        async for message in self.websocket:
+            try:
+                yield self.parse_message(message)
+            except Exception as e:
+                LOG.error("Could not parse order update message %s: %s", message, e)
+
+    async def close(self) -> None:
+        if self.websocket is not None:
+            await self.websocket.close()
+            self.websocket = None
+
+
+class OrderTracker:
+    """
+    The orders sent to the exchanges, completed or cancelled by their updates. Each fill is applied once to the
+    portfolio whether it is pushed by a user data stream or found by polling the trades.
+
+    :param lookback_period: How far back the brokers poll the trades, the ids of the fills older than that before the
+        most recent fill are forgotten since polling cannot find them again
+    :type lookback_period: timedelta
+    """
+
+    def __init__(self, lookback_period: timedelta = timedelta(minutes=10)):
+        self.lookback_period = lookback_period
+        self.orders: dict[tuple[str, str], Order] = {}
+        self.filled_sizes: dict[tuple[str, str], float] = defaultdict(float)
+        # The ids of the fills applied with their timestamp, in the order they were applied
+        self.processed_transaction_ids: OrderedDict[str, datetime] = OrderedDict()
+        self.last_fill_timestamp = None
+
+    def track(self, exchange: str, order: Order) -> None:
+        if order.order_id is not None:
+            self.orders[(exchange.lower(), order.order_id)] = order
+
+    def is_processed(self, transaction_id: str) -> bool:
+        return str(transaction_id) in self.processed_transaction_ids
+
+    def processed(self, transaction: Transaction) -> None:
+        self.processed_transaction_ids[str(transaction.transaction_id)] = transaction.timestamp
+        if self.last_fill_timestamp is None or transaction.timestamp > self.last_fill_timestamp:
+            self.last_fill_timestamp = transaction.timestamp
+        expiration = self.last_fill_timestamp - self.lookback_period
+        # The fills mostly come in order, a late one is forgotten with the first more recent one
+        while self.processed_transaction_ids:
+            transaction_id, timestamp = next(iter(self.processed_transaction_ids.items()))
+            if timestamp >= expiration:
+                break
+            del self.processed_transaction_ids[transaction_id]
+
+    def apply(self, update: OrderUpdate, portfolio: Portfolio) -> Order | None:
+        """
+        Apply the fill of an order update to the portfolio, then complete or cancel the order if it is closed
+
+        :param update: The order update
+        :type update: OrderUpdate
+        :param portfolio: The portfolio of the account
+        :type portfolio: Portfolio
+        :return: The order closed by the update, None if it is still open or isn't tracked
+        :rtype: Order | None
+        """
+        key = (update.exchange.lower(), update.order_id)
+        transaction = update.transaction
+        if transaction is not None and not self.is_processed(
+            transaction.transaction_id
+        ):
+            self.processed(transaction)
+            portfolio.transact_symbol(transaction)
+            self.filled_sizes[key] += abs(transaction.size)
+
+        order = self.orders.get(key)
+        if order is None:
+            return None
+        if update.status == FILLED or (
+            update.status not in CLOSED_STATUSES
+            and self.filled_sizes[key] >= abs(order.size)
+        ):
+            self.untrack(key)
+            order.complete()
+            return order
+        if update.status in CLOSED_STATUSES:
+            self.untrack(key)
+            order.cancel()
+            return order
+        return None
+
+    def untrack(self, key: tuple[str, str]) -> None:
+        del self.orders[key]
+        self.filled_sizes.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.orders)
@@ -1,6 +1,6 @@
 from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Union, Optional
+from typing import List, Dict, Any, Union, Optional, Callable
 
 import ccxt
 import numpy as np
@@ -9,6 +9,7 @@ import pytz
 from pandas_market_calendars import MarketCalendar
 
 from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.bot.fan_out_event_loop import FanOutEventLoop
 from trazy_analysis.broker.broker_manager import BrokerManager
 from trazy_analysis.broker.fee_model import FeeModel, FeeModelManager
 from trazy_analysis.broker.simulated_broker import SimulatedBroker
@@ -16,9 +17,16 @@ from trazy_analysis.common.ccxt_connector import CcxtConnector
 from trazy_analysis.common.clock import SimulatedClock
 from trazy_analysis.common.constants import NONE_API_KEYS
 from trazy_analysis.common.crypto_exchange_calendar import CryptoExchangeCalendar
+from trazy_analysis.common.result_cache import (
+    BacktestResult,
+    BacktestResultCache,
+    feed_digest,
+    result_key,
+)
 from trazy_analysis.db_storage.db_storage import DbStorage
 from trazy_analysis.feed.feed import (
     CsvFeed,
+    Feed,
     HistoricalFeed,
     PandasFeed,
     ExternalStorageFeed,
@@ -37,10 +45,12 @@ from trazy_analysis.models.enums import (
     BrokerIsolation,
     EventLoopMode,
     IndicatorMode,
+    IntraBarPath,
 )
 from trazy_analysis.order_manager.order_creator import OrderCreator
 from trazy_analysis.order_manager.order_manager import OrderManager
 from trazy_analysis.order_manager.position_sizer import PositionSizer
+from trazy_analysis.statistics.running_metrics import Checkpoint
 from trazy_analysis.statistics.statistics import Statistics
 
 
@@ -78,6 +88,10 @@ class BacktestConfig:
         isolation: BrokerIsolation = BrokerIsolation.EXCHANGE,
         statistics_class: type = Statistics,
         events: deque = deque(),
+        checkpoint_interval: timedelta = None,
+        result_cache: BacktestResultCache = None,
+        snapshot_path: str = None,
+        intra_bar_path: IntraBarPath = IntraBarPath.CLOSE,
     ):
         self.assets = assets
         self.fee_models = fee_models
@@ -110,6 +124,10 @@ class BacktestConfig:
         self.close_at_end_of_data = close_at_end_of_data
         self.isolation = isolation
         self.statistics_class = statistics_class
+        self.checkpoint_interval = checkpoint_interval
+        self.result_cache = result_cache
+        self.snapshot_path = snapshot_path
+        self.intra_bar_path = intra_bar_path
 
         self.events = events
         self.feed = None
@@ -204,6 +222,9 @@ class Backtest:
         close_at_end_of_data=True,
         isolation: BrokerIsolation = BrokerIsolation.EXCHANGE,
         statistics_class: type = Statistics,
+        checkpoint_interval: timedelta = None,
+        result_cache: BacktestResultCache = None,
+        snapshot_path: str = None,
         backtest_config: BacktestConfig = None,
     ):
         self.events = deque()
@@ -238,6 +259,9 @@ class Backtest:
                 isolation=isolation,
                 statistics_class=statistics_class,
                 events=self.events,
+                checkpoint_interval=checkpoint_interval,
+                result_cache=result_cache,
+                snapshot_path=snapshot_path,
             )
         else:
             backtest_config.events = self.events
@@ -245,22 +269,33 @@ class Backtest:
         self.backtest_config = backtest_config
         self.exchanges = [asset.exchange for asset in self.backtest_config.assets]
         self.event_loop: Optional[EventLoop] = None
+        self.fan_out_event_loop: Optional[FanOutEventLoop] = None
+        # Results of the last run_strategies, either computed or found in the result cache
+        self.statistics_df: Optional[pd.DataFrame] = None
+        self.equity_dfs: dict[str, pd.DataFrame] = {}
+        self.pruned = False
+        self.from_cache = False
+        self.data_digest: Optional[str] = None
+        # The feed and its version when the data digest was computed
+        self.digested_feed: Optional[tuple[Feed, int]] = None
 
-    def run_strategies(
-        self,
-        strategies_parameters: dict[type, dict[str, Any]],
-    ) -> pd.DataFrame:
-        self.events = deque()
-        self.backtest_config.feed.events = self.events
-        self.backtest_config.feed.reset()
+    def _create_clock(self) -> SimulatedClock:
         clock = SimulatedClock(market_cal=self.backtest_config.market_cal)
+        if self.backtest_config.start is not None:
+            clock.calendar_index.precompute(
+                self.backtest_config.start, self.backtest_config.end
+            )
+        return clock
+
+    def _create_order_manager(self, clock: SimulatedClock, events: deque) -> OrderManager:
         brokers = {}
         for exchange in self.exchanges:
             brokers[exchange] = SimulatedBroker(
                 clock,
-                self.events,
+                events,
                 initial_funds=self.backtest_config.initial_funds,
                 fee_models=self.backtest_config.fee_models,
+                intra_bar_path=self.backtest_config.intra_bar_path,
             )
             brokers[exchange].subscribe_funds_to_portfolio(
                 self.backtest_config.initial_funds
@@ -282,13 +317,57 @@ class Backtest:
             with_trailing_cover=self.backtest_config.with_trailing_cover,
             with_trailing_bracket=self.backtest_config.with_trailing_bracket,
         )
-        order_manager = OrderManager(
-            events=self.events,
+        return OrderManager(
+            events=events,
             broker_manager=broker_manager,
             position_sizer=position_sizer,
             order_creator=order_creator,
             clock=clock,
         )
+
+    def feed_digest(self) -> str:
+        """
+        :return: The digest of the config feed, computed again when the feed was replaced or new candles were appended
+        :rtype: str
+        """
+        feed = self.backtest_config.feed
+        if self.digested_feed != (feed, feed.version):
+            self.data_digest = feed_digest(feed)
+            self.digested_feed = (feed, feed.version)
+        return self.data_digest
+
+    def run_strategies(
+        self,
+        strategies_parameters: dict[type, dict[str, Any]],
+        checkpoint_callback: Callable[[Checkpoint], bool] = None,
+    ) -> pd.DataFrame:
+        """
+        Backtest the strategies parameters. When the config has a checkpoint interval, checkpoint_callback is called
+        with the running metrics at each checkpoint and can stop an unpromising backtest by returning True.
+
+        When the config has a result cache, the results of a backtest already run with the same data, config knobs,
+        strategies sources and parameters are returned without running it again. Pruned backtests are not cached.
+
+        When the config has a snapshot path, the state of the backtest is saved there at the end of the data so that
+        it can be resumed with new data, see resume. The result cache is not looked up as it has no snapshot.
+        """
+        key = None
+        result_cache = self.backtest_config.result_cache
+        if result_cache is not None and self.backtest_config.snapshot_path is None:
+            key = result_key(self.feed_digest(), self.backtest_config, strategies_parameters)
+            result = result_cache.get(key)
+            if result is not None:
+                self.statistics_df = result.statistics
+                self.equity_dfs = result.equity_dfs
+                self.pruned = False
+                self.from_cache = True
+                return self.get_statistics()
+
+        self.events = deque()
+        self.backtest_config.feed.events = self.events
+        self.backtest_config.feed.reset()
+        clock = self._create_clock()
+        order_manager = self._create_order_manager(clock, self.events)
         self.event_loop = EventLoop(
             events=self.events,
             assets=self.backtest_config.assets,
@@ -302,16 +381,111 @@ class Backtest:
             broker_isolation=self.backtest_config.isolation,
             statistics_class=self.backtest_config.statistics_class,
             real_time_plotting=False,
+            checkpoint_interval=self.backtest_config.checkpoint_interval,
+            checkpoint_callback=checkpoint_callback,
+            snapshot_path=self.backtest_config.snapshot_path,
         )
         self.event_loop.loop()
+        self.statistics_df = self.event_loop.statistics_df
+        self.equity_dfs = self.event_loop.equity_dfs
+        self.pruned = self.event_loop.pruned
+        self.from_cache = False
+        if key is not None and not self.pruned:
+            result_cache.put(key, BacktestResult(self.statistics_df, self.equity_dfs))
+        return self.get_statistics()
 
-    def get_statistics(self) -> pd.DataFrame:
-        df = self.event_loop.statistics_df
+    def resume(self, snapshot_path: str = None) -> pd.DataFrame:
+        """
+        Resume the backtest saved in a snapshot with the candles of the feed of the config. Only the candles more
+        recent than the last candle of the snapshot are replayed: a daily re-run costs the new day of data instead of
+        the whole history. The config feed can therefore be loaded with the new candles only. The snapshot is saved
+        again at the end of the new data.
+
+        :param snapshot_path: The snapshot to resume, the snapshot path of the config by default
+        :type snapshot_path: str
+        :return: The statistics of the whole backtest, from the start of the snapshotted run
+        :rtype: pd.DataFrame
+        """
+        snapshot_path = (
+            snapshot_path
+            if snapshot_path is not None
+            else self.backtest_config.snapshot_path
+        )
+        if snapshot_path is None:
+            raise Exception("There is no snapshot to resume, set a snapshot path")
+        self.event_loop = EventLoop.load_snapshot(snapshot_path)
+        self.event_loop.snapshot_path = snapshot_path
+        self.data_digest = self.digested_feed = None
+        self.event_loop.feed.append(
+            [
+                candle_dataframe
+                for time_unit_candle_dataframes in self.backtest_config.feed.candle_dataframes.values()
+                for candle_dataframe in time_unit_candle_dataframes.values()
+            ]
+        )
+        self.events = self.event_loop.events
+        self.event_loop.loop()
+        self.statistics_df = self.event_loop.statistics_df
+        self.equity_dfs = self.event_loop.equity_dfs
+        self.pruned = self.event_loop.pruned
+        self.from_cache = False
+        return self.get_statistics()
+
+    def run_strategies_fan_out(
+        self,
+        strategies_parameters_list: list[dict[type, dict[str, Any]]],
+        checkpoint_callback: Callable[[Checkpoint], bool] = None,
+    ) -> list[pd.DataFrame]:
+        """
+        Backtest several strategies parameters with a single replay of the feed. Each strategies parameters trades on
+        its own brokers, the statistics are returned in the same order as the strategies parameters.
+
+        :param strategies_parameters_list: The strategies parameters to backtest
+        :type strategies_parameters_list: list[dict[type, dict[str, Any]]]
+        :param checkpoint_callback: Called at each checkpoint of each strategies parameters, see run_strategies
+        :type checkpoint_callback: Callable[[Checkpoint], bool]
+        :return: The statistics of each strategies parameters
+        :rtype: list[pd.DataFrame]
+        """
+        self.events = deque()
+        self.backtest_config.feed.events = self.events
+        self.backtest_config.feed.reset()
+        order_managers = [
+            self._create_order_manager(self._create_clock(), deque())
+            for _ in strategies_parameters_list
+        ]
+        self.fan_out_event_loop = FanOutEventLoop(
+            events=self.events,
+            assets=self.backtest_config.assets,
+            feed=self.backtest_config.feed,
+            order_managers=order_managers,
+            strategies_parameters_list=strategies_parameters_list,
+            indicator_mode=self.backtest_config.indicator_mode,
+            close_at_end_of_day=self.backtest_config.close_at_end_of_day,
+            close_at_end_of_data=self.backtest_config.close_at_end_of_data,
+            broker_isolation=self.backtest_config.isolation,
+            statistics_class=self.backtest_config.statistics_class,
+            checkpoint_interval=self.backtest_config.checkpoint_interval,
+            checkpoint_callback=checkpoint_callback,
+        )
+        self.fan_out_event_loop.loop()
+        return self.get_fan_out_statistics()
+
+    @staticmethod
+    def _statistics(df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
             data = {"index": ["Sortino Ratio"], "Backtest results": [-1]}
             df = pd.DataFrame(data).set_index("index")
         return df
 
+    def get_statistics(self) -> pd.DataFrame:
+        return self._statistics(self.statistics_df)
+
+    def get_fan_out_statistics(self) -> list[pd.DataFrame]:
+        return [
+            self._statistics(df) for df in self.fan_out_event_loop.statistics_dfs
+        ]
+
     def plot(self, asset: Asset, time_unit: timedelta) -> None:
         self.event_loop.plot(asset, time_unit)
 
@@ -319,6 +493,9 @@ class Backtest:
         self.event_loop.plot_indicators_instances_graph()
 
     def run_strategy(
-        self, strategy: type, strategy_parameters: dict[str, Any]
+        self,
+        strategy: type,
+        strategy_parameters: dict[str, Any],
+        checkpoint_callback: Callable[[Checkpoint], bool] = None,
     ) -> pd.DataFrame:
-        self.run_strategies({strategy: strategy_parameters})
+        return self.run_strategies({strategy: strategy_parameters}, checkpoint_callback)
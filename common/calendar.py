@@ -1,5 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 from pandas_market_calendars import MarketCalendar
 
@@ -40,3 +41,156 @@ def is_business_hour(
             & (df_business_calendar["market_close"] >= dt)
         ]
         return not df_temp.empty
+
+
+NANOSECONDS_IN_DAY = 86400 * 10**9
+
+
+def to_utc_naive_timestamp(dt: datetime | str) -> pd.Timestamp:
+    timestamp = pd.Timestamp(dt)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return timestamp
+
+
+class CalendarIndex:
+    """
+    Precomputed view of a market calendar expressed in epoch nanoseconds.
+
+    Session opens/closes are kept in sorted int64 arrays so that in-session
+    checks are a binary search, and the regular end of day of every UTC day is
+    kept in a dict so that the clock can answer end of day queries in O(1).
+    Ranges are extended lazily when a query falls outside of what has already
+    been computed. Use CalendarIndex.for_calendar to share a single index per
+    market calendar.
+    """
+
+    _instances: dict[MarketCalendar, "CalendarIndex"] = {}
+
+    def __init__(
+        self,
+        market_cal: MarketCalendar,
+        start: datetime = None,
+        end: datetime = None,
+    ):
+        self.market_cal = market_cal
+        close_time = self.market_cal.regular_market_times["market_close"][0][1]
+        self.close_offset_ns = (
+            ((close_time.hour * 60 + close_time.minute) * 60) * 10**9
+            + close_time.microsecond * 1000
+        )
+        self.end_of_day_epochs: dict[int, int] = {}
+        self.schedule_df = None
+        self.opens = np.empty(0, dtype=np.int64)
+        self.closes = np.empty(0, dtype=np.int64)
+        self.first_day = None
+        self.last_day = None
+        if start is not None and end is not None:
+            self.precompute(start, end)
+
+    @classmethod
+    def for_calendar(cls, market_cal: MarketCalendar) -> "CalendarIndex":
+        if market_cal not in cls._instances:
+            cls._instances[market_cal] = CalendarIndex(market_cal)
+        return cls._instances[market_cal]
+
+    @staticmethod
+    def epoch_ns_to_day(epoch_ns: int) -> int:
+        return epoch_ns // NANOSECONDS_IN_DAY
+
+    def precompute(self, start: datetime, end: datetime) -> None:
+        start_day = self.epoch_ns_to_day(to_utc_naive_timestamp(start).value)
+        end_day = self.epoch_ns_to_day(to_utc_naive_timestamp(end).value)
+        self.extend(start_day, end_day)
+
+    def extend(self, start_day: int, end_day: int) -> None:
+        if self.first_day is not None:
+            if self.first_day <= start_day and end_day <= self.last_day:
+                return
+            start_day = min(start_day, self.first_day)
+            end_day = max(end_day, self.last_day)
+
+        days = pd.to_datetime(
+            np.arange(start_day, end_day + 1, dtype=np.int64) * NANOSECONDS_IN_DAY
+        )
+        # Same rule as the historical Clock.end_of_day: the regular close time of
+        # the market, on the UTC date of the query, in the market timezone.
+        local_closes = (days + pd.Timedelta(self.close_offset_ns)).tz_localize(
+            self.market_cal.tz
+        )
+        self.end_of_day_epochs = dict(
+            zip(range(start_day, end_day + 1), local_closes.asi8.tolist())
+        )
+
+        # One extra day on each side so that sessions spanning midnight UTC are kept
+        self.schedule_df = self.market_cal.schedule(
+            start_date=days[0] - timedelta(days=1),
+            end_date=days[-1] + timedelta(days=1),
+        )
+        self.opens = self.schedule_df["market_open"].values.astype(np.int64)
+        self.closes = self.schedule_df["market_close"].values.astype(np.int64)
+        self.first_day = start_day
+        self.last_day = end_day
+
+    def ensure(self, epoch_ns: int) -> None:
+        day = self.epoch_ns_to_day(epoch_ns)
+        if self.first_day is None or not self.first_day <= day <= self.last_day:
+            # Extend by a year at a time so that a replay triggers very few recomputations
+            self.extend(day, day + 365)
+
+    def end_of_day_epoch_ns(self, epoch_ns: int) -> int:
+        day = epoch_ns // NANOSECONDS_IN_DAY
+        end_of_day = self.end_of_day_epochs.get(day)
+        if end_of_day is None:
+            self.ensure(epoch_ns)
+            end_of_day = self.end_of_day_epochs[day]
+        return end_of_day
+
+    def end_of_day(self, epoch_ns: int, threshold_ns: int = 0) -> bool:
+        return self.end_of_day_epoch_ns(epoch_ns) <= epoch_ns + threshold_ns
+
+    def session_index(self, epoch_ns: int) -> int:
+        """
+        Return the index of the session containing epoch_ns or -1 if the market is closed
+        """
+        self.ensure(epoch_ns)
+        index = int(np.searchsorted(self.closes, epoch_ns, side="left"))
+        if index < self.closes.size and self.opens[index] <= epoch_ns:
+            return index
+        return -1
+
+    def is_in_session(self, epoch_ns: int) -> bool:
+        return self.session_index(epoch_ns) != -1
+
+    def in_session_mask(self, epochs_ns: np.ndarray) -> np.ndarray:
+        if epochs_ns.size == 0:
+            return np.zeros(0, dtype=bool)
+        self.ensure(int(epochs_ns.min()))
+        self.ensure(int(epochs_ns.max()))
+        return sessions_mask(epochs_ns, self.opens, self.closes)
+
+    def schedule(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """
+        Same output as MarketCalendar.schedule but served from the precomputed table
+        """
+        start_date = to_utc_naive_timestamp(start_date)
+        end_date = to_utc_naive_timestamp(end_date)
+        self.ensure(start_date.value)
+        self.ensure(end_date.value)
+        return self.schedule_df.loc[
+            start_date.normalize() : end_date.normalize()
+        ].copy()
+
+
+def sessions_mask(
+    epochs_ns: np.ndarray, opens: np.ndarray, closes: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized in-session check: for every epoch, find the first session closing at
+    or after it and check that this session is already opened.
+    """
+    indexes = np.searchsorted(closes, epochs_ns, side="left")
+    in_range = indexes < closes.size
+    mask = np.zeros(epochs_ns.size, dtype=bool)
+    mask[in_range] = opens[indexes[in_range]] <= epochs_ns[in_range]
+    return mask
@@ -10,6 +10,7 @@ import trazy_analysis.settings
 from trazy_analysis.broker.ccxt_parser import Parser
 from trazy_analysis.broker.fee_model import FeeModel, FeeModelManager
 from trazy_analysis.broker.percent_fee_model import PercentFeeModel
+from trazy_analysis.common.metadata_cache import MARKETS, MetadataCache
 from trazy_analysis.models.asset import Asset
 
 LOG = trazy_analysis.logger.get_root_logger(
@@ -36,8 +37,11 @@ class CcxtConnector:
         exchanges_api_keys: dict[str, dict[str, Any]],
         parsers: Optional[dict[str, Type[Parser]]] = None,
         fee_models: Optional[FeeModel | dict[Asset, FeeModel]] = None,
+        metadata_cache: Optional[MetadataCache] = None,
     ):
         self.exchanges_api_keys = exchanges_api_keys
+        # The markets are fetched at each call when there is no metadata cache
+        self.metadata_cache = metadata_cache
         self.exchanges = list(exchanges_api_keys.keys())
         self.authorized_exchanges = ccxt.exchanges
         self.parsers = parsers
@@ -95,6 +99,81 @@ class CcxtConnector:
     def format_symbol(self, exchange: str, symbol: str) -> str:
         return CcxtConnector.FORMAT_FUNC[exchange](symbol)
 
+    @staticmethod
+    def normalize_symbol(symbol: str) -> Optional[str]:
+        """
+        :return: The symbol of an asset for a ccxt market symbol, None if the format of the symbol is unknown
+        :rtype: Optional[str]
+        """
+        if CcxtConnector.FORMAT1.match(symbol) is not None:
+            return symbol.replace("/", "").upper()
+        elif CcxtConnector.FORMAT2.match(symbol) is not None:
+            return symbol.replace(".", "").upper()
+        elif CcxtConnector.FORMAT3.match(symbol) is not None:
+            return symbol.replace("$", "").upper()
+        elif CcxtConnector.FORMAT4.match(symbol) is not None:
+            return symbol.replace("-", "").upper()
+        elif CcxtConnector.FORMAT5.match(symbol) is not None:
+            return symbol[:-2].upper()
+        elif CcxtConnector.FORMAT6.match(symbol) is not None:
+            return symbol[:-4].upper()
+        elif CcxtConnector.FORMAT7.match(symbol) is not None:
+            return symbol[:-7].upper()
+        elif CcxtConnector.FORMAT8.match(symbol) is not None:
+            return symbol[:4].upper()
+        elif CcxtConnector.FORMAT9.match(symbol) is not None:
+            return symbol.replace("-", "")[:-6].upper()
+        elif CcxtConnector.FORMAT10.match(symbol) is not None:
+            return symbol.replace("-", "")[:-4].upper()
+        return None
+
+    def fetch_markets(self, exchange: str) -> list[dict[str, Any]]:
+        """
+        The markets of an exchange, from the metadata cache if there is one. The exchange instance is loaded with the
+        cached markets so that ccxt doesn't fetch them again.
+
+        :param exchange: The exchange
+        :type exchange: str
+        :return: The ccxt markets of the exchange
+        :rtype: list[dict[str, Any]]
+        """
+        exchange_to_lower = exchange.lower()
+        exchange_instance = self.get_exchange_instance(exchange_to_lower)
+        if self.metadata_cache is None:
+            return exchange_instance.fetchMarkets()
+        markets = self.metadata_cache.get(
+            exchange_to_lower, MARKETS, exchange_instance.fetchMarkets
+        )
+        if not exchange_instance.markets:
+            try:
+                exchange_instance.set_markets(markets)
+            except Exception as e:
+                LOG.warning(
+                    "Could not load the cached markets of %s in ccxt: %s",
+                    exchange_to_lower,
+                    str(e),
+                )
+        return markets
+
+    def invalidate_markets(self, exchange: str = None) -> None:
+        """
+        Forget the cached markets of an exchange, of all the exchanges if None
+        """
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate(exchange, MARKETS)
+
+    def fetch_symbol_mapping(self, exchange: str) -> dict[str, str]:
+        """
+        :return: The ccxt market symbols of an exchange by symbol of asset
+        :rtype: dict[str, str]
+        """
+        symbol_mapping = {}
+        for symbol_info in self.fetch_markets(exchange):
+            symbol = CcxtConnector.normalize_symbol(symbol_info["symbol"])
+            if symbol is not None:
+                symbol_mapping[symbol] = symbol_info["symbol"]
+        return symbol_mapping
+
     def fetch_fees(self, exchange: str) -> Optional[dict[Asset, FeeModel]]:
         # Get fees
         exchange_to_lower = exchange.lower()
@@ -114,35 +193,15 @@ class CcxtConnector:
             LOG.info("ccxt doesn't have fetchMarkets function for %s", exchange)
             return None
         try:
-            market_info = exchange_instance.fetchMarkets()
+            market_info = self.fetch_markets(exchange_to_lower)
         except Exception as e:
             LOG.error(str(e))
             return None
 
         fee_models = {}
         for symbol_info in market_info:
-            symbol = symbol_info["symbol"]
-            if CcxtConnector.FORMAT1.match(symbol) is not None:
-                symbol = symbol.replace("/", "").upper()
-            elif CcxtConnector.FORMAT2.match(symbol) is not None:
-                symbol = symbol.replace(".", "").upper()
-            elif CcxtConnector.FORMAT3.match(symbol) is not None:
-                symbol = symbol.replace("$", "").upper()
-            elif CcxtConnector.FORMAT4.match(symbol) is not None:
-                symbol = symbol.replace("-", "").upper()
-            elif CcxtConnector.FORMAT5.match(symbol) is not None:
-                symbol = symbol[:-2].upper()
-            elif CcxtConnector.FORMAT6.match(symbol) is not None:
-                symbol = symbol[:-4].upper()
-            elif CcxtConnector.FORMAT7.match(symbol) is not None:
-                symbol = symbol[:-7].upper()
-            elif CcxtConnector.FORMAT8.match(symbol) is not None:
-                symbol = symbol[:4].upper()
-            elif CcxtConnector.FORMAT9.match(symbol) is not None:
-                symbol = symbol.replace("-", "")[:-6].upper()
-            elif CcxtConnector.FORMAT10.match(symbol) is not None:
-                symbol = symbol.replace("-", "")[:-4].upper()
-            else:
+            symbol = CcxtConnector.normalize_symbol(symbol_info["symbol"])
+            if symbol is None:
                 continue
 
             # to simplify we just take the maximum of the 2 fees
@@ -157,5 +216,3 @@ class CcxtConnector:
             fee_models[Asset(symbol, exchange)] = PercentFeeModel(commission_pct=fee)
 
         return fee_models
-
-
@@ -1,31 +1,41 @@
 import abc
+import time
 from datetime import datetime, timedelta
 
 import pytz
 from pandas_market_calendars import MarketCalendar
 from pandas_market_calendars.exchange_calendar_iex import IEXExchangeCalendar
 
-from trazy_analysis.common.utils import timestamp_to_utc
+from trazy_analysis.common.calendar import CalendarIndex
+from trazy_analysis.common.utils import (
+    datetime_to_epoch_ns,
+    epoch_ns_to_datetime,
+    timedelta_to_ns,
+)
 
 
 class Clock:
     def __init__(self, market_cal: MarketCalendar = IEXExchangeCalendar()) -> None:
         self.market_cal = market_cal
+        self.calendar_index = CalendarIndex.for_calendar(market_cal)
         self.updated = False
 
     @abc.abstractmethod
     def current_time(self, tz=pytz.UTC) -> datetime:  # pragma: no cover
         raise NotImplementedError
 
+    def current_epoch_ns(self) -> int:
+        return datetime_to_epoch_ns(self.current_time())
+
     @abc.abstractmethod
-    def update_time(self, timestamp: datetime) -> None:  # pragma: no cover
+    def update_time(self, timestamp: datetime | int) -> None:  # pragma: no cover
         raise NotImplementedError
 
     @abc.abstractmethod
     def update_bars(self) -> None:  # pragma: no cover
         raise NotImplementedError
 
-    def update(self, timestamp: datetime):
+    def update(self, timestamp: datetime | int):
         self.update_bars()
         self.update_time(timestamp)
         self.updated = True
@@ -35,27 +45,19 @@ class Clock:
         raise NotImplementedError
 
     def end_of_day(self, threshold: timedelta = timedelta(minutes=5)) -> bool:
-        now = self.current_time()
-        date = now.date()
-        time = self.market_cal.regular_market_times["market_close"][0][1]
-        end_of_day_datetime = datetime(
-            year=date.year,
-            month=date.month,
-            day=date.day,
-            hour=time.hour,
-            minute=time.minute,
-            microsecond=time.microsecond,
+        return self.calendar_index.end_of_day(
+            self.current_epoch_ns(), timedelta_to_ns(threshold)
         )
-        end_of_day_datetime = self.market_cal.tz.localize(end_of_day_datetime)
-        end_of_day_datetime = timestamp_to_utc(end_of_day_datetime)
-        return end_of_day_datetime <= now + threshold
 
 
 class LiveClock(Clock):
     def current_time(self, tz=pytz.UTC) -> datetime:
         return datetime.now(tz=tz)
 
-    def update_time(self, timestamp: datetime) -> None:  # pragma: no cover
+    def current_epoch_ns(self) -> int:
+        return time.time_ns()
+
+    def update_time(self, timestamp: datetime | int) -> None:  # pragma: no cover
         pass
 
     def update_bars(self) -> None:  # pragma: no cover
@@ -69,18 +71,33 @@ class SimulatedClock(Clock):
     def __init__(self, market_cal: MarketCalendar = IEXExchangeCalendar()) -> None:
         super().__init__(market_cal)
         self.timestamp: datetime = None
+        self.epoch_ns: int = None
         self.bars: int = 0
 
-    def update_time(self, timestamp: datetime) -> None:
-        self.timestamp = timestamp
+    def update_time(self, timestamp: datetime | int) -> None:
+        # The simulation advances the clock with epochs, the datetime is only built if somebody asks for it
+        if isinstance(timestamp, int):
+            self.epoch_ns = timestamp
+            self.timestamp = None
+        else:
+            self.timestamp = timestamp
+            self.epoch_ns = datetime_to_epoch_ns(timestamp)
 
     def update_bars(self) -> None:
         self.bars += 1
 
     def current_time(self, tz=pytz.UTC) -> datetime:
         if self.timestamp is None:
-            self.timestamp = datetime.now(pytz.UTC)
+            if self.epoch_ns is None:
+                self.update_time(datetime.now(pytz.UTC))
+            else:
+                self.timestamp = epoch_ns_to_datetime(self.epoch_ns)
         return self.timestamp
 
+    def current_epoch_ns(self) -> int:
+        if self.epoch_ns is None:
+            self.update_time(datetime.now(pytz.UTC))
+        return self.epoch_ns
+
     def current_bars(self) -> int:
         return self.bars
@@ -1,5 +1,6 @@
 from datetime import datetime
 
+import numpy as np
 from pandas_market_calendars.exchange_calendar_eurex import EUREXExchangeCalendar
 from pandas_market_calendars.exchange_calendar_iex import IEXExchangeCalendar
 
@@ -14,6 +15,7 @@ CONNECTION_ERROR_MESSAGE = (
     "Connection error, the exception is: %s. The traceback is: %s"
 )
 MAX_TIMESTAMP = timestamp_to_utc(datetime.max)
+MAX_EPOCH_NS = int(np.iinfo(np.int64).max)
 NONE_API_KEYS = {
     "key": None,
     "secret": None,
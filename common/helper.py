@@ -1,6 +1,7 @@
 import json
 import os
 import re
+import threading
 import traceback
 from datetime import datetime, timedelta
 from typing import List, Dict, Union
@@ -11,12 +12,15 @@ import pytz
 import requests
 from pandas import DataFrame
 from pandas_market_calendars import MarketCalendar
-from pandasql import sqldf
 from requests import Response
 
 import trazy_analysis.logger
 import trazy_analysis.settings
-from trazy_analysis.common.calendar import is_business_day, is_business_hour
+from trazy_analysis.common.calendar import (
+    is_business_day,
+    is_business_hour,
+    sessions_mask,
+)
 from trazy_analysis.common.constants import CONNECTION_ERROR_MESSAGE, ENCODING
 from trazy_analysis.common.types import CandleDataFrame
 from trazy_analysis.common.utils import timestamp_to_utc
@@ -200,10 +204,20 @@ def calc_required_history_start_timestamp(
     return start_timestamp
 
 
+# One session per thread so that keep-alive connections to the same host are reused between requests
+SESSIONS = threading.local()
+
+
+def get_session() -> requests.Session:
+    session = getattr(SESSIONS, "session", None)
+    if session is None:
+        session = requests.Session()
+        SESSIONS.session = session
+    return session
+
+
 def request(url: str) -> Response:
-    with requests.Session() as session:
-        response = session.get(url)
-        return response
+    return get_session().get(url)
 
 
 def fill_missing_datetimes(
@@ -260,16 +274,11 @@ def resample_candle_data(
         df_resampled = candle_dataframe.reindex(market_cal_df.index)
         df_resampled.index.name = "timestamp"
     else:
-        s = """
-            select
-                d.timestamp, d.open, d.high, d.low, d.close, d.volume
-            from
-                candle_dataframe d join market_cal_df b on (d.timestamp >= b.market_open and d.timestamp <= 
-                b.market_close)
-        """
-        df_resampled = sqldf(s, locals())
+        opens = market_cal_df["market_open"].values.astype(np.int64)
+        closes = market_cal_df["market_close"].values.astype(np.int64)
+        mask = sessions_mask(candle_dataframe.index.asi8, opens, closes)
         df_resampled = CandleDataFrame.from_dataframe(
-            df_resampled, Asset(symbol=asset.symbol, exchange=asset.exchange), time_unit=time_unit
+            candle_dataframe[mask], Asset(symbol=asset.symbol, exchange=asset.exchange), time_unit=time_unit
         )
     if (
         remove_incomplete_head
@@ -362,6 +371,31 @@ def datetime_to_epoch(timestamp: datetime, unit_multiplicator: int) -> int:
     return int(timestamp.timestamp()) * unit_multiplicator
 
 
+def candles_to_arrays(candles: np.array) -> dict[str, np.ndarray]:
+    """
+    Columnar view of candles: the epochs in nanoseconds under "timestamp" and one float64 array per price/volume column
+
+    :param candles: The candles to convert
+    :type candles: np.array
+    :return: The candles columns
+    :rtype: dict[str, np.ndarray]
+    """
+    size = len(candles)
+    return {
+        "timestamp": np.fromiter(
+            (candle.epoch_ns for candle in candles), dtype=np.int64, count=size
+        ),
+        **{
+            column: np.fromiter(
+                (getattr(candle, column) for candle in candles),
+                dtype=np.float64,
+                count=size,
+            )
+            for column in ["open", "high", "low", "close", "volume"]
+        },
+    }
+
+
 def normalize_assets(
     assets: dict[Asset, timedelta | list[timedelta]]
 ) -> dict[Asset, list[timedelta]]:
@@ -0,0 +1,57 @@
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+
+from trazy_analysis.common.utils import timedelta_to_ns
+
+
+class LatencyStats:
+    """
+    Rolling statistics over the last recorded latencies, in nanoseconds. Latencies above the bound are counted so that
+    callers can check the bound is respected.
+    """
+
+    def __init__(self, bound: timedelta = None, max_size: int = 10000):
+        self.bound_ns = timedelta_to_ns(bound) if bound is not None else None
+        self.latencies = deque(maxlen=max_size)
+        self.count = 0
+        self.exceeded = 0
+        self.max_ns = 0
+
+    def record(self, latency_ns: int) -> bool:
+        """
+        Record a latency
+
+        :param latency_ns: The latency to record in nanoseconds
+        :type latency_ns: int
+        :return: False if the latency exceeded the bound, True otherwise
+        :rtype: bool
+        """
+        self.latencies.append(latency_ns)
+        self.count += 1
+        self.max_ns = max(self.max_ns, latency_ns)
+        if self.bound_ns is not None and latency_ns > self.bound_ns:
+            self.exceeded += 1
+            return False
+        return True
+
+    def percentile(self, q: float) -> float:
+        if len(self.latencies) == 0:
+            return 0.0
+        return float(np.percentile(np.fromiter(self.latencies, dtype=np.int64), q))
+
+    def mean(self) -> float:
+        if len(self.latencies) == 0:
+            return 0.0
+        return float(np.mean(np.fromiter(self.latencies, dtype=np.int64)))
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "exceeded": self.exceeded,
+            "mean_ms": self.mean() / 1e6,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
@@ -24,7 +24,12 @@ from trazy_analysis.market_data.live.tiingo_live_data_handler import (
     TiingoLiveDataHandler,
 )
 from trazy_analysis.models.asset import Asset
-from trazy_analysis.models.enums import OrderType, BrokerIsolation
+from trazy_analysis.models.enums import (
+    BrokerIsolation,
+    EventLoopMode,
+    IndicatorMode,
+    OrderType,
+)
 from trazy_analysis.order_manager.order_creator import OrderCreator
 from trazy_analysis.order_manager.order_manager import OrderManager
 from trazy_analysis.order_manager.position_sizer import PositionSizer
@@ -256,7 +261,8 @@ class Live:
                                     order_manager=order_manager, strategies_parameters=strategies_parameters,
                                     close_at_end_of_day=self.live_config.close_at_end_of_day,
                                     close_at_end_of_data=False, broker_isolation=self.live_config.isolation,
-                                    statistics_class=self.live_config.statistics_class)
+                                    statistics_class=self.live_config.statistics_class,
+                                    indicator_mode=IndicatorMode.LIVE, mode=EventLoopMode.LIVE)
         self.event_loop.loop()
         return self.event_loop.statistics_df
 
@@ -3,7 +3,7 @@ import uuid
 from abc import ABCMeta
 from typing import Any
 
-from ratelimit import limits, sleep_and_retry
+from trazy_analysis.common.rate_limiter import RATE_LIMITER
 
 
 class InheritableSingleton(ABCMeta):
@@ -24,13 +24,11 @@ class RateLimitedSingleton(InheritableSingleton):
         ):
             from trazy_analysis.common.helper import request
 
-            setattr(
-                cls,
-                "request",
-                sleep_and_retry(
-                    limits(calls=cls.MAX_CALLS, period=cls.PERIOD)(request)
-                ),
+            # The quotas of the data providers are given per window: the bucket is refilled at the end of each window
+            RATE_LIMITER.set_limit(
+                cls_name, cls.MAX_CALLS, cls.PERIOD, continuous=False
             )
+            setattr(cls, "request", RATE_LIMITER.limited(cls_name, request))
         super().__init__(cls_name, bases, namespace, **kwds)
 
 
@@ -0,0 +1,241 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import quote, unquote
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+METADATA_FILE_EXTENSION = ".pkl"
+KEY_SEPARATOR = "@"
+
+# Kinds of metadata
+MARKETS = "markets"
+SYMBOLS = "symbols"
+PRODUCT_INFO = "product_info"
+
+# Time to live of the metadata in seconds by kind
+DEFAULT_TTL = 3600.0
+DEFAULT_TTLS = {
+    MARKETS: 24 * 3600.0,
+    SYMBOLS: 24 * 3600.0,
+    PRODUCT_INFO: 10 * 24 * 3600.0,
+}
+
+
+class MetadataEntry:
+    def __init__(self, value: Any, fetch_time: float):
+        self.value = value
+        self.fetch_time = fetch_time
+
+
+class MetadataCache:
+    """
+    Metadata of the exchanges, like their markets, fees, lot sizes and symbols, that change rarely but are slow to
+    fetch. The metadata of a kind for a source is fetched once per time to live and kept in memory and, when a
+    directory is given, on disk so that it is shared by the processes using the same directory and survives restarts.
+    Writes are atomic. The expired metadata is still returned when fetching it again fails.
+
+    :param directory: The directory of the metadata files, the metadata is only kept in memory if None
+    :type directory: str
+    :param ttls: The time to live in seconds of each kind of metadata, DEFAULT_TTL for the other kinds
+    :type ttls: dict[str, float]
+    :param time_function: The wall clock time in seconds, the fetch times are compared across processes
+    :type time_function: Callable[[], float]
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        ttls: dict[str, float] = None,
+        time_function: Callable[[], float] = time.time,
+    ):
+        self.directory = directory
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.time_function = time_function
+        self.entries: dict[tuple[str, str], MetadataEntry] = {}
+        self.lock = threading.Lock()
+        # The concurrent requests for the same metadata wait for a single fetch
+        self.fetch_locks: dict[tuple[str, str], threading.Lock] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def ttl(self, kind: str) -> float:
+        # The kinds of a single item like product_info@123 share the time to live of their kind
+        return self.ttls.get(kind.split(KEY_SEPARATOR)[0], DEFAULT_TTL)
+
+    def path(self, source: str, kind: str) -> str:
+        name = quote(source.lower(), safe="") + KEY_SEPARATOR + quote(kind, safe="")
+        return os.path.join(self.directory, name + METADATA_FILE_EXTENSION)
+
+    def load(self, source: str, kind: str) -> MetadataEntry | None:
+        key = (source.lower(), kind)
+        if key in self.entries:
+            return self.entries[key]
+        if self.directory is None:
+            return None
+        path = self.path(source, kind)
+        try:
+            with open(path, "rb") as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError) as e:
+            LOG.warning("Ignoring corrupted metadata %s: %s", path, e)
+            return None
+        self.entries[key] = entry
+        return entry
+
+    def put(self, source: str, kind: str, value: Any) -> None:
+        entry = MetadataEntry(value, self.time_function())
+        with self.lock:
+            self.entries[(source.lower(), kind)] = entry
+            if self.directory is None:
+                return
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self.path(source, kind))
+
+    def peek(self, source: str, kind: str) -> Any:
+        """
+        :return: The cached metadata of a kind for a source even if expired, None if there is none
+        :rtype: Any
+        """
+        with self.lock:
+            entry = self.load(source, kind)
+        return entry.value if entry is not None else None
+
+    def get(
+        self,
+        source: str,
+        kind: str,
+        fetch_function: Callable[[], Any],
+        ttl: float = None,
+    ) -> Any:
+        """
+        The metadata of a kind for a source, fetched if it isn't cached or is expired
+
+        :param source: The exchange or data provider
+        :type source: str
+        :param kind: The kind of metadata, like MARKETS, optionally followed by KEY_SEPARATOR and the identifier of
+            an item
+        :type kind: str
+        :param fetch_function: The function fetching the metadata, its result isn't cached if it raises or returns
+            None
+        :type fetch_function: Callable[[], Any]
+        :param ttl: The time to live in seconds, the time to live of the kind if None
+        :type ttl: float
+        :return: The metadata
+        :rtype: Any
+        """
+        ttl = ttl if ttl is not None else self.ttl(kind)
+        key = (source.lower(), kind)
+
+        def is_fresh(entry: MetadataEntry | None) -> bool:
+            return entry is not None and self.time_function() - entry.fetch_time < ttl
+
+        with self.lock:
+            fetch_lock = self.fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            with self.lock:
+                entry = self.load(source, kind)
+                if not is_fresh(entry) and self.directory is not None:
+                    # Another process may have fetched it since it was loaded
+                    self.entries.pop(key, None)
+                    entry = self.load(source, kind)
+            if is_fresh(entry):
+                return entry.value
+            try:
+                value = fetch_function()
+            except Exception as e:
+                if entry is None:
+                    raise
+                LOG.warning(
+                    "Using the expired %s metadata of %s, fetching it failed: %s",
+                    kind,
+                    source,
+                    e,
+                )
+                return entry.value
+            if value is None:
+                return entry.value if entry is not None else None
+            self.put(source, kind, value)
+            return value
+
+    def invalidate(self, source: str = None, kind: str = None) -> None:
+        """
+        Forget the metadata of a kind for a source, all the kinds or all the sources if None. The kinds of the items
+        of a kind are forgotten with it.
+        """
+
+        def matches(entry_source: str, entry_kind: str) -> bool:
+            return (source is None or entry_source == source.lower()) and (
+                kind is None
+                or entry_kind == kind
+                or entry_kind.startswith(kind + KEY_SEPARATOR)
+            )
+
+        with self.lock:
+            for key in list(self.entries):
+                if matches(*key):
+                    del self.entries[key]
+            if self.directory is None:
+                return
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(METADATA_FILE_EXTENSION):
+                    continue
+                name = entry.name[: -len(METADATA_FILE_EXTENSION)]
+                entry_source, _, entry_kind = name.partition(KEY_SEPARATOR)
+                if matches(unquote(entry_source), unquote(entry_kind)):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["lock"] = None
+        state["fetch_locks"] = {}
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+def item_kind(kind: str, identifier: Any) -> str:
+    """
+    :return: The kind of the metadata of a single item of a kind, like the info of a product
+    :rtype: str
+    """
+    return f"{kind}{KEY_SEPARATOR}{identifier}"
+
+
+def default_metadata_cache() -> MetadataCache | None:
+    """
+    :return: The metadata cache of the process, stored in the METADATA_CACHE_DIRECTORY directory, None if it isn't
+        configured
+    :rtype: MetadataCache | None
+    """
+    global METADATA_CACHE
+    directory = trazy_analysis.settings.METADATA_CACHE_DIRECTORY
+    if directory is None:
+        return None
+    if METADATA_CACHE is None or METADATA_CACHE.directory != directory:
+        METADATA_CACHE = MetadataCache(directory)
+    return METADATA_CACHE
+
+
+METADATA_CACHE = None
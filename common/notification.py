@@ -0,0 +1,208 @@
+import abc
+import os
+import queue
+import threading
+from typing import Any, Callable
+
+import telegram_send
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.common.rate_limiter import TokenBucket
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+# Put in the queue to stop the dispatching thread
+STOP = None
+# Time in seconds given to the queued notifications to be sent when the dispatcher is closed
+CLOSE_TIMEOUT = 5.0
+
+
+class NotificationSink:
+    """
+    Destination of the notifications, called from the dispatching thread only
+    """
+
+    @abc.abstractmethod
+    def send(self, messages: list[str]) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+
+class TelegramSink(NotificationSink):
+    """
+    :param conf: The telegram-send configuration file, the default configuration if None
+    :type conf: str
+    """
+
+    def __init__(self, conf: str = None):
+        self.conf = conf
+
+    def send(self, messages: list[str]) -> None:
+        telegram_send.send(messages=messages, conf=self.conf)
+
+
+class FileSink(NotificationSink):
+    """
+    Append the notifications to a file, a blank line separating each send
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, messages: list[str]) -> None:
+        with open(self.path, "a") as file:
+            file.write("\n".join(messages) + "\n\n")
+
+
+class MemorySink(NotificationSink):
+    def __init__(self):
+        self.sent: list[list[str]] = []
+
+    def send(self, messages: list[str]) -> None:
+        self.sent.append(messages)
+
+
+class NotificationDispatcher:
+    """
+    Send the notifications of the strategies from a background thread so that the strategies never wait for the
+    network. The sends are rate limited: the notifications queued while waiting for the limit are coalesced into a
+    single send, in which a notification replaces the previous ones having the same key. A disabled dispatcher drops
+    the notifications without evaluating their messages, the event loops which don't run live use one.
+
+    :param sinks: The destinations of the notifications
+    :type sinks: list[NotificationSink]
+    :param enabled: Whether the notifications are sent
+    :type enabled: bool
+    :param capacity: The maximum number of sends per period
+    :type capacity: float
+    :param period: The period of the rate limit in seconds
+    :type period: float
+    :param max_queue_size: The maximum number of notifications waiting to be sent, the next ones are dropped
+    :type max_queue_size: int
+    """
+
+    def __init__(
+        self,
+        sinks: list[NotificationSink] = None,
+        enabled: bool = True,
+        capacity: float = 20,
+        period: float = 60.0,
+        max_queue_size: int = 1000,
+    ):
+        self.sinks = sinks if sinks is not None else []
+        self.enabled = enabled
+        self.bucket = TokenBucket(capacity, period)
+        self.max_queue_size = max_queue_size
+        self.queue = queue.Queue(max_queue_size)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.nb_dropped = 0
+        self.nb_sends = 0
+
+    def notify(self, *messages: str | Callable[[], str], key: str = None) -> bool:
+        """
+        Queue a notification without waiting for it to be sent
+
+        :param messages: The messages of the notification, the callables are only called when the dispatcher is
+            enabled, by the calling thread
+        :type messages: str | Callable[[], str]
+        :param key: The notification replaces the queued notification having the same key, if any
+        :type key: str
+        :return: Whether the notification was queued
+        :rtype: bool
+        """
+        if not self.enabled:
+            return False
+        messages = [message() if callable(message) else message for message in messages]
+        self.start()
+        try:
+            self.queue.put_nowait((key, messages))
+        except queue.Full:
+            self.nb_dropped += 1
+            LOG.warning("Notification dropped, %s notifications are waiting", self.max_queue_size)
+            return False
+        return True
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="notification-dispatcher", daemon=True
+                )
+                self.thread.start()
+
+    @staticmethod
+    def coalesce(notifications: list[tuple[str, list[str]]]) -> list[str]:
+        """
+        :return: The messages of the notifications, the last notification of each key taking the place of the first
+        :rtype: list[str]
+        """
+        coalesced = {}
+        for index, (key, messages) in enumerate(notifications):
+            coalesced[key if key is not None else index] = messages
+        return [message for messages in coalesced.values() for message in messages]
+
+    def run(self) -> None:
+        while True:
+            notification = self.queue.get()
+            if notification is STOP:
+                self.queue.task_done()
+                return
+            self.bucket.acquire()
+            notifications = [notification]
+            while True:
+                try:
+                    notifications.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopped = STOP in notifications
+            self.dispatch(
+                self.coalesce(
+                    [notification for notification in notifications if notification is not STOP]
+                )
+            )
+            for _ in notifications:
+                self.queue.task_done()
+            if stopped:
+                return
+
+    def dispatch(self, messages: list[str]) -> None:
+        self.nb_sends += 1
+        for sink in self.sinks:
+            try:
+                sink.send(messages)
+            except Exception as e:
+                LOG.error("Could not send the notification to %s: %s", sink, e)
+
+    def flush(self) -> None:
+        """
+        Wait for the queued notifications to be sent
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.join()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        """
+        Send the queued notifications then stop the dispatching thread
+        """
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self.queue.put(STOP)
+        thread.join(timeout)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["queue"] = None
+        state["thread"] = None
+        state["lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.queue = queue.Queue(self.max_queue_size)
+        self.lock = threading.Lock()
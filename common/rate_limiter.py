@@ -0,0 +1,271 @@
+import asyncio
+import functools
+import math
+import multiprocessing
+import threading
+import time
+from typing import Any, Callable
+
+# Indexes of the state of a token bucket
+TOKENS = 0
+# Time of the last refill of a continuous bucket, end of the current window of an interval bucket
+STAMP = 1
+ACQUISITIONS = 2
+THROTTLED = 3
+WAIT_TIME = 4
+MAX_WAIT_TIME = 5
+STATE_SIZE = 6
+
+DEFAULT_WEIGHT_CLASS = "default"
+
+
+class TokenBucket:
+    """
+    A token bucket of capacity tokens refilled every period. A continuous bucket refills its tokens gradually, so
+    it allows bursts of up to capacity requests then capacity requests per period. An interval bucket refills all its
+    tokens at the end of each window of one period, which guarantees at most capacity requests per window, like the
+    fixed windows quotas of the data providers.
+
+    A request takes its tokens as soon as it arrives, possibly going below zero, and waits for the time the bucket
+    needs to pay them back: the waiting requests are served in the order they arrived, from any thread or asyncio
+    task. A shared bucket keeps its state in shared memory so that it can be passed to other processes when they are
+    started.
+
+    :param capacity: The maximum number of tokens of the bucket
+    :type capacity: float
+    :param period: The time in seconds needed to refill the bucket
+    :type period: float
+    :param continuous: Whether the tokens are refilled gradually or at the end of each window
+    :type continuous: bool
+    :param shared: Whether the bucket is shared across processes
+    :type shared: bool
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        period: float,
+        continuous: bool = True,
+        shared: bool = False,
+        time_function: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if capacity <= 0 or period <= 0:
+            raise Exception(
+                f"The capacity and the period of a token bucket should be positive, got {capacity} and {period}"
+            )
+        self.capacity = capacity
+        self.period = period
+        self.continuous = continuous
+        self.shared = shared
+        self.time_function = time_function
+        if shared:
+            self.state = multiprocessing.Array("d", STATE_SIZE)
+            self.lock = self.state.get_lock()
+        else:
+            self.state = [0.0] * STATE_SIZE
+            self.lock = threading.Lock()
+        self.state[TOKENS] = capacity
+        self.state[STAMP] = math.nan
+
+    def reserve(self, weight: float = 1) -> float:
+        """
+        Take the tokens of a request
+
+        :param weight: The number of tokens of the request
+        :type weight: float
+        :return: The time in seconds the request has to wait before being sent
+        :rtype: float
+        """
+        if weight > self.capacity:
+            raise Exception(
+                f"A request of weight {weight} can't fit in a bucket of capacity {self.capacity}"
+            )
+        with self.lock:
+            state = self.state
+            now = self.time_function()
+            tokens = state[TOKENS]
+            stamp = state[STAMP]
+            if self.continuous:
+                if not math.isnan(stamp):
+                    tokens = min(
+                        self.capacity,
+                        tokens + (now - stamp) * self.capacity / self.period,
+                    )
+                stamp = now
+                tokens -= weight
+                wait_time = max(0.0, -tokens * self.period / self.capacity)
+            else:
+                if not math.isnan(stamp) and now >= stamp:
+                    nb_windows = math.floor((now - stamp) / self.period) + 1
+                    tokens += nb_windows * self.capacity
+                    # The requests waiting for the next windows keep their tokens
+                    stamp += nb_windows * self.period
+                if math.isnan(stamp) or tokens >= self.capacity:
+                    # The window starts with the first request after an idle time
+                    tokens = self.capacity
+                    stamp = now + self.period
+                tokens -= weight
+                wait_time = 0.0
+                if tokens < 0:
+                    nb_windows = math.ceil(-tokens / self.capacity)
+                    wait_time = stamp + (nb_windows - 1) * self.period - now
+            state[TOKENS] = tokens
+            state[STAMP] = stamp
+            state[ACQUISITIONS] += 1
+            if wait_time > 0:
+                state[THROTTLED] += 1
+                state[WAIT_TIME] += wait_time
+                state[MAX_WAIT_TIME] = max(state[MAX_WAIT_TIME], wait_time)
+        return wait_time
+
+    def acquire(self, weight: float = 1) -> float:
+        """
+        Wait until a request can be sent
+
+        :return: The time waited in seconds
+        :rtype: float
+        """
+        wait_time = self.reserve(weight)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    async def acquire_async(self, weight: float = 1) -> float:
+        """
+        Wait until a request can be sent without blocking the event loop
+        """
+        wait_time = self.reserve(weight)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+    def metrics(self) -> dict[str, float]:
+        with self.lock:
+            return {
+                "acquisitions": int(self.state[ACQUISITIONS]),
+                "throttled": int(self.state[THROTTLED]),
+                "wait_time": self.state[WAIT_TIME],
+                "max_wait_time": self.state[MAX_WAIT_TIME],
+            }
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        if not self.shared:
+            state["lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if not self.shared:
+            self.lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    The token buckets of the exchanges and data providers, one per weight class of their endpoints. The requests
+    to a source or a weight class without limit aren't throttled.
+
+    :param shared: Whether the buckets are shared across processes. The buckets have to be created before the rate
+        limiter is passed to the processes.
+    :type shared: bool
+    """
+
+    def __init__(self, shared: bool = False) -> None:
+        self.shared = shared
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def set_limit(
+        self,
+        source: str,
+        capacity: float,
+        period: float,
+        weight_class: str = DEFAULT_WEIGHT_CLASS,
+        continuous: bool = True,
+        replace: bool = True,
+    ) -> TokenBucket:
+        """
+        Limit the requests of a weight class of a source to capacity tokens per period seconds
+
+        :param replace: Whether an existing limit is replaced
+        :type replace: bool
+        :return: The bucket of the weight class
+        :rtype: TokenBucket
+        """
+        key = (source.lower(), weight_class)
+        with self.lock:
+            if not replace and key in self.buckets:
+                return self.buckets[key]
+            bucket = TokenBucket(capacity, period, continuous, self.shared)
+            self.buckets[key] = bucket
+        return bucket
+
+    def bucket(
+        self, source: str, weight_class: str = DEFAULT_WEIGHT_CLASS
+    ) -> TokenBucket | None:
+        return self.buckets.get((source.lower(), weight_class))
+
+    def acquire(
+        self, source: str, weight: float = 1, weight_class: str = DEFAULT_WEIGHT_CLASS
+    ) -> float:
+        """
+        Wait until a request to the source can be sent
+
+        :return: The time waited in seconds
+        :rtype: float
+        """
+        bucket = self.bucket(source, weight_class)
+        if bucket is None:
+            return 0.0
+        return bucket.acquire(weight)
+
+    async def acquire_async(
+        self, source: str, weight: float = 1, weight_class: str = DEFAULT_WEIGHT_CLASS
+    ) -> float:
+        bucket = self.bucket(source, weight_class)
+        if bucket is None:
+            return 0.0
+        return await bucket.acquire_async(weight)
+
+    def limited(
+        self,
+        source: str,
+        function: Callable,
+        weight: float = 1,
+        weight_class: str = DEFAULT_WEIGHT_CLASS,
+    ) -> Callable:
+        """
+        :return: The function waiting for the limit of the source before each call
+        :rtype: Callable
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            self.acquire(source, weight, weight_class)
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """
+        :return: The number of requests, of throttled requests, the total and maximum wait time of each bucket, by
+            source/weight class
+        :rtype: dict[str, dict[str, float]]
+        """
+        return {
+            f"{source}/{weight_class}": bucket.metrics()
+            for (source, weight_class), bucket in list(self.buckets.items())
+        }
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+# The rate limiter of the process, shared by the data handlers and the brokers
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+
+class RequestCache:
+    """
+    Runs blocking requests on a thread pool so that the requests to several endpoints and exchanges are sent
+    concurrently. A request submitted while the same request is in flight shares its future, and the responses are
+    cached for a time to live. The functions are called from several threads at once: the callers serialize the
+    requests sharing a client which isn't thread safe.
+
+    :param max_workers: The number of requests sent at the same time
+    :type max_workers: int
+    :param time_function: The time source of the time to live, in seconds
+    :type time_function: Callable[[], float]
+    """
+
+    def __init__(
+        self, max_workers: int = 8, time_function: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_workers = max_workers
+        self.time_function = time_function
+        self.executor = None
+        self.lock = threading.Lock()
+        self.in_flight: dict[Hashable, Future] = {}
+        # Completed requests with the time their response expires
+        self.responses: dict[Hashable, tuple[float, Future]] = {}
+
+    def submit(
+        self,
+        key: Hashable,
+        function: Callable,
+        *args,
+        ttl: float = 0.0,
+        **kwargs,
+    ) -> Future:
+        """
+        Send a request unless it is in flight or its response is cached
+
+        :param key: The identifier of the request, the requests with the same key are expected to have the same
+            response
+        :type key: Hashable
+        :param function: The function sending the request
+        :type function: Callable
+        :param ttl: The time to live of the response in seconds, the response can still be shared by the requests
+            submitted while it was in flight when it is 0. The failed requests are never cached.
+        :type ttl: float
+        :return: The future of the response
+        :rtype: Future
+        """
+        with self.lock:
+            now = self.time_function()
+            if key in self.responses:
+                expiration, future = self.responses[key]
+                if now < expiration:
+                    return future
+                del self.responses[key]
+            if key in self.in_flight:
+                return self.in_flight[key]
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="request"
+                )
+            future = self.executor.submit(function, *args, **kwargs)
+            self.in_flight[key] = future
+        future.add_done_callback(lambda done_future: self._complete(key, done_future, ttl))
+        return future
+
+    def _complete(self, key: Hashable, future: Future, ttl: float) -> None:
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+                if ttl > 0 and future.exception() is None:
+                    self.responses[key] = (self.time_function() + ttl, future)
+
+    def get(self, key: Hashable, function: Callable, *args, ttl: float = 0.0, **kwargs) -> Any:
+        """
+        Send a request unless it is in flight or its response is cached and wait for its response
+        """
+        return self.submit(key, function, *args, ttl=ttl, **kwargs).result()
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = None) -> None:
+        """
+        Forget the cached responses whose key matches the predicate, all of them if None. The requests in flight
+        aren't cached when they complete.
+        """
+        with self.lock:
+            for key in list(self.responses):
+                if predicate is None or predicate(key):
+                    del self.responses[key]
+            for key in list(self.in_flight):
+                if predicate is None or predicate(key):
+                    del self.in_flight[key]
+
+    def shutdown(self) -> None:
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["executor"] = None
+        state["lock"] = None
+        state["in_flight"] = {}
+        state["responses"] = {}
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
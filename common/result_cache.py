@@ -0,0 +1,252 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+from typing import Any
+
+import pandas as pd
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.feed.feed import Feed
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+CACHE_FILE_EXTENSION = ".pkl"
+
+# Knobs of the backtest config that change the results of a backtest, the data source and the checkpoints are not
+# part of them: the data is hashed and the checkpoints don't change the results of a complete backtest.
+CONFIG_KNOBS = [
+    "start",
+    "end",
+    "initial_funds",
+    "integer_size",
+    "fixed_order_type",
+    "limit_order_pct",
+    "stop_order_pct",
+    "target_order_pct",
+    "trailing_stop_order_pct",
+    "with_cover",
+    "with_bracket",
+    "with_trailing_cover",
+    "with_trailing_bracket",
+    "indicator_mode",
+    "close_at_end_of_day",
+    "close_at_end_of_data",
+    "isolation",
+    "intra_bar_path",
+]
+
+
+def qualified_name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def feed_digest(feed: Feed) -> str:
+    """
+    Hash of the candles of a feed
+
+    :param feed: The feed
+    :type feed: Feed
+    :return: The hexadecimal sha256 of the assets, time units and candles of the feed
+    :rtype: str
+    """
+    sha256 = hashlib.sha256()
+    for asset in sorted(feed.candle_dataframes):
+        for time_unit in sorted(feed.candle_dataframes[asset]):
+            candle_dataframe = feed.candle_dataframes[asset][time_unit]
+            sha256.update(f"{asset.key()}|{time_unit}|".encode())
+            sha256.update(
+                pd.util.hash_pandas_object(candle_dataframe, index=True)
+                .to_numpy()
+                .tobytes()
+            )
+    return sha256.hexdigest()
+
+
+def fee_model_description(fee_model: Any) -> Any:
+    if fee_model is None:
+        return None
+    return {"class": qualified_name(type(fee_model)), **vars(fee_model)}
+
+
+def config_description(backtest_config: Any) -> dict[str, Any]:
+    """
+    The knobs of a backtest config changing the results of a backtest
+    """
+    description = {knob: getattr(backtest_config, knob) for knob in CONFIG_KNOBS}
+    description["market_cal"] = qualified_name(type(backtest_config.market_cal))
+    description["statistics_class"] = (
+        qualified_name(backtest_config.statistics_class)
+        if backtest_config.statistics_class is not None
+        else None
+    )
+    # The fee models actually used, the config fee models are None when they are fetched with the data
+    fee_models_manager = backtest_config.fee_models_manager
+    description["fee_models"] = {
+        "default": fee_model_description(fee_models_manager.default_fee_model),
+        "assets": {
+            asset.key(): fee_model_description(fee_model)
+            for asset, fee_model in (fee_models_manager.fee_models or {}).items()
+        },
+    }
+    return description
+
+
+def strategy_source(strategy_class: type) -> str:
+    # The whole module is hashed so that the helpers used by the strategy are taken into account too
+    try:
+        return inspect.getsource(inspect.getmodule(strategy_class))
+    except (OSError, TypeError):
+        return qualified_name(strategy_class)
+
+
+def result_key(
+    data_digest: str,
+    backtest_config: Any,
+    strategies_parameters: dict[type, dict[str, Any]],
+) -> str:
+    """
+    Content address of the results of a backtest
+
+    :param data_digest: The digest of the feed, see feed_digest
+    :type data_digest: str
+    :param backtest_config: The config of the backtest
+    :type backtest_config: BacktestConfig
+    :param strategies_parameters: The strategies parameters backtested
+    :type strategies_parameters: dict[type, dict[str, Any]]
+    :return: The hexadecimal sha256 of the data, the config, the strategies sources and parameters
+    :rtype: str
+    """
+    description = {
+        "data": data_digest,
+        "config": config_description(backtest_config),
+        "strategies": {
+            qualified_name(strategy_class): {
+                "source": hashlib.sha256(
+                    strategy_source(strategy_class).encode()
+                ).hexdigest(),
+                "parameters": parameters,
+            }
+            for strategy_class, parameters in strategies_parameters.items()
+        },
+    }
+
+    def default(value: Any) -> Any:
+        if hasattr(value, "item"):
+            return value.item()
+        return str(value)
+
+    serialized_description = json.dumps(description, sort_keys=True, default=default)
+    return hashlib.sha256(serialized_description.encode()).hexdigest()
+
+
+class BacktestResult:
+    """
+    The tearsheet of a backtest and, optionally, its equity curves by exchange
+    """
+
+    def __init__(
+        self, statistics: pd.DataFrame, equity_dfs: dict[str, pd.DataFrame] = None
+    ):
+        self.statistics = statistics
+        self.equity_dfs = equity_dfs if equity_dfs is not None else {}
+
+
+class BacktestResultCache:
+    """
+    Results of backtests stored on disk under their content address, one file per result. When the total size of the
+    files goes above max_size bytes, the least recently used results are evicted. Writes are atomic so several
+    processes can share the same directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = 512 * 1024 * 1024,
+        with_equity: bool = True,
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        self.with_equity = with_equity
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+    def get(self, key: str) -> BacktestResult | None:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                result = pickle.load(file)
+            # The modification time orders the results for the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError) as e:
+            LOG.warning("Ignoring corrupted cached result %s: %s", path, e)
+            return None
+        LOG.info("Backtest result %s found in cache", key)
+        return result
+
+    def put(self, key: str, result: BacktestResult) -> None:
+        if not self.with_equity:
+            result = BacktestResult(result.statistics)
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        with os.fdopen(file_descriptor, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.path(key))
+        self.evict()
+
+    def entries(self) -> list[os.DirEntry]:
+        return [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(CACHE_FILE_EXTENSION)
+        ]
+
+    def size(self) -> int:
+        size = 0
+        for entry in self.entries():
+            try:
+                size += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return size
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used results until the cache fits in max_size
+        """
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self) -> None:
+        for entry in self.entries():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self.entries())
@@ -0,0 +1,376 @@
+import copy
+import os
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.feed.feed import PandasFeed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.optimization.pruner import Pruner
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+ALIGNMENT = 64
+
+
+class SharedFeedLayout:
+    """
+    Position of the columns of one candle dataframe inside the shared buffer
+    """
+
+    def __init__(
+        self,
+        asset: Asset,
+        time_unit: timedelta,
+        length: int,
+        columns: list[tuple[str, str, int]],
+    ):
+        self.asset = asset
+        self.time_unit = time_unit
+        self.length = length
+        # (column name, numpy dtype string, offset in bytes), the index is stored as the "timestamp" column
+        self.columns = columns
+
+
+class SharedFeedSpec:
+    """
+    Picklable description of a published feed, used by the workers to attach to it
+    """
+
+    def __init__(self, layouts: list[SharedFeedLayout], size: int, name: str = None, path: str = None):
+        self.layouts = layouts
+        self.size = size
+        self.name = name
+        self.path = path
+
+    def attach(self) -> tuple[Any, list[CandleDataFrame]]:
+        """
+        Attach to the published feed without copying it
+
+        :return: The object owning the buffer, to keep alive as long as the candle dataframes are used, and the
+        candle dataframes
+        :rtype: tuple[Any, list[CandleDataFrame]]
+        """
+        if self.path is not None:
+            owner = np.memmap(self.path, dtype=np.uint8, mode="r", shape=(self.size,))
+            buffer = owner
+        else:
+            owner = shared_memory.SharedMemory(name=self.name)
+            buffer = owner.buf
+
+        candle_dataframes = []
+        for layout in self.layouts:
+            arrays = {
+                column: np.frombuffer(buffer, dtype=np.dtype(dtype), count=layout.length, offset=offset)
+                for column, dtype, offset in layout.columns
+            }
+            index = pd.DatetimeIndex(
+                arrays.pop("timestamp").view("datetime64[ns]"), name="timestamp"
+            ).tz_localize("UTC")
+            candle_dataframe = CandleDataFrame(
+                asset=layout.asset,
+                time_unit=layout.time_unit,
+                data=arrays,
+                index=index,
+                copy=False,
+            )
+            candle_dataframes.append(candle_dataframe)
+        return owner, candle_dataframes
+
+
+class SharedFeed:
+    """
+    Publish the candle dataframes of a feed once as columnar buffers, either in a shared memory segment or in a memory
+    mapped file when a directory is given, so that worker processes can use them without copying.
+    """
+
+    def __init__(
+        self,
+        candle_dataframes: dict[Asset, dict[timedelta, CandleDataFrame]],
+        directory: str = None,
+    ):
+        layouts = []
+        size = 0
+        for asset, time_unit_candle_dataframes in candle_dataframes.items():
+            for time_unit, candle_dataframe in time_unit_candle_dataframes.items():
+                columns = []
+                arrays = {"timestamp": candle_dataframe.index.asi8}
+                for column in CandleDataFrame.DATA_COLUMNS:
+                    arrays[column] = candle_dataframe[column].to_numpy()
+                for column, array in arrays.items():
+                    size = -(-size // ALIGNMENT) * ALIGNMENT
+                    columns.append((column, array.dtype.str, size))
+                    size += array.nbytes
+                layouts.append(
+                    SharedFeedLayout(asset, time_unit, len(candle_dataframe), columns)
+                )
+        size = max(size, 1)
+
+        self.shm = None
+        self.path = None
+        if directory is not None:
+            self.path = os.path.join(directory, f"feed-{uuid.uuid4().hex}.bin")
+            buffer = np.memmap(self.path, dtype=np.uint8, mode="w+", shape=(size,))
+        else:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            buffer = self.shm.buf
+
+        layout_index = 0
+        for asset, time_unit_candle_dataframes in candle_dataframes.items():
+            for time_unit, candle_dataframe in time_unit_candle_dataframes.items():
+                layout = layouts[layout_index]
+                layout_index += 1
+                for column, dtype, offset in layout.columns:
+                    if column == "timestamp":
+                        values = candle_dataframe.index.asi8
+                    else:
+                        values = candle_dataframe[column].to_numpy()
+                    destination = np.frombuffer(buffer, dtype=np.dtype(dtype), count=layout.length, offset=offset)
+                    destination[:] = values
+        if self.path is not None:
+            buffer.flush()
+            del buffer
+
+        self.spec = SharedFeedSpec(
+            layouts, size, name=self.shm.name if self.shm is not None else None, path=self.path
+        )
+
+    def close(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+            self.path = None
+
+
+class SweepResult:
+    """
+    Compact result of one backtest of a sweep
+    """
+
+    def __init__(
+        self,
+        strategies_parameters: dict[type, dict[str, Any]],
+        statistics: pd.DataFrame = None,
+        equity: dict[str, pd.Series] = None,
+        error: str = None,
+        pruned: bool = False,
+    ):
+        self.strategies_parameters = strategies_parameters
+        self.statistics = statistics
+        self.equity = equity if equity is not None else {}
+        self.error = error
+        self.pruned = pruned
+
+    @property
+    def final_equity(self) -> dict[str, float]:
+        return {
+            exchange: float(equity.iloc[-1]) if not equity.empty else None
+            for exchange, equity in self.equity.items()
+        }
+
+
+_worker_state = None
+
+
+def init_sweep_worker(
+    feed_spec: SharedFeedSpec, backtest_config: BacktestConfig, pruner: Pruner = None
+) -> None:
+    global _worker_state
+    owner, candle_dataframes = feed_spec.attach()
+    backtest_config.events = deque()
+    backtest_config.feed = PandasFeed(
+        candle_dataframes=candle_dataframes, events=backtest_config.events
+    )
+    backtest = Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+    _worker_state = (owner, backtest, pruner)
+
+
+def run_sweep_task(
+    strategies_parameters: dict[type, dict[str, Any]], with_equity: bool
+) -> SweepResult:
+    _, backtest, pruner = _worker_state
+    try:
+        backtest.run_strategies(strategies_parameters, checkpoint_callback=pruner)
+    except Exception as e:
+        return SweepResult(
+            strategies_parameters, error=f"{e}\n{traceback.format_exc()}"
+        )
+    equity = {}
+    if with_equity:
+        equity = {
+            exchange: equity_df["Equity"]
+            for exchange, equity_df in backtest.equity_dfs.items()
+        }
+    return SweepResult(
+        strategies_parameters,
+        backtest.get_statistics(),
+        equity,
+        pruned=backtest.pruned,
+    )
+
+
+def run_sweep_fan_out_task(
+    strategies_parameters_list: list[dict[type, dict[str, Any]]], with_equity: bool
+) -> list[SweepResult]:
+    _, backtest, pruner = _worker_state
+    try:
+        statistics_dfs = backtest.run_strategies_fan_out(
+            strategies_parameters_list, checkpoint_callback=pruner
+        )
+    except Exception as e:
+        error = f"{e}\n{traceback.format_exc()}"
+        return [
+            SweepResult(strategies_parameters, error=error)
+            for strategies_parameters in strategies_parameters_list
+        ]
+    results = []
+    for strategies_parameters, statistics_df, event_loop in zip(
+        strategies_parameters_list,
+        statistics_dfs,
+        backtest.fan_out_event_loop.event_loops,
+    ):
+        equity = {}
+        if with_equity:
+            equity = {
+                exchange: equity_df["Equity"]
+                for exchange, equity_df in event_loop.equity_dfs.items()
+            }
+        results.append(
+            SweepResult(
+                strategies_parameters,
+                statistics_df,
+                equity,
+                pruned=event_loop.pruned,
+            )
+        )
+    return results
+
+
+class BacktestSweep:
+    """
+    Run a backtest for each set of strategies parameters on a pool of worker processes. The feed of the backtest
+    config is published once in shared memory (or in a memory mapped file when memmap_directory is set) and every
+    worker builds its engine on top of it.
+
+    When fan_out_size is above 1, the parameters are sent to the workers by chunks of fan_out_size, each chunk being
+    backtested with a single replay of the feed.
+
+    A pruner stops the backtests that are not promising at the checkpoints of the backtest config, it is shared by
+    all the workers while the sweep is started.
+    """
+
+    def __init__(
+        self,
+        backtest_config: BacktestConfig,
+        nb_workers: int = None,
+        memmap_directory: str = None,
+        with_equity: bool = True,
+        fan_out_size: int = 1,
+        pruner: Pruner = None,
+    ):
+        self.backtest_config = backtest_config
+        self.nb_workers = nb_workers if nb_workers is not None else os.cpu_count()
+        self.memmap_directory = memmap_directory
+        self.with_equity = with_equity
+        self.fan_out_size = fan_out_size
+        self.pruner = pruner
+        self.shared_feed = None
+        self.executor = None
+
+    def start(self) -> None:
+        if self.executor is not None:
+            return
+        self.shared_feed = SharedFeed(
+            self.backtest_config.feed.candle_dataframes, directory=self.memmap_directory
+        )
+        worker_config = copy.copy(self.backtest_config)
+        worker_config.feed = None
+        worker_config.events = None
+        if self.pruner is not None:
+            self.pruner.share()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.nb_workers,
+            initializer=init_sweep_worker,
+            initargs=(self.shared_feed.spec, worker_config, self.pruner),
+        )
+
+    def submit(self, strategies_parameters: dict[type, dict[str, Any]]) -> Future:
+        """
+        Schedule a backtest without waiting for it
+
+        :param strategies_parameters: The strategies parameters to backtest
+        :type strategies_parameters: dict[type, dict[str, Any]]
+        :return: A future of the SweepResult
+        :rtype: Future
+        """
+        self.start()
+        return self.executor.submit(run_sweep_task, strategies_parameters, self.with_equity)
+
+    def run(
+        self, strategies_parameters_list: list[dict[type, dict[str, Any]]]
+    ) -> list[SweepResult]:
+        """
+        Run a backtest per strategies parameters, results are in the same order as the parameters
+        """
+        self.start()
+        if self.fan_out_size > 1:
+            futures = [
+                self.executor.submit(
+                    run_sweep_fan_out_task,
+                    strategies_parameters_list[i : i + self.fan_out_size],
+                    self.with_equity,
+                )
+                for i in range(0, len(strategies_parameters_list), self.fan_out_size)
+            ]
+            results = [result for future in futures for result in future.result()]
+        else:
+            futures = [
+                self.executor.submit(run_sweep_task, strategies_parameters, self.with_equity)
+                for strategies_parameters in strategies_parameters_list
+            ]
+            results = [future.result() for future in futures]
+        for result in results:
+            if result.error is not None:
+                LOG.error(
+                    "Backtest with parameters %s failed: %s",
+                    result.strategies_parameters,
+                    result.error,
+                )
+        return results
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.shared_feed is not None:
+            self.shared_feed.close()
+            self.shared_feed = None
+        if self.pruner is not None:
+            self.pruner.close()
+
+    def __enter__(self) -> "BacktestSweep":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -7,6 +7,7 @@ import pytz
 from pandas import DataFrame, DatetimeIndex
 from pandas_market_calendars import MarketCalendar
 
+from trazy_analysis.common.calendar import CalendarIndex
 from trazy_analysis.common.utils import timestamp_to_utc, validate_dataframe_columns
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.candle import Candle
@@ -102,15 +103,30 @@ class CandleDataFrame(DataFrame):
     def to_candles(self) -> np.array:
         if self.asset is None or self.time_unit is None:
             raise Exception("CandleDataFrame asset or time_unit is not set")
-        map_index_to_values = self.to_dict(orient="index")
-        candles = np.empty(shape=len(map_index_to_values), dtype=Candle)
-        for index, timestamp in enumerate(map_index_to_values):
-            candle_dict = map_index_to_values[timestamp]
-            candle_dict["asset"] = self.asset.to_dict()
-            candle_dict["time_unit"] = str(self.time_unit)
-            candle_dict["timestamp"] = timestamp
-            candle = Candle.from_serializable_dict(candle_dict)
-            candles[index] = candle
+        candles = np.empty(shape=len(self.index), dtype=Candle)
+        if self.empty:
+            return candles
+        # Build the candles straight from the int64 epochs of the index to avoid a Timestamp conversion per row
+        epochs = self.index.asi8
+        for index, (open, high, low, close, volume) in enumerate(
+            zip(
+                self["open"].tolist(),
+                self["high"].tolist(),
+                self["low"].tolist(),
+                self["close"].tolist(),
+                self["volume"].tolist(),
+            )
+        ):
+            candles[index] = Candle(
+                asset=self.asset,
+                open=float(open),
+                high=float(high),
+                low=float(low),
+                close=float(close),
+                volume=volume,
+                timestamp=int(epochs[index]),
+                time_unit=self.time_unit,
+            )
         return candles
 
     def append(self, other, *args, **kwargs) -> "CandleDataFrame":
@@ -176,7 +192,7 @@ class CandleDataFrame(DataFrame):
 
         market_cal_df = None
         if market_cal is not None:
-            market_cal_df = market_cal.schedule(
+            market_cal_df = CalendarIndex.for_calendar(market_cal).schedule(
                 start_date=start.strftime("%Y-%m-%d"),
                 end_date=end.strftime("%Y-%m-%d"),
             )
@@ -1,7 +1,7 @@
 import binascii
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pandas as pd
 import pytz
@@ -21,7 +21,15 @@ def validate_dataframe_columns(df: DataFrame, required_columns: list) -> None:
         )
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+NANOSECONDS_IN_SECOND = 1_000_000_000
+NANOSECONDS_IN_MICROSECOND = 1_000
+
+
 def timestamp_to_utc(timestamp: pd.Timestamp | pd.DatetimeIndex | datetime):
+    # Fast path: most timestamps flowing through the engine are already in UTC
+    if type(timestamp) is datetime and timestamp.tzinfo is pytz.UTC:
+        return timestamp
     if isinstance(timestamp, pd.Timestamp) or isinstance(timestamp, pd.DatetimeIndex):
         if timestamp.tz is None:
             timestamp = timestamp.tz_localize("UTC")
@@ -39,6 +47,52 @@ def timestamp_to_utc(timestamp: pd.Timestamp | pd.DatetimeIndex | datetime):
     return timestamp
 
 
+def datetime_to_epoch_ns(timestamp: pd.Timestamp | datetime) -> int:
+    """
+    Convert a datetime to an integer number of nanoseconds since the Unix epoch. Naive datetimes are considered to be
+    in UTC.
+
+    :param timestamp: The timestamp to convert
+    :type timestamp: pd.Timestamp | datetime
+    :return: The number of nanoseconds elapsed since 1970-01-01 00:00:00 UTC
+    """
+    if isinstance(timestamp, pd.Timestamp):
+        if timestamp.tz is None:
+            timestamp = timestamp.tz_localize("UTC")
+        return timestamp.value
+    if timestamp.tzinfo is None or timestamp.tzinfo.utcoffset(timestamp) is None:
+        timestamp = timestamp.replace(tzinfo=pytz.UTC)
+    delta = timestamp - EPOCH
+    return (
+        delta.days * 86400 + delta.seconds
+    ) * NANOSECONDS_IN_SECOND + delta.microseconds * NANOSECONDS_IN_MICROSECOND
+
+
+def epoch_ns_to_datetime(epoch_ns: int) -> datetime:
+    """
+    Convert an integer number of nanoseconds since the Unix epoch to a UTC datetime. The precision of the result is
+    limited to the microsecond, like any datetime.
+
+    :param epoch_ns: The number of nanoseconds elapsed since 1970-01-01 00:00:00 UTC
+    :type epoch_ns: int
+    :return: The corresponding UTC datetime
+    """
+    return EPOCH + timedelta(microseconds=int(epoch_ns) // NANOSECONDS_IN_MICROSECOND)
+
+
+def timedelta_to_ns(delta: timedelta) -> int:
+    """
+    Convert a timedelta to an integer number of nanoseconds.
+
+    :param delta: The timedelta to convert
+    :type delta: timedelta
+    :return: The number of nanoseconds in the timedelta
+    """
+    return (
+        delta.days * 86400 + delta.seconds
+    ) * NANOSECONDS_IN_SECOND + delta.microseconds * NANOSECONDS_IN_MICROSECOND
+
+
 def generate_object_id() -> str:
     timestamp = "{:x}".format(int(time.time()))
     rest = binascii.b2a_hex(os.urandom(8)).decode("ascii")
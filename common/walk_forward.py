@@ -0,0 +1,310 @@
+import copy
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.bot.walk_forward_event_loop import WalkForwardEventLoop
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.feed.feed import PandasFeed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.parameter import Parameter
+from trazy_analysis.optimization.optimizer import Optimizer
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+class WalkForwardWindow:
+    """
+    A training window, on which the strategy parameters are optimized, followed by the out of sample window on which
+    the best parameters are traded
+    """
+
+    def __init__(
+        self,
+        train_start: datetime,
+        train_end: datetime,
+        test_start: datetime,
+        test_end: datetime,
+    ):
+        self.train_start = train_start
+        self.train_end = train_end
+        self.test_start = test_start
+        self.test_end = test_end
+        self.best_parameters: dict[str, Any] = None
+        self.best_result: float = None
+
+    def __str__(self) -> str:
+        return (
+            f"WalkForwardWindow(train=[{self.train_start}, {self.train_end}), "
+            f"test=[{self.test_start}, {self.test_end}))"
+        )
+
+
+def walk_forward_windows(
+    start: datetime,
+    end: datetime,
+    train_period: timedelta,
+    test_period: timedelta,
+    anchored: bool = False,
+) -> list[WalkForwardWindow]:
+    """
+    Split [start, end) in consecutive out of sample windows of test_period, each one preceded by its training window
+
+    :param start: The start of the data
+    :type start: datetime
+    :param end: The end of the data, excluded
+    :type end: datetime
+    :param train_period: The duration of the training windows, the first one when anchored is True
+    :type train_period: timedelta
+    :param test_period: The duration of the out of sample windows, the last one can be shorter
+    :type test_period: timedelta
+    :param anchored: If True, all the training windows start at start instead of rolling with the test windows
+    :type anchored: bool
+    :return: The windows
+    :rtype: list[WalkForwardWindow]
+    """
+    windows = []
+    test_start = start + train_period
+    while test_start < end:
+        test_end = min(test_start + test_period, end)
+        train_start = start if anchored else test_start - train_period
+        windows.append(WalkForwardWindow(train_start, test_start, test_start, test_end))
+        test_start = test_end
+    return windows
+
+
+def slice_candle_dataframes(
+    candle_dataframes: dict[Asset, dict[timedelta, CandleDataFrame]],
+    start: datetime,
+    end: datetime,
+) -> list[CandleDataFrame]:
+    sliced_candle_dataframes = []
+    for time_unit_candle_dataframes in candle_dataframes.values():
+        for candle_dataframe in time_unit_candle_dataframes.values():
+            mask = (candle_dataframe.index >= start) & (candle_dataframe.index < end)
+            sliced_candle_dataframes.append(candle_dataframe[mask])
+    return sliced_candle_dataframes
+
+
+def optimize_window(
+    backtest_config: BacktestConfig,
+    candle_dataframes: list[CandleDataFrame],
+    strategy_class: type,
+    parameters_space: dict[str, Parameter],
+    optimizer: Optimizer,
+    nb_iter: int,
+    max_evals: int,
+    objective: str,
+) -> dict[str, Any]:
+    """
+    Optimize the strategy parameters on the candles of a training window
+
+    :return: The best parameters and the in sample objective value, under the "best_result" key
+    :rtype: dict[str, Any]
+    """
+    window_config = copy.copy(backtest_config)
+    window_config.events = deque()
+    window_config.feed = PandasFeed(
+        candle_dataframes=candle_dataframes, events=window_config.events
+    )
+    backtest = Backtest(
+        assets=window_config.assets,
+        start=window_config.start,
+        backtest_config=window_config,
+    )
+
+    def window_objective(**parameters) -> float:
+        statistics = backtest.run_strategy(strategy_class, parameters)
+        if objective not in statistics.index:
+            return -1
+        value = statistics.loc[objective]["Backtest results"]
+        return value if not np.isnan(value) else -1
+
+    return optimizer.maximize(
+        window_objective, parameters_space, nb_iter=nb_iter, max_evals=max_evals
+    )
+
+
+class WalkForward:
+    """
+    Walk forward analysis of a strategy: its parameters are optimized on each training window, the training windows
+    being optimized in parallel on nb_workers processes, then the best parameters of each window are traded on the
+    following out of sample window. All the out of sample windows are backtested with a single replay of the feed,
+    the indicators keeping their state from one window to the next, and the stitched out of sample equity gives the
+    walk forward statistics.
+    """
+
+    def __init__(
+        self,
+        backtest_config: BacktestConfig,
+        strategy_class: type,
+        parameters_space: dict[str, Parameter],
+        optimizer: Optimizer,
+        train_period: timedelta,
+        test_period: timedelta,
+        anchored: bool = False,
+        nb_iter: int = 54,
+        max_evals: int = 1,
+        nb_workers: int = None,
+        objective: str = "Sortino Ratio",
+    ):
+        self.backtest_config = backtest_config
+        self.strategy_class = strategy_class
+        self.parameters_space = parameters_space
+        self.optimizer = optimizer
+        self.train_period = train_period
+        self.test_period = test_period
+        self.anchored = anchored
+        self.nb_iter = nb_iter
+        self.max_evals = max_evals
+        self.nb_workers = nb_workers if nb_workers is not None else os.cpu_count()
+        self.objective = objective
+
+        candle_dataframes = [
+            candle_dataframe
+            for time_unit_candle_dataframes in backtest_config.feed.candle_dataframes.values()
+            for candle_dataframe in time_unit_candle_dataframes.values()
+        ]
+        self.start = min(
+            candle_dataframe.index[0] for candle_dataframe in candle_dataframes
+        ).to_pydatetime()
+        self.end = max(
+            candle_dataframe.index[-1] + candle_dataframe.time_unit
+            for candle_dataframe in candle_dataframes
+        ).to_pydatetime()
+        self.windows = walk_forward_windows(
+            self.start, self.end, train_period, test_period, anchored
+        )
+        if not self.windows:
+            raise Exception(
+                f"The data from {self.start} to {self.end} is too short for a training window of {train_period}"
+            )
+        self.event_loop: WalkForwardEventLoop = None
+        self.equity_dfs: dict[str, pd.DataFrame] = {}
+        self.statistics_df: pd.DataFrame = None
+
+    def optimize_windows(self) -> None:
+        worker_config = copy.copy(self.backtest_config)
+        worker_config.feed = None
+        worker_config.events = None
+        tasks = [
+            (
+                worker_config,
+                slice_candle_dataframes(
+                    self.backtest_config.feed.candle_dataframes,
+                    window.train_start,
+                    window.train_end,
+                ),
+                self.strategy_class,
+                self.parameters_space,
+                self.optimizer,
+                self.nb_iter,
+                self.max_evals,
+                self.objective,
+            )
+            for window in self.windows
+        ]
+        if self.nb_workers <= 1:
+            results = [optimize_window(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(self.nb_workers, len(tasks))
+            ) as executor:
+                futures = [executor.submit(optimize_window, *task) for task in tasks]
+                results = [future.result() for future in futures]
+        for window, best_parameters in zip(self.windows, results):
+            window.best_result = best_parameters.pop("best_result")
+            window.best_parameters = best_parameters
+            LOG.info(
+                "%s: best parameters %s, in sample %s = %s",
+                window,
+                window.best_parameters,
+                self.objective,
+                window.best_result,
+            )
+
+    def run_out_of_sample(self) -> None:
+        backtest = Backtest(
+            assets=self.backtest_config.assets,
+            start=self.backtest_config.start,
+            backtest_config=self.backtest_config,
+        )
+        events = backtest.events
+        self.backtest_config.feed.events = events
+        self.backtest_config.feed.reset()
+        order_manager = backtest._create_order_manager(backtest._create_clock(), events)
+        self.event_loop = WalkForwardEventLoop(
+            events=events,
+            assets=self.backtest_config.assets,
+            feed=self.backtest_config.feed,
+            order_manager=order_manager,
+            windows_strategies_parameters=[
+                (
+                    window.test_start,
+                    window.test_end,
+                    {self.strategy_class: window.best_parameters},
+                )
+                for window in self.windows
+            ],
+            indicator_mode=self.backtest_config.indicator_mode,
+            close_at_end_of_day=self.backtest_config.close_at_end_of_day,
+            close_at_end_of_data=self.backtest_config.close_at_end_of_data,
+            broker_isolation=self.backtest_config.isolation,
+            # The statistics are computed on the out of sample part of the equity only
+            statistics_class=None,
+        )
+        self.event_loop.loop()
+
+        test_start = self.windows[0].test_start
+        self.equity_dfs = {
+            exchange: equity_df[equity_df.index >= test_start]
+            for exchange, equity_df in self.event_loop.equity_dfs.items()
+        }
+        statistics_class = self.backtest_config.statistics_class
+        if statistics_class is None:
+            return
+        for result_key, equity_df in self.equity_dfs.items():
+            if equity_df.empty:
+                self.statistics_df = pd.DataFrame()
+                continue
+            self.statistics_df = statistics_class(
+                equity=equity_df,
+                positions=self.event_loop.positions_dfs[result_key],
+                transactions=self.event_loop.transactions_dfs[result_key],
+            ).get_tearsheet()
+
+    def run(self) -> pd.DataFrame:
+        """
+        Optimize the training windows then backtest the out of sample windows
+
+        :return: The statistics of the stitched out of sample equity
+        :rtype: pd.DataFrame
+        """
+        self.optimize_windows()
+        self.run_out_of_sample()
+        return self.statistics_df
+
+    def windows_df(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [
+                {
+                    "train_start": window.train_start,
+                    "train_end": window.train_end,
+                    "test_start": window.test_start,
+                    "test_end": window.test_end,
+                    "best_parameters": window.best_parameters,
+                    "best_result": window.best_result,
+                }
+                for window in self.windows
+            ]
+        )
@@ -1,3 +1,5 @@
+import asyncio
+import time
 from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
@@ -11,10 +13,12 @@ from pandas_market_calendars.exchange_calendar_iex import IEXExchangeCalendar
 from sortedcontainers import SortedSet
 
 from trazy_analysis.common.ccxt_connector import CcxtConnector
-from trazy_analysis.common.constants import MAX_TIMESTAMP, NONE_API_KEYS
+from trazy_analysis.common.constants import MAX_EPOCH_NS, MAX_TIMESTAMP, NONE_API_KEYS
 from trazy_analysis.common.crypto_exchange_calendar import CryptoExchangeCalendar
 from trazy_analysis.common.helper import get_or_create_nested_dict, normalize_assets
+from trazy_analysis.common.latency import LatencyStats
 from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.common.utils import timedelta_to_ns
 from trazy_analysis.db_storage.db_storage import DbStorage
 from trazy_analysis.feed.loader import (
     CsvLoader,
@@ -31,8 +35,10 @@ from trazy_analysis.market_data.historical.historical_data_handler import (
 from trazy_analysis.market_data.historical.tiingo_historical_data_handler import (
     TiingoHistoricalDataHandler,
 )
+from trazy_analysis.market_data.live.candle_stream import CandleStream
 from trazy_analysis.market_data.live.live_data_handler import LiveDataHandler
 from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
 from trazy_analysis.models.event import (
     MarketDataEndEvent,
     MarketDataEvent,
@@ -65,7 +71,10 @@ class Feed:
         )
         self.indexes = {}
         self.completed = False
+        # Incremented whenever candles are added, the digests of the feed are outdated when it changes
+        self.version = 0
         current_timestamp = MAX_TIMESTAMP
+        current_epoch_ns = MAX_EPOCH_NS
         for asset in self.candles:
             get_or_create_nested_dict(self.indexes, asset)
             for time_unit in self.candles[asset]:
@@ -73,21 +82,59 @@ class Feed:
                 if len(self.candles[asset][time_unit]) == 0:
                     continue
                 first_candle = self.candles[asset][time_unit][0]
-                min_timestamp = first_candle.timestamp
-                current_timestamp = min(current_timestamp, min_timestamp)
+                if first_candle.epoch_ns < current_epoch_ns:
+                    current_epoch_ns = first_candle.epoch_ns
+                    current_timestamp = first_candle.timestamp
         self.min_timestamp = self.current_timestamp = current_timestamp
+        self.min_epoch_ns = self.current_epoch_ns = current_epoch_ns
 
     def reset(self):
         """
         It resets the index of the data to the first row of the first asset.
         """
         self.indexes = {
-            asset: {time_unit: 0}
+            asset: {time_unit: 0 for time_unit in self.assets[asset]}
             for asset in self.assets
-            for time_unit in self.assets[asset]
         }
         self.completed = False
         self.current_timestamp = self.min_timestamp
+        self.current_epoch_ns = self.min_epoch_ns
+
+    def append(self, candle_dataframes: list[CandleDataFrame]) -> None:
+        """
+        Append new candles to the feed, the candles that are not more recent than the last candle of the feed for
+        their asset and time unit are ignored. The feed then resumes from where it stopped, only the new candles are
+        emitted.
+
+        :param candle_dataframes: The new candles, the assets and time units must already be in the feed
+        :type candle_dataframes: list[CandleDataFrame]
+        """
+        for candle_dataframe in candle_dataframes:
+            asset = candle_dataframe.asset
+            time_unit = candle_dataframe.time_unit
+            if asset not in self.candles or time_unit not in self.candles[asset]:
+                raise Exception(
+                    f"Cannot append candles of {asset} {time_unit} to a feed without them"
+                )
+            candles = self.candles[asset][time_unit]
+            if len(candles) != 0:
+                candle_dataframe = candle_dataframe[
+                    candle_dataframe.index.asi8 > candles[-1].epoch_ns
+                ]
+            if candle_dataframe.empty:
+                continue
+            self.candles[asset][time_unit] = np.concatenate(
+                [candles, candle_dataframe.to_candles()]
+            )
+            if asset in self.candle_dataframes and time_unit in self.candle_dataframes[asset]:
+                self.candle_dataframes[asset][time_unit] = self.candle_dataframes[asset][
+                    time_unit
+                ].append(candle_dataframe)
+            else:
+                get_or_create_nested_dict(self.candle_dataframes, asset)
+                self.candle_dataframes[asset][time_unit] = candle_dataframe
+            self.version += 1
+        self.completed = False
 
     def update_latest_data(self):
         """
@@ -97,6 +144,7 @@ class Feed:
         MarketDataEndEvent to the event queue.
         """
         candles = []
+        min_epoch_ns = MAX_EPOCH_NS
         min_timestamp = MAX_TIMESTAMP
         completed = 0
         for asset in self.candles:
@@ -104,22 +152,25 @@ class Feed:
                 if self.indexes[asset][time_unit] < len(self.candles[asset][time_unit]):
                     index = self.indexes[asset][time_unit]
                     candle = self.candles[asset][time_unit][index]
-                    if candle.timestamp < self.current_timestamp:
+                    if candle.epoch_ns < self.current_epoch_ns:
                         continue
                     candles.append(candle)
-                    min_timestamp = min(min_timestamp, candle.timestamp)
+                    if candle.epoch_ns < min_epoch_ns:
+                        min_epoch_ns = candle.epoch_ns
+                        min_timestamp = candle.timestamp
                 else:
                     completed += 1
         if candles:
             self.current_timestamp = min_timestamp
+            self.current_epoch_ns = min_epoch_ns
             assets = {}
             for candle in candles:
                 get_or_create_nested_dict(assets, candle.asset)
-                if candle.timestamp == self.current_timestamp:
+                if candle.epoch_ns == self.current_epoch_ns:
                     self.indexes[candle.asset][candle.time_unit] += 1
                     assets[candle.asset][candle.time_unit] = SortedSet(
                         [candle],
-                        key=lambda candle_param: candle_param.timestamp,
+                        key=lambda candle_param: candle_param.epoch_ns,
                     )
             self.events.append(MarketDataEvent(assets, self.current_timestamp))
         elif completed == sum(len(self.candles[asset]) for asset in self.candles):
@@ -141,42 +192,147 @@ class LiveFeed(Feed):
         events: deque = deque(),
         candles: dict[Asset, dict[timedelta, np.array]] = {},
         candle_dataframes: dict[Asset, dict[timedelta, CandleDataFrame]] = {},
+        candle_stream: CandleStream = None,
+        max_concurrent_requests: int = 8,
     ):
+        """
+        :param assets: The assets to get live data for
+        :type assets: dict[Asset, timedelta | list[timedelta]]
+        :param live_data_handlers: The live data handlers to poll, per exchange
+        :type live_data_handlers: dict[str, LiveDataHandler]
+        :param events: A deque of events
+        :type events: deque
+        :param candle_stream: If set, closed candles are pushed by this stream instead of being polled
+        :type candle_stream: CandleStream
+        :param max_concurrent_requests: Maximum number of concurrent requests per exchange when polling
+        :type max_concurrent_requests: int
+        """
         super().__init__(
             events=events, candles=candles, candle_dataframes=candle_dataframes
         )
         self.assets = normalize_assets(assets)
         self.live_data_handlers = live_data_handlers
+        self.candle_stream = candle_stream
+        self.max_concurrent_requests = max_concurrent_requests
+        self.last_epoch_ns = {asset: -1 for asset in self.assets}
+        self.stream_task = None
+        self.streamed_candles = deque()
+        self.new_data = None
+        self.latency_stats = LatencyStats()
 
-    def update_latest_data(self):
+    def reset(self):
+        super().reset()
+        self.last_epoch_ns = {asset: -1 for asset in self.assets}
+
+    def fetch_latest_candles(self, asset: Asset) -> np.array:
+        return self.live_data_handlers[
+            asset.exchange.lower()
+        ].request_ticker_lastest_candles(asset, nb_candles=10)
+
+    def select_new_closed_candles(
+        self, asset: Asset, candles: np.array, now_ns: int
+    ) -> list[Candle]:
+        """
+        Keep the candles that are closed and that were not emitted yet
+        """
+        last_epoch_ns = self.last_epoch_ns.get(asset, -1)
+        new_candles = [
+            candle
+            for candle in candles
+            if last_epoch_ns < candle.epoch_ns
+            and candle.epoch_ns + timedelta_to_ns(candle.time_unit) < now_ns
+        ]
+        if len(new_candles) != 0:
+            last_candle = max(new_candles, key=lambda candle: candle.epoch_ns)
+            self.last_epoch_ns[asset] = last_candle.epoch_ns
+            self.latency_stats.record(
+                now_ns - last_candle.epoch_ns - timedelta_to_ns(last_candle.time_unit)
+            )
+        return new_candles
+
+    def push_latest_candles(self, latest_candles: dict[Asset, np.array]) -> None:
         """
-        It takes the latest 10 candles from the exchange, and if the latest candle is not older more than 1 minute,
-        it adds it to the list of events
+        Add the new closed candles to the list of events
+
+        :param latest_candles: The latest candles received for each asset
+        :type latest_candles: dict[Asset, np.array]
         """
-        now = datetime.now(pytz.UTC)
+        now_ns = time.time_ns()
         candles_dict = {}
-        one_minute_timedelta = timedelta(minutes=1)
         min_timestamp = MAX_TIMESTAMP
-        for asset in self.assets:
-            candles = self.live_data_handlers[
-                asset.exchange.lower()
-            ].request_ticker_lastest_candles(asset, nb_candles=10)
-            if len(candles) > 0:
-                get_or_create_nested_dict(candles_dict, asset)
-                candles_dict[asset][one_minute_timedelta] = SortedSet(
-                    [
-                        candle
-                        for candle in candles
-                        if candle.timestamp + one_minute_timedelta < now
-                    ],
-                    key=lambda candle: candle.timestamp,
-                )
-                min_timestamp = min(min_timestamp, candles[0].timestamp)
+        for asset, candles in latest_candles.items():
+            new_candles = self.select_new_closed_candles(asset, candles, now_ns)
+            for candle in new_candles:
+                asset_candles = candles_dict.setdefault(asset, {})
+                if candle.time_unit not in asset_candles:
+                    asset_candles[candle.time_unit] = SortedSet(
+                        key=lambda candle: candle.epoch_ns
+                    )
+                asset_candles[candle.time_unit].add(candle)
+                min_timestamp = min(min_timestamp, candle.timestamp)
         if candles_dict:
             self.events.append(
                 MarketDataEvent(candles=candles_dict, timestamp=min_timestamp)
             )
 
+    def update_latest_data(self):
+        """
+        It takes the latest 10 candles from the exchange and adds the new closed ones to the list of events
+        """
+        self.push_latest_candles(
+            {asset: self.fetch_latest_candles(asset) for asset in self.assets}
+        )
+
+    async def async_update_latest_data(self):
+        """
+        Same as update_latest_data but all the assets are requested concurrently, with at most
+        max_concurrent_requests in flight per exchange. When a candle stream is set, the candles it pushed since the
+        last call are used instead.
+        """
+        if self.candle_stream is not None:
+            await self.start_stream()
+            latest_candles = {}
+            while len(self.streamed_candles) != 0:
+                candle = self.streamed_candles.popleft()
+                if candle.asset in self.last_epoch_ns:
+                    latest_candles.setdefault(candle.asset, []).append(candle)
+            self.push_latest_candles(latest_candles)
+            return
+
+        semaphores = {
+            asset.exchange.lower(): asyncio.Semaphore(self.max_concurrent_requests)
+            for asset in self.assets
+        }
+
+        async def fetch(asset: Asset) -> np.array:
+            async with semaphores[asset.exchange.lower()]:
+                return await asyncio.to_thread(self.fetch_latest_candles, asset)
+
+        assets = list(self.assets)
+        assets_latest_candles = await asyncio.gather(*[fetch(asset) for asset in assets])
+        # Keep the assets order so that the events don't depend on which request answered first
+        self.push_latest_candles(dict(zip(assets, assets_latest_candles)))
+
+    async def start_stream(self) -> None:
+        if self.stream_task is not None and not self.stream_task.done():
+            return
+        self.new_data = asyncio.Event()
+        await self.candle_stream.connect(list(self.assets))
+        self.stream_task = asyncio.create_task(self.consume_stream())
+
+    async def consume_stream(self) -> None:
+        async for candle in self.candle_stream.candles():
+            self.streamed_candles.append(candle)
+            self.new_data.set()
+
+    async def stop_stream(self) -> None:
+        if self.stream_task is None:
+            return
+        self.stream_task.cancel()
+        await asyncio.gather(self.stream_task, return_exceptions=True)
+        self.stream_task = None
+        await self.candle_stream.close()
+
 
 # It's a subclass of the Feed class, which is a class that Django provides for us
 class ExternalStorageFeed(Feed):
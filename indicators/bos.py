@@ -169,6 +169,9 @@ class BiggerCandleBody(CandleBodyShape):
 
 
 class CandleBOS(Indicator):
+    def candle_extremum(self, candle: Candle) -> float:
+        return candle.high if self.comparator(candle.high, candle.low) else candle.low
+
     def get_source_from_base(
         self,
         source_indicator: Indicator,
@@ -180,12 +183,7 @@ class CandleBOS(Indicator):
                 get_price_selector_function(price_type), self.size
             )
         elif base == "candle":
-            return source_indicator.map(
-                lambda candle: candle.high
-                if self.comparator(candle.high, candle.low)
-                else candle.low,
-                self.size,
-            )
+            return source_indicator.map(self.candle_extremum, self.size)
         else:
             raise Exception(f"base {base} is not a valid base")
 
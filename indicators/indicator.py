@@ -24,24 +24,69 @@ from trazy_analysis.models.candle import Candle
 from trazy_analysis.models.enums import IndicatorMode
 
 
+# The callables kept by the indicators are module level functions or bound methods rather than lambdas so that the
+# indicators can be pickled with the rest of the engine state
+
+
+def identity(data: Any) -> Any:
+    return data
+
+
+def candle_open(candle: Candle) -> float:
+    return candle.open
+
+
+def candle_high(candle: Candle) -> float:
+    return candle.high
+
+
+def candle_low(candle: Candle) -> float:
+    return candle.low
+
+
+def candle_close(candle: Candle) -> float:
+    return candle.close
+
+
+def candle_body_high(candle: Candle) -> float:
+    return max(candle.open, candle.close)
+
+
+def candle_body_low(candle: Candle) -> float:
+    return min(candle.open, candle.close)
+
+
 def get_price_selector_function(price_type: PriceType) -> Callable[[Candle], float]:
     match price_type:
         case PriceType.OPEN:
-            return lambda candle: candle.open
+            return candle_open
         case PriceType.HIGH:
-            return lambda candle: candle.high
+            return candle_high
         case PriceType.LOW:
-            return lambda candle: candle.low
+            return candle_low
         case PriceType.CLOSE:
-            return lambda candle: candle.close
+            return candle_close
         case PriceType.BODY_HIGH:
-            return lambda candle: max(candle.open, candle.close)
+            return candle_body_high
         case PriceType.BODY_LOW:
-            return lambda candle: min(candle.open, candle.close)
+            return candle_body_low
         case _:
             raise Exception("Invalid price_type {}".format(price_type.name))
 
 
+class BinaryOperationTransform:
+    """
+    Apply a binary operation between the data of an indicator and a constant operand
+    """
+
+    def __init__(self, operation_function: Callable[[Any, Any], Any], other: Any):
+        self.operation_function = operation_function
+        self.other = other
+
+    def __call__(self, data: Any) -> Any:
+        return self.operation_function(data, self.other) if data is not None else None
+
+
 COLORS = []
 for color_class, colors in plt.colors.PLOTLY_SCALES.items():
     for color in colors:
@@ -73,7 +118,7 @@ class Indicator:
         self.input_window = None
         self.insert = 0
         self.index = -1
-        self.callback = lambda elt: self.handle_data(elt)
+        self.callback = self.handle_data
         self.callbacks = deque()
         self.subscribers = set()
         self.data = None
@@ -151,7 +196,7 @@ class Indicator:
         self.window: np.array = None
         if self.input_window is not None and self.input_window.filled():
             self.transform = (
-                (lambda data: data) if self.transform is None else self.transform
+                identity if self.transform is None else self.transform
             )
             if self.mode == IndicatorMode.BATCH:
                 self.initialize_batch()
@@ -161,12 +206,12 @@ class Indicator:
             issubclass(type(self.source), np.ndarray)
             or issubclass(type(self.source), list)
         ):
-            self.transform = lambda data: data
+            self.transform = identity
             self.fill(self.source)
             self.source = None
         else:  # not self.input_window.filled()
             self.transform = (
-                (lambda data: data) if self.transform is None else self.transform
+                identity if self.transform is None else self.transform
             )
             if self.size is not None and self.dtype is not None:
                 self.window = ma.masked_array(
@@ -362,6 +407,12 @@ class Indicator:
     def __hash__(self):
         return id(self)
 
+    def __getstate__(self) -> dict:
+        # The memoization keys hold the ids of the indicators, they are translated when unpickling
+        state = self.__dict__.copy()
+        state["pickled_id"] = id(self)
+        return state
+
     def indicator_unary_operation(
         self,
         operation_function: Callable[[Any], Any],
@@ -386,9 +437,7 @@ class Indicator:
     def indicator_binary_operation_data(
         self, other, operation_function: Callable[[Any, Any], Any]
     ) -> TIndicator:
-        transform = (
-            lambda data: (operation_function(data, other)) if data is not None else None
-        )
+        transform = BinaryOperationTransform(operation_function, other)
         indicator_data: Indicator = self.indicators.Indicator(
             source=self, transform=transform
         )
@@ -767,10 +816,10 @@ class ZipIndicator(Indicator):
         self.data = None
         self.callbacks = deque()
         self.source_indicator1.subscribe(
-            lambda data: self.handle_source1_data(data), self
+            self.handle_source1_data, self
         )
         self.source_indicator2.subscribe(
-            lambda data: self.handle_source2_data(data), self
+            self.handle_source2_data, self
         )
 
     def handle_stream_data(self, data) -> None:
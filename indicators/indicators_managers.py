@@ -3,6 +3,8 @@ import importlib
 import inspect
 import os
 import uuid
+from datetime import timedelta
+from enum import Enum
 from pathlib import Path
 from typing import Callable, Set, Tuple
 
@@ -40,6 +42,16 @@ module_path = current_path.parent
 MODULE_NAME = "trazy_analysis.indicators"
 indicators_classes = get_module_classes(MODULE_NAME, str(module_path))
 
+# Immutable values are memoized by value so that equal parameters coming from different strategy instances share the
+# same indicators, everything else is memoized by identity.
+VALUE_MEMOIZED_TYPES = (bool, int, float, str, timedelta, Enum, type(None))
+
+
+def memoization_key(value) -> tuple | int:
+    if isinstance(value, VALUE_MEMOIZED_TYPES):
+        return type(value).__name__, value
+    return id(value)
+
 
 class ReactiveIndicators:
     def __init__(self, memoize: bool = True, mode: IndicatorMode = IndicatorMode.LIVE):
@@ -48,12 +60,20 @@ class ReactiveIndicators:
         self.instances = set()
         self.source_edges = []
         self.input_edges = []
+        self.registered = True
+        self._enrich()
 
+    def _enrich(self):
+        """
+        Add a memoizing factory method for each indicator class
+        """
         for class_to_enrich in indicators_classes:
             def indicator_call(
                 indicator_class: type,
             ) -> Callable:
                 def indicator_call_helper(*args, **kwargs) -> Indicator:
+                    if not self.registered:
+                        self._register_instances()
                     if not hasattr(indicator_class, "_instances"):
                         indicator_class._instances = {}
                     if not hasattr(indicator_class, "_max_sizes"):
@@ -61,11 +81,11 @@ class ReactiveIndicators:
                     key = [id(self)]
                     if self.memoize:
                         key = [id(self), indicator_class.__name__]
-                        key.extend(map(id, args))
+                        key.extend(map(memoization_key, args))
                         if kwargs:
                             for k, v in kwargs.items():
-                                key.append(id(k))
-                                key.append(id(v))
+                                key.append(k)
+                                key.append(memoization_key(v))
                     else:
                         key.append(uuid.uuid4())
                     key = tuple(key)
@@ -88,6 +108,39 @@ class ReactiveIndicators:
                 indicator_call(class_to_enrich),
             )
 
+    def __getstate__(self) -> dict:
+        # The factory methods are closures, they are created again when unpickling
+        state = {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in {indicator_class.__name__ for indicator_class in indicators_classes}
+        }
+        state["pickled_id"] = id(self)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        # The instances may not be completely unpickled yet, they are registered on the next call of a factory method
+        self.registered = False
+        self._enrich()
+
+    def _register_instances(self) -> None:
+        # The memoization keys hold the ids of the manager and of the indicators memoized by identity, translate them
+        # to the ids of the unpickled objects
+        ids = {self.pickled_id: id(self)}
+        for instance in self.instances:
+            ids[instance.pickled_id] = id(instance)
+        for instance in self.instances:
+            instance.id = tuple(
+                ids.get(element, element) if type(element) is int else element
+                for element in instance.id
+            )
+            indicator_class = type(instance)
+            if not hasattr(indicator_class, "_instances"):
+                indicator_class._instances = {}
+            indicator_class._instances[instance.id] = instance
+        self.registered = True
+
     def add_source_edge(self, edge: Tuple["Indicator", "Indicator"]):
         if edge[0] is not None and edge[1] is not None:
             self.source_edges.append(edge)
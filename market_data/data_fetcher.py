@@ -10,6 +10,7 @@ from pandas_market_calendars import MarketCalendar
 
 from trazy_analysis.broker.fee_model import FeeModel
 from trazy_analysis.common.ccxt_connector import CcxtConnector
+from trazy_analysis.common.metadata_cache import default_metadata_cache
 from trazy_analysis.common.constants import DATE_DIR_FORMAT, NONE_API_KEYS
 from trazy_analysis.common.helper import normalize_assets
 from trazy_analysis.common.types import CandleDataFrame
@@ -164,7 +165,10 @@ class AssetDataFetcher:
             else:
                 other_exchanges.append(exchange)
         if len(ccxt_exchanges_api_keys) != 0:
-            ccxt_connector = CcxtConnector(exchanges_api_keys=ccxt_exchanges_api_keys)
+            ccxt_connector = CcxtConnector(
+                exchanges_api_keys=ccxt_exchanges_api_keys,
+                metadata_cache=default_metadata_cache(),
+            )
             ccxt_historical_data_handler = CcxtHistoricalDataHandler(ccxt_connector)
             for exchange in ccxt_exchanges_api_keys:
                 historical_data_handlers[exchange] = ccxt_historical_data_handler
@@ -1,5 +1,4 @@
 import os
-import time
 from datetime import date, datetime, timedelta
 from typing import List, Tuple, Union
 
@@ -11,6 +10,7 @@ import trazy_analysis.logger
 import trazy_analysis.settings
 from trazy_analysis.common.ccxt_connector import CcxtConnector
 from trazy_analysis.common.helper import datetime_to_epoch, fill_missing_datetimes
+from trazy_analysis.common.rate_limiter import RATE_LIMITER
 from trazy_analysis.common.types import CandleDataFrame
 from trazy_analysis.db_storage.db_storage import DbStorage
 from trazy_analysis.market_data.ccxt_data_handler import CcxtDataHandler
@@ -73,10 +73,13 @@ class CcxtHistoricalDataHandler(CcxtDataHandler):
         empty_candle_dataframe = CandleDataFrame.from_candle_list(
             asset=ticker, candles=np.array([], dtype=Candle)
         )
+        # don't hit the rateLimit or you will be banned, the limit is shared by all the requests to the exchange
+        RATE_LIMITER.set_limit(
+            exchange_to_lower, 1, exchange_instance.rateLimit / 1000, replace=False
+        )
         try:
+            RATE_LIMITER.acquire(exchange_to_lower)
             raw_candles = exchange_instance.fetchOHLCV(symbol=ticker.symbol)
-            # don't hit the rateLimit or you will be banned
-            time.sleep(exchange_instance.rateLimit / 1000)
         except Exception as e:
             error_message = (
                 f"There was an error while pulling OHLCV data for {ticker.key()}, "
@@ -130,11 +133,10 @@ class CcxtHistoricalDataHandler(CcxtDataHandler):
             LOG.info(f"Current for {ticker.key()}: {current}")
             since = datetime_to_epoch(current, 1000)
             try:
+                RATE_LIMITER.acquire(exchange_to_lower)
                 raw_candles = exchange_instance.fetchOHLCV(
                     symbol=ticker.symbol, since=since
                 )
-                # don't hit the rateLimit or you will be banned
-                time.sleep(exchange_instance.rateLimit / 1000)
             except Exception as e:
                 error_message = f"There was an error while pulling OHLCV data from {ticker.key()}, Exception is: {e}"
                 LOG.exception(error_message)
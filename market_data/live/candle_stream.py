@@ -0,0 +1,69 @@
+import abc
+import json
+import os
+from typing import AsyncIterator
+
+import websockets
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+class CandleStream:
+    """
+    Streaming source of closed candles. LiveFeed consumes it instead of polling the live data handlers.
+    """
+
+    @abc.abstractmethod
+    async def connect(self, assets: list[Asset]) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def candles(self) -> AsyncIterator[Candle]:  # pragma: no cover
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def close(self) -> None:  # pragma: no cover
+        raise NotImplementedError
+
+
+class WebsocketCandleStream(CandleStream):
+    """
+    Candle stream over a websocket. Once connected, a subscription message listing the asset keys is sent, then each
+    message received is expected to be a candle serialized with Candle.to_json.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.websocket = None
+
+    @staticmethod
+    def subscription_message(assets: list[Asset]) -> str:
+        return json.dumps({"op": "subscribe", "assets": [asset.key() for asset in assets]})
+
+    @staticmethod
+    def parse_message(message: str | bytes) -> Candle:
+        return Candle.from_json(message)
+
+    async def connect(self, assets: list[Asset]) -> None:
+        self.websocket = await websockets.connect(self.url)
+        await self.websocket.send(self.subscription_message(assets))
+        LOG.info("Subscribed to %s candles stream for %s", self.url, assets)
+
+    async def candles(self) -> AsyncIterator[Candle]:
+        async for message in self.websocket:
+            try:
+                yield self.parse_message(message)
+            except Exception as e:
+                LOG.error("Could not parse candle message %s: %s", message, e)
+
+    async def close(self) -> None:
+        if self.websocket is not None:
+            await self.websocket.close()
+            self.websocket = None
@@ -2,6 +2,7 @@ import json
 from datetime import datetime, timedelta
 from typing import TypeVar
 
+import numpy as np
 import pytz
 
 from trazy_analysis.models.asset import Asset
@@ -18,7 +19,7 @@ class Candle:
         low: float,
         close: float,
         volume: int,
-        timestamp: datetime = datetime.now(pytz.UTC),
+        timestamp: datetime | int = datetime.now(pytz.UTC),
         time_unit=timedelta(minutes=1),
     ):
         """
@@ -34,8 +35,8 @@ class Candle:
         :type close: float
         :param volume: The volume of the asset traded during the time unit
         :type volume: int
-        :param timestamp: The timestamp of the candle
-        :type timestamp: datetime
+        :param timestamp: The timestamp of the candle, either as a datetime or as nanoseconds since the epoch
+        :type timestamp: datetime | int
         :param time_unit: The time unit of the candle
         """
         self.asset: Asset = asset
@@ -46,9 +47,30 @@ class Candle:
         self.volume: int = volume
         self.time_unit = time_unit
 
-        from trazy_analysis.common.utils import timestamp_to_utc
+        # The epoch is what the engine compares and hashes internally, the datetime is only built when it is read, by
+        # the API and the reporting
+        if isinstance(timestamp, (int, np.integer)):
+            self.epoch_ns: int = int(timestamp)
+            self._timestamp: datetime = None
+        else:
+            from trazy_analysis.common.utils import datetime_to_epoch_ns, timestamp_to_utc
 
-        self.timestamp = timestamp_to_utc(timestamp)
+            self._timestamp = timestamp_to_utc(timestamp)
+            self.epoch_ns: int = datetime_to_epoch_ns(self._timestamp)
+
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is None:
+            from trazy_analysis.common.utils import epoch_ns_to_datetime
+
+            self._timestamp = epoch_ns_to_datetime(self.epoch_ns)
+        return self._timestamp
+
+    def __setstate__(self, state: dict) -> None:
+        # The candles pickled before the datetime was built lazily
+        if "timestamp" in state:
+            state["_timestamp"] = state.pop("timestamp")
+        self.__dict__.update(state)
 
     @property
     def direction(self) -> CandleDirection:
@@ -98,8 +120,20 @@ class Candle:
         )
         return Candle.from_serializable_dict(candle_dict)
 
+    def to_dict(self) -> dict:
+        return {
+            "asset": self.asset,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "time_unit": self.time_unit,
+            "timestamp": self.timestamp,
+        }
+
     def to_serializable_dict(self) -> dict:
-        candle_dict = self.__dict__.copy()
+        candle_dict = self.to_dict()
         candle_dict["asset"] = candle_dict["asset"].to_dict()
         candle_dict["open"] = str(candle_dict["open"])
         candle_dict["high"] = str(candle_dict["high"])
@@ -116,7 +150,16 @@ class Candle:
         return json.dumps(candle_dict)
 
     def copy(self) -> TCandle:
-        return Candle.from_dict(self.__dict__)
+        return Candle(
+            asset=self.asset,
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close=self.close,
+            volume=self.volume,
+            timestamp=self.epoch_ns,
+            time_unit=self.time_unit,
+        )
 
     def __hash__(self):
         return hash(
@@ -127,7 +170,7 @@ class Candle:
                 self.low,
                 self.close,
                 self.volume,
-                self.timestamp,
+                self.epoch_ns,
             )
         )
 
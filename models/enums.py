@@ -34,6 +34,13 @@ class OrderType(Enum):
     TRAILING_STOP = "TRAILING_STOP"
 
 
+class IntraBarPath(Enum):
+    CLOSE = "CLOSE"
+    OPEN_HIGH_LOW_CLOSE = "OPEN_HIGH_LOW_CLOSE"
+    OPEN_LOW_HIGH_CLOSE = "OPEN_LOW_HIGH_CLOSE"
+    NEAREST_EXTREMUM_FIRST = "NEAREST_EXTREMUM_FIRST"
+
+
 class OrderCondition(Enum):
     EOD = "EOD"
     GTC = "GTC"
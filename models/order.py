@@ -91,6 +91,7 @@ class Order(OrderBase):
         status: OrderStatus = OrderStatus.CREATED,
         generation_time: datetime = datetime.now(pytz.UTC),
         order_id: str = None,
+        sub_account: tuple[str, str] = None,
     ):
         self.asset = asset
         self.time_unit = time_unit
@@ -106,6 +107,8 @@ class Order(OrderBase):
         if order_id is None:
             order_id = uuid.uuid4()
         self.order_id = order_id
+        # The (symbol, strategy name) sub-account of the broker the order is booked in, the broker portfolio if None
+        self.sub_account = sub_account
         if self.clock is not None:
             generation_time = self.clock.current_time()
         self.order_type: OrderType = order_type
@@ -147,6 +150,11 @@ class Order(OrderBase):
             time_in_force=parse_timedelta_str(order_dict["time_in_force"]),
             status=OrderStatus[order_dict["status"]],
             generation_time=order_dict["generation_time"],
+            sub_account=(
+                tuple(order_dict["sub_account"])
+                if order_dict.get("sub_account") is not None
+                else None
+            ),
         )
         return order
 
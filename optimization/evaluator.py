@@ -0,0 +1,232 @@
+import abc
+import copy
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Callable
+
+import numpy as np
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.common.backtest import BacktestConfig
+from trazy_analysis.common.sweep import BacktestSweep, SweepResult
+from trazy_analysis.optimization.pruner import Pruner
+from trazy_analysis.optimization.trial_store import TrialStore
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+def completed_future(value: Any) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class Evaluator:
+    """
+    Evaluate the objective for parameters suggested by an optimizer. Evaluations are submitted and complete
+    asynchronously so that optimizers can keep several of them running, and the objective values are saved in the
+    trial store when one is given: parameters already evaluated in the same study are not evaluated again, which
+    allows to resume an interrupted optimization.
+    """
+
+    def __init__(
+        self,
+        nb_workers: int = 1,
+        trial_store: TrialStore = None,
+        study: str = "default",
+    ):
+        self.nb_workers = nb_workers
+        self.trial_store = trial_store
+        self.study = study
+        self.sign = 1
+
+    @abc.abstractmethod
+    def _submit(self, parameters: dict[str, Any]) -> Future:  # pragma: no cover
+        """
+        Start the evaluation of the parameters
+
+        :return: A future of the objective value
+        :rtype: Future
+        """
+        raise NotImplementedError
+
+    def submit(self, parameters: dict[str, Any]) -> Future:
+        """
+        Evaluate the parameters, or fetch their objective value from the trial store
+
+        :param parameters: The parameters to evaluate
+        :type parameters: dict[str, Any]
+        :return: A future of the objective value
+        :rtype: Future
+        """
+        if self.trial_store is not None:
+            value = self.trial_store.get(self.study, parameters)
+            if value is not None:
+                return completed_future(self.sign * value)
+
+        signed_future = Future()
+
+        def on_done(future: Future) -> None:
+            try:
+                value = future.result()
+            except Exception as e:
+                signed_future.set_exception(e)
+                return
+            if self.trial_store is not None:
+                self.trial_store.add(self.study, parameters, value)
+            signed_future.set_result(self.sign * value)
+
+        self._submit(parameters).add_done_callback(on_done)
+        return signed_future
+
+    def evaluate(self, parameters_list: list[dict[str, Any]]) -> list[float]:
+        """
+        Evaluate a batch of parameters concurrently
+
+        :return: The objective values, in the same order as the parameters
+        :rtype: list[float]
+        """
+        futures = [self.submit(parameters) for parameters in parameters_list]
+        return [future.result() for future in futures]
+
+    def completed_trials(self) -> list[tuple[dict[str, Any], float]]:
+        """
+        The trials of the study already in the trial store
+        """
+        if self.trial_store is None:
+            return []
+        return [
+            (parameters, self.sign * value)
+            for parameters, value in self.trial_store.trials(self.study)
+        ]
+
+    def negated(self) -> "Evaluator":
+        """
+        The same evaluator, sharing its workers, returning the opposite of the objective values
+        """
+        negated_evaluator = copy.copy(self)
+        negated_evaluator.sign = -self.sign
+        return negated_evaluator
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Evaluator":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class FunctionEvaluator(Evaluator):
+    """
+    Call func(**parameters) to evaluate the parameters. With more than one worker func is called on a pool of
+    processes, it must be picklable in this case, or threads when use_processes is False.
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        nb_workers: int = 1,
+        use_processes: bool = True,
+        trial_store: TrialStore = None,
+        study: str = None,
+    ):
+        super().__init__(
+            nb_workers,
+            trial_store,
+            study if study is not None else getattr(func, "__name__", "default"),
+        )
+        self.func = func
+        self.use_processes = use_processes
+        # Created upfront so that the negated copies of the evaluator share the same workers
+        self.executor: Executor = None
+        if nb_workers > 1:
+            executor_class = (
+                ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            )
+            self.executor = executor_class(max_workers=nb_workers)
+
+    def _submit(self, parameters: dict[str, Any]) -> Future:
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(self.func(**parameters))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.executor.submit(self.func, **parameters)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class BacktestEvaluator(Evaluator):
+    """
+    Evaluate strategy parameters with backtests run by a BacktestSweep, the feed being shared by all the workers. The
+    objective is a row of the backtest tearsheet, failed or undefined results being worth -1. With a pruner and a
+    checkpoint interval in the backtest config, the unpromising backtests are stopped early and are worth -1 too.
+    """
+
+    def __init__(
+        self,
+        backtest_config: BacktestConfig,
+        strategy_class: type,
+        nb_workers: int = 1,
+        trial_store: TrialStore = None,
+        study: str = None,
+        objective: str = "Sortino Ratio",
+        memmap_directory: str = None,
+        pruner: Pruner = None,
+    ):
+        super().__init__(
+            nb_workers,
+            trial_store,
+            study if study is not None else f"{strategy_class.__name__}-{objective}",
+        )
+        self.strategy_class = strategy_class
+        self.objective = objective
+        self.backtest_sweep = BacktestSweep(
+            backtest_config,
+            nb_workers=nb_workers,
+            memmap_directory=memmap_directory,
+            with_equity=False,
+            pruner=pruner,
+        )
+
+    def objective_value(self, sweep_result: SweepResult) -> float:
+        if sweep_result.error is not None:
+            raise Exception(
+                f"Backtest with parameters {sweep_result.strategies_parameters} failed: {sweep_result.error}"
+            )
+        statistics = sweep_result.statistics
+        if self.objective not in statistics.index:
+            return -1
+        value = statistics.loc[self.objective]["Backtest results"]
+        return float(value) if not np.isnan(value) else -1
+
+    def _submit(self, parameters: dict[str, Any]) -> Future:
+        objective_future = Future()
+
+        def on_done(future: Future) -> None:
+            try:
+                objective_future.set_result(self.objective_value(future.result()))
+            except Exception as e:
+                objective_future.set_exception(e)
+
+        self.backtest_sweep.submit({self.strategy_class: parameters}).add_done_callback(
+            on_done
+        )
+        return objective_future
+
+    def close(self) -> None:
+        self.backtest_sweep.close()
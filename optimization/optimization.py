@@ -1,13 +1,22 @@
-from typing import Dict
+from typing import Any
 
 import numpy as np
 
 from trazy_analysis.common.backtest import Backtest
 from trazy_analysis.models.parameter import Parameter
+from trazy_analysis.optimization.evaluator import BacktestEvaluator
 from trazy_analysis.optimization.optimizer import Optimizer
+from trazy_analysis.optimization.pruner import Pruner
+from trazy_analysis.optimization.trial_store import TrialStore
 
 
 class Optimization:
+    """
+    Optimize the Sortino ratio of each strategy over its parameters space. With nb_workers the backtests are run by a
+    BacktestEvaluator on a pool of processes, with a trial store the optimization can be resumed and with a pruner the
+    unpromising backtests are stopped at the checkpoints of the backtest config.
+    """
+
     def __init__(
         self,
         backtest: Backtest,
@@ -15,18 +24,37 @@ class Optimization:
         parameters_spaces: dict[type, dict[str, Parameter]] = {},
         nb_iter: int = 54,
         max_evals: int = 1,
+        nb_workers: int = None,
+        trial_store: TrialStore = None,
+        pruner: Pruner = None,
     ):
         def run_strategy(strategy_class, kwargs):
-            result = backtest.run_strategy(strategy_class, kwargs).loc["Sortino Ratio"][
-                "Backtest results"
-            ]
+            result = backtest.run_strategy(
+                strategy_class, kwargs, checkpoint_callback=pruner
+            ).loc["Sortino Ratio"]["Backtest results"]
             return result if not np.isnan(result) else -1
 
+        self.best_params: dict[type, dict[str, Any]] = {}
         for strategy_class, parameters_space in parameters_spaces.items():
-            best_params_dict = optimizer.maximize(
-                lambda **kwargs: run_strategy(strategy_class, kwargs),
-                parameters_space,
-                nb_iter=nb_iter,
-                max_evals=max_evals,
-            )
+            evaluator = None
+            if nb_workers is not None or trial_store is not None:
+                evaluator = BacktestEvaluator(
+                    backtest.backtest_config,
+                    strategy_class,
+                    nb_workers=nb_workers if nb_workers is not None else 1,
+                    trial_store=trial_store,
+                    pruner=pruner,
+                )
+            try:
+                best_params_dict = optimizer.maximize(
+                    lambda **kwargs: run_strategy(strategy_class, kwargs),
+                    parameters_space,
+                    nb_iter=nb_iter,
+                    max_evals=max_evals,
+                    evaluator=evaluator,
+                )
+            finally:
+                if evaluator is not None:
+                    evaluator.close()
+            self.best_params[strategy_class] = best_params_dict
             print(best_params_dict)
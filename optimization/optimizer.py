@@ -1,6 +1,7 @@
+import os
 from abc import ABC, abstractmethod
-from collections import Callable
-from typing import Any, Dict, List
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Callable
 
 import GPyOpt
 import black_box as bb
@@ -9,7 +10,17 @@ import numpy as np
 # import optuna
 # import sherpa
 # from bayes_opt import BayesianOptimization
-from hyperopt import Trials, fmin, hp, tpe
+from hyperopt import (
+    Domain,
+    JOB_STATE_DONE,
+    JOB_STATE_RUNNING,
+    STATUS_OK,
+    Trials,
+    hp,
+    space_eval,
+    tpe,
+    trials_from_docs,
+)
 
 # from skopt import gp_minimize
 # from skopt.space import Categorical, Integer, Real
@@ -20,9 +31,16 @@ from trazy_analysis.models.parameter import (
     Parameter,
     Static,
 )
+from trazy_analysis.optimization.evaluator import Evaluator, FunctionEvaluator
 
 
 class Optimizer(ABC):
+    """
+    The objective is evaluated by an Evaluator: by default func is called in the current process, an evaluator with
+    several workers evaluates up to max_evals suggestions concurrently and an evaluator with a trial store lets an
+    interrupted optimization resume from the trials already evaluated.
+    """
+
     @abstractmethod
     def maximize(
         self,
@@ -30,6 +48,7 @@ class Optimizer(ABC):
         space: dict[str, Parameter],
         nb_iter: int = 54,
         max_evals: int = 1,
+        evaluator: Evaluator = None,
     ) -> dict[str, Any]:
         raise NotImplementedError("Should implement maximize()")
 
@@ -39,21 +58,78 @@ class Optimizer(ABC):
         space: dict[str, Parameter],
         nb_iter: int,
         max_evals: int = 52,
+        evaluator: Evaluator = None,
     ):
-        def max_func(*args):
-            return -func(*args)
+        if evaluator is not None:
+            return self.maximize(func, space, nb_iter, max_evals, evaluator.negated())
+
+        def max_func(**kwargs):
+            return -func(**kwargs)
 
         return self.maximize(max_func, space, nb_iter, max_evals)
 
+    @staticmethod
+    def get_evaluator(func: Callable, evaluator: Evaluator = None) -> Evaluator:
+        return evaluator if evaluator is not None else FunctionEvaluator(func)
+
+    @staticmethod
+    def completed_trials(
+        evaluator: Evaluator, space: dict[str, Parameter]
+    ) -> list[tuple[dict[str, Any], float]]:
+        """
+        The trials of the evaluator study that can be used to warm start an optimization of the space
+
+        :param evaluator: The evaluator of the optimization
+        :type evaluator: Evaluator
+        :param space: The space of the optimization
+        :type space: dict[str, Parameter]
+        :return: The parameters and objective value of the trials having exactly the parameters of the space
+        :rtype: list[tuple[dict[str, Any], float]]
+        """
+        return [
+            (parameters, value)
+            for parameters, value in evaluator.completed_trials()
+            if parameters.keys() == space.keys()
+        ]
+
+
+class EvaluatorPool:
+    """
+    Adapter giving to black box an executor which evaluates its batches with an Evaluator, func converting the points
+    of black box to parameters
+    """
+
+    def __init__(self, evaluator: Evaluator):
+        self.evaluator = evaluator
+
+    def __call__(self) -> "EvaluatorPool":
+        return self
+
+    def __enter__(self) -> "EvaluatorPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def map(self, func: Callable, points: list[list[float]]) -> list[float]:
+        # black box minimizes
+        values = self.evaluator.evaluate([func(point) for point in points])
+        return [-value for value in values]
+
 
 class BlackBoxOptimizer(Optimizer):
+    def __init__(self, resfile: str = os.devnull):
+        self.resfile = resfile
+
     def maximize(
         self,
         func: Callable,
         space: dict[str, Parameter],
         nb_iter: int = 54,
         max_evals: int = 1,
+        evaluator: Evaluator = None,
     ) -> dict[str, Any]:
+        evaluator = self.get_evaluator(func, evaluator)
         domain = []
         map_index_to_param_key = {}
         index = 0
@@ -72,9 +148,7 @@ class BlackBoxOptimizer(Optimizer):
             map_index_to_param_key[index] = param_key
             index += 1
 
-        global bb_func
-
-        def bb_func(params: list[Any]):
+        def to_params(params: list[Any]) -> dict[str, Any]:
             kwargs = {}
             for index in range(0, len(params)):
                 param_key = map_index_to_param_key[index]
@@ -82,26 +156,22 @@ class BlackBoxOptimizer(Optimizer):
                 param_value = space[param_key]
                 if isinstance(param_value, Discrete):
                     kwargs[param_key] = int(kwargs[param_key])
-            return -func(**kwargs)
+                else:
+                    kwargs[param_key] = float(kwargs[param_key])
+            return kwargs
 
         best_params = bb.search_min(
-            f=bb_func,  # given function
+            f=to_params,  # given function
             domain=domain,  # ranges of each parameter,
             budget=nb_iter,  # total number of function calls available
             batch=max_evals,  # number of calls that will be evaluated in parallel
-            resfile="output.txt",
+            resfile=self.resfile,
+            executor=EvaluatorPool(evaluator),
         )
 
-        best_params_dict = {}
-        for index in range(0, len(best_params)):
-            param_key = map_index_to_param_key[index]
-            param_value = space[param_key]
-            best_params_dict[param_key] = best_params[index]
-            if isinstance(param_value, Discrete):
-                best_params_dict[param_key] = int(best_params_dict[param_key])
-            index += 1
-
-        best_result = func(**best_params_dict)
+        best_params_dict = to_params(best_params)
+        # Already evaluated, the value is fetched from the trial store if there is one
+        best_result = evaluator.submit(best_params_dict).result()
         best_params_dict["best_result"] = best_result
 
         return best_params_dict
@@ -183,13 +253,18 @@ class BlackBoxOptimizer(Optimizer):
 
 
 class HyperOptimizer(Optimizer):
+    def __init__(self, seed: int = None):
+        self.seed = seed
+
     def maximize(
         self,
         func: Callable,
         space: dict[str, Parameter],
         nb_iter: int = 54,
         max_evals: int = 1,
+        evaluator: Evaluator = None,
     ) -> dict[str, Any]:
+        evaluator = self.get_evaluator(func, evaluator)
         hyperopt_space = {}
         for param_key, param_value in space.items():
             if (
@@ -218,28 +293,70 @@ class HyperOptimizer(Optimizer):
             elif isinstance(param_value, Static):
                 hyperopt_space[param_key] = hp.choice(param_key, param_value.range)
 
-        global hyperopt_func
-
-        def hyperopt_func(params: dict[str, Any]):
-            return -func(**params)
-
+        # The trials are driven here instead of by fmin so that up to max_evals of them are evaluated concurrently:
+        # a new trial is suggested as soon as one completes, the running ones being known by tpe.
+        domain = Domain(lambda params: None, hyperopt_space)
+        # The completed trials are given back to tpe as trial documents, built with the public Trials API
         trials = Trials()
-        best_params_dict = fmin(
-            fn=hyperopt_func,
-            space=hyperopt_space,
-            algo=tpe.suggest,
-            max_evals=nb_iter,
-            trials=trials,
+        docs = []
+        for parameters, value in self.completed_trials(evaluator, space):
+            vals = {}
+            for param_key, param_value in space.items():
+                vals[param_key] = parameters[param_key]
+                if isinstance(param_value, Choice) or isinstance(param_value, Static):
+                    if parameters[param_key] not in param_value.range:
+                        break
+                    vals[param_key] = param_value.range.index(parameters[param_key])
+            else:
+                [tid] = trials.new_trial_ids(1)
+                [doc] = trials.new_trial_docs(
+                    [tid],
+                    [None],
+                    [{"loss": -value, "status": STATUS_OK}],
+                    [
+                        {
+                            "tid": tid,
+                            "cmd": domain.cmd,
+                            "workdir": domain.workdir,
+                            "idxs": {key: [tid] for key in vals},
+                            "vals": {key: [val] for key, val in vals.items()},
+                        }
+                    ],
+                )
+                doc["state"] = JOB_STATE_DONE
+                docs.append(doc)
+
+        rng = np.random.default_rng(self.seed)
+        # A resumed optimization continues the sequence of seeds instead of suggesting the same trials again
+        rng.integers(2**31 - 1, size=len(docs))
+        running_docs = {}
+        while len(docs) < nb_iter or running_docs:
+            while len(docs) < nb_iter and len(running_docs) < max_evals:
+                [doc] = tpe.suggest(
+                    [len(docs)],
+                    domain,
+                    trials_from_docs(docs),
+                    rng.integers(2**31 - 1),
+                )
+                doc["state"] = JOB_STATE_RUNNING
+                docs.append(doc)
+                params = space_eval(
+                    hyperopt_space,
+                    {key: vals[0] for key, vals in doc["misc"]["vals"].items()},
+                )
+                running_docs[evaluator.submit(params)] = doc
+            done, _ = wait(running_docs, return_when=FIRST_COMPLETED)
+            for future in done:
+                doc = running_docs.pop(future)
+                doc["state"] = JOB_STATE_DONE
+                doc["result"] = {"loss": -future.result(), "status": STATUS_OK}
+
+        best_doc = min(docs, key=lambda doc: doc["result"]["loss"])
+        best_params_dict = space_eval(
+            hyperopt_space,
+            {key: vals[0] for key, vals in best_doc["misc"]["vals"].items()},
         )
-
-        for param_key, param_value in space.items():
-            if isinstance(param_value, Choice) or isinstance(param_value, Static):
-                best_params_dict[param_key] = param_value.range[
-                    best_params_dict[param_key]
-                ]
-
-        best_result = func(**best_params_dict)
-        best_params_dict["best_result"] = best_result
+        best_params_dict["best_result"] = -best_doc["result"]["loss"]
 
         return best_params_dict
 
@@ -407,12 +524,16 @@ class HyperOptimizer(Optimizer):
 
 
 class GPyOptimizer(Optimizer):
+    def __init__(self, initial_design_numdata: int = 5):
+        self.initial_design_numdata = initial_design_numdata
+
     def maximize(
         self,
         func: Callable,
         space: dict[str, Parameter],
         nb_iter: int = 54,
         max_evals: int = 1,
+        evaluator: Evaluator = None,
     ) -> dict[str, Any]:
         gpyopt_space = []
         for param_key, param_value in space.items():
@@ -435,7 +556,9 @@ class GPyOptimizer(Optimizer):
                     {
                         "name": param_key,
                         "type": "discrete",
-                        "domain": (param_value.range[0], param_value.range[-1]),
+                        "domain": tuple(
+                            range(param_value.range[0], param_value.range[-1] + 1)
+                        ),
                     }
                 )
             elif isinstance(param_value, Continuous):
@@ -455,20 +578,55 @@ class GPyOptimizer(Optimizer):
                     }
                 )
 
-        global gpyopt_func
-
-        def gpyopt_func(params: np.ndarray):
-            return -func(*params[0])
-
-        bayesian_opt = GPyOpt.methods.BayesianOptimization(gpyopt_func, gpyopt_space)
-        bayesian_opt.run_optimization(nb_iter)
-
-        index = 0
-        best_params_dict = {}
-        best_params_list = bayesian_opt.x_opt
-        for param_key, param_value in space.items():
-            best_params_dict[param_key] = best_params_list[index]
-            index += 1
-        best_params_dict["best_result"] = -bayesian_opt.fx_opt
+        evaluator = self.get_evaluator(func, evaluator)
+        design_space = GPyOpt.Design_space(gpyopt_space)
+        param_keys = list(space.keys())
+
+        def to_params(x: np.ndarray) -> dict[str, Any]:
+            params = {}
+            for param_key, param_value in zip(param_keys, x):
+                if isinstance(space[param_key], Discrete):
+                    param_value = int(param_value)
+                elif isinstance(space[param_key], Continuous):
+                    param_value = float(param_value)
+                params[param_key] = param_value
+            return params
+
+        # GPyOpt minimizes
+        X = np.empty((0, len(param_keys)))
+        Y = np.empty((0, 1))
+        for parameters, value in self.completed_trials(evaluator, space):
+            X = np.vstack([X, [parameters[param_key] for param_key in param_keys]])
+            Y = np.vstack([Y, [-value]])
+
+        # Same budget as run_optimization: the initial design followed by nb_iter suggestions
+        budget = self.initial_design_numdata + nb_iter
+        next_X = None
+        if len(X) < self.initial_design_numdata:
+            next_X = GPyOpt.experiment_design.initial_design(
+                "random", design_space, self.initial_design_numdata - len(X)
+            )
+        while len(X) < budget:
+            if next_X is None:
+                batch_size = min(max_evals, budget - len(X))
+                bayesian_opt = GPyOpt.methods.BayesianOptimization(
+                    f=None,
+                    domain=gpyopt_space,
+                    X=X,
+                    Y=Y,
+                    batch_size=batch_size,
+                    evaluator_type="sequential"
+                    if batch_size == 1
+                    else "thompson_sampling",
+                )
+                next_X = bayesian_opt.suggest_next_locations()
+            values = evaluator.evaluate([to_params(x) for x in next_X])
+            X = np.vstack([X, next_X])
+            Y = np.vstack([Y, [[-value] for value in values]])
+            next_X = None
+
+        best_index = int(np.argmin(Y[:, 0]))
+        best_params_dict = to_params(X[best_index])
+        best_params_dict["best_result"] = -float(Y[best_index, 0])
 
         return best_params_dict
@@ -0,0 +1,137 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from multiprocessing import Manager
+
+import numpy as np
+
+from trazy_analysis.statistics.running_metrics import Checkpoint
+
+
+class Pruner(ABC):
+    """
+    Decide at each checkpoint of a backtest whether it is worth continuing, by comparing the value of a running metric
+    with the values reported by the other trials of the optimization at the same checkpoint. Higher values of the
+    metric are better. A pruner is meant to be given as checkpoint callback to Backtest.run_strategies.
+
+    The reported values are kept in memory, call share() before using the pruner from several processes.
+    """
+
+    def __init__(self, metric: str = "total_return"):
+        self.metric = metric
+        self.values: dict[int, list[float]] = {}
+        self.lock = threading.Lock()
+        self.manager = None
+
+    def share(self) -> None:
+        """
+        Keep the reported values in a manager process so that trials running in worker processes see each other
+        """
+        if self.manager is not None:
+            return
+        self.manager = Manager()
+        values = self.manager.dict(self.values)
+        self.values = values
+        self.lock = self.manager.Lock()
+
+    def close(self) -> None:
+        if self.manager is not None:
+            self.values = dict(self.values)
+            self.lock = threading.Lock()
+            self.manager.shutdown()
+            self.manager = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if self.manager is None:
+            # Not shared, each process gets its own values
+            state["lock"] = None
+        state["manager"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self.lock is None:
+            self.lock = threading.Lock()
+
+    @abstractmethod
+    def _should_prune(
+        self, step: int, value: float, other_values: list[float]
+    ) -> bool:  # pragma: no cover
+        """
+        :param step: The step of the checkpoint
+        :type step: int
+        :param value: The value of the metric for the trial
+        :type value: float
+        :param other_values: The values reported by the previous trials at this step
+        :type other_values: list[float]
+        :return: True if the trial should be stopped
+        :rtype: bool
+        """
+        raise NotImplementedError("Should implement _should_prune()")
+
+    def __call__(self, checkpoint: Checkpoint) -> bool:
+        value = float(getattr(checkpoint.metrics, self.metric))
+        if math.isnan(value):
+            value = -math.inf
+        with self.lock:
+            other_values = self.values.get(checkpoint.step, [])
+            self.values[checkpoint.step] = other_values + [value]
+        return self._should_prune(checkpoint.step, value, other_values)
+
+
+class MedianPruner(Pruner):
+    """
+    Prune a trial whose metric is below the median of the previous trials at the same checkpoint
+    """
+
+    def __init__(
+        self,
+        metric: str = "total_return",
+        nb_startup_trials: int = 5,
+        nb_warmup_steps: int = 0,
+    ):
+        super().__init__(metric)
+        self.nb_startup_trials = nb_startup_trials
+        self.nb_warmup_steps = nb_warmup_steps
+
+    def _should_prune(self, step: int, value: float, other_values: list[float]) -> bool:
+        if step <= self.nb_warmup_steps or len(other_values) < self.nb_startup_trials:
+            return False
+        return value < np.median(other_values)
+
+
+class SuccessiveHalvingPruner(Pruner):
+    """
+    Asynchronous successive halving: the rungs are at the steps min_step * reduction_factor ** k, a trial reaching a
+    rung continues only if its metric is in the top 1 / reduction_factor of the values reported at that rung.
+    """
+
+    def __init__(
+        self,
+        metric: str = "total_return",
+        min_step: int = 1,
+        reduction_factor: int = 3,
+    ):
+        if min_step < 1:
+            raise Exception(f"The min step should be at least 1, got {min_step}")
+        if reduction_factor <= 1:
+            raise Exception(
+                f"The reduction factor should be greater than 1, got {reduction_factor}"
+            )
+        super().__init__(metric)
+        self.min_step = min_step
+        self.reduction_factor = reduction_factor
+
+    def is_rung(self, step: int) -> bool:
+        rung_step = self.min_step
+        while rung_step < step:
+            rung_step *= self.reduction_factor
+        return rung_step == step
+
+    def _should_prune(self, step: int, value: float, other_values: list[float]) -> bool:
+        if not self.is_rung(step):
+            return False
+        values = sorted(other_values + [value], reverse=True)
+        nb_promoted = max(len(values) // self.reduction_factor, 1)
+        return value < values[nb_promoted - 1]
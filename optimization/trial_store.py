@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+
+def parameters_to_json(parameters: dict[str, Any]) -> str:
+    """
+    Canonical serialization of parameters, used as the trial key
+
+    :param parameters: The parameters of the trial
+    :type parameters: dict[str, Any]
+    :return: The parameters serialized with sorted keys, numpy scalars being converted to python scalars
+    :rtype: str
+    """
+
+    def default(value: Any) -> Any:
+        if isinstance(value, np.generic):
+            return value.item()
+        return str(value)
+
+    return json.dumps(parameters, sort_keys=True, default=default)
+
+
+class TrialStore:
+    """
+    Persistent store of the evaluated trials of optimizations, in a sqlite database. Trials are grouped by study so
+    that a single file can hold several optimizations, an optimization restarted with the same study name reuses the
+    trials already evaluated instead of running them again.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.Lock()
+        # Results are stored from the threads completing the evaluations
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS trials ("
+                "study TEXT NOT NULL, "
+                "parameters TEXT NOT NULL, "
+                "value REAL, "
+                "created_at REAL NOT NULL, "
+                "PRIMARY KEY (study, parameters))"
+            )
+
+    def get(self, study: str, parameters: dict[str, Any]) -> float | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM trials WHERE study = ? AND parameters = ?",
+                (study, parameters_to_json(parameters)),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def add(self, study: str, parameters: dict[str, Any], value: float) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO trials (study, parameters, value, created_at) VALUES (?, ?, ?, ?)",
+                (study, parameters_to_json(parameters), float(value), time.time()),
+            )
+
+    def trials(self, study: str) -> list[tuple[dict[str, Any], float]]:
+        """
+        The trials of a study, in the order they were evaluated
+
+        :param study: The name of the study
+        :type study: str
+        :return: The parameters and the objective value of each trial
+        :rtype: list[tuple[dict[str, Any], float]]
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT parameters, value FROM trials WHERE study = ? ORDER BY created_at, rowid",
+                (study,),
+            ).fetchall()
+        return [(json.loads(parameters), value) for parameters, value in rows]
+
+    def best(self, study: str) -> tuple[dict[str, Any], float] | None:
+        trials = self.trials(study)
+        if not trials:
+            return None
+        return max(trials, key=lambda trial: trial[1])
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -15,7 +15,7 @@ from trazy_analysis.models.multiple_order import (
     CoverOrder, MultipleOrder,
 )
 from trazy_analysis.models.order import Order, OrderBase
-from trazy_analysis.models.signal import ArbitragePairSignal, Signal
+from trazy_analysis.models.signal import ArbitragePairSignal, Signal, SignalBase
 from trazy_analysis.order_manager.order_creator import OrderCreator
 from trazy_analysis.order_manager.position_sizer import PositionSizer
 
@@ -91,12 +91,29 @@ class OrderManager:
                 self.add_order(order_base)
 
 
+    def set_sub_account(self, order: OrderBase, strategy_name: str) -> None:
+        if isinstance(order, Order):
+            order.sub_account = self.broker_manager.sub_account(
+                order.asset, strategy_name
+            )
+        elif isinstance(order, MultipleOrder):
+            for order_base in order.orders:
+                self.set_sub_account(order_base, strategy_name)
+
+    @staticmethod
+    def strategy_name(signal: SignalBase) -> str:
+        if signal.strategy is None and isinstance(signal, ArbitragePairSignal):
+            return signal.buy_signal.strategy
+        return signal.strategy
+
     def process_pending_signal(self, signal: Signal) -> None:
         LOG.info("Processing %s", str(signal))
         order = self.order_creator.create_order(signal, self.clock)
         self.add_order(order)
         if order is not None:
             LOG.info("Order has been created and can be dispatched to the broker")
+            # The order is sized and booked in the sub-account of its strategy and asset
+            self.set_sub_account(order, self.strategy_name(signal))
             self.position_sizer.size_order(order)
             if (
                 isinstance(order, Order)
@@ -132,7 +149,11 @@ class OrderManager:
             LOG.info("now = %s", now)
             if not signal.in_force(now):
                 return
-            opened_position = self.broker_manager.get_broker(signal.asset.exchange).has_opened_position(signal.asset, signal.direction)
+            opened_position = self.broker_manager.get_broker(signal.asset.exchange).has_opened_position(
+                signal.asset,
+                signal.direction,
+                self.broker_manager.sub_account(signal.asset, signal.strategy),
+            )
             LOG.info("opened position = %s", opened_position)
             if not (
                 (signal.is_entry_signal and not opened_position)
@@ -145,14 +166,23 @@ class OrderManager:
             LOG.info("Sell signal %s", str(signal.sell_signal.to_serializable_dict()))
             buy_signal: Signal = signal.buy_signal
             sell_signal: Signal = signal.sell_signal
+            strategy_name = self.strategy_name(signal)
             if sell_signal.is_exit_signal:
                 opened_position = self.broker_manager.get_broker(
-                    sell_signal.asset.exchange).has_opened_position(sell_signal.asset, sell_signal.direction)
+                    sell_signal.asset.exchange).has_opened_position(
+                    sell_signal.asset,
+                    sell_signal.direction,
+                    self.broker_manager.sub_account(sell_signal.asset, strategy_name),
+                )
                 if not opened_position:
                     return
             if buy_signal.is_exit_signal:
                 opened_position = self.broker_manager.get_broker(
-                    buy_signal.asset.exchange).has_opened_position(buy_signal.asset, buy_signal.direction)
+                    buy_signal.asset.exchange).has_opened_position(
+                    buy_signal.asset,
+                    buy_signal.direction,
+                    self.broker_manager.sub_account(buy_signal.asset, strategy_name),
+                )
                 if not opened_position:
                     return
 
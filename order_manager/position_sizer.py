@@ -15,15 +15,18 @@ class PositionSizer:
         self.integer_size = integer_size
 
     def size_single_order(self, order: Order):
+        broker = self.broker_manager.get_broker(exchange=order.asset.exchange)
         if order.is_exit_order:
-            size = self.broker_manager.get_broker(exchange=order.asset.exchange).position_size(order.asset, order.direction)
+            size = broker.position_size(order.asset, order.direction, order.sub_account)
         else:
-            total_equity = self.broker_manager.get_broker(exchange=order.asset.exchange).portfolio.total_equity
+            total_equity = broker.get_portfolio_total_equity(order.sub_account)
             max_equity_risk = total_equity * PositionSizer.MAXIMUM_RISK_PER_TRADE
-            size_relative_to_equity = self.broker_manager.get_broker(
-                exchange=order.asset.exchange).max_entry_order_size(order.asset, max_equity_risk)
-            size_relative_to_cash = self.broker_manager.get_broker(
-                exchange=order.asset.exchange).max_entry_order_size(order.asset)
+            size_relative_to_equity = broker.max_entry_order_size(
+                order.asset, max_equity_risk, order.sub_account
+            )
+            size_relative_to_cash = broker.max_entry_order_size(
+                order.asset, sub_account=order.sub_account
+            )
             size = min(size_relative_to_equity, size_relative_to_cash)
             if self.integer_size:
                 size = int(size)
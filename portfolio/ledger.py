@@ -0,0 +1,544 @@
+import os
+import pickle
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from numbers import Integral
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import Action, Direction
+from trazy_analysis.portfolio.portfolio_event import PortfolioEvent, TransactionEvent
+from trazy_analysis.position.transaction import Transaction
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+DEFAULT_SEGMENT_SIZE = 65536
+
+# Types of the rows of the ledger
+SUBSCRIPTION = 0
+WITHDRAWAL = 1
+TRANSACTION = 2
+# A portfolio event appended as is, by the live brokers when they synchronize their transactions
+EVENT = 3
+# Types and descriptions of the portfolio events of each type of row, the appended events have their own
+EVENT_TYPES = ["subscription", "withdrawal", "symbol_transaction", None]
+EVENT_DESCRIPTIONS = ["SUBSCRIPTION", "WITHDRAWAL", None, None]
+# Action, direction, size, asset, price and date of a transaction
+TRANSACTION_DESCRIPTION = "%s %s %s %s %s %s"
+
+ACTIONS = list(Action)
+DIRECTIONS = list(Direction)
+# Flags of the transactions whose size or price is an integer, so that they are rendered as they were given
+SIZE_IS_INTEGER = 1
+PRICE_IS_INTEGER = 2
+
+COLUMNS = {
+    "type": "b",
+    "timestamp": "q",
+    "timezone": "b",
+    "asset": "q",
+    "action": "b",
+    "direction": "b",
+    "flags": "b",
+    "size": "d",
+    "price": "d",
+    "commission": "d",
+    "amount": "d",
+    "balance": "d",
+}
+
+
+def to_epoch_ns(timestamp: datetime) -> int:
+    if isinstance(timestamp, pd.Timestamp):
+        return timestamp.value
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // ONE_MICROSECOND * 1000
+
+
+def from_epoch_ns(epoch_ns: int, tz) -> datetime:
+    timestamp = EPOCH + timedelta(microseconds=epoch_ns // 1000)
+    if tz is None:
+        return timestamp.replace(tzinfo=None)
+    return timestamp.astimezone(tz)
+
+
+class LedgerSegment:
+    """
+    Rows of the ledger written to a file: only the position of the segment is kept in memory
+    """
+
+    def __init__(self, start: int, nb_rows: int, path: str) -> None:
+        self.start = start
+        self.nb_rows = nb_rows
+        self.path = path
+
+    def load(self) -> dict[str, Any]:
+        with open(self.path, "rb") as file:
+            return pickle.load(file)
+
+
+class TransactionLedger:
+    """
+    Cash events and transactions of a portfolio stored column by column in typed arrays. The assets and the
+    timezones are stored once and referenced by their index. The portfolio events and the transactions are only
+    created, descriptions included, when they are read.
+
+    When a directory is given, the rows are written to a new file of this directory every segment_size rows, so the
+    memory used by the ledger is bounded however long the backtest.
+
+    :param directory: The directory of the segments, the rows are kept in memory if None
+    :type directory: str
+    :param segment_size: The number of rows of each segment
+    :type segment_size: int
+    """
+
+    def __init__(
+        self, directory: str = None, segment_size: int = DEFAULT_SEGMENT_SIZE
+    ) -> None:
+        if segment_size <= 0:
+            raise Exception(
+                f"The segment size of the ledger should be positive, got {segment_size}"
+            )
+        self.directory = directory
+        self.segment_size = segment_size
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.assets: list[Asset] = []
+        self.asset_ids: dict[Asset, int] = {}
+        self.timezones: list = []
+        self.timezone_ids: dict = {}
+        self.segments: list[LedgerSegment] = []
+        self.buffer_start = 0
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.order_ids = []
+        self.transaction_ids = []
+        self.events: dict[int, PortfolioEvent] = {}
+        # The rows of the transactions, in all the segments
+        self.transaction_rows = array("q")
+        self.loaded_segment_index = None
+        self.loaded_segment = None
+        self.history = PortfolioHistory(self)
+        self.transactions = LedgerTransactions(self)
+
+    def __len__(self) -> int:
+        return self.buffer_start + len(self.columns["type"])
+
+    def _asset_id(self, asset: Asset) -> int:
+        asset_id = self.asset_ids.get(asset)
+        if asset_id is None:
+            asset_id = len(self.assets)
+            self.asset_ids[asset] = asset_id
+            self.assets.append(asset)
+        return asset_id
+
+    def _timezone_id(self, tz) -> int:
+        timezone_id = self.timezone_ids.get(tz)
+        if timezone_id is None:
+            timezone_id = len(self.timezones)
+            self.timezone_ids[tz] = timezone_id
+            self.timezones.append(tz)
+        return timezone_id
+
+    def _append(
+        self,
+        row_type: int,
+        timestamp: datetime,
+        amount: float,
+        balance: float,
+        asset_id: int = -1,
+        action: int = -1,
+        direction: int = -1,
+        flags: int = 0,
+        size: float = 0.0,
+        price: float = 0.0,
+        commission: float = 0.0,
+        order_id=None,
+        transaction_id=None,
+    ) -> int:
+        row = len(self)
+        columns = self.columns
+        columns["type"].append(row_type)
+        columns["timestamp"].append(to_epoch_ns(timestamp))
+        columns["timezone"].append(self._timezone_id(timestamp.tzinfo))
+        columns["asset"].append(asset_id)
+        columns["action"].append(action)
+        columns["direction"].append(direction)
+        columns["flags"].append(flags)
+        columns["size"].append(size)
+        columns["price"].append(price)
+        columns["commission"].append(commission)
+        columns["amount"].append(amount)
+        columns["balance"].append(balance)
+        self.order_ids.append(order_id)
+        self.transaction_ids.append(transaction_id)
+        return row
+
+    def add_subscription(
+        self, amount: float, balance: float, timestamp: datetime
+    ) -> None:
+        self._append(SUBSCRIPTION, timestamp, amount, balance)
+        self._spill_if_full()
+
+    def add_withdrawal(
+        self, amount: float, balance: float, timestamp: datetime
+    ) -> None:
+        self._append(WITHDRAWAL, timestamp, amount, balance)
+        self._spill_if_full()
+
+    def add_transaction(self, transaction: Transaction, cost: float, balance: float) -> None:
+        """
+        :param transaction: The transaction
+        :type transaction: Transaction
+        :param cost: The cost of the transaction, commission included
+        :type cost: float
+        :param balance: The cash balance of the portfolio after the transaction
+        :type balance: float
+        """
+        flags = 0
+        if isinstance(transaction.size, Integral):
+            flags |= SIZE_IS_INTEGER
+        if isinstance(transaction.price, Integral):
+            flags |= PRICE_IS_INTEGER
+        row = self._append(
+            TRANSACTION,
+            transaction.timestamp,
+            cost,
+            balance,
+            asset_id=self._asset_id(transaction.asset),
+            action=ACTIONS.index(transaction.action),
+            direction=DIRECTIONS.index(transaction.direction),
+            flags=flags,
+            size=transaction.size,
+            price=transaction.price,
+            commission=transaction.commission,
+            order_id=transaction.order_id,
+            transaction_id=transaction.transaction_id,
+        )
+        self.transaction_rows.append(row)
+        self._spill_if_full()
+
+    def add_event(self, event: PortfolioEvent) -> None:
+        row = self._append(EVENT, event.timestamp, 0.0, event.balance)
+        self.events[row] = event
+        self._spill_if_full()
+
+    def _spill_if_full(self) -> None:
+        if self.directory is None or len(self.columns["type"]) < self.segment_size:
+            return
+        path = os.path.join(
+            self.directory, "ledger_segment_%06d.pickle" % len(self.segments)
+        )
+        with open(path, "wb") as file:
+            pickle.dump(self._buffer(), file, protocol=pickle.HIGHEST_PROTOCOL)
+        nb_rows = len(self.columns["type"])
+        self.segments.append(LedgerSegment(self.buffer_start, nb_rows, path))
+        self.buffer_start += nb_rows
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.order_ids = []
+        self.transaction_ids = []
+        self.events = {}
+
+    def _buffer(self) -> dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "order_ids": self.order_ids,
+            "transaction_ids": self.transaction_ids,
+            "events": self.events,
+        }
+
+    def _segment_of(self, row: int) -> tuple[dict[str, Any], int]:
+        """
+        :return: The rows of the segment containing the row and its position in them
+        :rtype: tuple[dict[str, Any], int]
+        """
+        if row >= self.buffer_start:
+            return self._buffer(), row - self.buffer_start
+        segment_index = bisect_right([segment.start for segment in self.segments], row) - 1
+        if segment_index != self.loaded_segment_index:
+            self.loaded_segment = self.segments[segment_index].load()
+            self.loaded_segment_index = segment_index
+        return self.loaded_segment, row - self.segments[segment_index].start
+
+    def _iter_segments(self) -> Iterator[dict[str, Any]]:
+        for segment in self.segments:
+            yield segment.load()
+        yield self._buffer()
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        :return: The values of a column for all the rows
+        :rtype: np.ndarray
+        """
+        values = [
+            np.frombuffer(segment["columns"][name], dtype=COLUMNS[name])
+            for segment in self._iter_segments()
+        ]
+        return np.concatenate(values)
+
+    def event(self, row: int) -> PortfolioEvent:
+        """
+        Create the portfolio event of a row
+        """
+        segment, index = self._segment_of(row)
+        columns = segment["columns"]
+        row_type = columns["type"][index]
+        if row_type == EVENT:
+            return segment["events"][row]
+        timestamp = from_epoch_ns(
+            columns["timestamp"][index], self.timezones[columns["timezone"][index]]
+        )
+        amount = columns["amount"][index]
+        balance = columns["balance"][index]
+        if row_type == SUBSCRIPTION:
+            return PortfolioEvent.create_subscription(amount, balance, timestamp)
+        if row_type == WITHDRAWAL:
+            return PortfolioEvent.create_withdrawal(amount, balance, timestamp)
+        transaction = self._transaction(segment, index, row)
+        description = TRANSACTION_DESCRIPTION % (
+            transaction.action.name,
+            transaction.direction.name,
+            transaction.size,
+            transaction.asset.key().upper(),
+            transaction.price,
+            datetime.strftime(transaction.timestamp, "%d/%m/%Y"),
+        )
+        if transaction.action == Action.BUY:
+            return TransactionEvent(
+                timestamp=timestamp,
+                description=description,
+                debit=amount,
+                credit=0.0,
+                balance=balance,
+                direction=transaction.direction.name,
+            )
+        return TransactionEvent(
+            timestamp=timestamp,
+            description=description,
+            debit=0.0,
+            credit=-1.0 * round(amount, 2),
+            balance=round(balance, 2),
+            direction=transaction.direction.name,
+        )
+
+    def _transaction(self, segment: dict[str, Any], index: int, row: int) -> Transaction:
+        columns = segment["columns"]
+        flags = columns["flags"][index]
+        size = columns["size"][index]
+        price = columns["price"][index]
+        return Transaction(
+            asset=self.assets[columns["asset"][index]],
+            size=int(size) if flags & SIZE_IS_INTEGER else size,
+            action=ACTIONS[columns["action"][index]],
+            direction=DIRECTIONS[columns["direction"][index]],
+            price=int(price) if flags & PRICE_IS_INTEGER else price,
+            order_id=segment["order_ids"][index],
+            commission=columns["commission"][index],
+            timestamp=from_epoch_ns(
+                columns["timestamp"][index], self.timezones[columns["timezone"][index]]
+            ),
+            transaction_id=segment["transaction_ids"][index],
+        )
+
+    def transaction(self, row: int) -> Transaction:
+        """
+        Create the transaction of a row
+        """
+        segment, index = self._segment_of(row)
+        return self._transaction(segment, index, row)
+
+    def _timestamp_index(self, mask: np.ndarray, name: str) -> pd.DatetimeIndex:
+        timestamps = self.column("timestamp")[mask]
+        timezones = set(self.timezones[tz_id] for tz_id in np.unique(self.column("timezone")[mask]))
+        if timezones == {None}:
+            return pd.DatetimeIndex(pd.to_datetime(timestamps), name=name)
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True), name=name)
+        if len(timezones) == 1:
+            index = index.tz_convert(timezones.pop())
+        return index
+
+    def transactions_df(self) -> pd.DataFrame:
+        """
+        The transactions as expected by the statistics: the signed size, price and symbol of each transaction, indexed
+        by their timestamp. The dataframe is built from the columns of the ledger.
+        """
+        mask = self.column("type") == TRANSACTION
+        sizes = self.column("size")[mask]
+        flags = self.column("flags")[mask]
+        if (flags & SIZE_IS_INTEGER).all():
+            sizes = sizes.astype(np.int64)
+        sell = self.column("action")[mask] == ACTIONS.index(Action.SELL)
+        symbols = np.array([asset.key() for asset in self.assets] + [None], dtype=object)
+        return pd.DataFrame(
+            {
+                "amount": np.where(sell, -sizes, sizes),
+                "price": self.column("price")[mask],
+                "symbol": symbols[self.column("asset")[mask]],
+            },
+            index=self._timestamp_index(mask, "Timestamp"),
+        )
+
+    def _transaction_descriptions(self, mask: np.ndarray) -> list[str]:
+        """
+        :return: The descriptions of the transactions of the rows of the mask, as in their portfolio events
+        :rtype: list[str]
+        """
+        timestamps = self.column("timestamp")[mask]
+        timezone_ids = self.column("timezone")[mask]
+        dates = np.empty(len(timestamps), dtype=object)
+        for timezone_id in np.unique(timezone_ids):
+            tz = self.timezones[timezone_id]
+            same_timezone = timezone_ids == timezone_id
+            datetimes = pd.to_datetime(timestamps[same_timezone], utc=tz is not None)
+            if tz is not None:
+                datetimes = datetimes.tz_convert(tz)
+            dates[same_timezone] = datetimes.strftime("%d/%m/%Y")
+        asset_keys = [asset.key().upper() for asset in self.assets]
+        return [
+            TRANSACTION_DESCRIPTION
+            % (
+                ACTIONS[action].name,
+                DIRECTIONS[direction].name,
+                int(size) if flags & SIZE_IS_INTEGER else size,
+                asset_keys[asset_id],
+                int(price) if flags & PRICE_IS_INTEGER else price,
+                date,
+            )
+            for action, direction, flags, size, asset_id, price, date in zip(
+                self.column("action")[mask].tolist(),
+                self.column("direction")[mask].tolist(),
+                self.column("flags")[mask].tolist(),
+                self.column("size")[mask].tolist(),
+                self.column("asset")[mask].tolist(),
+                self.column("price")[mask].tolist(),
+                dates,
+            )
+        ]
+
+    def history_df(self) -> pd.DataFrame:
+        """
+        The portfolio events as a dataframe indexed by their timestamp. The dataframe is built from the columns of the
+        ledger, only the descriptions of the transactions and the appended events are handled row by row.
+        """
+        types = self.column("type")
+        amounts = self.column("amount")
+        balances = self.column("balance")
+        rounded_amounts = np.round(amounts, 2)
+        subscription = types == SUBSCRIPTION
+        transaction = types == TRANSACTION
+        buy = transaction & (self.column("action") == ACTIONS.index(Action.BUY))
+        sell = transaction & ~buy
+        event_types = np.array(EVENT_TYPES, dtype=object)[types]
+        descriptions = np.array(EVENT_DESCRIPTIONS, dtype=object)[types]
+        descriptions[transaction] = self._transaction_descriptions(transaction)
+        debits = np.select([types == WITHDRAWAL, buy], [rounded_amounts, amounts], 0.0)
+        credits = np.select([subscription, sell], [rounded_amounts, -1.0 * rounded_amounts], 0.0)
+        balances = np.where(buy, balances, np.round(balances, 2))
+        for segment in self._iter_segments():
+            for row, event in segment["events"].items():
+                event_types[row] = event.type
+                descriptions[row] = event.description
+                debits[row] = event.debit
+                credits[row] = event.credit
+                balances[row] = event.balance
+        return pd.DataFrame(
+            {
+                "type": event_types,
+                "description": descriptions,
+                "debit": debits,
+                "credit": credits,
+                "balance": balances,
+            },
+            index=self._timestamp_index(np.full(len(types), True), "timestamp"),
+        )
+
+    def rows(self) -> Iterator[tuple]:
+        """
+        The raw values of each row, with the assets and timezones they reference
+        """
+        for segment in self._iter_segments():
+            columns = segment["columns"]
+            for index in range(len(columns["type"])):
+                values = [columns[name][index] for name in COLUMNS]
+                asset_id = columns["asset"][index]
+                yield (
+                    *values,
+                    self.assets[asset_id] if asset_id >= 0 else None,
+                    self.timezones[columns["timezone"][index]],
+                    segment["order_ids"][index],
+                    segment["transaction_ids"][index],
+                )
+
+    def __eq__(self, other: "TransactionLedger") -> bool:
+        if not isinstance(other, TransactionLedger) or len(self) != len(other):
+            return False
+        return list(self.rows()) == list(other.rows()) and list(self.history) == list(
+            other.history
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["loaded_segment_index"] = None
+        state["loaded_segment"] = None
+        return state
+
+
+class PortfolioHistory:
+    """
+    The portfolio events of a ledger, in order. The events are created when they are read.
+    """
+
+    def __init__(self, ledger: TransactionLedger) -> None:
+        self.ledger = ledger
+
+    def __len__(self) -> int:
+        return len(self.ledger)
+
+    def __getitem__(self, index: int | slice) -> PortfolioEvent | list[PortfolioEvent]:
+        if isinstance(index, slice):
+            return [self.ledger.event(row) for row in range(len(self))[index]]
+        return self.ledger.event(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[PortfolioEvent]:
+        for row in range(len(self)):
+            yield self.ledger.event(row)
+
+    def append(self, event: PortfolioEvent) -> None:
+        self.ledger.add_event(event)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PortfolioHistory):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class LedgerTransactions:
+    """
+    The transactions of a ledger, in order. The transactions are created when they are read.
+    """
+
+    def __init__(self, ledger: TransactionLedger) -> None:
+        self.ledger = ledger
+
+    def __len__(self) -> int:
+        return len(self.ledger.transaction_rows)
+
+    def __getitem__(self, index: int | slice) -> Transaction | list[Transaction]:
+        rows = self.ledger.transaction_rows
+        if isinstance(index, slice):
+            return [self.ledger.transaction(row) for row in rows[index]]
+        return self.ledger.transaction(rows[index])
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for row in self.ledger.transaction_rows:
+            yield self.ledger.transaction(row)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
@@ -1,4 +1,5 @@
 import copy
+import logging
 import os
 from datetime import datetime
 
@@ -11,7 +12,7 @@ from trazy_analysis.common.helper import get_or_create_nested_dict
 from trazy_analysis.logger import logger
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.enums import Action
-from trazy_analysis.portfolio.portfolio_event import PortfolioEvent, TransactionEvent
+from trazy_analysis.portfolio.ledger import TransactionLedger
 from trazy_analysis.position.position_handler import PositionHandler
 from trazy_analysis.position.transaction import Transaction
 
@@ -20,6 +21,41 @@ LOG = trazy_analysis.logger.get_root_logger(
 )
 
 
+class PortfolioSnapshot:
+    """
+    The cash and the totals of a portfolio at a point in time. A snapshot can be passed back to Portfolio.snapshot to
+    be refilled in place instead of allocating a new one on every bar.
+    """
+
+    __slots__ = (
+        "cash",
+        "total_market_value",
+        "total_equity",
+        "total_unrealised_pnl",
+        "total_realised_pnl",
+        "total_pnl",
+    )
+
+    def __init__(
+        self,
+        cash: float = 0.0,
+        total_market_value: float = 0.0,
+        total_equity: float = 0.0,
+        total_unrealised_pnl: float = 0.0,
+        total_realised_pnl: float = 0.0,
+        total_pnl: float = 0.0,
+    ) -> None:
+        self.cash = cash
+        self.total_market_value = total_market_value
+        self.total_equity = total_equity
+        self.total_unrealised_pnl = total_unrealised_pnl
+        self.total_realised_pnl = total_realised_pnl
+        self.total_pnl = total_pnl
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class Portfolio:
     """
     Represents a portfolio of symbols. It contains a cash
@@ -38,6 +74,9 @@ class Portfolio:
         An identifier for the portfolio.
     name: str, optional
         The human-readable name of the portfolio.
+    ledger_directory: str, optional
+        The directory where the ledger of the cash events and transactions
+        is written by segments. The ledger is kept in memory if None.
     """
 
     def __init__(
@@ -47,6 +86,7 @@ class Portfolio:
         portfolio_id: str = None,
         name: str = None,
         timestamp: datetime = datetime.now(pytz.UTC),
+        ledger_directory: str = None,
     ) -> None:
         """
         Initialise the Portfolio object with a PositionHandler,
@@ -59,8 +99,7 @@ class Portfolio:
         self.name = name
 
         self.pos_handler = PositionHandler()
-        self.history = []
-        self.transactions = []
+        self.ledger = TransactionLedger(ledger_directory)
 
         self.logger = LOG
         self.logger.info('Portfolio "%s" instance initialised' % (self.portfolio_id,))
@@ -77,10 +116,8 @@ class Portfolio:
         self.cash = copy.copy(self.starting_cash)
 
         if self.starting_cash > 0.0:
-            self.history.append(
-                PortfolioEvent.create_subscription(
-                    self.starting_cash, self.starting_cash, timestamp
-                )
+            self.ledger.add_subscription(
+                self.starting_cash, self.starting_cash, timestamp
             )
 
         self.logger.info(
@@ -94,6 +131,21 @@ class Portfolio:
             )
         )
 
+    @property
+    def history(self):
+        """
+        The cash events and transactions of the portfolio, as PortfolioEvent
+        instances created when they are read.
+        """
+        return self.ledger.history
+
+    @property
+    def transactions(self):
+        """
+        The transactions of the portfolio, created when they are read.
+        """
+        return self.ledger.transactions
+
     @property
     def total_market_value(self) -> float:
         """
@@ -143,9 +195,7 @@ class Portfolio:
 
         self.cash += amount
 
-        self.history.append(
-            PortfolioEvent.create_subscription(amount, self.cash, timestamp)
-        )
+        self.ledger.add_subscription(amount, self.cash, timestamp)
 
         self.logger.info(
             '%s - Funds subscribed to portfolio "%s" '
@@ -179,9 +229,7 @@ class Portfolio:
 
         self.cash -= amount
 
-        self.history.append(
-            PortfolioEvent.create_withdrawal(amount, self.cash, timestamp)
-        )
+        self.ledger.add_withdrawal(amount, self.cash, timestamp)
 
         self.logger.info(
             '%s - Funds withdrawn from portfolio "%s" '
@@ -214,63 +262,34 @@ class Portfolio:
 
         self.cash -= txn_total_cost
 
-        # Form Portfolio history details
-        action = txn.action.name
-        direction = txn.direction.name
-        description = "%s %s %s %s %s %s" % (
-            action,
-            direction,
-            txn.size,
-            txn.asset.key().upper(),
-            txn.price,
-            datetime.strftime(txn.timestamp, "%d/%m/%Y"),
-        )
+        self.ledger.add_transaction(txn, txn_total_cost, self.cash)
+
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         if txn.action == Action.BUY:
-            pe = TransactionEvent(
-                timestamp=txn.timestamp,
-                description=description,
-                debit=txn_total_cost,
-                credit=0.0,
-                balance=self.cash,
-                direction=direction,
-            )
             self.logger.info(
                 '(%s) Symbol "%s" %s %s in portfolio "%s" '
-                "- Debit: %s, Balance: %s"
-                % (
-                    txn.timestamp.strftime(DATE_FORMAT),
-                    txn.asset,
-                    txn.action.name,
-                    direction,
-                    self.portfolio_id,
-                    txn_total_cost,
-                    self.cash,
-                )
+                "- Debit: %s, Balance: %s",
+                txn.timestamp.strftime(DATE_FORMAT),
+                txn.asset,
+                txn.action.name,
+                txn.direction.name,
+                self.portfolio_id,
+                txn_total_cost,
+                self.cash,
             )
         else:
-            pe = TransactionEvent(
-                timestamp=txn.timestamp,
-                description=description,
-                debit=0.0,
-                credit=-1.0 * round(txn_total_cost, 2),
-                balance=round(self.cash, 2),
-                direction=direction,
-            )
             self.logger.info(
                 '(%s) Symbol "%s" %s %s in portfolio "%s" '
-                "- Credit: %s, Balance: %s"
-                % (
-                    txn.timestamp.strftime(DATE_FORMAT),
-                    txn.asset,
-                    txn.action.name,
-                    direction,
-                    self.portfolio_id,
-                    -1.0 * txn_total_cost,
-                    self.cash,
-                )
+                "- Credit: %s, Balance: %s",
+                txn.timestamp.strftime(DATE_FORMAT),
+                txn.asset,
+                txn.action.name,
+                txn.direction.name,
+                self.portfolio_id,
+                -1.0 * txn_total_cost,
+                self.cash,
             )
-        self.history.append(pe)
-        self.transactions.append(txn)
 
     def portfolio_to_dict(self) -> dict:
         """
@@ -295,6 +314,26 @@ class Portfolio:
                 }
         return holdings
 
+    def snapshot(self, snapshot: PortfolioSnapshot = None) -> PortfolioSnapshot:
+        """
+        Read the cash and the totals of the portfolio. The totals are maintained by the PositionHandler, so taking a
+        snapshot doesn't depend on the number of positions.
+
+        :param snapshot: The snapshot to fill, a new one is created if None
+        :type snapshot: PortfolioSnapshot
+        :return: The filled snapshot
+        :rtype: PortfolioSnapshot
+        """
+        if snapshot is None:
+            snapshot = PortfolioSnapshot()
+        snapshot.cash = self.cash
+        snapshot.total_market_value = self.total_market_value
+        snapshot.total_equity = snapshot.total_market_value + self.cash
+        snapshot.total_unrealised_pnl = self.total_unrealised_pnl
+        snapshot.total_realised_pnl = self.total_realised_pnl
+        snapshot.total_pnl = self.total_pnl
+        return snapshot
+
     def update_market_value_of_symbol(
         self, asset: Asset, current_price: float, timestamp=datetime.now(pytz.UTC)
     ) -> None:
@@ -311,20 +350,13 @@ class Portfolio:
                     "asset %s. Cannot update position." % (current_price, asset)
                 )
 
-            for direction in self.pos_handler.positions[asset]:
-                self.pos_handler.positions[asset][direction].update_price(
-                    current_price, timestamp
-                )
+            self.pos_handler.update_price(asset, current_price, timestamp)
 
     def history_to_df(self) -> pd.DataFrame:
         """
         Creates a Pandas DataFrame of the Portfolio history.
         """
-        records = [pe.to_dict() for pe in self.history]
-        return pd.DataFrame.from_records(
-            records,
-            columns=["timestamp", "type", "description", "debit", "credit", "balance"],
-        ).set_index(keys=["timestamp"])
+        return self.ledger.history_df()
 
     def __eq__(self, other):
         if not isinstance(other, Portfolio):
@@ -1,3 +1,8 @@
+import math
+from datetime import datetime
+
+import pytz
+
 from trazy_analysis.common.helper import get_or_create_nested_dict
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.enums import Direction
@@ -5,10 +10,41 @@ from trazy_analysis.position.position import Position
 from trazy_analysis.position.transaction import Transaction
 
 
+class RunningSum:
+    """
+    A sum updated when one of its terms is added or removed, without summing all the terms again. The sum is kept
+    exact as a list of non-overlapping partial sums, so it doesn't drift however many times its terms are updated.
+    Adding a term costs one step per partial sum: there are only a few of them as long as the terms don't span a huge
+    range of magnitudes, but it isn't constant time in general.
+    """
+
+    def __init__(self) -> None:
+        self.partials = []
+
+    def add(self, value: float) -> None:
+        index = 0
+        for partial in self.partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                self.partials[index] = low
+                index += 1
+            value = high
+        self.partials[index:] = [value]
+
+    @property
+    def value(self) -> float:
+        return math.fsum(self.partials)
+
+
 class PositionHandler:
     """
     A class that keeps track of, and updates, the current
     list of Position instances stored in a Portfolio entity.
+    The totals of the positions are maintained on each transaction
+    and price update, so they are obtained in constant time.
     """
 
     def __init__(self) -> None:
@@ -17,6 +53,55 @@ class PositionHandler:
         an ordered dictionary containing the current positions.
         """
         self.positions = {}
+        # The market value, unrealised, realised and total P&Ls of each position, as added to the running sums
+        self.contributions = {}
+        self.market_value_sum = RunningSum()
+        self.unrealised_pnl_sum = RunningSum()
+        self.realised_pnl_sum = RunningSum()
+        self.pnl_sum = RunningSum()
+
+    def _update_contribution(self, asset: Asset, direction: Direction) -> None:
+        """
+        Replace the previous values of a position in the running sums by its current ones
+        """
+        key = (asset, direction)
+        previous_contribution = self.contributions.pop(key, None)
+        if previous_contribution is not None:
+            market_value, unrealised_pnl, realised_pnl, total_pnl = previous_contribution
+            self.market_value_sum.add(-market_value)
+            self.unrealised_pnl_sum.add(-unrealised_pnl)
+            self.realised_pnl_sum.add(-realised_pnl)
+            self.pnl_sum.add(-total_pnl)
+        if asset not in self.positions or direction not in self.positions[asset]:
+            return
+        position = self.positions[asset][direction]
+        contribution = (
+            position.market_value,
+            position.unrealised_pnl,
+            position.realised_pnl,
+            position.total_pnl,
+        )
+        self.contributions[key] = contribution
+        market_value, unrealised_pnl, realised_pnl, total_pnl = contribution
+        self.market_value_sum.add(market_value)
+        self.unrealised_pnl_sum.add(unrealised_pnl)
+        self.realised_pnl_sum.add(realised_pnl)
+        self.pnl_sum.add(total_pnl)
+
+    def set_position(self, asset: Asset, direction: Direction, position: Position) -> None:
+        """
+        Replace the position of an asset and direction, like the positions synchronized from a broker account
+        """
+        get_or_create_nested_dict(self.positions, asset)
+        self.positions[asset][direction] = position
+        self._update_contribution(asset, direction)
+
+    def remove_position(self, asset: Asset, direction: Direction) -> None:
+        if asset in self.positions and direction in self.positions[asset]:
+            del self.positions[asset][direction]
+            if len(self.positions[asset]) == 0:
+                del self.positions[asset]
+        self._update_contribution(asset, direction)
 
     def position_size(self, asset: Asset, direction: Direction) -> int:
         return self.positions[asset][direction].net_size
@@ -39,46 +124,43 @@ class PositionHandler:
             del self.positions[asset][transaction.direction]
             if len(self.positions[asset]) == 0:
                 del self.positions[asset]
+        self._update_contribution(asset, transaction.direction)
+
+    def update_price(
+        self, asset: Asset, price: float, timestamp: datetime = datetime.now(pytz.UTC)
+    ) -> None:
+        """
+        Update the price of the positions of the asset
+        """
+        if asset not in self.positions:
+            return
+        for direction, position in self.positions[asset].items():
+            position.update_price(price, timestamp)
+            self._update_contribution(asset, direction)
 
     def total_market_value(self) -> float:
         """
         Calculate the sum of all the positions' market values.
         """
-        market_value = 0.0
-        for values in self.positions.values():
-            for pos in values.values():
-                market_value += pos.market_value
-        return market_value
+        return self.market_value_sum.value
 
     def total_unrealised_pnl(self) -> float:
         """
         Calculate the sum of all the positions' unrealised P&Ls.
         """
-        unrealised_pnl = 0.0
-        for values in self.positions.values():
-            for pos in values.values():
-                unrealised_pnl += pos.unrealised_pnl
-        return unrealised_pnl
+        return self.unrealised_pnl_sum.value
 
     def total_realised_pnl(self) -> float:
         """
         Calculate the sum of all the positions' realised P&Ls.
         """
-        realised_pnl = 0.0
-        for values in self.positions.values():
-            for pos in values.values():
-                realised_pnl += pos.realised_pnl
-        return realised_pnl
+        return self.realised_pnl_sum.value
 
     def total_pnl(self) -> float:
         """
         Calculate the sum of all the positions' P&Ls.
         """
-        total_pnl = 0.0
-        for asset_values in self.positions.values():
-            for pos in asset_values.values():
-                total_pnl += pos.total_pnl
-        return total_pnl
+        return self.pnl_sum.value
 
     def __eq__(self, other):
         if not isinstance(other, PositionHandler):
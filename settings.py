@@ -45,4 +45,6 @@ KUCOIN_API_KEY = os.environ.get("KUCOIN_API_KEY")
 KUCOIN_API_SECRET = os.environ.get("KUCOIN_API_SECRET")
 KUCOIN_API_PASSPHRASE = os.environ.get("KUCOIN_API_PASSPHRASE")
 
+METADATA_CACHE_DIRECTORY = os.environ.get("METADATA_CACHE_DIRECTORY")
+
 ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,83 @@
+import math
+from datetime import datetime
+
+import numpy as np
+
+
+class RunningMetrics:
+    """
+    Equity metrics updated incrementally, in constant time for each new equity value, so that they can be read while
+    a backtest is running. The Sharpe ratio is computed like in Statistics, from the returns between two updates.
+    """
+
+    def __init__(self, periods: int = 252):
+        self.periods = periods
+        self.nb_updates = 0
+        self.initial_equity = None
+        self.equity = None
+        self.peak_equity = None
+        self.max_drawdown = 0.0
+        # Welford's algorithm for the mean and variance of the returns
+        self.nb_returns = 0
+        self.returns_mean = 0.0
+        self.returns_m2 = 0.0
+
+    def update(self, equity: float) -> None:
+        if self.equity is None:
+            self.initial_equity = equity
+            self.peak_equity = equity
+        elif self.equity != 0:
+            period_return = equity / self.equity - 1.0
+            self.nb_returns += 1
+            delta = period_return - self.returns_mean
+            self.returns_mean += delta / self.nb_returns
+            self.returns_m2 += delta * (period_return - self.returns_mean)
+        self.nb_updates += 1
+        self.equity = equity
+        self.peak_equity = max(self.peak_equity, equity)
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+
+    @property
+    def total_return(self) -> float:
+        if self.equity is None or self.initial_equity == 0:
+            return 0.0
+        return self.equity / self.initial_equity - 1.0
+
+    @property
+    def drawdown(self) -> float:
+        if self.equity is None or self.peak_equity == 0:
+            return 0.0
+        return 1.0 - self.equity / self.peak_equity
+
+    @property
+    def sharpe_ratio(self) -> float:
+        if self.nb_returns == 0:
+            return 0.0
+        std = np.sqrt(self.returns_m2 / self.nb_returns)
+        if std == 0:
+            # Constant returns: no excess return is worth nothing, the sign of the others is all that is known
+            return 0.0 if self.returns_mean == 0 else math.copysign(math.inf, self.returns_mean)
+        return np.sqrt(self.periods) * self.returns_mean / std
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "equity": self.equity,
+            "total_return": self.total_return,
+            "drawdown": self.drawdown,
+            "max_drawdown": self.max_drawdown,
+            "sharpe_ratio": self.sharpe_ratio,
+        }
+
+
+class Checkpoint:
+    """
+    Intermediate report of a running backtest
+    """
+
+    def __init__(self, step: int, timestamp: datetime, metrics: RunningMetrics):
+        self.step = step
+        self.timestamp = timestamp
+        self.metrics = metrics
+
+    def __str__(self) -> str:
+        return f"Checkpoint(step={self.step}, timestamp={self.timestamp}, metrics={self.metrics.to_dict()})"
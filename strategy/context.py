@@ -6,8 +6,9 @@ from typing import Dict, List
 import trazy_analysis.logger
 import trazy_analysis.settings
 from trazy_analysis.broker.broker_manager import BrokerManager
-from trazy_analysis.common.constants import MAX_TIMESTAMP
+from trazy_analysis.common.constants import MAX_EPOCH_NS, MAX_TIMESTAMP
 from trazy_analysis.common.helper import get_or_create_nested_dict
+from trazy_analysis.common.notification import NotificationDispatcher
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.candle import Candle
 from trazy_analysis.models.event import Event
@@ -29,12 +30,15 @@ class Context:
         order_manager: OrderManager,
         broker_manager: BrokerManager,
         events: deque,
+        notification_dispatcher: NotificationDispatcher = None,
     ):
         """
         It creates a dictionary of dictionaries of deques
 
         :param assets: dict[Asset, list[timedelta]]
         :type assets: dict[Asset, list[timedelta]]
+        :param notification_dispatcher: Sends the notifications of the strategies, they are dropped if None
+        :type notification_dispatcher: NotificationDispatcher
         """
         self.candles: dict[Asset, dict[timedelta, deque]] = {
             asset: {time_unit: deque() for time_unit in assets[asset]}
@@ -44,7 +48,9 @@ class Context:
         self.order_manager = order_manager
         self.broker_manager = broker_manager
         self.events = events
+        self.notification_dispatcher = notification_dispatcher
         self.current_timestamp = MAX_TIMESTAMP
+        self.current_epoch_ns = MAX_EPOCH_NS
 
     def add_candle(self, candle: Candle) -> None:
         """
@@ -57,7 +63,9 @@ class Context:
         if candle.time_unit not in self.candles[candle.asset]:
             self.candles[candle.asset][candle.time_unit] = deque()
         self.candles[candle.asset][candle.time_unit].append(candle)
-        self.current_timestamp = min(self.current_timestamp, candle.timestamp)
+        if candle.epoch_ns < self.current_epoch_ns:
+            self.current_epoch_ns = candle.epoch_ns
+            self.current_timestamp = candle.timestamp
 
     def get_last_candles(self) -> list[Candle]:
         """
@@ -91,8 +99,9 @@ class Context:
         unit to the candle
         """
         self.last_candles = {}
-        current_timestamp = self.current_timestamp
-        min_timestamp = next_timestamp = MAX_TIMESTAMP
+        current_epoch_ns = self.current_epoch_ns
+        min_epoch_ns = MAX_EPOCH_NS
+        min_timestamp = MAX_TIMESTAMP
         candles = {asset: list(self.candles[asset]) for asset in self.candles}
         for asset in candles:
             get_or_create_nested_dict(self.last_candles, asset)
@@ -100,18 +109,17 @@ class Context:
                 if len(self.candles[asset][time_unit]) == 0:
                     continue
                 first_candle = self.candles[asset][time_unit].popleft()
-                if first_candle.timestamp >= current_timestamp:
-                    min_timestamp = min(min_timestamp, first_candle.timestamp)
+                if first_candle.epoch_ns >= current_epoch_ns:
+                    if first_candle.epoch_ns < min_epoch_ns:
+                        min_epoch_ns = first_candle.epoch_ns
+                        min_timestamp = first_candle.timestamp
                     self.last_candles[asset][time_unit] = first_candle
-                if len(self.candles[asset][time_unit]) != 0:
-                    next_timestamp = min(
-                        next_timestamp, self.candles[asset][time_unit][0].timestamp
-                    )
-                else:
+                if len(self.candles[asset][time_unit]) == 0:
                     del self.candles[asset][time_unit]
             if len(self.candles[asset]) == 0:
                 del self.candles[asset]
-        if min_timestamp != MAX_TIMESTAMP:
+        if min_epoch_ns != MAX_EPOCH_NS:
+            self.current_epoch_ns = min_epoch_ns
             self.current_timestamp = min_timestamp
 
     def add_event(self, event: Event) -> None:
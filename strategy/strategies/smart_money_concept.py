@@ -86,11 +86,13 @@ class SmartMoneyConcept(Strategy):
                     direction=Direction.LONG,
                 )
             )
+            broker = self.context.broker_manager.get_broker(candle.asset.exchange)
             self.send_notification(
                 f"Signal generated!",
                 f"BUY LONG {str(candle.asset)}",
-                f"{candle.asset.exchange}: Strategy Smart money concepts results so far: "
-                f"cash = {self.context.order_manager.broker_manager.get_broker(candle.asset.exchange).get_portfolio_cash_balance()}, "
-                f"portfolio = {self.context.order_manager.broker_manager.get_broker(candle.asset.exchange).get_portfolio_as_dict()}, "
-                f"total_equity = {self.context.order_manager.broker_manager.get_broker(candle.asset.exchange).get_portfolio_total_equity()}",
+                lambda: f"{candle.asset.exchange}: Strategy Smart money concepts results so far: "
+                f"cash = {broker.get_portfolio_cash_balance()}, "
+                f"portfolio = {broker.get_portfolio_as_dict()}, "
+                f"total_equity = {broker.get_portfolio_total_equity()}",
+                key=f"{self.name}-{candle.asset.key()}",
             )
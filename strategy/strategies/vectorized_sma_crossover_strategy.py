@@ -0,0 +1,49 @@
+from typing import Any
+
+import numpy as np
+import talib
+
+from trazy_analysis.indicators.indicator import CandleIndicator
+from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
+from trazy_analysis.models.parameter import Discrete
+from trazy_analysis.strategy.strategy import VectorizedStrategy
+
+
+class VectorizedSmaCrossoverStrategy(VectorizedStrategy):
+    DEFAULT_PARAMETERS = {
+        "short_sma": 9,
+        "long_sma": 65,
+    }
+
+    DEFAULT_PARAMETERS_SPACE = {
+        "short_sma": Discrete([5, 75]),
+        "long_sma": Discrete([100, 200]),
+    }
+
+    def __init__(
+        self,
+        data: CandleIndicator,
+        parameters: dict[str, Any],
+        indicators: ReactiveIndicators,
+    ):
+        super().__init__(data, parameters, indicators)
+
+    def lookback(self) -> int:
+        # The trends of the candle and of the previous one
+        return max(self.parameters["short_sma"], self.parameters["long_sma"]) + 1
+
+    def generate(self, candle_arrays: dict[str, np.ndarray]) -> np.ndarray:
+        close = candle_arrays["close"]
+        codes = np.full(len(close), self.NO_SIGNAL, dtype=np.int8)
+        if len(close) == 0:
+            return codes
+        short_sma = talib.SMA(close, timeperiod=self.parameters["short_sma"])
+        long_sma = talib.SMA(close, timeperiod=self.parameters["long_sma"])
+        # Same states as the Crossover indicator: the trend is only negative when the short sma is strictly below the
+        # long one, a signal is emitted each time the trend changes after the first candle
+        negative_trend = (short_sma - long_sma) < 0
+        changes = np.flatnonzero(negative_trend[1:] != negative_trend[:-1]) + 1
+        codes[changes] = np.where(
+            negative_trend[changes], self.LONG_EXIT, self.LONG_ENTRY
+        )
+        return codes
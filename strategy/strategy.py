@@ -1,19 +1,21 @@
 import abc
 import os
-from typing import Dict, List, Union, Any
+from typing import Any, Callable, Dict, List, Union
 
-import telegram_send
+import numpy as np
 
 import trazy_analysis.logger
 import trazy_analysis.settings
 from trazy_analysis.common.clock import Clock
+from trazy_analysis.common.helper import candles_to_arrays
 from trazy_analysis.indicators.common import PriceType
 from trazy_analysis.indicators.indicator import CandleIndicator, CandleData
 from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
 from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import Action, Direction
 from trazy_analysis.models.event import SignalEvent
 from trazy_analysis.models.parameter import Parameter
-from trazy_analysis.models.signal import SignalBase
+from trazy_analysis.models.signal import Signal, SignalBase
 from trazy_analysis.strategy.context import Context
 
 LOG = trazy_analysis.logger.get_root_logger(
@@ -105,9 +107,157 @@ class Strategy(StrategyBase):
             if self.signals:
                 self.context.add_event(SignalEvent(self.signals))
 
-    @staticmethod
-    def send_notification(*messages):
-        telegram_send.send(messages=list(messages))
+    def send_notification(self, *messages: str | Callable[[], str], key: str = None) -> None:
+        """
+        Queue a notification, sent in the background by the notification dispatcher of the context. The callable
+        messages are only called when the dispatcher is enabled, by the calling thread: never in backtests.
+
+        :param key: The notification replaces the queued notification having the same key, if any
+        :type key: str
+        """
+        if self.context is None or self.context.notification_dispatcher is None:
+            return
+        self.context.notification_dispatcher.notify(*messages, key=key)
+
+
+# > This class is a single asset strategy whose signals are computed at once from the whole candles history
+class VectorizedStrategy(Strategy):
+    """
+    generate receives the candles columns and returns one signal code per candle. The event loop still replays every
+    candle through the order manager and the brokers so fills, order types and fees are the same as with a per candle
+    strategy, but the strategy itself only costs a lookup per candle.
+
+    The signal of a candle must only depend on this candle and the previous ones, like in a per candle strategy.
+    The candles coming after the history, in live trading, are appended to preallocated arrays and the signal of each
+    new candle is computed from the last lookback() candles only, or from the whole history when the lookback is None.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    NO_SIGNAL = 0
+    LONG_ENTRY = 1
+    LONG_EXIT = -1
+    SHORT_ENTRY = 2
+    SHORT_EXIT = -2
+    SIGNAL_CODES = {
+        LONG_ENTRY: (Action.BUY, Direction.LONG),
+        LONG_EXIT: (Action.SELL, Direction.LONG),
+        SHORT_ENTRY: (Action.SELL, Direction.SHORT),
+        SHORT_EXIT: (Action.BUY, Direction.SHORT),
+    }
+
+    def __init__(
+        self,
+        data: CandleIndicator,
+        parameters: dict[str, Any],
+        indicators: ReactiveIndicators,
+    ):
+        # The price indicators of Strategy are not needed, the candles are read from the history
+        StrategyBase.__init__(self, data, parameters, indicators)
+        self.asset = data.asset
+        self.time_unit = data.time_unit
+        self.candle_arrays: dict[str, np.ndarray] = candles_to_arrays([])
+        # The candle arrays are the first nb_candles values of the buffers, which grow by doubling their capacity
+        self.candle_buffers: dict[str, np.ndarray] = self.candle_arrays
+        self.nb_candles = 0
+        self.signal_codes: dict[int, int] = {}
+        self.last_epoch_ns: int = None
+
+    def lookback(self) -> int | None:
+        """
+        :return: The number of candles, the last one included, the signal of a candle depends on, at least the
+            longest period of the indicators. None if the signal depends on the whole history.
+        :rtype: int | None
+        """
+        return None
+
+    @abc.abstractmethod
+    def generate(
+        self, candle_arrays: dict[str, np.ndarray]
+    ) -> np.ndarray:  # pragma: no cover
+        """
+        Compute the signals of all the candles
+
+        :param candle_arrays: The epochs in nanoseconds of the candles under "timestamp" and their open, high, low,
+        close and volume
+        :type candle_arrays: dict[str, np.ndarray]
+        :return: One signal code per candle, NO_SIGNAL when the candle doesn't trigger a signal
+        :rtype: np.ndarray
+        """
+        raise NotImplementedError
+
+    def prepare(self, candles: np.array) -> None:
+        """
+        Compute the signals of the candles history at once
+
+        :param candles: The candles history
+        :type candles: np.array
+        """
+        self.candle_arrays = self.candle_buffers = candles_to_arrays(candles)
+        self.nb_candles = len(candles)
+        self.update_signal_codes()
+
+    def generate_codes(self, candle_arrays: dict[str, np.ndarray]) -> np.ndarray:
+        codes = np.asarray(self.generate(candle_arrays))
+        if len(codes) != len(candle_arrays["timestamp"]):
+            raise Exception(
+                f"{self.name} generated {len(codes)} signal codes for {len(candle_arrays['timestamp'])} candles"
+            )
+        return codes
+
+    def update_signal_codes(self) -> None:
+        codes = self.generate_codes(self.candle_arrays)
+        epochs = self.candle_arrays["timestamp"]
+        signal_indexes = np.flatnonzero(codes)
+        self.signal_codes = dict(
+            zip(epochs[signal_indexes].tolist(), codes[signal_indexes].tolist())
+        )
+        self.last_epoch_ns = int(epochs[-1]) if len(epochs) != 0 else None
+
+    def append_candle(self, candle: Candle) -> None:
+        """
+        Add a candle that is not part of the history, in live trading, and compute its signal
+        """
+        if self.nb_candles == len(self.candle_buffers["timestamp"]):
+            capacity = max(2 * self.nb_candles, 1)
+            for column, buffer in self.candle_buffers.items():
+                grown_buffer = np.empty(capacity, dtype=buffer.dtype)
+                grown_buffer[: self.nb_candles] = buffer[: self.nb_candles]
+                self.candle_buffers[column] = grown_buffer
+        new_candle_arrays = candles_to_arrays([candle])
+        for column, buffer in self.candle_buffers.items():
+            buffer[self.nb_candles] = new_candle_arrays[column][0]
+        self.nb_candles += 1
+        self.candle_arrays = {
+            column: buffer[: self.nb_candles]
+            for column, buffer in self.candle_buffers.items()
+        }
+
+        # The signals of the previous candles are already known
+        lookback = self.lookback()
+        start = 0 if lookback is None else max(self.nb_candles - lookback, 0)
+        codes = self.generate_codes(
+            {column: array[start:] for column, array in self.candle_arrays.items()}
+        )
+        if codes[-1] != self.NO_SIGNAL:
+            self.signal_codes[candle.epoch_ns] = int(codes[-1])
+        self.last_epoch_ns = candle.epoch_ns
+
+    def current(self, candle: Candle) -> None:
+        if self.last_epoch_ns is None or candle.epoch_ns > self.last_epoch_ns:
+            self.append_candle(candle)
+        code = self.signal_codes.get(candle.epoch_ns)
+        if code is None:
+            return
+        action, direction = self.SIGNAL_CODES[code]
+        self.add_signal(
+            Signal(
+                asset=candle.asset,
+                time_unit=candle.time_unit,
+                action=action,
+                direction=direction,
+            )
+        )
 
 
 # It's a strategy that can trade multiple assets
@@ -0,0 +1,321 @@
+import multiprocessing
+import os
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from multiprocessing.connection import Connection
+from typing import Any
+
+import numpy as np
+from pandas_market_calendars import MarketCalendar
+from pandas_market_calendars.exchange_calendar_iex import IEXExchangeCalendar
+
+import trazy_analysis.logger
+import trazy_analysis.settings
+from trazy_analysis.common.clock import Clock, SimulatedClock
+from trazy_analysis.indicators.indicator import CandleData
+from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import IndicatorMode
+from trazy_analysis.models.signal import MultipleSignal, Signal, SignalBase
+from trazy_analysis.strategy.context import Context
+from trazy_analysis.strategy.strategy import (
+    MultiAssetsStrategy,
+    Strategy,
+    VectorizedStrategy,
+)
+
+LOG = trazy_analysis.logger.get_root_logger(
+    __name__, filename=os.path.join(trazy_analysis.settings.ROOT_PATH, "output.log")
+)
+
+
+class StrategyInstanceSpec:
+    """
+    Everything needed to build a strategy instance in a shard. index is the position the instance would have in
+    EventLoop.strategy_instances, it is used to merge the signals of all the shards in the sequential order.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        strategy_class: type,
+        parameters: dict[str, Any],
+        asset: Asset = None,
+        time_unit: timedelta = None,
+    ):
+        self.index = index
+        self.strategy_class = strategy_class
+        self.parameters = parameters
+        self.asset = asset
+        self.time_unit = time_unit
+
+
+def strategy_instances_specs(
+    strategies_parameters: dict[type, dict[str, Any]],
+    assets: dict[Asset, list[timedelta]],
+    candles: dict[Asset, dict[timedelta, np.array]],
+) -> list[StrategyInstanceSpec]:
+    """
+    List the strategy instances in the same order as EventLoop._init_strategy_instances
+    """
+    specs = []
+    for strategy_class, parameters in strategies_parameters.items():
+        if issubclass(strategy_class, Strategy):
+            for asset in assets:
+                for time_unit in assets[asset]:
+                    if asset in candles and time_unit in candles[asset]:
+                        specs.append(
+                            StrategyInstanceSpec(
+                                len(specs), strategy_class, parameters, asset, time_unit
+                            )
+                        )
+        elif issubclass(strategy_class, MultiAssetsStrategy):
+            specs.append(StrategyInstanceSpec(len(specs), strategy_class, parameters))
+    return specs
+
+
+def shard_strategy_instances_specs(
+    specs: list[StrategyInstanceSpec], nb_shards: int
+) -> list[list[StrategyInstanceSpec]]:
+    """
+    Split the strategy instances in at most nb_shards shards. Instances trading the same asset are kept together so
+    that they keep sharing their memoized indicators, groups are then spread from the biggest to the smallest on the
+    least loaded shard.
+    """
+    groups = {}
+    for spec in specs:
+        key = spec.asset.key() if spec.asset is not None else None
+        groups.setdefault(key, []).append(spec)
+    shards = [[] for _ in range(min(nb_shards, len(groups)))]
+    for group in sorted(groups.values(), key=lambda group: (-len(group), group[0].index)):
+        min(shards, key=len).extend(group)
+    for shard in shards:
+        shard.sort(key=lambda spec: spec.index)
+    return shards
+
+
+def shard_assets(specs: list[StrategyInstanceSpec]) -> set[Asset] | None:
+    """
+    Assets a shard needs the candles of, None meaning all of them
+    """
+    if any(spec.asset is None for spec in specs):
+        return None
+    return {spec.asset for spec in specs}
+
+
+def set_signals_clock(signals: list[SignalBase], clock: Clock | None) -> None:
+    for signal in signals:
+        if isinstance(signal, Signal):
+            signal.clock = clock
+        elif isinstance(signal, MultipleSignal):
+            set_signals_clock(signal.signals, clock)
+
+
+class StrategyShard:
+    """
+    A subset of the strategy instances with their own indicators, candle data, context and clock, so that the
+    indicators state lives where the strategies run. The clock of the shard follows the time of the event loop clock
+    on the same market calendar.
+    """
+
+    def __init__(
+        self,
+        specs: list[StrategyInstanceSpec],
+        assets: dict[Asset, list[timedelta]],
+        candles: dict[Asset, dict[timedelta, np.array]],
+        indicator_mode: IndicatorMode,
+        market_cal: MarketCalendar = IEXExchangeCalendar(),
+    ):
+        needed_assets = shard_assets(specs)
+        shard_assets_list = [
+            asset for asset in candles if needed_assets is None or asset in needed_assets
+        ]
+        self.indicators = ReactiveIndicators(mode=indicator_mode, memoize=True)
+        self.data = CandleData(
+            candles={asset: candles[asset] for asset in shard_assets_list},
+            indicators=self.indicators,
+        )
+        self.clock = SimulatedClock(market_cal)
+        self.context = Context(
+            assets={asset: assets[asset] for asset in shard_assets_list if asset in assets},
+            order_manager=None,
+            broker_manager=None,
+            events=deque(),
+        )
+        self.strategy_instances = []
+        for spec in specs:
+            if spec.asset is not None:
+                data = self.data(spec.asset, spec.time_unit)
+            else:
+                data = self.data
+            strategy = spec.strategy_class(data, spec.parameters, self.indicators)
+            strategy.set_context(self.context)
+            if isinstance(strategy, VectorizedStrategy):
+                strategy.prepare(self.data.candles[spec.asset][spec.time_unit])
+            self.strategy_instances.append((spec.index, strategy))
+
+    def process(
+        self, candles: list[Candle], epoch_ns: int
+    ) -> list[tuple[int, list[SignalBase]]]:
+        """
+        Push the new candles to the shard indicators and run the strategies
+
+        :param candles: The last candles of the event loop context
+        :type candles: list[Candle]
+        :param epoch_ns: The current time of the event loop clock
+        :type epoch_ns: int
+        :return: The signals of each strategy instance that emitted some, with the instance index
+        :rtype: list[tuple[int, list[SignalBase]]]
+        """
+        self.clock.update_time(epoch_ns)
+        last_candles = {}
+        for candle in candles:
+            if self.data.exists(candle.asset, candle.time_unit):
+                self.data(candle.asset, candle.time_unit).push(candle)
+                last_candles.setdefault(candle.asset, {})[candle.time_unit] = candle
+        self.context.last_candles = last_candles
+
+        results = []
+        for index, strategy in self.strategy_instances:
+            strategy.process_context(self.context, self.clock)
+            signals = []
+            while len(self.context.events) != 0:
+                signals.extend(self.context.events.popleft().signals)
+            if signals:
+                results.append((index, signals))
+        return results
+
+
+def run_shard_worker(connection: Connection, shard_args: tuple) -> None:
+    shard = StrategyShard(*shard_args)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        try:
+            results = shard.process(*message)
+            for _, signals in results:
+                # The clock of the shard is not needed in the main process and is costly to pickle
+                set_signals_clock(signals, None)
+            connection.send(("ok", results))
+        except Exception as e:
+            connection.send(("error", f"{e}\n{traceback.format_exc()}"))
+    connection.close()
+
+
+class ParallelStrategyExecutor:
+    """
+    Run the strategy instances of an event loop in shards, on worker processes or threads. Only strategies that don't
+    read the broker or order manager state can be sharded since they are not available in the shards.
+
+    The signals of all the shards are merged following the order of the sequential execution, so the results are
+    the same as when running sequentially.
+    """
+
+    def __init__(self, nb_workers: int = None, use_processes: bool = True):
+        self.nb_workers = nb_workers if nb_workers is not None else os.cpu_count()
+        self.use_processes = use_processes
+        self.shards = []
+        self.shards_assets = []
+        self.processes = []
+        self.connections = []
+        self.thread_pool = None
+
+    def start(
+        self,
+        strategies_parameters: dict[type, dict[str, Any]],
+        assets: dict[Asset, list[timedelta]],
+        candles: dict[Asset, dict[timedelta, np.array]],
+        indicator_mode: IndicatorMode = IndicatorMode.BATCH,
+        market_cal: MarketCalendar = IEXExchangeCalendar(),
+    ) -> None:
+        """
+        :param market_cal: The market calendar of the event loop clock, read by the strategies through the clock of
+            their shard
+        :type market_cal: MarketCalendar
+        """
+        specs = strategy_instances_specs(strategies_parameters, assets, candles)
+        shards_specs = shard_strategy_instances_specs(specs, self.nb_workers)
+        LOG.info(
+            "Running %s strategy instances in %s shards", len(specs), len(shards_specs)
+        )
+        if self.use_processes:
+            self.shards_assets = [shard_assets(shard_specs) for shard_specs in shards_specs]
+            mp_context = multiprocessing.get_context()
+            for shard_specs in shards_specs:
+                parent_connection, child_connection = mp_context.Pipe()
+                process = mp_context.Process(
+                    target=run_shard_worker,
+                    args=(
+                        child_connection,
+                        (shard_specs, assets, candles, indicator_mode, market_cal),
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                child_connection.close()
+                self.processes.append(process)
+                self.connections.append(parent_connection)
+        else:
+            self.shards = [
+                StrategyShard(shard_specs, assets, candles, indicator_mode, market_cal)
+                for shard_specs in shards_specs
+            ]
+            self.thread_pool = ThreadPoolExecutor(max_workers=max(len(self.shards), 1))
+
+    def run(
+        self, candles: list[Candle], epoch_ns: int, clock: Clock
+    ) -> list[list[SignalBase]]:
+        """
+        Run all the strategy instances on the new candles
+
+        :return: The signals of each strategy instance that emitted some, in the sequential execution order
+        :rtype: list[list[SignalBase]]
+        """
+        results = []
+        if self.use_processes:
+            for connection, assets in zip(self.connections, self.shards_assets):
+                # Only send the candles the shard needs to keep the pickling cost down
+                if assets is not None:
+                    shard_candles = [candle for candle in candles if candle.asset in assets]
+                else:
+                    shard_candles = candles
+                connection.send((shard_candles, epoch_ns))
+            for connection in self.connections:
+                status, shard_results = connection.recv()
+                if status == "error":
+                    raise Exception(f"A strategy shard failed: {shard_results}")
+                results.extend(shard_results)
+        else:
+            for shard_results in self.thread_pool.map(
+                lambda shard: shard.process(candles, epoch_ns), self.shards
+            ):
+                results.extend(shard_results)
+        results.sort(key=lambda result: result[0])
+        signals_list = []
+        for _, signals in results:
+            set_signals_clock(signals, clock)
+            signals_list.append(signals)
+        return signals_list
+
+    def stop(self) -> None:
+        for connection in self.connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.connections = []
+        self.processes = []
+        self.shards_assets = []
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown()
+            self.thread_pool = None
+        self.shards = []
@@ -1,13 +1,23 @@
+import os
+
 from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
-from trazy_analysis.common.backtest import Backtest
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.feed.loader import CsvLoader
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.strategy.strategies.smart_money_concept import (
     SmartMoneyConcept,
 )
-from trazy_analysis.models.enums import OrderType, IndicatorMode
+from trazy_analysis.models.enums import BrokerIsolation, OrderType, IndicatorMode
 from trazy_analysis.db_storage.influxdb_storage import InfluxDbStorage
 from trazy_analysis.statistics.statistics import Statistics
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategies.vectorized_sma_crossover_strategy import (
+    VectorizedSmaCrossoverStrategy,
+)
 from datetime import datetime, timedelta
+import pytest
 import pytz
 
 def test_backtest():
@@ -36,4 +46,115 @@ def test_backtest():
         statistics_class=Statistics,
     )
 
-    backtest.run_strategy(SmartMoneyConcept, SmartMoneyConcept.DEFAULT_PARAMETERS)
\ No newline at end of file
+    backtest.run_strategy(SmartMoneyConcept, SmartMoneyConcept.DEFAULT_PARAMETERS)
+
+
+def test_backtest_resume(tmp_path):
+    asset = Asset(symbol="BTCUSDT", exchange="BINANCE")
+    time_unit = timedelta(minutes=1)
+    csv_loader = CsvLoader(
+        csv_filenames={asset: {time_unit: "test/data/btc_usdt_one_day.csv"}}
+    )
+    csv_loader.load()
+    candle_dataframe = csv_loader.candle_dataframes[asset][time_unit]
+    strategies_parameters = {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}}
+    snapshot_path = os.path.join(tmp_path, "snapshot.pkl")
+
+    def backtest(candle_dataframes, snapshot_path=None, **kwargs) -> Backtest:
+        backtest_config = BacktestConfig(
+            assets={asset: time_unit},
+            fee_models=BinanceFeeModel(),
+            start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+            end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+            candle_dataframes=candle_dataframes,
+            snapshot_path=snapshot_path,
+            **kwargs,
+        )
+        return Backtest(
+            assets=backtest_config.assets,
+            start=backtest_config.start,
+            backtest_config=backtest_config,
+        )
+
+    full_backtest = backtest([candle_dataframe])
+    statistics_df = full_backtest.run_strategies(strategies_parameters)
+
+    split = datetime(2022, 5, 13, 12, 0, 0, 0, tzinfo=pytz.UTC)
+    backtest(
+        [candle_dataframe[candle_dataframe.index < split]], snapshot_path
+    ).run_strategies(strategies_parameters)
+    assert os.path.exists(snapshot_path)
+
+    # The new data overlaps the snapshot, only the candles after the snapshot are replayed
+    resumed_backtest = backtest(
+        [candle_dataframe[candle_dataframe.index >= split - timedelta(hours=1)]],
+        snapshot_path,
+    )
+    resumed_statistics_df = resumed_backtest.resume()
+
+    assert resumed_statistics_df.equals(statistics_df)
+    assert resumed_backtest.equity_dfs["BINANCE"].equals(
+        full_backtest.equity_dfs["BINANCE"]
+    )
+    assert resumed_backtest.event_loop.transactions_dfs["BINANCE"].equals(
+        full_backtest.event_loop.transactions_dfs["BINANCE"]
+    )
+    assert resumed_backtest.event_loop.signals_df[asset][time_unit].index.equals(
+        full_backtest.event_loop.signals_df[asset][time_unit].index
+    )
+
+    # A backtest that couldn't be snapshotted fails before running
+    batch_snapshot_path = os.path.join(tmp_path, "batch_snapshot.pkl")
+    batch_backtest = backtest(
+        [candle_dataframe], batch_snapshot_path, indicator_mode=IndicatorMode.BATCH
+    )
+    with pytest.raises(Exception, match="BATCH indicator mode"):
+        batch_backtest.run_strategies(strategies_parameters)
+    assert batch_backtest.event_loop is None
+    assert not os.path.exists(batch_snapshot_path)
+
+
+def test_backtest_strategy_sub_accounts():
+    asset = Asset(symbol="BTCUSDT", exchange="BINANCE")
+    time_unit = timedelta(minutes=1)
+    csv_loader = CsvLoader(
+        csv_filenames={asset: {time_unit: "test/data/btc_usdt_one_day.csv"}}
+    )
+    csv_loader.load()
+    candle_dataframe = csv_loader.candle_dataframes[asset][time_unit]
+    strategies_parameters = {
+        SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65},
+        VectorizedSmaCrossoverStrategy: {"short_sma": 5, "long_sma": 30},
+    }
+
+    def backtest(isolation: BrokerIsolation) -> Backtest:
+        backtest_config = BacktestConfig(
+            assets={asset: time_unit},
+            fee_models=BinanceFeeModel(),
+            start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+            end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+            candle_dataframes=[candle_dataframe],
+            isolation=isolation,
+            integer_size=False,
+        )
+        return Backtest(
+            assets=backtest_config.assets,
+            start=backtest_config.start,
+            backtest_config=backtest_config,
+        )
+
+    # A single replay books each strategy in its own sub-account of the broker
+    isolated_backtest = backtest(BrokerIsolation.STRATEGY)
+    isolated_backtest.run_strategies(strategies_parameters)
+    broker = isolated_backtest.event_loop.broker_manager.get_broker("BINANCE")
+    assert set(broker.sub_portfolios) == {
+        (None, "SmaCrossoverStrategy"),
+        (None, "VectorizedSmaCrossoverStrategy"),
+    }
+
+    for strategy_class, parameters in strategies_parameters.items():
+        separate_backtest = backtest(BrokerIsolation.EXCHANGE)
+        separate_backtest.run_strategies({strategy_class: parameters})
+        equity_df = isolated_backtest.equity_dfs[(None, None, strategy_class.__name__)]
+        assert len(separate_backtest.event_loop.transactions_dfs["BINANCE"]) != 0
+        assert equity_df.equals(separate_backtest.equity_dfs["BINANCE"])
@@ -0,0 +1,35 @@
+from trazy_analysis.benchmarks.benchmark_suite import compare
+
+
+def result(throughput: float, peak_rss_mb: float, nb_bars: int = 1000) -> dict:
+    return {
+        "seconds": 1.0,
+        "count": throughput,
+        "unit": "bars",
+        "throughput": throughput,
+        "peak_rss_mb": peak_rss_mb,
+        "nb_assets": 1,
+        "nb_bars": nb_bars,
+    }
+
+
+def test_compare():
+    baseline = {
+        "feed": result(1000, 100),
+        "indicators": result(1000, 100),
+        "statistics": result(1000, 100),
+    }
+    results = {
+        "feed": result(850, 110),
+        "indicators": result(700, 130),
+        "statistics": result(1000, 100, nb_bars=10),
+        "broker_fills": result(1000, 100),
+    }
+    assert compare(results, baseline, tolerance=0.2) == [
+        "indicators: throughput 700 bars/s, baseline 1000 bars/s",
+        "indicators: peak RSS 130 MB, baseline 100 MB",
+        "statistics: the baseline was run with different sizes",
+    ]
+    assert compare(results, baseline, tolerance=0.5) == [
+        "statistics: the baseline was run with different sizes",
+    ]
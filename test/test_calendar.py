@@ -4,7 +4,11 @@ import pandas as pd
 from pandas_market_calendars.exchange_calendar_eurex import EUREXExchangeCalendar
 from pytz import timezone
 
-from trazy_analysis.common.calendar import is_business_day, is_business_hour
+from trazy_analysis.common.calendar import (
+    CalendarIndex,
+    is_business_day,
+    is_business_hour,
+)
 from trazy_analysis.common.constants import DATE_FORMAT
 
 euronext_cal = EUREXExchangeCalendar()
@@ -88,3 +92,58 @@ def test_calendar_is_business_hour_with_calendar_df():
     test_hour_pos = datetime(2020, 4, 30, 15, 30, tzinfo=timezone("UTC"))
     assert not is_business_hour(test_hour_neg, df_business_calendar=business_day)
     assert is_business_hour(test_hour_pos, df_business_calendar=business_day)
+
+
+def test_calendar_index_end_of_day():
+    calendar_index = CalendarIndex(euronext_cal)
+    # Regular close of EUREX is 17:30 Europe/Berlin, i.e. 15:30 UTC during summer time
+    end_of_day = pd.Timestamp("2020-04-30 15:30:00+00:00").value
+    assert calendar_index.end_of_day_epoch_ns(end_of_day - 1) == end_of_day
+    assert not calendar_index.end_of_day(pd.Timestamp("2020-04-30 15:24:00+00:00").value)
+    assert calendar_index.end_of_day(
+        pd.Timestamp("2020-04-30 15:26:00+00:00").value, threshold_ns=5 * 60 * 10**9
+    )
+    # Winter time
+    assert (
+        calendar_index.end_of_day_epoch_ns(pd.Timestamp("2020-12-01 10:00:00+00:00").value)
+        == pd.Timestamp("2020-12-01 16:30:00+00:00").value
+    )
+
+
+def test_calendar_index_is_in_session():
+    calendar_index = CalendarIndex(
+        euronext_cal, start=datetime(2020, 1, 1), end=datetime(2020, 10, 1)
+    )
+    assert not calendar_index.is_in_session(
+        pd.Timestamp("2020-04-30 01:30:33+00:00").value
+    )
+    assert not calendar_index.is_in_session(
+        pd.Timestamp("2020-05-01 15:30:00+00:00").value
+    )
+    assert calendar_index.is_in_session(pd.Timestamp("2020-04-30 15:30:00+00:00").value)
+    timestamps = pd.DatetimeIndex(
+        [
+            "2020-04-30 01:30:33+00:00",
+            "2020-04-30 15:30:00+00:00",
+            "2020-05-01 15:30:00+00:00",
+            "2020-05-04 07:00:00+00:00",
+        ]
+    )
+    assert calendar_index.in_session_mask(timestamps.asi8).tolist() == [
+        False,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_calendar_index_schedule():
+    calendar_index = CalendarIndex(euronext_cal)
+    expected_df = euronext_cal.schedule(start_date="2020-05-01", end_date="2020-05-05")
+    assert calendar_index.schedule("2020-05-01", "2020-05-05").equals(expected_df)
+
+
+def test_calendar_index_for_calendar():
+    assert CalendarIndex.for_calendar(euronext_cal) is CalendarIndex.for_calendar(
+        euronext_cal
+    )
@@ -1,3 +1,4 @@
+import pickle
 from datetime import datetime, timedelta
 
 from trazy_analysis.models.asset import Asset
@@ -131,3 +132,37 @@ def test_str():
         "open=25.0,high=25.5,low=24.8,close=25.3,volume=100,time_unit=0:01:00,timestamp=2020-05-08 14:17:00+00:00)"
     )
     assert str(CANDLE1) == expected_str
+
+
+def test_epoch_ns():
+    assert CANDLE1.epoch_ns == 1588947420000000000
+    candle = Candle(
+        asset=IVV_ASSET,
+        open=25.0,
+        high=25.5,
+        low=24.8,
+        close=25.3,
+        volume=100,
+        timestamp=1588947420000000000,
+    )
+    # The datetime is only built when it is read
+    assert candle._timestamp is None
+    assert candle.timestamp == datetime.strptime(
+        "2020-05-08 14:17:00+0000", "%Y-%m-%d %H:%M:%S%z"
+    )
+    assert candle == CANDLE1
+
+
+def test_pickle():
+    candle = Candle(
+        asset=IVV_ASSET,
+        open=25.0,
+        high=25.5,
+        low=24.8,
+        close=25.3,
+        volume=100,
+        timestamp=1588947420000000000,
+        time_unit=timedelta(minutes=5),
+    )
+    assert pickle.loads(pickle.dumps(candle)) == candle
+    assert candle.copy().time_unit == timedelta(minutes=5)
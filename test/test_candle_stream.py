@@ -0,0 +1,111 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.feed.feed import LiveFeed
+from trazy_analysis.market_data.live.candle_stream import WebsocketCandleStream
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.event import MarketDataEvent
+from trazy_analysis.test.tools.candle_server import LocalCandleServer
+
+EXCHANGE = "BINANCE"
+BTC_ASSET = Asset(symbol="BTCUSDT", exchange=EXCHANGE)
+ETH_ASSET = Asset(symbol="ETHUSDT", exchange=EXCHANGE)
+TIMESTAMP = datetime.strptime("2020-06-18 13:30:00+0000", "%Y-%m-%d %H:%M:%S%z")
+BTC_CANDLE1 = Candle(
+    asset=BTC_ASSET,
+    open=9420.5,
+    high=9421.0,
+    low=9419.5,
+    close=9420.0,
+    volume=12,
+    timestamp=TIMESTAMP,
+)
+BTC_CANDLE2 = Candle(
+    asset=BTC_ASSET,
+    open=9420.0,
+    high=9425.0,
+    low=9418.5,
+    close=9424.5,
+    volume=8,
+    timestamp=TIMESTAMP + timedelta(minutes=1),
+)
+ETH_CANDLE = Candle(
+    asset=ETH_ASSET,
+    open=231.5,
+    high=231.7,
+    low=231.2,
+    close=231.3,
+    volume=31,
+    timestamp=TIMESTAMP,
+)
+
+
+async def wait_for_subscription(server: LocalCandleServer):
+    while len(server.subscriptions) == 0:
+        await asyncio.sleep(0.01)
+
+
+def test_websocket_candle_stream():
+    async def run():
+        server = LocalCandleServer()
+        await server.start()
+        candle_stream = WebsocketCandleStream(server.url)
+        await candle_stream.connect([BTC_ASSET])
+        await wait_for_subscription(server)
+
+        await server.publish(ETH_CANDLE)
+        await server.publish(BTC_CANDLE1)
+        candles = candle_stream.candles()
+        received_candle = await asyncio.wait_for(candles.__anext__(), timeout=5)
+
+        await candle_stream.close()
+        await server.stop()
+        return received_candle
+
+    assert asyncio.run(run()) == BTC_CANDLE1
+
+
+def test_live_feed_candle_stream():
+    async def run():
+        server = LocalCandleServer()
+        await server.start()
+        events = deque()
+        live_feed = LiveFeed(
+            assets={BTC_ASSET: timedelta(minutes=1)},
+            live_data_handlers={},
+            events=events,
+            candle_stream=WebsocketCandleStream(server.url),
+        )
+        await live_feed.async_update_latest_data()
+        await wait_for_subscription(server)
+        assert len(events) == 0
+
+        await server.publish(BTC_CANDLE1)
+        await server.publish(BTC_CANDLE2)
+        while len(live_feed.streamed_candles) < 2:
+            await asyncio.wait_for(live_feed.new_data.wait(), timeout=5)
+            live_feed.new_data.clear()
+        await live_feed.async_update_latest_data()
+
+        # Already emitted candles are not emitted again
+        await server.publish(BTC_CANDLE2)
+        await asyncio.wait_for(live_feed.new_data.wait(), timeout=5)
+        await live_feed.async_update_latest_data()
+
+        await live_feed.stop_stream()
+        await server.stop()
+        return list(events), live_feed
+
+    events, live_feed = asyncio.run(run())
+    assert len(events) == 1
+    assert isinstance(events[0], MarketDataEvent)
+    assert list(events[0].candles[BTC_ASSET][timedelta(minutes=1)]) == [
+        BTC_CANDLE1,
+        BTC_CANDLE2,
+    ]
+    assert live_feed.latency_stats.count == 1
+    assert live_feed.stream_task is None
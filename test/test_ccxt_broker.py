@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 from collections import deque
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -10,13 +13,20 @@ from pytz import timezone
 from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
 from trazy_analysis.broker.ccxt_broker import CcxtBroker
 from trazy_analysis.broker.ccxt_parser import CcxtBinanceParser
+from trazy_analysis.broker.user_data_stream import (
+    FILLED,
+    OrderUpdate,
+    WebsocketUserDataStream,
+)
 from trazy_analysis.common.ccxt_connector import CcxtConnector
-from trazy_analysis.common.clock import LiveClock
+from trazy_analysis.common.clock import LiveClock, SimulatedClock
 from trazy_analysis.models.asset import Asset
-from trazy_analysis.models.enums import Action, Direction, OrderType
+from trazy_analysis.models.enums import Action, Direction, OrderStatus, OrderType
 from trazy_analysis.models.order import Order
 from trazy_analysis.portfolio.portfolio_event import PortfolioEvent
 from trazy_analysis.position.position import Position
+from trazy_analysis.position.transaction import Transaction
+from trazy_analysis.test.tools.user_data_server import LocalUserDataServer
 
 INITIAL_CASH = "51.07118"
 
@@ -2101,3 +2111,205 @@ def test_max_order_entry_size(
         ccxt_broker.max_entry_order_size(asset=ASSET2, direction=Direction.LONG)
         == 130.4863423021991
     )
+
+
+class FakeParser(CcxtBinanceParser):
+    @classmethod
+    def parse_lot_size_info(cls, symbol_info):
+        return symbol_info["symbol"], 0.001
+
+    @classmethod
+    def parse_price_info(cls, price_info):
+        return price_info["symbol"], price_info["price"]
+
+    @classmethod
+    def parse_balances_info(cls, balance_info):
+        return dict(balance_info)
+
+    @classmethod
+    def parse_trade_info(cls, trade_info):
+        return trade_info
+
+
+class FakeExchange:
+    """
+    A ccxt exchange answering after a delay, which records the number of requests sent at the same time, to all the
+    exchanges and to this one
+    """
+
+    def __init__(self, exchange: str, calls: list, in_flight: list):
+        self.exchange = exchange
+        self.calls = calls
+        self.in_flight = in_flight
+        self.lock = threading.Lock()
+        self.nb_in_flight = 0
+        self.max_in_flight = 0
+        self.trades = []
+
+    def respond(self, method: str, response):
+        with self.lock:
+            self.calls.append((self.exchange, method))
+            self.in_flight[0] += 1
+            self.in_flight[1] = max(self.in_flight[1], self.in_flight[0])
+            self.nb_in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.nb_in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight[0] -= 1
+            self.nb_in_flight -= 1
+        return response
+
+    def fetchMarkets(self):
+        return self.respond("fetchMarkets", [{"info": {"symbol": "ETH/EUR"}}])
+
+    def fetch_tickers(self):
+        return self.respond(
+            "fetch_tickers", {"ETH/EUR": {"info": {"symbol": "ETH/EUR", "price": 2000.0}}}
+        )
+
+    def fetchBalance(self):
+        return self.respond("fetchBalance", {"info": {"EUR": 100.0, "ETH": 0.5}})
+
+    def fetchMyTrades(self, symbol: str, since: int):
+        return self.respond(
+            "fetchMyTrades", [{"info": trade_info} for trade_info in self.trades]
+        )
+
+    def createOrder(self, symbol: str, type: str, side: str, amount: Decimal, price=None):
+        return {"info": {"orderId": "42", "status": "NEW"}}
+
+
+def test_synchronize_sends_the_requests_concurrently():
+    calls = []
+    in_flight = [0, 0]
+    clock = SimulatedClock()
+    start = datetime(2021, 2, 8, 15, 0, 0, tzinfo=timezone("UTC"))
+    clock.update_time(start)
+    ccxt_connector = CcxtConnector(exchanges_api_keys={})
+    ccxt_connector.exchanges = ["BINANCE", "KRAKEN"]
+    ccxt_connector.exchanges_instances = {
+        "binance": FakeExchange("binance", calls, in_flight),
+        "kraken": FakeExchange("kraken", calls, in_flight),
+    }
+    ccxt_connector.parsers = {"binance": FakeParser, "kraken": FakeParser}
+    ccxt_broker = CcxtBroker(
+        clock=clock, events=deque(), ccxt_connector=ccxt_connector
+    )
+    assert ccxt_broker.portfolio.cash == 200.0
+    assert ccxt_broker.currency_pairs_traded == {
+        Asset(symbol="ETH/EUR", exchange="binance"),
+        Asset(symbol="ETH/EUR", exchange="kraken"),
+    }
+
+    # The responses of the requests sent by the constructor are still cached
+    nb_calls = len(calls)
+    clock.update_time(start + timedelta(seconds=10))
+    ccxt_broker.request_cache.invalidate()
+    in_flight[1] = 0
+    ccxt_broker.synchronize()
+
+    sync_calls = calls[nb_calls:]
+    assert sorted(sync_calls) == sorted(
+        [(exchange, "fetch_tickers") for exchange in ["binance", "kraken"]]
+        + [(exchange, "fetchBalance") for exchange in ["binance", "kraken"]]
+        + [(exchange, "fetchMyTrades") for exchange in ["binance", "kraken"]]
+    )
+    # The requests are concurrent across the exchanges only, a ccxt exchange instance isn't thread safe
+    assert in_flight[1] > 1
+    for exchange_instance in ccxt_connector.exchanges_instances.values():
+        assert exchange_instance.max_in_flight == 1
+    assert ccxt_broker.last_prices[Asset(symbol="ETH/EUR", exchange="kraken")] == 2000.0
+    ccxt_broker.request_cache.shutdown()
+
+
+def test_fills_pushed_by_the_user_data_stream():
+    calls = []
+    in_flight = [0, 0]
+    clock = SimulatedClock()
+    start = datetime(2021, 2, 8, 15, 0, 0, tzinfo=timezone("UTC"))
+    clock.update_time(start)
+    fake_exchange = FakeExchange("binance", calls, in_flight)
+    ccxt_connector = CcxtConnector(exchanges_api_keys={})
+    ccxt_connector.exchanges = ["BINANCE"]
+    ccxt_connector.exchanges_instances = {"binance": fake_exchange}
+    ccxt_connector.parsers = {"binance": FakeParser}
+
+    async def run():
+        server = LocalUserDataServer()
+        await server.start()
+        ccxt_broker = CcxtBroker(
+            clock=clock,
+            events=deque(),
+            ccxt_connector=ccxt_connector,
+            user_data_stream=WebsocketUserDataStream(server.url),
+        )
+        order = Order(
+            asset=ASSET1,
+            time_unit=timedelta(minutes=1),
+            action=Action.BUY,
+            direction=Direction.LONG,
+            size=0.01,
+            signal_id="1",
+            limit=1900.0,
+            order_type=OrderType.LIMIT,
+            clock=clock,
+        )
+        order.submit()
+        completed = []
+        order.add_on_complete_callback(completed.append, order.order_id)
+        ccxt_broker.execute_order(order)
+        assert ccxt_broker.open_orders_ids["binance"] == {"42"}
+
+        await ccxt_broker.user_data_stream.connect(["binance"])
+        ccxt_broker.streaming = True
+        while len(server.subscriptions) == 0:
+            await asyncio.sleep(0.01)
+        transaction = Transaction(
+            asset=ASSET1,
+            size=0.01,
+            action=Action.BUY,
+            direction=Direction.LONG,
+            price=1900.0,
+            order_id="42",
+            commission=0.01,
+            timestamp=start + timedelta(seconds=1),
+            transaction_id="7",
+        )
+        await server.publish(OrderUpdate("binance", "42", FILLED, transaction))
+        updates = ccxt_broker.user_data_stream.updates()
+        ccxt_broker.apply_order_update(
+            await asyncio.wait_for(updates.__anext__(), timeout=5)
+        )
+        await ccxt_broker.user_data_stream.close()
+        await server.stop()
+        return ccxt_broker, order, completed
+
+    ccxt_broker, order, completed = asyncio.run(run())
+    assert order.status == OrderStatus.COMPLETED
+    assert len(completed) == 1
+    assert ccxt_broker.open_orders_ids["binance"] == set()
+    # The fill is added to the position synchronized from the balances
+    position = ccxt_broker.portfolio.pos_handler.positions[ASSET1][Direction.LONG]
+    assert position.net_size == pytest.approx(0.51)
+    assert ccxt_broker.transactions_update_period() == CcxtBroker.RECONCILIATION_PERIOD
+
+    # The polling only reconciles: the fill already pushed is not applied again
+    fake_exchange.trades = [
+        (
+            int(start.timestamp() * 1000) + 1000,
+            SYMBOL1,
+            0.01,
+            Action.BUY,
+            1900.0,
+            "42",
+            0.01,
+            "7",
+        )
+    ]
+    history_length = len(ccxt_broker.portfolio.history)
+    clock.update_time(start + CcxtBroker.RECONCILIATION_PERIOD)
+    ccxt_broker.request_cache.invalidate()
+    ccxt_broker.update_transactions()
+    assert len(ccxt_broker.portfolio.history) == history_length
+    assert position.net_size == pytest.approx(0.51)
+    ccxt_broker.request_cache.shutdown()
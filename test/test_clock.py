@@ -45,6 +45,16 @@ def test_current_time_simulated_clock():
     assert clock.current_bars() == 2
 
 
+def test_end_of_day_simulated_clock():
+    clock = SimulatedClock()
+    clock.update(datetime.strptime("2017-10-05 19:54:00+0000", "%Y-%m-%d %H:%M:%S%z"))
+    assert not clock.end_of_day()
+    clock.update(datetime.strptime("2017-10-05 19:55:00+0000", "%Y-%m-%d %H:%M:%S%z"))
+    assert clock.end_of_day()
+    clock.update(datetime.strptime("2017-10-06 08:00:00+0000", "%Y-%m-%d %H:%M:%S%z"))
+    assert not clock.end_of_day()
+
+
 def test_update_time_simulated_clock():
     pass
 
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.optimization.evaluator import BacktestEvaluator, FunctionEvaluator
+from trazy_analysis.optimization.trial_store import TrialStore
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+PARAMETERS_LIST = [{"a": 1, "b": 2}, {"a": 3, "b": 4}, {"a": 5, "b": 6}]
+
+
+def objective(a: int, b: int) -> float:
+    return a * 10 + b
+
+
+def test_function_evaluator_inline():
+    evaluator = FunctionEvaluator(objective)
+    assert evaluator.study == "objective"
+    assert evaluator.evaluate(PARAMETERS_LIST) == [12, 34, 56]
+    assert evaluator.submit({"a": 0, "b": 1}).result() == 1
+    assert evaluator.completed_trials() == []
+
+
+def test_function_evaluator_processes():
+    with FunctionEvaluator(objective, nb_workers=2) as evaluator:
+        assert evaluator.evaluate(PARAMETERS_LIST) == [12, 34, 56]
+
+
+def test_function_evaluator_threads():
+    with FunctionEvaluator(
+        objective, nb_workers=2, use_processes=False
+    ) as evaluator:
+        assert evaluator.evaluate(PARAMETERS_LIST) == [12, 34, 56]
+
+
+def test_function_evaluator_error():
+    evaluator = FunctionEvaluator(objective)
+    future = evaluator.submit({"a": 1})
+    assert isinstance(future.exception(), TypeError)
+
+
+def test_function_evaluator_trial_store():
+    calls = []
+
+    def counted_objective(a: int, b: int) -> float:
+        calls.append((a, b))
+        return objective(a, b)
+
+    trial_store = TrialStore()
+    evaluator = FunctionEvaluator(counted_objective, trial_store=trial_store)
+    assert evaluator.evaluate(PARAMETERS_LIST) == [12, 34, 56]
+    assert evaluator.evaluate(PARAMETERS_LIST[:2]) == [12, 34]
+    assert len(calls) == 3
+    assert evaluator.completed_trials() == list(zip(PARAMETERS_LIST, [12, 34, 56]))
+
+    other_evaluator = FunctionEvaluator(
+        counted_objective, trial_store=trial_store, study="other_study"
+    )
+    other_evaluator.evaluate(PARAMETERS_LIST[:1])
+    assert len(calls) == 4
+
+
+def test_function_evaluator_negated():
+    trial_store = TrialStore()
+    evaluator = FunctionEvaluator(objective, trial_store=trial_store)
+    negated_evaluator = evaluator.negated()
+    assert negated_evaluator.evaluate(PARAMETERS_LIST[:1]) == [-12]
+    assert negated_evaluator.completed_trials() == [(PARAMETERS_LIST[0], -12)]
+    # The objective values are stored as returned by the objective
+    assert evaluator.evaluate(PARAMETERS_LIST[:1]) == [12]
+    assert trial_store.trials("objective") == [(PARAMETERS_LIST[0], 12)]
+
+
+def test_backtest_evaluator():
+    backtest_config = BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+    )
+    parameters_list = [
+        {"short_sma": 9, "long_sma": 65},
+        {"short_sma": 20, "long_sma": 50},
+    ]
+    trial_store = TrialStore()
+    with BacktestEvaluator(
+        backtest_config,
+        SmaCrossoverStrategy,
+        nb_workers=2,
+        trial_store=trial_store,
+    ) as evaluator:
+        values = evaluator.evaluate(parameters_list)
+        assert evaluator.study == "SmaCrossoverStrategy-Sortino Ratio"
+        assert len(trial_store.trials(evaluator.study)) == 2
+
+    backtest = Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+    for parameters, value in zip(parameters_list, values):
+        statistics = backtest.run_strategy(SmaCrossoverStrategy, parameters)
+        expected_value = statistics.loc["Sortino Ratio"]["Backtest results"]
+        assert value == expected_value
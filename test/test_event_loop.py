@@ -1,17 +1,19 @@
 from collections import deque
 from datetime import datetime, timedelta
-from unittest.mock import call, patch
+import time
+from threading import Thread
+from unittest.mock import MagicMock, call, patch
 
 from pandas_market_calendars.exchange_calendar_eurex import EUREXExchangeCalendar
 
 from trazy_analysis.bot.event_loop import EventLoop
 from trazy_analysis.broker.broker_manager import BrokerManager
 from trazy_analysis.broker.simulated_broker import SimulatedBroker
-from trazy_analysis.common.clock import SimulatedClock
-from trazy_analysis.feed.feed import CsvFeed
+from trazy_analysis.common.clock import LiveClock, SimulatedClock
+from trazy_analysis.feed.feed import CsvFeed, Feed
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.candle import Candle
-from trazy_analysis.models.enums import IndicatorMode
+from trazy_analysis.models.enums import EventLoopMode, IndicatorMode
 from trazy_analysis.order_manager.order_creator import OrderCreator
 from trazy_analysis.order_manager.order_manager import OrderManager
 from trazy_analysis.order_manager.position_sizer import PositionSizer
@@ -173,3 +175,74 @@ def test_run_backtest():
     event_loop = EventLoop(events=EVENTS, assets=assets, feed=FEED, order_manager=order_manager,
                            strategies_parameters=strategies_classes, indicator_mode=IndicatorMode.LIVE)
     event_loop.loop()
+
+
+@patch("trazy_analysis.broker.simulated_broker.SimulatedBroker.synchronize")
+def test_run_live(synchronize_mocked):
+    assets = {AAPL_ASSET: timedelta(minutes=1)}
+    strategies_classes = {SmaCrossoverStrategy: SmaCrossoverStrategy.DEFAULT_PARAMETERS}
+    events = deque()
+    feed = CsvFeed(
+        csv_filenames={
+            AAPL_ASSET: {timedelta(minutes=1): "test/data/aapl_candles_one_day.csv"}
+        },
+        events=events,
+    )
+    clock = SimulatedClock()
+    broker = SimulatedBroker(clock=clock, events=events, initial_funds=FUND)
+    broker_manager = BrokerManager(brokers={EXCHANGE: broker})
+    position_sizer = PositionSizer(broker_manager=broker_manager)
+    order_creator = OrderCreator(broker_manager=broker_manager)
+    order_manager = OrderManager(
+        events, broker_manager, position_sizer, order_creator, clock
+    )
+    event_loop = EventLoop(
+        events=events,
+        assets=assets,
+        feed=feed,
+        order_manager=order_manager,
+        strategies_parameters=strategies_classes,
+        indicator_mode=IndicatorMode.LIVE,
+        mode=EventLoopMode.LIVE,
+        live_data_interval=timedelta(microseconds=1),
+        live_data_delay=timedelta(0),
+    )
+    event_loop.loop()
+
+    synchronize_mocked.assert_called()
+    assert event_loop.data(AAPL_ASSET, timedelta(minutes=1)).data is not None
+    assert event_loop.asyncio_loop is None
+
+
+def test_stop_live():
+    events = deque()
+    feed = MagicMock(spec=Feed)
+    feed.candles = {}
+    clock = LiveClock()
+    broker = SimulatedBroker(clock=clock, events=events, initial_funds=FUND)
+    broker_manager = BrokerManager(brokers={EXCHANGE: broker})
+    position_sizer = PositionSizer(broker_manager=broker_manager)
+    order_creator = OrderCreator(broker_manager=broker_manager)
+    order_manager = OrderManager(
+        events, broker_manager, position_sizer, order_creator, clock
+    )
+    event_loop = EventLoop(
+        events=events,
+        assets={},
+        feed=feed,
+        order_manager=order_manager,
+        mode=EventLoopMode.LIVE,
+        live_data_interval=timedelta(milliseconds=100),
+        live_data_delay=timedelta(0),
+    )
+    thread = Thread(target=event_loop.loop)
+    thread.start()
+    while event_loop.asyncio_loop is None:
+        time.sleep(0.01)
+    time.sleep(0.3)
+    event_loop.stop()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    # The loop sleeps between two polls instead of spinning
+    assert 1 <= feed.update_latest_data.call_count <= 5
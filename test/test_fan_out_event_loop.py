@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+STRATEGIES_PARAMETERS_LIST = [
+    {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}},
+    {SmaCrossoverStrategy: {"short_sma": 5, "long_sma": 100}},
+    {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 100}},
+]
+
+
+def create_backtest() -> Backtest:
+    backtest_config = BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+    )
+    return Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+
+
+def test_fan_out_same_results_as_separate_backtests():
+    backtest = create_backtest()
+    expected_statistics = []
+    expected_equity_dfs = []
+    expected_transactions_dfs = []
+    for strategies_parameters in STRATEGIES_PARAMETERS_LIST:
+        backtest.run_strategies(strategies_parameters)
+        expected_statistics.append(backtest.get_statistics())
+        expected_equity_dfs.append(backtest.event_loop.equity_dfs["BINANCE"])
+        expected_transactions_dfs.append(backtest.event_loop.transactions_dfs["BINANCE"])
+
+    statistics = backtest.run_strategies_fan_out(STRATEGIES_PARAMETERS_LIST)
+
+    assert len(statistics) == len(STRATEGIES_PARAMETERS_LIST)
+    event_loops = backtest.fan_out_event_loop.event_loops
+    for i in range(len(STRATEGIES_PARAMETERS_LIST)):
+        assert statistics[i].equals(expected_statistics[i])
+        assert event_loops[i].equity_dfs["BINANCE"].equals(expected_equity_dfs[i])
+        assert event_loops[i].transactions_dfs["BINANCE"].equals(
+            expected_transactions_dfs[i]
+        )
+    # The parameter sets lead to different trades
+    assert not expected_equity_dfs[0].equals(expected_equity_dfs[1])
+
+
+def test_fan_out_shares_indicators():
+    backtest = create_backtest()
+    backtest.run_strategies_fan_out(STRATEGIES_PARAMETERS_LIST)
+
+    fan_out_event_loop = backtest.fan_out_event_loop
+    strategies = [
+        event_loop.strategy_instances[0] for event_loop in fan_out_event_loop.event_loops
+    ]
+    for event_loop in fan_out_event_loop.event_loops:
+        assert event_loop.indicators is fan_out_event_loop.indicators
+        assert event_loop.data is fan_out_event_loop.data
+    assert strategies[0].close is strategies[1].close
+    assert strategies[0].short_sma is strategies[2].short_sma
+    assert strategies[1].long_sma is strategies[2].long_sma
+    assert strategies[0].short_sma is not strategies[1].short_sma
+    # Only the first event loop pushes the candles
+    assert [event_loop.update_data for event_loop in fan_out_event_loop.event_loops] == [
+        True,
+        False,
+        False,
+    ]
+
+
+def test_fan_out_isolated_portfolios():
+    backtest = create_backtest()
+    backtest.run_strategies_fan_out(STRATEGIES_PARAMETERS_LIST)
+
+    brokers = [
+        event_loop.broker_manager.get_broker("BINANCE")
+        for event_loop in backtest.fan_out_event_loop.event_loops
+    ]
+    assert len({id(broker) for broker in brokers}) == len(brokers)
+    assert len({id(broker.portfolio) for broker in brokers}) == len(brokers)
+
+
+def test_fan_out_pruned_event_loop():
+    backtest = create_backtest()
+    expected_statistics = []
+    for strategies_parameters in STRATEGIES_PARAMETERS_LIST:
+        backtest.run_strategies(strategies_parameters)
+        expected_statistics.append(backtest.get_statistics())
+
+    backtest.backtest_config.checkpoint_interval = timedelta(hours=2)
+    checkpoints = []
+
+    def prune_first_event_loop(checkpoint) -> bool:
+        checkpoints.append(checkpoint.step)
+        # The event loops report their first checkpoint in order
+        return len(checkpoints) == 1
+
+    statistics = backtest.run_strategies_fan_out(
+        STRATEGIES_PARAMETERS_LIST, checkpoint_callback=prune_first_event_loop
+    )
+
+    event_loops = backtest.fan_out_event_loop.event_loops
+    assert event_loops[0].pruned
+    assert statistics[0].loc["Sortino Ratio"]["Backtest results"] == -1
+    # The event loop pushing the candles to the shared data was pruned, the others still see every candle
+    for i in range(1, len(STRATEGIES_PARAMETERS_LIST)):
+        assert not event_loops[i].pruned
+        assert statistics[i].equals(expected_statistics[i])
@@ -1,8 +1,11 @@
+import asyncio
+import time
 from collections import deque
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
 import numpy as np
+import pytest
 
 from trazy_analysis.common.types import CandleDataFrame
 from trazy_analysis.db_storage.mongodb_storage import MongoDbStorage
@@ -299,6 +302,50 @@ def test_live_feed(request_ticker_lastest_candles_mocked):
     assert events_list[1].candles[GOOGL_ASSET][time_unit][1] == GOOGL_CANDLES2[1]
 
 
+@patch(
+    "trazy_analysis.market_data.live.tiingo_live_data_handler.TiingoLiveDataHandler.request_ticker_lastest_candles"
+)
+def test_live_feed_async_update_latest_data(request_ticker_lastest_candles_mocked):
+    request_ticker_lastest_candles_mocked.side_effect = [
+        AAPL_CANDLES1,
+        GOOGL_CANDLES1,
+        AAPL_CANDLES2,
+        GOOGL_CANDLES2,
+    ]
+    tiingo_live_data_handler = TiingoLiveDataHandler()
+    events = deque()
+    live_feed = LiveFeed(
+        assets={AAPL_ASSET: timedelta(minutes=1), GOOGL_ASSET: timedelta(minutes=1)},
+        live_data_handlers={"iex": tiingo_live_data_handler},
+        events=events,
+    )
+
+    for i in range(0, 2):
+        asyncio.run(live_feed.async_update_latest_data())
+
+    events_list = list(events)
+    assert len(events_list) == 2
+
+    time_unit = timedelta(minutes=1)
+    assert isinstance(events_list[0], MarketDataEvent)
+    assert events_list[0].candles[AAPL_ASSET][time_unit][0] == AAPL_CANDLES1[0]
+    assert isinstance(events_list[0], MarketDataEvent)
+    assert events_list[0].candles[AAPL_ASSET][time_unit][1] == AAPL_CANDLES1[1]
+    assert isinstance(events_list[0], MarketDataEvent)
+    assert events_list[0].candles[GOOGL_ASSET][time_unit][0] == GOOGL_CANDLES1[0]
+    assert isinstance(events_list[0], MarketDataEvent)
+    assert events_list[0].candles[GOOGL_ASSET][time_unit][1] == GOOGL_CANDLES1[1]
+
+    assert isinstance(events_list[1], MarketDataEvent)
+    assert events_list[1].candles[AAPL_ASSET][time_unit][0] == AAPL_CANDLES2[0]
+    assert isinstance(events_list[1], MarketDataEvent)
+    assert events_list[1].candles[AAPL_ASSET][time_unit][1] == AAPL_CANDLES2[1]
+    assert isinstance(events_list[1], MarketDataEvent)
+    assert events_list[1].candles[GOOGL_ASSET][time_unit][0] == GOOGL_CANDLES2[0]
+    assert isinstance(events_list[1], MarketDataEvent)
+    assert events_list[1].candles[GOOGL_ASSET][time_unit][1] == GOOGL_CANDLES2[1]
+
+
 @patch(
     "trazy_analysis.market_data.historical.historical_data_handler.HistoricalDataHandler.request_ticker_data_in_range"
 )
@@ -398,6 +445,58 @@ def test_pandas_feed():
     assert isinstance(events_list[7], MarketDataEndEvent)
 
 
+def test_feed_append():
+    events = deque()
+    pandas_feed = PandasFeed(
+        [CandleDataFrame.from_candle_list(asset=AAPL_ASSET, candles=AAPL_CANDLES1)],
+        events,
+    )
+    for i in range(0, 3):
+        pandas_feed.update_latest_data()
+    assert pandas_feed.completed
+    assert isinstance(events[-1], MarketDataEndEvent)
+    events.clear()
+
+    # The candles already in the feed are ignored
+    pandas_feed.append(
+        [CandleDataFrame.from_candle_list(asset=AAPL_ASSET, candles=AAPL_CANDLES[1:])]
+    )
+    assert not pandas_feed.completed
+    time_unit = timedelta(minutes=1)
+    assert len(pandas_feed.candles[AAPL_ASSET][time_unit]) == 4
+    assert len(pandas_feed.candle_dataframes[AAPL_ASSET][time_unit]) == 4
+
+    for i in range(0, 3):
+        pandas_feed.update_latest_data()
+    events_list = list(events)
+    assert len(events_list) == 3
+    assert events_list[0].candles[AAPL_ASSET][time_unit][0] == AAPL_CANDLES2[0]
+    assert events_list[1].candles[AAPL_ASSET][time_unit][0] == AAPL_CANDLES2[1]
+    assert isinstance(events_list[2], MarketDataEndEvent)
+
+    with pytest.raises(Exception):
+        pandas_feed.append(
+            [CandleDataFrame.from_candle_list(asset=GOOGL_ASSET, candles=GOOGL_CANDLES)]
+        )
+
+
+def test_feed_reset_several_time_units():
+    candle_dataframe = CandleDataFrame.from_candle_list(
+        asset=AAPL_ASSET, candles=AAPL_CANDLES
+    )
+    pandas_feed = PandasFeed(
+        [candle_dataframe, candle_dataframe.rescale(timedelta(minutes=2))]
+    )
+    while not pandas_feed.completed:
+        pandas_feed.update_latest_data()
+
+    pandas_feed.reset()
+    assert pandas_feed.indexes == {
+        AAPL_ASSET: {timedelta(minutes=1): 0, timedelta(minutes=2): 0}
+    }
+    assert not pandas_feed.completed
+
+
 def test_csv_feed():
     events = deque()
     time_unit = timedelta(minutes=1)
@@ -437,3 +536,45 @@ def test_csv_feed():
 
     assert events_list[7].assets == {AAPL_ASSET, GOOGL_ASSET}
     assert isinstance(events_list[7], MarketDataEndEvent)
+
+
+class SlowLiveDataHandler:
+    def __init__(self, candles: dict[Asset, np.array]):
+        self.candles = candles
+
+    def request_ticker_lastest_candles(self, asset: Asset, nb_candles: int = 1):
+        time.sleep(0.2)
+        return self.candles[asset]
+
+
+def test_live_feed_async_update_latest_data_concurrent_requests():
+    live_data_handler = SlowLiveDataHandler(
+        {AAPL_ASSET: AAPL_CANDLES1, GOOGL_ASSET: GOOGL_CANDLES1}
+    )
+    events = deque()
+    live_feed = LiveFeed(
+        assets={AAPL_ASSET: timedelta(minutes=1), GOOGL_ASSET: timedelta(minutes=1)},
+        live_data_handlers={"iex": live_data_handler},
+        events=events,
+    )
+
+    start = time.time()
+    asyncio.run(live_feed.async_update_latest_data())
+    assert time.time() - start < 0.35
+
+    assert len(events) == 1
+    time_unit = timedelta(minutes=1)
+    assert list(events[0].candles[AAPL_ASSET][time_unit]) == list(AAPL_CANDLES1)
+    assert list(events[0].candles[GOOGL_ASSET][time_unit]) == list(GOOGL_CANDLES1)
+
+    # Only new closed candles are emitted
+    asyncio.run(live_feed.async_update_latest_data())
+    assert len(events) == 1
+    live_data_handler.candles = {
+        AAPL_ASSET: np.concatenate([AAPL_CANDLES1[1:], AAPL_CANDLES2]),
+        GOOGL_ASSET: GOOGL_CANDLES1,
+    }
+    asyncio.run(live_feed.async_update_latest_data())
+    assert len(events) == 2
+    assert list(events[1].candles[AAPL_ASSET][time_unit]) == list(AAPL_CANDLES2)
+    assert GOOGL_ASSET not in events[1].candles
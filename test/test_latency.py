@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from trazy_analysis.common.latency import LatencyStats
+
+
+def test_latency_stats():
+    latency_stats = LatencyStats(bound=timedelta(milliseconds=20))
+    assert latency_stats.to_dict()["mean_ms"] == 0.0
+
+    assert latency_stats.record(10_000_000)
+    assert latency_stats.record(20_000_000)
+    assert not latency_stats.record(30_000_000)
+
+    assert latency_stats.count == 3
+    assert latency_stats.exceeded == 1
+    assert latency_stats.to_dict() == {
+        "count": 3,
+        "exceeded": 1,
+        "mean_ms": 20.0,
+        "p50_ms": 20.0,
+        "p99_ms": 29.8,
+        "max_ms": 30.0,
+    }
+
+
+def test_latency_stats_rolling_window():
+    latency_stats = LatencyStats(max_size=2)
+    for latency in [100, 1, 3]:
+        latency_stats.record(latency)
+    assert latency_stats.mean() == 2.0
+    assert latency_stats.max_ns == 100
+    assert latency_stats.count == 3
@@ -0,0 +1,133 @@
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import Action, Direction
+from trazy_analysis.portfolio.ledger import TransactionLedger
+from trazy_analysis.portfolio.portfolio import Portfolio
+from trazy_analysis.portfolio.portfolio_event import PortfolioEvent, TransactionEvent
+from trazy_analysis.position.transaction import Transaction
+
+ASSET1 = Asset(symbol="AAA", exchange="IEX")
+ASSET2 = Asset(symbol="BBB", exchange="IEX")
+TIMESTAMP = datetime(2017, 10, 5, 8, 0, 0, tzinfo=pytz.UTC)
+
+
+def transaction(index: int) -> Transaction:
+    return Transaction(
+        asset=ASSET1 if index % 3 else ASSET2,
+        size=10 if index % 2 == 0 else 2.5,
+        action=Action.BUY if index % 4 < 2 else Action.SELL,
+        direction=Direction.LONG,
+        price=100 + index if index % 5 else 100.25 + index,
+        order_id=str(index),
+        commission=1.5,
+        timestamp=TIMESTAMP + timedelta(minutes=index),
+        transaction_id=index,
+    )
+
+
+def fill_ledger(ledger: TransactionLedger, nb_transactions: int) -> None:
+    balance = 100000.0
+    ledger.add_subscription(balance, balance, TIMESTAMP)
+    for index in range(nb_transactions):
+        txn = transaction(index)
+        balance -= txn.cost_with_commission
+        ledger.add_transaction(txn, txn.cost_with_commission, balance)
+    ledger.add_withdrawal(1000.0, balance - 1000.0, TIMESTAMP + timedelta(days=1))
+
+
+def test_transactions_are_rendered_from_the_columns():
+    port = Portfolio(starting_cash=100000.0, timestamp=TIMESTAMP)
+    sell = Transaction(
+        asset=ASSET1,
+        size=100,
+        action=Action.SELL,
+        direction=Direction.SHORT,
+        price=567.0,
+        order_id="1",
+        commission=15.78,
+        timestamp=TIMESTAMP,
+    )
+    port.transact_symbol(sell)
+
+    assert port.history[1] == PortfolioEvent(
+        timestamp=TIMESTAMP,
+        type="symbol_transaction",
+        description="SELL SHORT 100 IEX-AAA 567.0 05/10/2017",
+        debit=0.0,
+        credit=56684.22,
+        balance=156684.22,
+    )
+    stored_transaction = port.transactions[0]
+    assert stored_transaction is not sell
+    assert vars(stored_transaction) == vars(sell)
+
+
+def test_spill_to_disk(tmp_path):
+    in_memory_ledger = TransactionLedger()
+    spilled_ledger = TransactionLedger(str(tmp_path), segment_size=8)
+    fill_ledger(in_memory_ledger, 30)
+    fill_ledger(spilled_ledger, 30)
+
+    assert len(spilled_ledger.segments) == 4
+    assert len(spilled_ledger.columns["type"]) == 0
+    assert len(list(tmp_path.iterdir())) == 4
+    assert spilled_ledger == in_memory_ledger
+    assert spilled_ledger.history[17] == in_memory_ledger.history[17]
+    assert spilled_ledger.history[-2:] == in_memory_ledger.history[-2:]
+    assert [vars(txn) for txn in spilled_ledger.transactions] == [
+        vars(txn) for txn in in_memory_ledger.transactions
+    ]
+    assert spilled_ledger.history_df().equals(in_memory_ledger.history_df())
+    assert pickle.loads(pickle.dumps(spilled_ledger)) == in_memory_ledger
+
+
+def test_transactions_df():
+    ledger = TransactionLedger()
+    fill_ledger(ledger, 6)
+    transactions_df = ledger.transactions_df()
+
+    assert list(transactions_df.columns) == ["amount", "price", "symbol"]
+    assert transactions_df.index.name == "Timestamp"
+    assert list(transactions_df.index) == [
+        TIMESTAMP + timedelta(minutes=index) for index in range(6)
+    ]
+    assert np.array_equal(transactions_df["amount"], [10, 2.5, -10, -2.5, 10, 2.5])
+    assert list(transactions_df["symbol"]) == [
+        "IEX-BBB",
+        "IEX-AAA",
+        "IEX-AAA",
+        "IEX-BBB",
+        "IEX-AAA",
+        "IEX-AAA",
+    ]
+    assert TransactionLedger().transactions_df().empty
+
+
+def test_history_df_matches_the_portfolio_events():
+    ledger = TransactionLedger()
+    fill_ledger(ledger, 12)
+    ledger.add_event(
+        TransactionEvent(
+            timestamp=TIMESTAMP + timedelta(days=2),
+            description="BUY LONG 1 IEX-AAA 100 07/10/2017",
+            debit=101.5,
+            credit=0.0,
+            balance=98000.0,
+            direction=Direction.LONG.name,
+        )
+    )
+    history_df = ledger.history_df()
+
+    expected_df = pd.DataFrame.from_records(
+        [event.to_dict() for event in ledger.history],
+        columns=["timestamp", "type", "description", "debit", "credit", "balance"],
+    ).set_index(keys=["timestamp"])
+    assert history_df.equals(expected_df)
+    assert history_df["description"].iloc[3] == "SELL LONG 10 IEX-AAA 102 05/10/2017"
+    assert TransactionLedger().history_df().empty
@@ -0,0 +1,57 @@
+import os
+import tracemalloc
+
+from trazy_analysis.benchmarks.memory_profile import (
+    attribute,
+    check_thresholds,
+    subsystem_of,
+)
+from trazy_analysis.settings import ROOT_PATH
+
+
+def test_subsystem_of():
+    assert subsystem_of(os.path.join(ROOT_PATH, "models", "candle.py")) == "candles"
+    assert subsystem_of(os.path.join(ROOT_PATH, "models", "asset.py")) == "package"
+    assert subsystem_of(os.path.join(ROOT_PATH, "portfolio", "portfolio.py")) == "portfolio"
+    assert subsystem_of(os.path.join(ROOT_PATH, "position", "position.py")) == "portfolio"
+    assert subsystem_of(os.path.join(ROOT_PATH, "benchmarks", "benchmark_suite.py")) is None
+    assert subsystem_of(tracemalloc.__file__) is None
+
+
+def test_attribute():
+    candle_filename = os.path.join(ROOT_PATH, "models", "candle.py")
+    feed_filename = os.path.join(ROOT_PATH, "feed", "feed.py")
+    # The frames of a tracemalloc traceback are given from the most recent one
+    traceback = tracemalloc.Traceback(
+        ((tracemalloc.__file__, 10), (candle_filename, 42), (feed_filename, 7))
+    )
+    assert attribute(traceback) == ("candles", os.path.join("models", "candle.py") + ":42")
+    traceback = tracemalloc.Traceback(((tracemalloc.__file__, 10),))
+    assert attribute(traceback) == ("other", f"{tracemalloc.__file__}:10")
+
+
+def test_check_thresholds():
+    reports = {
+        "feed": {
+            "bytes_per_bar": 500.0,
+            "bytes_per_asset": 10000.0,
+            "subsystems": {"feed": {"bytes": 2000}, "candles": {"bytes": 500}},
+        },
+        "statistics": {
+            "bytes_per_bar": 100.0,
+            "bytes_per_asset": 1000.0,
+            "subsystems": {},
+        },
+    }
+    thresholds = {
+        "feed": {"bytes_per_bar": 1000, "subsystems": {"feed": 1000, "indicators": 0}}
+    }
+    assert check_thresholds(reports, thresholds) == [
+        "feed: feed retains 2000 bytes, threshold 1000"
+    ]
+    assert check_thresholds(
+        reports, thresholds, {"bytes_per_bar": 50, "bytes_per_asset": None}
+    ) == [
+        "feed: feed retains 2000 bytes, threshold 1000",
+        "statistics: bytes_per_bar 100, threshold 50",
+    ]
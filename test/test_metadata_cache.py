@@ -0,0 +1,118 @@
+import pickle
+
+import pytest
+
+from trazy_analysis.broker.percent_fee_model import PercentFeeModel
+from trazy_analysis.common.ccxt_connector import CcxtConnector
+from trazy_analysis.common.metadata_cache import (
+    MARKETS,
+    PRODUCT_INFO,
+    MetadataCache,
+    item_kind,
+)
+from trazy_analysis.models.asset import Asset
+
+MARKETS_RESPONSE = [
+    {"symbol": "ETH/EUR", "maker": 0.001, "taker": 0.002},
+    {"symbol": "BTC-USDT-SWAP", "maker": 0.0005, "taker": None},
+    {"symbol": "UNKNOWN FORMAT", "maker": 0.1, "taker": 0.1},
+]
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeExchange:
+    def __init__(self):
+        self.has = {"fetchOHLCV": True, "fetchMarkets": True}
+        self.markets = None
+        self.nb_calls = 0
+
+    def fetchMarkets(self):
+        self.nb_calls += 1
+        return MARKETS_RESPONSE
+
+    def set_markets(self, markets):
+        self.markets = {market["symbol"]: market for market in markets}
+
+
+def test_ttl_and_expired_metadata_on_error():
+    fake_time = FakeTime()
+    metadata_cache = MetadataCache(ttls={MARKETS: 10.0}, time_function=fake_time)
+    calls = []
+
+    def fetch():
+        calls.append(fake_time.now)
+        if fake_time.now >= 20:
+            raise Exception("Exchange unavailable")
+        return [fake_time.now]
+
+    assert metadata_cache.get("BINANCE", MARKETS, fetch) == [0.0]
+    fake_time.now = 9.0
+    assert metadata_cache.get("binance", MARKETS, fetch) == [0.0]
+    fake_time.now = 10.0
+    assert metadata_cache.get("binance", MARKETS, fetch) == [10.0]
+    assert metadata_cache.get("binance", MARKETS, fetch, ttl=0) == [10.0]
+    fake_time.now = 20.0
+    assert metadata_cache.get("binance", MARKETS, fetch) == [10.0]
+    assert calls == [0.0, 10.0, 10.0, 20.0]
+
+    with pytest.raises(Exception):
+        metadata_cache.get("kraken", MARKETS, fetch)
+    assert metadata_cache.peek("kraken", MARKETS) is None
+
+
+def test_persistence_and_invalidation(tmp_path):
+    metadata_cache = MetadataCache(str(tmp_path))
+    metadata_cache.get("binance", MARKETS, lambda: MARKETS_RESPONSE)
+    metadata_cache.get("degiro", item_kind(PRODUCT_INFO, "123/4"), lambda: {"id": 1})
+    metadata_cache.get("degiro", item_kind(PRODUCT_INFO, "567"), lambda: {"id": 2})
+    metadata_cache.get("degiro", MARKETS, lambda: [])
+
+    # Another process sharing the directory finds the metadata without fetching it
+    other_metadata_cache = pickle.loads(pickle.dumps(MetadataCache(str(tmp_path))))
+    assert other_metadata_cache.peek("binance", MARKETS) == MARKETS_RESPONSE
+    assert other_metadata_cache.get(
+        "degiro", item_kind(PRODUCT_INFO, "123/4"), lambda: None
+    ) == {"id": 1}
+
+    other_metadata_cache.invalidate("degiro", PRODUCT_INFO)
+    assert metadata_cache.peek("degiro", MARKETS) == []
+    assert MetadataCache(str(tmp_path)).peek("degiro", item_kind(PRODUCT_INFO, "567")) is None
+    assert other_metadata_cache.peek("degiro", item_kind(PRODUCT_INFO, "123/4")) is None
+
+    other_metadata_cache.invalidate()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ccxt_connector_markets_are_cached():
+    fake_exchange = FakeExchange()
+    ccxt_connector = CcxtConnector(
+        exchanges_api_keys={}, metadata_cache=MetadataCache()
+    )
+    ccxt_connector.exchanges_instances = {"binance": fake_exchange}
+
+    assert ccxt_connector.fetch_symbol_mapping("binance") == {
+        "ETHEUR": "ETH/EUR",
+        "BTCUSDT": "BTC-USDT-SWAP",
+    }
+    fee_models = ccxt_connector.fetch_fees("binance")
+    assert fee_models.keys() == {
+        Asset("ETHEUR", "binance"),
+        Asset("BTCUSDT", "binance"),
+    }
+    assert isinstance(fee_models[Asset("ETHEUR", "binance")], PercentFeeModel)
+    assert fee_models[Asset("ETHEUR", "binance")].commission_pct == 0.002
+    assert fee_models[Asset("BTCUSDT", "binance")].commission_pct == 0.0005
+    assert fake_exchange.nb_calls == 1
+    # ccxt doesn't load the markets again
+    assert set(fake_exchange.markets) == {market["symbol"] for market in MARKETS_RESPONSE}
+
+    ccxt_connector.invalidate_markets("BINANCE")
+    ccxt_connector.fetch_markets("binance")
+    assert fake_exchange.nb_calls == 2
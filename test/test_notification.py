@@ -0,0 +1,68 @@
+import pickle
+import threading
+
+from trazy_analysis.common.notification import (
+    FileSink,
+    MemorySink,
+    NotificationDispatcher,
+    NotificationSink,
+)
+
+
+class BlockingSink(MemorySink):
+    def __init__(self):
+        super().__init__()
+        self.sending = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, messages: list[str]) -> None:
+        self.sending.set()
+        self.release.wait(timeout=5)
+        super().send(messages)
+
+
+class FailingSink(NotificationSink):
+    def send(self, messages: list[str]) -> None:
+        raise Exception("Network unreachable")
+
+
+def test_notifications_are_coalesced_in_the_background():
+    sink = BlockingSink()
+    notification_dispatcher = NotificationDispatcher([sink])
+    assert notification_dispatcher.notify("first")
+    assert sink.sending.wait(timeout=5)
+
+    # The notifications queued while the sink is busy are sent together, the last one of a key replacing the first
+    notification_dispatcher.notify("BUY ETH/EUR", "cash = 100", key="ETH/EUR")
+    notification_dispatcher.notify("BUY BTC/EUR")
+    notification_dispatcher.notify(lambda: "BUY ETH/EUR again", key="ETH/EUR")
+    sink.release.set()
+    notification_dispatcher.flush()
+
+    assert sink.sent == [["first"], ["BUY ETH/EUR again", "BUY BTC/EUR"]]
+    assert notification_dispatcher.nb_sends == 2
+    notification_dispatcher.close()
+    assert notification_dispatcher.thread is None
+
+
+def test_sinks_and_disabled_dispatcher(tmp_path):
+    path = str(tmp_path / "notifications.txt")
+    memory_sink = MemorySink()
+    notification_dispatcher = NotificationDispatcher(
+        [FailingSink(), FileSink(path), memory_sink]
+    )
+    notification_dispatcher.notify("Signal generated!", "BUY LONG ETH/EUR")
+    notification_dispatcher.close()
+    assert memory_sink.sent == [["Signal generated!", "BUY LONG ETH/EUR"]]
+    with open(path) as file:
+        assert file.read() == "Signal generated!\nBUY LONG ETH/EUR\n\n"
+
+    def portfolio_message() -> str:
+        raise Exception("The messages of a disabled dispatcher shouldn't be formatted")
+
+    disabled_dispatcher = pickle.loads(
+        pickle.dumps(NotificationDispatcher([memory_sink], enabled=False))
+    )
+    assert not disabled_dispatcher.notify("Signal generated!", portfolio_message)
+    assert disabled_dispatcher.thread is None
+    assert len(memory_sink.sent) == 1
@@ -0,0 +1,66 @@
+from trazy_analysis.models.parameter import Choice, Continuous, Discrete
+from trazy_analysis.optimization.evaluator import FunctionEvaluator
+from trazy_analysis.optimization.optimizer import GPyOptimizer, HyperOptimizer
+from trazy_analysis.optimization.trial_store import TrialStore
+
+SPACE = {
+    "a": Discrete([5, 75]),
+    "b": Continuous([0, 1]),
+    "c": Choice(["x", "y"]),
+}
+
+
+def objective(a: int, b: float, c: str) -> float:
+    return -((a - 40) ** 2) - b + (1 if c == "y" else 0)
+
+
+def test_hyperoptimizer_concurrent_evaluations():
+    with FunctionEvaluator(
+        objective, nb_workers=2, use_processes=False
+    ) as evaluator:
+        best_params = HyperOptimizer(seed=0).maximize(
+            objective, SPACE, nb_iter=30, max_evals=3, evaluator=evaluator
+        )
+    assert set(best_params.keys()) == {"a", "b", "c", "best_result"}
+    assert best_params["best_result"] == objective(
+        best_params["a"], best_params["b"], best_params["c"]
+    )
+
+
+def test_hyperoptimizer_resume():
+    calls = []
+
+    def counted_objective(a: int, b: float, c: str) -> float:
+        calls.append((a, b, c))
+        return objective(a, b, c)
+
+    trial_store = TrialStore()
+    evaluator = FunctionEvaluator(counted_objective, trial_store=trial_store)
+    first_best_params = HyperOptimizer(seed=0).maximize(
+        counted_objective, SPACE, nb_iter=10, evaluator=evaluator
+    )
+    assert len(calls) == 10
+
+    best_params = HyperOptimizer(seed=0).maximize(
+        counted_objective, SPACE, nb_iter=25, evaluator=evaluator
+    )
+    assert len(calls) == 25
+    assert len(trial_store.trials(evaluator.study)) == 25
+    assert best_params["best_result"] >= first_best_params["best_result"]
+
+
+def test_gpyoptimizer_batch():
+    calls = []
+
+    def counted_objective(a: int, b: float) -> float:
+        value = objective(a, b, "x")
+        calls.append(value)
+        return value
+
+    space = {"a": Discrete([5, 75]), "b": Continuous([0, 1])}
+    best_params = GPyOptimizer(initial_design_numdata=4).maximize(
+        counted_objective, space, nb_iter=6, max_evals=3
+    )
+    assert len(calls) == 10
+    assert isinstance(best_params["a"], int)
+    assert best_params["best_result"] == max(calls)
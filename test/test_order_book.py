@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.broker.order_book import (
+    MIN_COMPACTION_SIZE,
+    OrderBook,
+    intra_bar_path,
+)
+from trazy_analysis.common.clock import SimulatedClock
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import Action, Direction, IntraBarPath, OrderType
+from trazy_analysis.models.order import Order
+
+ASSET1 = Asset(symbol="AAA", exchange="BINANCE")
+ASSET2 = Asset(symbol="BBB", exchange="BINANCE")
+TIMESTAMP = datetime(2022, 1, 3, 10, 0, 0, tzinfo=pytz.UTC)
+
+
+def submitted_order(
+    clock: SimulatedClock,
+    asset: Asset,
+    action: Action,
+    order_type: OrderType,
+    time_in_force: timedelta = timedelta(minutes=5),
+    **prices
+) -> Order:
+    order = Order(
+        asset=asset,
+        time_unit=timedelta(minutes=1),
+        action=action,
+        direction=Direction.LONG,
+        size=1,
+        signal_id="1",
+        order_type=order_type,
+        clock=clock,
+        time_in_force=time_in_force,
+        **prices
+    )
+    order.submit()
+    return order
+
+
+def bar(asset: Asset, close: float, open=None, high=None, low=None) -> Candle:
+    open = open if open is not None else close
+    return Candle(
+        asset=asset,
+        open=open,
+        high=high if high is not None else max(open, close),
+        low=low if low is not None else min(open, close),
+        close=close,
+        volume=1,
+        timestamp=TIMESTAMP,
+    )
+
+
+def triggered_orders(order_book: OrderBook) -> list[Order]:
+    return [order for order, _ in order_book.pop_triggered()]
+
+
+def test_pop_triggered():
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order_book = OrderBook()
+    buy_limit = submitted_order(clock, ASSET1, Action.BUY, OrderType.LIMIT, limit=95)
+    sell_stop = submitted_order(clock, ASSET1, Action.SELL, OrderType.STOP, stop=90)
+    sell_target = submitted_order(clock, ASSET1, Action.SELL, OrderType.TARGET, target=110)
+    buy_stop = submitted_order(clock, ASSET1, Action.BUY, OrderType.STOP, stop=105)
+    other_asset_limit = submitted_order(clock, ASSET2, Action.BUY, OrderType.LIMIT, limit=95)
+    for order in [buy_limit, sell_stop, sell_target, buy_stop, other_asset_limit]:
+        order_book.add(order)
+    assert len(order_book) == 5
+
+    order_book.update_price(bar(ASSET1, 100))
+    assert order_book.pop_triggered() == []
+
+    order_book.update_price(bar(ASSET1, 89))
+    assert order_book.pop_triggered() == [(buy_limit, 89), (sell_stop, 89)]
+    order_book.update_price(bar(ASSET1, 110))
+    order_book.update_price(bar(ASSET2, 95))
+    assert triggered_orders(order_book) == [sell_target, buy_stop, other_asset_limit]
+    assert len(order_book) == 0
+
+
+def test_trailing_stops():
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order_book = OrderBook()
+    prices = [100, 102, 101, 104, 103, 102.5, 106, 99]
+    stop_pct = 0.02
+    orders = []
+    for index, price in enumerate(prices[:-1]):
+        if index % 2 == 0:
+            order = submitted_order(
+                clock, ASSET1, Action.SELL, OrderType.TRAILING_STOP, stop_pct=stop_pct
+            )
+            order.stop = price - price * stop_pct
+            order_book.add(order)
+            orders.append((order, index))
+        order_book.update_price(bar(ASSET1, price))
+        assert order_book.pop_triggered() == []
+
+    order_book.update_price(bar(ASSET1, prices[-1]))
+    assert triggered_orders(order_book) == [order for order, _ in orders]
+    for order, index in orders:
+        highest_price = max(prices[index:])
+        assert order.stop == highest_price - highest_price * stop_pct
+
+
+def test_pop_expired():
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order_book = OrderBook()
+    short_order = submitted_order(
+        clock, ASSET1, Action.BUY, OrderType.LIMIT, timedelta(minutes=1), limit=95
+    )
+    long_order = submitted_order(
+        clock, ASSET1, Action.BUY, OrderType.LIMIT, timedelta(minutes=10), limit=95
+    )
+    order_book.add(short_order)
+    order_book.add(long_order)
+
+    assert order_book.pop_expired(TIMESTAMP + timedelta(seconds=30)) == []
+    assert order_book.pop_expired(TIMESTAMP + timedelta(minutes=1)) == [short_order]
+    assert len(order_book) == 1
+    order_book.update_price(bar(ASSET1, 90))
+    assert triggered_orders(order_book) == [long_order]
+
+
+def test_compaction():
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order_book = OrderBook()
+    nb_orders = 4 * MIN_COMPACTION_SIZE
+    for index in range(nb_orders):
+        order_book.add(
+            submitted_order(
+                clock,
+                ASSET1,
+                Action.SELL,
+                OrderType.TRAILING_STOP,
+                timedelta(minutes=1 + index % 2),
+                stop_pct=0.01,
+                stop=99,
+            )
+        )
+        order_book.update_price(bar(ASSET1, 100 + index))
+        order_book.pop_triggered()
+    expired_orders = order_book.pop_expired(TIMESTAMP + timedelta(minutes=1))
+    assert len(expired_orders) == nb_orders // 2
+    assert len(order_book) == nb_orders // 2
+    asset_book = order_book.asset_books[ASSET1]
+    assert len(asset_book.trailing_stops[(Action.SELL, 0.01)]) <= 4 * len(asset_book)
+    assert len(order_book.expirations) <= 2 * len(order_book)
+
+
+def test_intra_bar_path():
+    bullish_bar = bar(ASSET1, 104, open=100, high=105, low=97)
+    assert intra_bar_path(bullish_bar, IntraBarPath.CLOSE) == (104,)
+    assert intra_bar_path(bullish_bar, IntraBarPath.OPEN_HIGH_LOW_CLOSE) == (100, 105, 97, 104)
+    assert intra_bar_path(bullish_bar, IntraBarPath.OPEN_LOW_HIGH_CLOSE) == (100, 97, 105, 104)
+    assert intra_bar_path(bullish_bar, IntraBarPath.NEAREST_EXTREMUM_FIRST) == (100, 97, 105, 104)
+
+
+def test_pop_triggered_intra_bar():
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order_book = OrderBook(IntraBarPath.OPEN_HIGH_LOW_CLOSE)
+    sell_stop = submitted_order(clock, ASSET1, Action.SELL, OrderType.STOP, stop=98)
+    sell_target = submitted_order(clock, ASSET1, Action.SELL, OrderType.TARGET, target=103)
+    buy_limit = submitted_order(clock, ASSET1, Action.BUY, OrderType.LIMIT, limit=90)
+    trailing_stop = submitted_order(
+        clock, ASSET1, Action.SELL, OrderType.TRAILING_STOP, stop_pct=0.05, stop=95
+    )
+    for order in [sell_stop, sell_target, buy_limit, trailing_stop]:
+        order_book.add(order)
+
+    # The high is reached before the low: the target is filled first at its price, then the stop. The trailing stop
+    # follows the high up to 99.75 and is crossed on the way down to the low.
+    order_book.update_price(bar(ASSET1, 104, open=100, high=105, low=97))
+    assert order_book.pop_triggered() == [
+        (sell_target, 103),
+        (sell_stop, 98),
+        (trailing_stop, 99.75),
+    ]
+    assert trailing_stop.stop == 99.75
+
+    # A bar opening beyond the trigger price fills the order at the open
+    order_book.update_price(bar(ASSET1, 88, open=89, high=89.5, low=87))
+    assert order_book.pop_triggered() == [(buy_limit, 89)]
+    assert len(order_book) == 0
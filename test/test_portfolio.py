@@ -670,3 +670,38 @@ def test_neq_different_type():
     assert port1 == port2
     assert port1 != port3
     assert port1 != object()
+
+
+def test_snapshot():
+    timestamp = datetime.strptime("2017-10-05 08:00:00+0000", "%Y-%m-%d %H:%M:%S%z")
+    port = Portfolio(starting_cash=100000.0, timestamp=timestamp)
+    asset = Asset(symbol="AAA", exchange="IEX")
+    port.transact_symbol(
+        Transaction(
+            asset=asset,
+            size=100,
+            action=Action.BUY,
+            direction=Direction.LONG,
+            price=567.0,
+            order_id=1,
+            commission=15.78,
+            timestamp=timestamp,
+        )
+    )
+    port.update_market_value_of_symbol(asset, 580.0, timestamp)
+
+    snapshot = port.snapshot()
+    assert snapshot.to_dict() == {
+        "cash": port.cash,
+        "total_market_value": port.total_market_value,
+        "total_equity": port.total_equity,
+        "total_unrealised_pnl": port.total_unrealised_pnl,
+        "total_realised_pnl": port.total_realised_pnl,
+        "total_pnl": port.total_pnl,
+    }
+    assert snapshot.total_market_value == 58000.0
+
+    port.update_market_value_of_symbol(asset, 590.0, timestamp)
+    assert port.snapshot(snapshot) is snapshot
+    assert snapshot.total_market_value == 59000.0
+    assert snapshot.total_equity == port.total_equity
@@ -2,7 +2,10 @@ from datetime import datetime
 
 import pytest
 
+from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.enums import Action, Direction
+from trazy_analysis.portfolio.portfolio import Portfolio
+from trazy_analysis.position.position import Position
 from trazy_analysis.position.position_handler import PositionHandler
 from trazy_analysis.position.transaction import Transaction
 
@@ -228,3 +231,67 @@ def test_neq_different_type():
     assert ph1 == ph2
     assert ph1 != ph3
     assert ph1 != object()
+
+
+def test_totals_are_maintained_on_transactions_and_price_updates():
+    ph = PositionHandler()
+    timestamp = datetime.strptime("2015-05-06 15:00:00+0000", "%Y-%m-%d %H:%M:%S%z")
+    symbols = ["AMZN", "MSFT", "GOOG"]
+    for index in range(60):
+        symbol = symbols[index % len(symbols)]
+        direction = Direction.LONG if index % 2 == 0 else Direction.SHORT
+        action = Action.BUY if index % 4 < 2 else Action.SELL
+        if direction == Direction.SHORT:
+            action = Action.SELL if action == Action.BUY else Action.BUY
+        if (
+            symbol not in ph.positions or direction not in ph.positions[symbol]
+        ) and (action == Action.SELL) == (direction == Direction.LONG):
+            continue
+        ph.transact_position(
+            Transaction(
+                symbol,
+                size=10,
+                action=action,
+                direction=direction,
+                price=100.0 + index * 0.37,
+                order_id=str(index),
+                commission=1.13,
+                timestamp=timestamp,
+            )
+        )
+        ph.update_price(symbols[(index + 1) % len(symbols)], 101.0 - index * 0.29)
+
+    positions = [
+        position for values in ph.positions.values() for position in values.values()
+    ]
+    assert ph.total_market_value() == pytest.approx(
+        sum(position.market_value for position in positions)
+    )
+    assert ph.total_unrealised_pnl() == pytest.approx(
+        sum(position.unrealised_pnl for position in positions)
+    )
+    assert ph.total_realised_pnl() == pytest.approx(
+        sum(position.realised_pnl for position in positions)
+    )
+    assert ph.total_pnl() == pytest.approx(
+        sum(position.total_pnl for position in positions)
+    )
+
+
+def test_totals_include_the_positions_synchronized_from_a_broker():
+    portfolio = Portfolio(starting_cash=1000.0)
+    pos_handler = portfolio.pos_handler
+    eth = Asset(symbol="ETH/EUR", exchange="binance")
+    btc = Asset(symbol="BTC/EUR", exchange="binance")
+
+    # The live brokers replace the positions with the balances of the account, no candle has been received yet
+    pos_handler.set_position(eth, Direction.LONG, Position(eth, 100.0, 2, 0, Direction.LONG))
+    pos_handler.set_position(btc, Direction.LONG, Position(btc, 50.0, 1, 0, Direction.LONG))
+    assert portfolio.total_market_value == 250.0
+    assert portfolio.total_equity == 1250.0
+
+    pos_handler.set_position(eth, Direction.LONG, Position(eth, 100.0, 3, 0, Direction.LONG))
+    assert portfolio.total_market_value == 350.0
+    pos_handler.remove_position(btc, Direction.LONG)
+    assert btc not in pos_handler.positions
+    assert portfolio.total_market_value == 300.0
@@ -0,0 +1,82 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from trazy_analysis.optimization.pruner import MedianPruner, SuccessiveHalvingPruner
+from trazy_analysis.statistics.running_metrics import Checkpoint, RunningMetrics
+
+
+def checkpoint(step: int, total_return: float) -> Checkpoint:
+    running_metrics = RunningMetrics()
+    running_metrics.update(100.0)
+    running_metrics.update(100.0 * (1 + total_return))
+    return Checkpoint(step=step, timestamp=None, metrics=running_metrics)
+
+
+def test_median_pruner():
+    pruner = MedianPruner(nb_startup_trials=3, nb_warmup_steps=1)
+    for total_return in [0.1, 0.2, 0.3]:
+        assert not pruner(checkpoint(1, total_return))
+        assert not pruner(checkpoint(2, total_return))
+    # Warmup step
+    assert not pruner(checkpoint(1, -0.5))
+    assert pruner(checkpoint(2, 0.15))
+    assert not pruner(checkpoint(2, 0.25))
+
+
+def test_median_pruner_metric():
+    pruner = MedianPruner(metric="max_drawdown", nb_startup_trials=1)
+    assert not pruner(checkpoint(1, -0.1))
+    assert pruner(checkpoint(1, 0.1))
+
+
+def test_successive_halving_pruner():
+    pruner = SuccessiveHalvingPruner(min_step=1, reduction_factor=2)
+    assert [pruner.is_rung(step) for step in range(1, 9)] == [
+        True,
+        True,
+        False,
+        True,
+        False,
+        False,
+        False,
+        True,
+    ]
+    # The first trial is always promoted
+    assert not pruner(checkpoint(1, 0.1))
+    # Top half of [0.1, 0.05]
+    assert pruner(checkpoint(1, 0.05))
+    assert not pruner(checkpoint(1, 0.2))
+    # Top half of [0.2, 0.1, 0.05, 0.0]: 0.2 and 0.1
+    assert pruner(checkpoint(1, 0.0))
+    assert not pruner(checkpoint(1, 0.1))
+    # Not a rung
+    assert not pruner(checkpoint(3, -1))
+
+    # The rungs would never grow
+    with pytest.raises(Exception):
+        SuccessiveHalvingPruner(reduction_factor=1)
+    with pytest.raises(Exception):
+        SuccessiveHalvingPruner(min_step=0)
+
+
+def report(pruner: MedianPruner, total_return: float) -> bool:
+    return pruner(checkpoint(1, total_return))
+
+
+def test_pruner_share():
+    pruner = MedianPruner(nb_startup_trials=2)
+    pruner.share()
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            assert not executor.submit(report, pruner, 0.1).result()
+            assert not executor.submit(report, pruner, 0.2).result()
+        assert pruner(checkpoint(1, 0.0))
+    finally:
+        pruner.close()
+    assert list(pruner.values.keys()) == [1]
+    assert np.allclose(pruner.values[1], [0.1, 0.2, 0.0])
+    # Not shared anymore, the pruner can be pickled with its values
+    assert pickle.loads(pickle.dumps(pruner)).values == pruner.values
@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from trazy_analysis.common.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_continuous_bucket():
+    fake_time = FakeTime()
+    bucket = TokenBucket(capacity=4, period=2, time_function=fake_time)
+    # A burst of capacity requests then one request every period / capacity
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    fake_time.now += 1.0
+    assert bucket.reserve(2) == pytest.approx(1.0)
+    assert bucket.metrics() == {
+        "acquisitions": 7,
+        "throttled": 3,
+        "wait_time": pytest.approx(2.5),
+        "max_wait_time": pytest.approx(1.0),
+    }
+    with pytest.raises(Exception):
+        bucket.reserve(5)
+
+
+def test_interval_bucket():
+    fake_time = FakeTime()
+    bucket = TokenBucket(capacity=3, period=5, continuous=False, time_function=fake_time)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # The next requests wait for the next windows
+    fake_time.now += 1
+    assert bucket.reserve() == pytest.approx(4)
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([4, 4, 9])
+    fake_time.now += 5
+    assert bucket.reserve() == pytest.approx(4)
+    # After an idle time the window starts with the next request
+    fake_time.now += 100
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0, 0, 0, 5])
+
+
+def test_rate_limiter_across_threads_and_tasks():
+    rate_limiter = RateLimiter()
+    rate_limiter.set_limit("BINANCE", capacity=5, period=0.25)
+    rate_limiter.set_limit("binance", capacity=1, period=10, weight_class="orders")
+    assert rate_limiter.acquire("kraken") == 0.0
+
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=rate_limiter.acquire, args=("binance",))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def acquire_all():
+        await asyncio.gather(
+            *(rate_limiter.acquire_async("binance") for _ in range(5))
+        )
+
+    asyncio.run(acquire_all())
+    # 5 requests in the first burst then 10 requests at 20 requests per second
+    assert time.monotonic() - start >= 0.45
+    assert rate_limiter.acquire("binance", weight_class="orders") == 0.0
+
+    metrics = rate_limiter.metrics()
+    assert metrics["binance/default"]["acquisitions"] == 15
+    assert metrics["binance/default"]["throttled"] == 10
+    assert metrics["binance/orders"]["acquisitions"] == 1
+
+
+def acquire_in_process(rate_limiter: RateLimiter, nb_requests: int) -> None:
+    for _ in range(nb_requests):
+        rate_limiter.acquire("binance")
+
+
+def test_rate_limiter_shared_across_processes():
+    rate_limiter = RateLimiter(shared=True)
+    rate_limiter.set_limit("binance", capacity=2, period=0.1)
+    processes = [
+        multiprocessing.Process(target=acquire_in_process, args=(rate_limiter, 4))
+        for _ in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    metrics = rate_limiter.metrics()["binance/default"]
+    assert metrics["acquisitions"] == 8
+    assert metrics["throttled"] == 6
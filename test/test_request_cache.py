@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from trazy_analysis.common.request_cache import RequestCache
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_requests_in_flight_are_shared():
+    request_cache = RequestCache(max_workers=4)
+    release = threading.Event()
+    calls = []
+
+    def fetch(symbol: str) -> str:
+        calls.append(symbol)
+        release.wait(timeout=5)
+        return symbol.lower()
+
+    first_future = request_cache.submit(("binance", "ETH"), fetch, "ETH")
+    second_future = request_cache.submit(("binance", "ETH"), fetch, "ETH")
+    other_future = request_cache.submit(("binance", "XRP"), fetch, "XRP")
+    release.set()
+
+    assert second_future is first_future
+    assert first_future.result() == "eth"
+    assert other_future.result() == "xrp"
+    assert sorted(calls) == ["ETH", "XRP"]
+    request_cache.shutdown()
+
+
+def test_responses_are_cached_until_they_expire():
+    fake_time = FakeTime()
+    request_cache = RequestCache(time_function=fake_time)
+    calls = []
+
+    def fetch() -> int:
+        calls.append(fake_time.now)
+        return len(calls)
+
+    assert request_cache.get("tickers", fetch, ttl=1.0) == 1
+    fake_time.now = 0.5
+    assert request_cache.get("tickers", fetch, ttl=1.0) == 1
+    fake_time.now = 1.5
+    assert request_cache.get("tickers", fetch, ttl=1.0) == 2
+    assert request_cache.get("balance", fetch) == 3
+    assert request_cache.get("balance", fetch) == 4
+
+    request_cache.invalidate(lambda key: key == "tickers")
+    assert request_cache.get("tickers", fetch, ttl=1.0) == 5
+    request_cache.shutdown()
+
+
+def test_failed_requests_are_not_cached():
+    request_cache = RequestCache()
+    calls = []
+
+    def fetch() -> str:
+        calls.append(None)
+        if len(calls) == 1:
+            raise Exception("Connection error")
+        return "ok"
+
+    with pytest.raises(Exception, match="Connection error"):
+        request_cache.get("tickers", fetch, ttl=60.0)
+    assert request_cache.get("tickers", fetch, ttl=60.0) == "ok"
+    request_cache.shutdown()
@@ -0,0 +1,200 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.broker.fee_model import FeeModelManager
+from trazy_analysis.broker.percent_fee_model import PercentFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.result_cache import (
+    BacktestResult,
+    BacktestResultCache,
+    feed_digest,
+    result_key,
+)
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.common.types import CandleDataFrame
+from trazy_analysis.models.enums import OrderType
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategies.vectorized_sma_crossover_strategy import (
+    VectorizedSmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+STRATEGIES_PARAMETERS = {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}}
+
+
+def backtest_config(**kwargs) -> BacktestConfig:
+    kwargs.setdefault("fee_models", BinanceFeeModel())
+    return BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+        **kwargs,
+    )
+
+
+def create_backtest(**kwargs) -> Backtest:
+    config = backtest_config(**kwargs)
+    return Backtest(assets=config.assets, start=config.start, backtest_config=config)
+
+
+def statistics(value: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"index": ["Sortino Ratio"], "Backtest results": [value]}
+    ).set_index("index")
+
+
+def test_result_key():
+    config = backtest_config()
+    data_digest = feed_digest(config.feed)
+    key = result_key(data_digest, config, STRATEGIES_PARAMETERS)
+    assert key == result_key(
+        feed_digest(backtest_config().feed), backtest_config(), STRATEGIES_PARAMETERS
+    )
+
+    other_keys = [
+        result_key(
+            data_digest,
+            config,
+            {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 66}},
+        ),
+        result_key(
+            data_digest,
+            config,
+            {VectorizedSmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}},
+        ),
+        result_key(
+            data_digest,
+            backtest_config(fee_models=PercentFeeModel(commission_pct=0.002)),
+            STRATEGIES_PARAMETERS,
+        ),
+        result_key(
+            data_digest,
+            backtest_config(fixed_order_type=OrderType.LIMIT),
+            STRATEGIES_PARAMETERS,
+        ),
+        result_key("other data", config, STRATEGIES_PARAMETERS),
+    ]
+    assert len(set(other_keys + [key])) == len(other_keys) + 1
+
+
+def test_feed_digest():
+    config = backtest_config()
+    data_digest = feed_digest(config.feed)
+    candle_dataframe = config.feed.candle_dataframes[ASSET][TIME_UNIT]
+    candle_dataframe.iloc[10, candle_dataframe.columns.get_loc("close")] += 1
+    assert feed_digest(config.feed) != data_digest
+
+
+def test_result_key_fetched_fee_models():
+    # The fee models fetched with the data leave the fee models of the config to None
+    configs = []
+    for commission_pct in [0.001, 0.002]:
+        config = backtest_config(fee_models=None)
+        config.fee_models_manager = FeeModelManager(
+            {ASSET: PercentFeeModel(commission_pct=commission_pct)}
+        )
+        configs.append(config)
+    data_digest = feed_digest(configs[0].feed)
+    assert result_key(data_digest, configs[0], STRATEGIES_PARAMETERS) != result_key(
+        data_digest, configs[1], STRATEGIES_PARAMETERS
+    )
+
+
+def test_backtest_feed_digest_after_append():
+    backtest = create_backtest()
+    feed = backtest.backtest_config.feed
+    data_digest = backtest.feed_digest()
+    assert backtest.feed_digest() == data_digest
+
+    last_candle = feed.candles[ASSET][TIME_UNIT][-1]
+    new_candle = Candle(
+        asset=ASSET,
+        open=last_candle.close,
+        high=last_candle.close,
+        low=last_candle.close,
+        close=last_candle.close,
+        volume=1,
+        timestamp=last_candle.timestamp + TIME_UNIT,
+        time_unit=TIME_UNIT,
+    )
+    feed.append([CandleDataFrame.from_candle_list(asset=ASSET, candles=np.array([new_candle]))])
+    assert backtest.feed_digest() != data_digest
+    assert backtest.feed_digest() == feed_digest(feed)
+
+
+def test_result_cache_eviction(tmp_path):
+    result_cache = BacktestResultCache(str(tmp_path))
+    result_cache.put("a", BacktestResult(statistics(1)))
+    entry_size = result_cache.size()
+    result_cache.max_size = 2 * entry_size
+    result_cache.put("b", BacktestResult(statistics(2)))
+    # Make "a" the most recently used result
+    time.sleep(0.01)
+    assert result_cache.get("a").statistics.equals(statistics(1))
+    result_cache.put("c", BacktestResult(statistics(3)))
+
+    assert len(result_cache) == 2
+    assert result_cache.get("b") is None
+    assert result_cache.get("a") is not None
+    assert result_cache.get("c") is not None
+    assert result_cache.size() <= result_cache.max_size
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+    result_cache.clear()
+    assert len(result_cache) == 0
+
+
+def test_backtest_result_cache(tmp_path):
+    result_cache = BacktestResultCache(str(tmp_path))
+    backtest = create_backtest(result_cache=result_cache)
+    expected_statistics = backtest.run_strategies(STRATEGIES_PARAMETERS)
+    assert not backtest.from_cache
+    expected_equity_df = backtest.equity_dfs["BINANCE"]
+    assert len(result_cache) == 1
+
+    # Another engine on the same data finds the result
+    backtest = create_backtest(result_cache=result_cache)
+    start = time.perf_counter()
+    statistics_df = backtest.run_strategy(
+        SmaCrossoverStrategy, STRATEGIES_PARAMETERS[SmaCrossoverStrategy]
+    )
+    cached_time = time.perf_counter() - start
+    assert backtest.from_cache
+    assert statistics_df.equals(expected_statistics)
+    assert backtest.equity_dfs["BINANCE"].equals(expected_equity_df)
+    assert cached_time < 1
+
+    backtest.run_strategy(SmaCrossoverStrategy, {"short_sma": 9, "long_sma": 66})
+    assert not backtest.from_cache
+    assert len(result_cache) == 2
+
+
+def test_backtest_result_cache_without_equity(tmp_path):
+    result_cache = BacktestResultCache(str(tmp_path), with_equity=False)
+    backtest = create_backtest(result_cache=result_cache)
+    expected_statistics = backtest.run_strategies(STRATEGIES_PARAMETERS)
+    assert backtest.run_strategies(STRATEGIES_PARAMETERS).equals(expected_statistics)
+    assert backtest.from_cache
+    assert backtest.equity_dfs == {}
+
+
+def test_pruned_backtest_not_cached(tmp_path):
+    result_cache = BacktestResultCache(str(tmp_path))
+    backtest = create_backtest(
+        result_cache=result_cache, checkpoint_interval=timedelta(hours=2)
+    )
+    backtest.run_strategies(STRATEGIES_PARAMETERS, lambda checkpoint: True)
+    assert backtest.pruned
+    assert len(result_cache) == 0
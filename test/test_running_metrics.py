@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.statistics import performance as perf
+from trazy_analysis.statistics.running_metrics import RunningMetrics
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+STRATEGIES_PARAMETERS = {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}}
+
+
+def create_backtest(checkpoint_interval: timedelta = None) -> Backtest:
+    backtest_config = BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+        checkpoint_interval=checkpoint_interval,
+    )
+    return Backtest(
+        assets=backtest_config.assets,
+        start=backtest_config.start,
+        backtest_config=backtest_config,
+    )
+
+
+def test_running_metrics():
+    equities = [100.0, 110.0, 99.0, 120.0, 90.0, 95.0]
+    running_metrics = RunningMetrics()
+    assert running_metrics.total_return == 0.0
+    assert running_metrics.drawdown == 0.0
+    assert running_metrics.sharpe_ratio == 0.0
+    for equity in equities:
+        running_metrics.update(equity)
+
+    returns = np.diff(equities) / equities[:-1]
+    assert running_metrics.nb_updates == len(equities)
+    assert running_metrics.equity == 95.0
+    assert running_metrics.peak_equity == 120.0
+    assert np.isclose(running_metrics.total_return, -0.05)
+    assert np.isclose(running_metrics.drawdown, 1 - 95.0 / 120.0)
+    assert np.isclose(running_metrics.max_drawdown, 1 - 90.0 / 120.0)
+    assert np.isclose(
+        running_metrics.sharpe_ratio, perf.create_sharpe_ratio(returns, 252)
+    )
+
+
+def test_running_metrics_constant_equity():
+    running_metrics = RunningMetrics()
+    running_metrics.update(100.0)
+    running_metrics.update(100.0)
+    assert running_metrics.sharpe_ratio == 0.0
+    assert running_metrics.max_drawdown == 0.0
+
+    # Constant non-zero returns
+    running_metrics = RunningMetrics()
+    for equity in [100.0, 50.0, 25.0]:
+        running_metrics.update(equity)
+    assert running_metrics.sharpe_ratio == float("-inf")
+
+
+def test_backtest_checkpoints():
+    backtest = create_backtest()
+    backtest.run_strategies(STRATEGIES_PARAMETERS)
+    expected_statistics = backtest.get_statistics()
+    expected_equity = backtest.event_loop.equity_dfs["BINANCE"]["Equity"]
+
+    checkpoints = []
+
+    def checkpoint_callback(checkpoint) -> bool:
+        checkpoints.append(
+            (checkpoint.step, checkpoint.timestamp, checkpoint.metrics.equity)
+        )
+        return False
+
+    backtest = create_backtest(checkpoint_interval=timedelta(hours=2))
+    backtest.run_strategies(STRATEGIES_PARAMETERS, checkpoint_callback)
+
+    assert not backtest.event_loop.pruned
+    assert backtest.get_statistics().equals(expected_statistics)
+    assert len(checkpoints) > 5
+    assert [step for step, _, _ in checkpoints] == list(range(1, len(checkpoints) + 1))
+    timestamps = [timestamp for _, timestamp, _ in checkpoints]
+    for previous_timestamp, timestamp in zip(timestamps, timestamps[1:]):
+        assert timestamp - previous_timestamp >= timedelta(hours=2)
+    for _, _, equity in checkpoints:
+        assert expected_equity.min() <= equity <= expected_equity.max()
+
+
+def test_backtest_pruned():
+    backtest = create_backtest(checkpoint_interval=timedelta(hours=2))
+    checkpoints = []
+
+    def checkpoint_callback(checkpoint) -> bool:
+        checkpoints.append((checkpoint.step, checkpoint.timestamp))
+        return checkpoint.step == 2
+
+    statistics = backtest.run_strategy(
+        SmaCrossoverStrategy,
+        STRATEGIES_PARAMETERS[SmaCrossoverStrategy],
+        checkpoint_callback,
+    )
+
+    assert [step for step, _ in checkpoints] == [1, 2]
+    assert backtest.event_loop.pruned
+    assert statistics.loc["Sortino Ratio"]["Backtest results"] == -1
+    equity_df = backtest.event_loop.equity_dfs["BINANCE"]
+    assert not equity_df.empty
+    assert equity_df.index[-1] <= checkpoints[-1][1]
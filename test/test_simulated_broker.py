@@ -11,7 +11,15 @@ from trazy_analysis.common.clock import SimulatedClock
 from trazy_analysis.feed.feed import CsvFeed, Feed
 from trazy_analysis.models.asset import Asset
 from trazy_analysis.models.candle import Candle
-from trazy_analysis.models.enums import Action, Direction, OrderType, IndicatorMode
+from trazy_analysis.models.enums import (
+    Action,
+    Direction,
+    IndicatorMode,
+    IntraBarPath,
+    OrderStatus,
+    OrderType,
+)
+from trazy_analysis.models.multiple_order import BracketOrder
 from trazy_analysis.models.order import Order
 from trazy_analysis.order_manager.order_creator import OrderCreator
 from trazy_analysis.order_manager.order_manager import OrderManager
@@ -659,3 +667,64 @@ def test_execute_bracket_order():
     event_loop.loop()
 
     assert broker.get_portfolio_cash_balance() == 10007.175
+
+
+def test_execute_bracket_order_intra_bar():
+    clock = SimulatedClock()
+    timestamp = datetime.strptime("2017-10-05 08:00:00+0000", "%Y-%m-%d %H:%M:%S%z")
+    clock.update_time(timestamp)
+    events = deque()
+    sb = SimulatedBroker(
+        clock=clock,
+        events=events,
+        initial_funds=10000,
+        intra_bar_path=IntraBarPath.OPEN_HIGH_LOW_CLOSE,
+    )
+    sb.subscribe_funds_to_portfolio(10000)
+
+    def new_bar(minutes: int, open: float, high: float, low: float, close: float):
+        clock.update_time(timestamp + timedelta(minutes=minutes))
+        sb.update_price(
+            Candle(
+                asset=AAPL_ASSET,
+                open=open,
+                high=high,
+                low=low,
+                close=close,
+                volume=100,
+                timestamp=timestamp + timedelta(minutes=minutes),
+            )
+        )
+        sb.execute_open_orders()
+
+    def bracket_order_leg(action: Action, order_type: OrderType, **prices) -> Order:
+        return Order(asset=AAPL_ASSET, time_unit=timedelta(minutes=1), action=action, direction=Direction.LONG,
+                     size=10, signal_id="1", order_type=order_type, clock=clock, **prices)
+
+    new_bar(0, 100, 100, 100, 100)
+    initiation_order = bracket_order_leg(Action.BUY, OrderType.LIMIT, limit=99)
+    target_order = bracket_order_leg(Action.SELL, OrderType.TARGET, target=103)
+    stop_order = bracket_order_leg(Action.SELL, OrderType.STOP, stop=97)
+    bracket_order = BracketOrder(
+        asset=AAPL_ASSET,
+        initiation_order=initiation_order,
+        target_order=target_order,
+        stop_order=stop_order,
+        clock=clock,
+    )
+    sb.submit_order(bracket_order)
+    sb.execute_open_orders()
+    assert len(sb.order_book) == 1
+
+    # The limit order is filled at its price when the bar goes down to its low, then the exit orders rest in the book
+    new_bar(1, 100, 100.5, 98.5, 99.5)
+    assert initiation_order.status == OrderStatus.COMPLETED
+    assert len(sb.order_book) == 2
+
+    # Both exit orders are crossed by the bar, the target is reached first and cancels the stop
+    new_bar(2, 99.5, 104, 96, 100)
+    assert target_order.status == OrderStatus.COMPLETED
+    assert stop_order.status == OrderStatus.CANCELLED
+    assert len(sb.order_book) == 0
+    assert [txn.price for txn in sb.portfolio.transactions] == [99, 103]
+    assert sb.portfolio.pos_handler.positions == {}
@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
@@ -48,3 +50,40 @@ def test_sma_stream_handle_data_source_is_filled_indicator_stream():
     assert sma.data == pytest.approx(6.733, abs=0.01)
     indicator_stream.push(7)
     assert sma.data == 6.666666666666666666666666667
+
+
+def test_sma_memoized_by_parameters_value():
+    memoized_indicators = ReactiveIndicators(memoize=True, mode=IndicatorMode.LIVE)
+    indicator_stream = memoized_indicators.Indicator(size=3)
+    # Equal periods built separately are different objects
+    period1 = int("300")
+    period2 = int("300")
+    assert period1 is not period2
+    sma1 = memoized_indicators.Sma(source=indicator_stream, period=period1)
+    sma2 = memoized_indicators.Sma(source=indicator_stream, period=period2)
+    assert sma1 is sma2
+    sma3 = memoized_indicators.Sma(source=indicator_stream, period=301)
+    assert sma3 is not sma1
+    other_indicator_stream = memoized_indicators.Indicator(size=4)
+    sma4 = memoized_indicators.Sma(source=other_indicator_stream, period=period1)
+    assert sma4 is not sma1
+
+
+def test_sma_pickle():
+    memoized_indicators = ReactiveIndicators(memoize=True, mode=IndicatorMode.LIVE)
+    indicator_stream = memoized_indicators.Indicator(size=3)
+    sma = memoized_indicators.Sma(source=indicator_stream, period=3)
+    indicator_stream.push(7.2)
+    indicator_stream.push(6.7)
+
+    unpickled_indicators, unpickled_indicator_stream, unpickled_sma = pickle.loads(
+        pickle.dumps((memoized_indicators, indicator_stream, sma))
+    )
+    unpickled_indicator_stream.push(6.3)
+    assert unpickled_sma.data == 6.733333333333333333333333333
+    assert sma.data is None
+    # The unpickled indicators are memoized by the unpickled manager
+    assert (
+        unpickled_indicators.Sma(source=unpickled_indicator_stream, period=3)
+        is unpickled_sma
+    )
@@ -0,0 +1,188 @@
+from collections import deque
+from datetime import timedelta
+
+from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.broker.broker_manager import BrokerManager
+from trazy_analysis.broker.simulated_broker import SimulatedBroker
+from trazy_analysis.common.clock import Clock, SimulatedClock
+from trazy_analysis.common.crypto_exchange_calendar import CryptoExchangeCalendar
+from trazy_analysis.feed.feed import CsvFeed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import Action, Direction, IndicatorMode
+from trazy_analysis.models.signal import Signal
+from trazy_analysis.order_manager.order_creator import OrderCreator
+from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.order_manager.position_sizer import PositionSizer
+from trazy_analysis.strategy.strategies.idle_strategy import IdleStrategy
+from trazy_analysis.strategy.context import Context
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategy import Strategy
+from trazy_analysis.strategy.strategy_executor import (
+    ParallelStrategyExecutor,
+    StrategyInstanceSpec,
+    shard_strategy_instances_specs,
+    strategy_instances_specs,
+)
+
+EXCHANGE = "BINANCE"
+TIME_UNIT = timedelta(minutes=1)
+ASSETS = [Asset(symbol=f"BTC{i}USDT", exchange=EXCHANGE) for i in range(4)]
+FUND = 10000
+STRATEGIES_PARAMETERS = {
+    SmaCrossoverStrategy: SmaCrossoverStrategy.DEFAULT_PARAMETERS,
+    IdleStrategy: IdleStrategy.DEFAULT_PARAMETERS,
+}
+
+
+class EndOfDayStrategy(Strategy):
+    """
+    Buy at the end of the day of the market calendar of the clock
+    """
+
+    DEFAULT_PARAMETERS = {}
+
+    def process_context(self, context: Context, clock: Clock) -> None:
+        self.clock = clock
+        super().process_context(context, clock)
+
+    def current(self, candle: Candle) -> None:
+        if self.clock.end_of_day():
+            self.add_signal(
+                Signal(
+                    asset=candle.asset,
+                    time_unit=candle.time_unit,
+                    action=Action.BUY,
+                    direction=Direction.LONG,
+                )
+            )
+
+
+def run_event_loop(
+    strategy_executor: ParallelStrategyExecutor = None,
+    strategies_parameters: dict = STRATEGIES_PARAMETERS,
+    clock: SimulatedClock = None,
+) -> EventLoop:
+    events = deque()
+    feed = CsvFeed(
+        csv_filenames={
+            asset: {TIME_UNIT: "test/data/btc_usdt_one_day.csv"} for asset in ASSETS
+        },
+        events=events,
+    )
+    clock = clock if clock is not None else SimulatedClock()
+    broker = SimulatedBroker(clock, events, initial_funds=FUND)
+    broker.subscribe_funds_to_portfolio(FUND)
+    broker_manager = BrokerManager(brokers={EXCHANGE: broker})
+    order_manager = OrderManager(
+        events=events,
+        broker_manager=broker_manager,
+        position_sizer=PositionSizer(broker_manager=broker_manager),
+        order_creator=OrderCreator(broker_manager=broker_manager),
+        clock=clock,
+    )
+    event_loop = EventLoop(
+        events=events,
+        assets={asset: TIME_UNIT for asset in ASSETS},
+        feed=feed,
+        order_manager=order_manager,
+        strategies_parameters=strategies_parameters,
+        indicator_mode=IndicatorMode.LIVE,
+        strategy_executor=strategy_executor,
+    )
+    event_loop.loop()
+    return event_loop
+
+
+def signals_summary(event_loop: EventLoop) -> list:
+    return [
+        (
+            signal.signal_id,
+            signal.action,
+            signal.direction,
+            signal.generation_time,
+            signal.root_candle_timestamp,
+        )
+        for asset in ASSETS
+        for signal in event_loop.signals[asset][TIME_UNIT]
+    ]
+
+
+def portfolio_events(event_loop: EventLoop) -> list:
+    broker = event_loop.broker_manager.get_broker(EXCHANGE)
+    return [
+        portfolio_event
+        for portfolio_event in broker.portfolio.history
+        if portfolio_event.type != "subscription"
+    ]
+
+
+def test_strategy_instances_specs():
+    candles = {asset: {TIME_UNIT: None} for asset in ASSETS[:2]}
+    specs = strategy_instances_specs(
+        STRATEGIES_PARAMETERS, {asset: [TIME_UNIT] for asset in ASSETS}, candles
+    )
+    assert [(spec.index, spec.strategy_class, spec.asset) for spec in specs] == [
+        (0, SmaCrossoverStrategy, ASSETS[0]),
+        (1, SmaCrossoverStrategy, ASSETS[1]),
+        (2, IdleStrategy, ASSETS[0]),
+        (3, IdleStrategy, ASSETS[1]),
+    ]
+
+
+def test_shard_strategy_instances_specs():
+    specs = [
+        StrategyInstanceSpec(0, SmaCrossoverStrategy, {}, ASSETS[0], TIME_UNIT),
+        StrategyInstanceSpec(1, SmaCrossoverStrategy, {}, ASSETS[1], TIME_UNIT),
+        StrategyInstanceSpec(2, SmaCrossoverStrategy, {}, ASSETS[2], TIME_UNIT),
+        StrategyInstanceSpec(3, IdleStrategy, {}, ASSETS[0], TIME_UNIT),
+    ]
+    shards = shard_strategy_instances_specs(specs, 2)
+    assert [[spec.index for spec in shard] for shard in shards] == [[0, 3], [1, 2]]
+    shards = shard_strategy_instances_specs(specs, 8)
+    assert [[spec.index for spec in shard] for shard in shards] == [[0, 3], [1], [2]]
+
+
+def test_parallel_strategy_executor_matches_sequential_execution():
+    sequential_event_loop = run_event_loop()
+    expected_signals = signals_summary(sequential_event_loop)
+    expected_portfolio_events = portfolio_events(sequential_event_loop)
+    assert len(expected_signals) != 0
+    assert len(expected_portfolio_events) != 0
+
+    for use_processes in [False, True]:
+        parallel_event_loop = run_event_loop(
+            ParallelStrategyExecutor(nb_workers=2, use_processes=use_processes)
+        )
+        assert signals_summary(parallel_event_loop) == expected_signals
+        assert portfolio_events(parallel_event_loop) == expected_portfolio_events
+        assert (
+            parallel_event_loop.broker_manager.get_broker(
+                EXCHANGE
+            ).get_portfolio_cash_balance()
+            == sequential_event_loop.broker_manager.get_broker(
+                EXCHANGE
+            ).get_portfolio_cash_balance()
+        )
+
+
+def test_parallel_strategy_executor_uses_the_market_calendar_of_the_clock():
+    strategies_parameters = {EndOfDayStrategy: {}}
+    sequential_event_loop = run_event_loop(
+        strategies_parameters=strategies_parameters,
+        clock=SimulatedClock(market_cal=CryptoExchangeCalendar()),
+    )
+    expected_signals = signals_summary(sequential_event_loop)
+    # The crypto exchanges close at midnight UTC
+    assert len(expected_signals) != 0
+    assert {signal[4].hour for signal in expected_signals} == {23}
+
+    for use_processes in [False, True]:
+        parallel_event_loop = run_event_loop(
+            ParallelStrategyExecutor(nb_workers=2, use_processes=use_processes),
+            strategies_parameters,
+            SimulatedClock(market_cal=CryptoExchangeCalendar()),
+        )
+        assert signals_summary(parallel_event_loop) == expected_signals
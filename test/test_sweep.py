@@ -0,0 +1,158 @@
+import gc
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.sweep import BacktestSweep, SharedFeed
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.optimization.pruner import MedianPruner
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+STRATEGIES_PARAMETERS_LIST = [
+    {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}},
+    {SmaCrossoverStrategy: {"short_sma": 5, "long_sma": 100}},
+    {SmaCrossoverStrategy: {"short_sma": 20, "long_sma": 50}},
+]
+
+
+def backtest_config() -> BacktestConfig:
+    return BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+    )
+
+
+def check_shared_feed(directory: str = None) -> None:
+    config = backtest_config()
+    shared_feed = SharedFeed(config.feed.candle_dataframes, directory=directory)
+    owner, candle_dataframes = shared_feed.spec.attach()
+    assert len(candle_dataframes) == 1
+    candle_dataframe = candle_dataframes[0]
+    expected_candle_dataframe = config.feed.candle_dataframes[ASSET][TIME_UNIT]
+    assert candle_dataframe.asset == ASSET
+    assert candle_dataframe.time_unit == TIME_UNIT
+    assert candle_dataframe.equals(expected_candle_dataframe)
+    assert (candle_dataframe.index == expected_candle_dataframe.index).all()
+
+    del candle_dataframe, candle_dataframes
+    gc.collect()
+    if directory is None:
+        owner.close()
+    shared_feed.close()
+    if directory is not None:
+        assert os.listdir(directory) == []
+
+
+def test_shared_feed_shared_memory():
+    check_shared_feed()
+
+
+def test_shared_feed_memmap(tmp_path):
+    check_shared_feed(str(tmp_path))
+
+
+def test_shared_feed_attach_does_not_copy():
+    config = backtest_config()
+    shared_feed = SharedFeed(config.feed.candle_dataframes)
+    owner, candle_dataframes = shared_feed.spec.attach()
+    buffer = np.frombuffer(owner.buf, dtype=np.uint8)
+    for column in ["open", "high", "low", "close", "volume"]:
+        assert np.shares_memory(candle_dataframes[0][column].to_numpy(), buffer)
+
+    del buffer, candle_dataframes
+    gc.collect()
+    owner.close()
+    shared_feed.close()
+
+
+def check_backtest_sweep(memmap_directory: str = None) -> None:
+    config = backtest_config()
+    with BacktestSweep(
+        config, nb_workers=2, memmap_directory=memmap_directory
+    ) as backtest_sweep:
+        results = backtest_sweep.run(STRATEGIES_PARAMETERS_LIST)
+
+    assert len(results) == len(STRATEGIES_PARAMETERS_LIST)
+    for strategies_parameters, result in zip(STRATEGIES_PARAMETERS_LIST, results):
+        assert result.error is None
+        assert result.strategies_parameters == strategies_parameters
+
+        backtest = Backtest(assets=config.assets, start=config.start, backtest_config=config)
+        backtest.run_strategies(strategies_parameters)
+        assert result.statistics.equals(backtest.get_statistics())
+        expected_equity = backtest.event_loop.equity_dfs["BINANCE"]["Equity"]
+        assert result.equity["BINANCE"].equals(expected_equity)
+        assert result.final_equity == {"BINANCE": float(expected_equity.iloc[-1])}
+
+
+def test_backtest_sweep_shared_memory():
+    check_backtest_sweep()
+
+
+def test_backtest_sweep_memmap(tmp_path):
+    check_backtest_sweep(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_backtest_sweep_failure():
+    config = backtest_config()
+    with BacktestSweep(config, nb_workers=1, with_equity=False) as backtest_sweep:
+        results = backtest_sweep.run(
+            [
+                {SmaCrossoverStrategy: {"short_sma": 9}},
+                STRATEGIES_PARAMETERS_LIST[0],
+            ]
+        )
+
+    assert results[0].error is not None
+    assert results[0].statistics is None
+    assert results[1].error is None
+    assert results[1].equity == {}
+
+
+def test_backtest_sweep_fan_out():
+    config = backtest_config()
+    with BacktestSweep(config, nb_workers=2) as backtest_sweep:
+        expected_results = backtest_sweep.run(STRATEGIES_PARAMETERS_LIST)
+    with BacktestSweep(config, nb_workers=2, fan_out_size=2) as backtest_sweep:
+        results = backtest_sweep.run(STRATEGIES_PARAMETERS_LIST)
+
+    assert len(results) == len(STRATEGIES_PARAMETERS_LIST)
+    for strategies_parameters, expected_result, result in zip(
+        STRATEGIES_PARAMETERS_LIST, expected_results, results
+    ):
+        assert result.error is None
+        assert result.strategies_parameters == strategies_parameters
+        assert result.statistics.equals(expected_result.statistics)
+        assert result.equity["BINANCE"].equals(expected_result.equity["BINANCE"])
+
+
+def test_backtest_sweep_pruner():
+    config = backtest_config()
+    config.checkpoint_interval = timedelta(hours=2)
+    pruner = MedianPruner(nb_startup_trials=1)
+    with BacktestSweep(
+        config, nb_workers=1, with_equity=False, pruner=pruner
+    ) as backtest_sweep:
+        results = backtest_sweep.run(STRATEGIES_PARAMETERS_LIST)
+
+    assert not results[0].pruned
+    assert any(result.pruned for result in results[1:])
+    for result in results:
+        assert result.error is None
+        if result.pruned:
+            assert result.statistics.loc["Sortino Ratio"]["Backtest results"] == -1
+    # The values reported by the workers are kept once the sweep is closed
+    assert len(pruner.values[1]) == len(STRATEGIES_PARAMETERS_LIST)
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import numpy as np
+
+from trazy_analysis.benchmarks.synthetic_data import generate_candle_dataframes
+from trazy_analysis.feed.feed import PandasFeed
+from trazy_analysis.models.asset import Asset
+
+
+def test_generate_candle_dataframes():
+    time_units = [timedelta(minutes=5), timedelta(minutes=1)]
+    candle_dataframes = generate_candle_dataframes(
+        2, 100, time_units, exchanges=["BINANCE", "KUCOIN"], seed=1
+    )
+    assert [
+        (candle_dataframe.asset, candle_dataframe.time_unit, len(candle_dataframe))
+        for candle_dataframe in candle_dataframes
+    ] == [
+        (Asset("SYN0USDT", "BINANCE"), timedelta(minutes=1), 100),
+        (Asset("SYN0USDT", "BINANCE"), timedelta(minutes=5), 20),
+        (Asset("SYN0USDT", "KUCOIN"), timedelta(minutes=1), 100),
+        (Asset("SYN0USDT", "KUCOIN"), timedelta(minutes=5), 20),
+        (Asset("SYN1USDT", "BINANCE"), timedelta(minutes=1), 100),
+        (Asset("SYN1USDT", "BINANCE"), timedelta(minutes=5), 20),
+        (Asset("SYN1USDT", "KUCOIN"), timedelta(minutes=1), 100),
+        (Asset("SYN1USDT", "KUCOIN"), timedelta(minutes=5), 20),
+    ]
+
+    for candle_dataframe in candle_dataframes:
+        assert (candle_dataframe["high"] >= candle_dataframe[["open", "close"]].max(axis=1)).all()
+        assert (candle_dataframe["low"] <= candle_dataframe[["open", "close"]].min(axis=1)).all()
+        assert (candle_dataframe["volume"] > 0).all()
+
+    minute_candles, five_minutes_candles = candle_dataframes[0], candle_dataframes[1]
+    assert five_minutes_candles["open"].iloc[1] == minute_candles["open"].iloc[5]
+    assert five_minutes_candles["close"].iloc[1] == minute_candles["close"].iloc[9]
+    assert five_minutes_candles["high"].iloc[1] == minute_candles["high"].iloc[5:10].max()
+    assert five_minutes_candles["volume"].iloc[1] == np.float64(
+        minute_candles["volume"].iloc[5:10].sum()
+    )
+
+    # The exchanges follow the same random walk, with their own noise
+    binance_closes = candle_dataframes[0]["close"].to_numpy()
+    kucoin_closes = candle_dataframes[2]["close"].to_numpy()
+    assert not np.array_equal(binance_closes, kucoin_closes)
+    assert np.allclose(binance_closes, kucoin_closes, rtol=0.02)
+
+    # Deterministic
+    same_candle_dataframes = generate_candle_dataframes(
+        2, 100, time_units, exchanges=["BINANCE", "KUCOIN"], seed=1
+    )
+    assert all(
+        candle_dataframe.equals(same_candle_dataframe)
+        for candle_dataframe, same_candle_dataframe in zip(
+            candle_dataframes, same_candle_dataframes
+        )
+    )
+    assert not generate_candle_dataframes(1, 100, seed=2)[0].equals(candle_dataframes[0])
+
+    # The candles can be replayed by a feed
+    feed = PandasFeed(candle_dataframes)
+    while not feed.completed:
+        feed.update_latest_data()
+    assert feed.indexes[Asset("SYN1USDT", "KUCOIN")] == {
+        timedelta(minutes=1): 100,
+        timedelta(minutes=5): 20,
+    }
@@ -0,0 +1,44 @@
+import numpy as np
+
+from trazy_analysis.optimization.trial_store import TrialStore, parameters_to_json
+
+
+def test_parameters_to_json():
+    assert parameters_to_json({"b": 1.5, "a": 2}) == parameters_to_json(
+        {"a": np.int64(2), "b": np.float64(1.5)}
+    )
+    assert parameters_to_json({"a": 2}) != parameters_to_json({"a": 3})
+
+
+def test_trial_store_add_get():
+    trial_store = TrialStore()
+    assert trial_store.get("study", {"a": 1}) is None
+    trial_store.add("study", {"a": 1}, 0.5)
+    assert trial_store.get("study", {"a": 1}) == 0.5
+    assert trial_store.get("other_study", {"a": 1}) is None
+
+    trial_store.add("study", {"a": 1}, 0.7)
+    assert trial_store.get("study", {"a": 1}) == 0.7
+    assert trial_store.trials("study") == [({"a": 1}, 0.7)]
+
+
+def test_trial_store_trials_best():
+    trial_store = TrialStore()
+    assert trial_store.best("study") is None
+    trial_store.add("study", {"a": 1}, 0.5)
+    trial_store.add("study", {"a": 2}, 1.5)
+    trial_store.add("study", {"a": 3}, -1)
+    trial_store.add("other_study", {"a": 4}, 3)
+    assert trial_store.trials("study") == [({"a": 1}, 0.5), ({"a": 2}, 1.5), ({"a": 3}, -1)]
+    assert trial_store.best("study") == ({"a": 2}, 1.5)
+
+
+def test_trial_store_persistence(tmp_path):
+    path = str(tmp_path / "trials.db")
+    trial_store = TrialStore(path)
+    trial_store.add("study", {"a": 1}, 0.5)
+    trial_store.close()
+
+    trial_store = TrialStore(path)
+    assert trial_store.trials("study") == [({"a": 1}, 0.5)]
+    trial_store.close()
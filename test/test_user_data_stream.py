@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.broker.user_data_stream import (
+    CANCELED,
+    FILLED,
+    PARTIALLY_FILLED,
+    OrderTracker,
+    OrderUpdate,
+    WebsocketUserDataStream,
+)
+from trazy_analysis.common.clock import SimulatedClock
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.enums import Action, Direction, OrderStatus, OrderType
+from trazy_analysis.models.order import Order
+from trazy_analysis.portfolio.portfolio import Portfolio
+from trazy_analysis.position.transaction import Transaction
+from trazy_analysis.test.tools.user_data_server import LocalUserDataServer
+
+ASSET = Asset(symbol="ETH/EUR", exchange="binance")
+TIMESTAMP = datetime(2021, 2, 8, 15, 0, 0, tzinfo=pytz.UTC)
+
+
+def fill(order_id: str, transaction_id: str, size: float) -> Transaction:
+    return Transaction(
+        asset=ASSET,
+        size=size,
+        action=Action.BUY,
+        direction=Direction.LONG,
+        price=2000.0,
+        order_id=order_id,
+        commission=0.5,
+        timestamp=TIMESTAMP,
+        transaction_id=transaction_id,
+    )
+
+
+def limit_order(order_id: str, size: float) -> Order:
+    clock = SimulatedClock()
+    clock.update_time(TIMESTAMP)
+    order = Order(
+        asset=ASSET,
+        time_unit=timedelta(minutes=1),
+        action=Action.BUY,
+        direction=Direction.LONG,
+        size=size,
+        signal_id="1",
+        order_type=OrderType.LIMIT,
+        limit=2000.0,
+        clock=clock,
+    )
+    order.submit()
+    order.order_id = order_id
+    return order
+
+
+async def wait_for_subscription(server: LocalUserDataServer):
+    while len(server.subscriptions) == 0:
+        await asyncio.sleep(0.01)
+
+
+def test_websocket_user_data_stream():
+    update = OrderUpdate("binance", "42", FILLED, fill("42", "7", 0.5))
+
+    async def run():
+        server = LocalUserDataServer()
+        await server.start()
+        user_data_stream = WebsocketUserDataStream(server.url)
+        await user_data_stream.connect(["binance"])
+        await wait_for_subscription(server)
+
+        await server.publish(OrderUpdate("kraken", "1", CANCELED))
+        await server.publish(update)
+        updates = user_data_stream.updates()
+        received_update = await asyncio.wait_for(updates.__anext__(), timeout=5)
+
+        await user_data_stream.close()
+        await server.stop()
+        return received_update
+
+    received_update = asyncio.run(run())
+    assert received_update.to_json() == update.to_json()
+    assert received_update.transaction.timestamp == TIMESTAMP
+    assert received_update.transaction.order_id == "42"
+
+
+def test_order_tracker():
+    portfolio = Portfolio(starting_cash=10000.0, timestamp=TIMESTAMP)
+    order_tracker = OrderTracker()
+    filled_order = limit_order("1", 1.0)
+    cancelled_order = limit_order("2", 1.0)
+    completed = []
+    filled_order.add_on_complete_callback(completed.append, "1")
+    order_tracker.track("BINANCE", filled_order)
+    order_tracker.track("binance", cancelled_order)
+
+    partial_fill = OrderUpdate("binance", "1", PARTIALLY_FILLED, fill("1", "10", 0.4))
+    assert order_tracker.apply(partial_fill, portfolio) is None
+    # The same fill found again by polling isn't applied twice
+    assert order_tracker.apply(partial_fill, portfolio) is None
+    assert order_tracker.is_processed("10")
+    assert completed == []
+
+    last_fill = OrderUpdate("binance", "1", PARTIALLY_FILLED, fill("1", "11", 0.6))
+    assert order_tracker.apply(last_fill, portfolio) is filled_order
+    assert completed == ["1"]
+    assert filled_order.status == OrderStatus.COMPLETED
+    assert portfolio.pos_handler.positions[ASSET][Direction.LONG].net_size == 1.0
+    assert portfolio.cash == 10000.0 - 2 * 0.5 - 2000.0
+
+    cancel = OrderUpdate("binance", "2", CANCELED)
+    assert order_tracker.apply(cancel, portfolio) is cancelled_order
+    assert cancelled_order.status == OrderStatus.CANCELLED
+    assert len(order_tracker) == 0
+
+
+def test_order_tracker_forgets_the_fills_older_than_the_lookback_period():
+    portfolio = Portfolio(starting_cash=10000.0, timestamp=TIMESTAMP)
+    order_tracker = OrderTracker(lookback_period=timedelta(minutes=10))
+    for minute in range(30):
+        transaction = fill("1", str(minute), 0.01)
+        transaction.timestamp = TIMESTAMP + timedelta(minutes=minute)
+        order_tracker.apply(
+            OrderUpdate("binance", "1", PARTIALLY_FILLED, transaction), portfolio
+        )
+
+    assert list(order_tracker.processed_transaction_ids) == [
+        str(minute) for minute in range(19, 30)
+    ]
+    assert not order_tracker.is_processed("18")
+    assert order_tracker.is_processed("19")
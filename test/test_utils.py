@@ -6,6 +6,8 @@ import pytz
 from dateutil.parser import parse
 
 from trazy_analysis.common.utils import (
+    datetime_to_epoch_ns,
+    epoch_ns_to_datetime,
     lists_equal,
     timestamp_to_utc,
     validate_dataframe_columns,
@@ -136,3 +138,39 @@ def test_timestamp_to_utc(timestamp, expected_utc_timestamp):
     assert str(timestamp_with_utc) == str(expected_utc_timestamp)
     with pytest.raises(Exception):
         timestamp_to_utc(object())
+
+
+@pytest.mark.parametrize(
+    "timestamp, expected_epoch_ns",
+    [
+        (
+            datetime.strptime("2020-05-08 14:16:00+0000", "%Y-%m-%d %H:%M:%S%z"),
+            1588947360000000000,
+        ),
+        (
+            datetime.strptime("2020-05-08 16:16:00+0200", "%Y-%m-%d %H:%M:%S%z"),
+            1588947360000000000,
+        ),
+        (
+            datetime(2020, 5, 8, 14, 16, 0, 123456),
+            1588947360123456000,
+        ),
+        (
+            pd.Timestamp("2020-05-08 14:16:00+00:00"),
+            1588947360000000000,
+        ),
+        (
+            pd.Timestamp("2020-05-08 14:16:00"),
+            1588947360000000000,
+        ),
+    ],
+)
+def test_datetime_to_epoch_ns(timestamp, expected_epoch_ns):
+    assert datetime_to_epoch_ns(timestamp) == expected_epoch_ns
+
+
+def test_epoch_ns_to_datetime():
+    timestamp = datetime(2020, 5, 8, 14, 16, 0, 123456, tzinfo=pytz.UTC)
+    assert epoch_ns_to_datetime(1588947360123456000) == timestamp
+    assert epoch_ns_to_datetime(datetime_to_epoch_ns(timestamp)) == timestamp
+    assert str(epoch_ns_to_datetime(1588947360000000000)) == "2020-05-08 14:16:00+00:00"
@@ -0,0 +1,283 @@
+from collections import deque
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+import pytest
+
+from trazy_analysis.bot.event_loop import EventLoop
+from trazy_analysis.broker.broker_manager import BrokerManager
+from trazy_analysis.broker.simulated_broker import SimulatedBroker
+from trazy_analysis.common.clock import SimulatedClock
+from trazy_analysis.common.helper import candles_to_arrays
+from trazy_analysis.feed.feed import CsvFeed
+from trazy_analysis.indicators.indicator import CandleIndicator
+from trazy_analysis.indicators.indicators_managers import ReactiveIndicators
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.candle import Candle
+from trazy_analysis.models.enums import Action, Direction, IndicatorMode
+from trazy_analysis.models.signal import Signal
+from trazy_analysis.order_manager.order_creator import OrderCreator
+from trazy_analysis.order_manager.order_manager import OrderManager
+from trazy_analysis.order_manager.position_sizer import PositionSizer
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategies.vectorized_sma_crossover_strategy import (
+    VectorizedSmaCrossoverStrategy,
+)
+from trazy_analysis.strategy.strategy import Strategy, VectorizedStrategy
+from trazy_analysis.strategy.strategy_executor import ParallelStrategyExecutor
+
+EXCHANGE = "IEX"
+AAPL_ASSET = Asset(symbol="AAPL", exchange=EXCHANGE)
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/aapl_candles_one_day.csv"
+THRESHOLD_PARAMETERS = {"high": 134.0, "low": 132.0}
+
+
+class ThresholdStrategy(Strategy):
+    DEFAULT_PARAMETERS = THRESHOLD_PARAMETERS
+
+    def current(self, candle: Candle) -> None:
+        if candle.close > self.parameters["high"]:
+            self.add_signal(
+                Signal(
+                    asset=candle.asset,
+                    time_unit=candle.time_unit,
+                    action=Action.BUY,
+                    direction=Direction.LONG,
+                )
+            )
+        elif candle.close < self.parameters["low"]:
+            self.add_signal(
+                Signal(
+                    asset=candle.asset,
+                    time_unit=candle.time_unit,
+                    action=Action.SELL,
+                    direction=Direction.LONG,
+                )
+            )
+
+
+class VectorizedThresholdStrategy(VectorizedStrategy):
+    DEFAULT_PARAMETERS = THRESHOLD_PARAMETERS
+
+    def generate(self, candle_arrays: dict[str, np.ndarray]) -> np.ndarray:
+        close = candle_arrays["close"]
+        return np.select(
+            [close > self.parameters["high"], close < self.parameters["low"]],
+            [self.LONG_ENTRY, self.LONG_EXIT],
+            self.NO_SIGNAL,
+        )
+
+
+class WrongSizeVectorizedStrategy(VectorizedStrategy):
+    DEFAULT_PARAMETERS = {}
+
+    def generate(self, candle_arrays: dict[str, np.ndarray]) -> np.ndarray:
+        return np.zeros(1)
+
+
+def run_event_loop(
+    strategies_parameters: dict[type, dict[str, Any]],
+    strategy_executor: ParallelStrategyExecutor = None,
+) -> EventLoop:
+    events = deque()
+    feed = CsvFeed(
+        csv_filenames={AAPL_ASSET: {TIME_UNIT: CSV_FILENAME}},
+        events=events,
+    )
+    clock = SimulatedClock()
+    broker = SimulatedBroker(clock, events, initial_funds=10000.0)
+    broker.subscribe_funds_to_portfolio(10000.0)
+    broker_manager = BrokerManager(brokers={EXCHANGE: broker})
+    order_manager = OrderManager(
+        events=events,
+        broker_manager=broker_manager,
+        position_sizer=PositionSizer(broker_manager=broker_manager),
+        order_creator=OrderCreator(broker_manager=broker_manager),
+        clock=clock,
+    )
+    event_loop = EventLoop(
+        events=events,
+        assets={AAPL_ASSET: TIME_UNIT},
+        feed=feed,
+        order_manager=order_manager,
+        strategies_parameters=strategies_parameters,
+        indicator_mode=IndicatorMode.LIVE,
+        strategy_executor=strategy_executor,
+    )
+    event_loop.loop()
+    return event_loop
+
+
+def trading_summary(event_loop: EventLoop) -> tuple:
+    broker = event_loop.broker_manager.get_broker(EXCHANGE)
+    signals = [
+        (
+            signal.action,
+            signal.direction,
+            signal.generation_time,
+            signal.root_candle_timestamp,
+        )
+        for signal in event_loop.signals[AAPL_ASSET][TIME_UNIT]
+    ]
+    transactions = [
+        (transaction.timestamp, transaction.action, transaction.size, transaction.price)
+        for transaction in broker.portfolio.transactions
+    ]
+    return signals, transactions, broker.get_portfolio_cash_balance()
+
+
+def test_vectorized_strategy_same_trading_as_strategy():
+    expected_signals, expected_transactions, expected_cash = trading_summary(
+        run_event_loop({ThresholdStrategy: THRESHOLD_PARAMETERS})
+    )
+    signals, transactions, cash = trading_summary(
+        run_event_loop({VectorizedThresholdStrategy: THRESHOLD_PARAMETERS})
+    )
+
+    assert len(expected_signals) != 0
+    assert len(expected_transactions) != 0
+    assert signals == expected_signals
+    assert transactions == expected_transactions
+    assert cash == expected_cash
+
+
+def test_vectorized_sma_crossover_strategy():
+    expected_summary = trading_summary(
+        run_event_loop(
+            {SmaCrossoverStrategy: SmaCrossoverStrategy.DEFAULT_PARAMETERS}
+        )
+    )
+    summary = trading_summary(
+        run_event_loop(
+            {
+                VectorizedSmaCrossoverStrategy: VectorizedSmaCrossoverStrategy.DEFAULT_PARAMETERS
+            }
+        )
+    )
+
+    assert summary == expected_summary
+    assert summary[2] == 10010.955
+
+
+def test_vectorized_strategy_with_strategy_executor():
+    expected_summary = trading_summary(
+        run_event_loop({VectorizedThresholdStrategy: THRESHOLD_PARAMETERS})
+    )
+    summary = trading_summary(
+        run_event_loop(
+            {VectorizedThresholdStrategy: THRESHOLD_PARAMETERS},
+            ParallelStrategyExecutor(nb_workers=1, use_processes=False),
+        )
+    )
+
+    assert summary == expected_summary
+
+
+def test_vectorized_strategy_generate():
+    candles = np.array(
+        [
+            Candle(
+                asset=AAPL_ASSET,
+                open=133.0,
+                high=134.5,
+                low=131.5,
+                close=close,
+                volume=100,
+                timestamp=i * 60_000_000_000,
+            )
+            for i, close in enumerate([133.0, 134.1, 133.0, 131.9, 134.3])
+        ],
+        dtype=Candle,
+    )
+    indicators = ReactiveIndicators(memoize=False, mode=IndicatorMode.LIVE)
+    data = CandleIndicator(asset=AAPL_ASSET, time_unit=TIME_UNIT)
+    strategy = VectorizedThresholdStrategy(data, THRESHOLD_PARAMETERS, indicators)
+    strategy.prepare(candles)
+
+    assert strategy.signal_codes == {
+        60_000_000_000: VectorizedStrategy.LONG_ENTRY,
+        180_000_000_000: VectorizedStrategy.LONG_EXIT,
+        240_000_000_000: VectorizedStrategy.LONG_ENTRY,
+    }
+    assert strategy.last_epoch_ns == 240_000_000_000
+
+    strategy.current(candles[1])
+    assert len(strategy.signals) == 1
+    assert strategy.signals[0].action == Action.BUY
+    assert strategy.signals[0].direction == Direction.LONG
+
+
+def test_vectorized_strategy_new_candles():
+    indicators = ReactiveIndicators(memoize=False, mode=IndicatorMode.LIVE)
+    data = CandleIndicator(asset=AAPL_ASSET, time_unit=TIME_UNIT)
+    strategy = VectorizedThresholdStrategy(data, THRESHOLD_PARAMETERS, indicators)
+    assert strategy.last_epoch_ns is None
+
+    # Candles that are not part of the prepared history are appended as they come
+    strategy.current(
+        Candle(asset=AAPL_ASSET, open=1, high=1, low=1, close=133.0, volume=1, timestamp=0)
+    )
+    assert strategy.signals == []
+    strategy.current(
+        Candle(
+            asset=AAPL_ASSET,
+            open=1,
+            high=1,
+            low=1,
+            close=131.2,
+            volume=1,
+            timestamp=60_000_000_000,
+        )
+    )
+    assert len(strategy.signals) == 1
+    assert strategy.signals[0].action == Action.SELL
+    assert len(strategy.candle_arrays["close"]) == 2
+
+
+def test_vectorized_strategy_live_candles_use_the_lookback():
+    feed = CsvFeed(csv_filenames={AAPL_ASSET: {TIME_UNIT: CSV_FILENAME}})
+    candles = feed.candles[AAPL_ASSET][TIME_UNIT]
+    parameters = {"short_sma": 5, "long_sma": 20}
+    indicators = ReactiveIndicators(memoize=False, mode=IndicatorMode.LIVE)
+    data = CandleIndicator(asset=AAPL_ASSET, time_unit=TIME_UNIT)
+    expected_strategy = VectorizedSmaCrossoverStrategy(data, parameters, indicators)
+    expected_strategy.prepare(candles)
+
+    strategy = VectorizedSmaCrossoverStrategy(data, parameters, indicators)
+    strategy.prepare(candles[:50])
+    generated_sizes = []
+    generate = strategy.generate
+
+    def recording_generate(candle_arrays):
+        generated_sizes.append(len(candle_arrays["close"]))
+        return generate(candle_arrays)
+
+    strategy.generate = recording_generate
+    for candle in candles[50:]:
+        strategy.append_candle(candle)
+
+    assert strategy.signal_codes == expected_strategy.signal_codes
+    assert set(generated_sizes) == {21}
+    assert len(strategy.candle_buffers["close"]) < 2 * len(candles)
+    for column, array in candles_to_arrays(candles).items():
+        assert np.array_equal(strategy.candle_arrays[column], array)
+
+
+def test_vectorized_strategy_wrong_size():
+    indicators = ReactiveIndicators(memoize=False, mode=IndicatorMode.LIVE)
+    data = CandleIndicator(asset=AAPL_ASSET, time_unit=TIME_UNIT)
+    strategy = WrongSizeVectorizedStrategy(data, {}, indicators)
+    with pytest.raises(Exception):
+        strategy.prepare(
+            np.array(
+                [
+                    Candle(asset=AAPL_ASSET, open=1, high=1, low=1, close=1, volume=1, timestamp=0),
+                    Candle(asset=AAPL_ASSET, open=1, high=1, low=1, close=1, volume=1, timestamp=1),
+                ],
+                dtype=Candle,
+            )
+        )
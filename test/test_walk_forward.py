@@ -0,0 +1,140 @@
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytz
+
+from trazy_analysis.bot.walk_forward_event_loop import WalkForwardEventLoop
+from trazy_analysis.broker.binance_fee_model import BinanceFeeModel
+from trazy_analysis.common.backtest import Backtest, BacktestConfig
+from trazy_analysis.common.walk_forward import WalkForward, walk_forward_windows
+from trazy_analysis.models.asset import Asset
+from trazy_analysis.models.parameter import Discrete
+from trazy_analysis.optimization.optimizer import HyperOptimizer
+from trazy_analysis.strategy.strategies.sma_crossover_strategy import (
+    SmaCrossoverStrategy,
+)
+
+ASSET = Asset(symbol="BTCUSDT", exchange="BINANCE")
+TIME_UNIT = timedelta(minutes=1)
+CSV_FILENAME = "test/data/btc_usdt_one_day.csv"
+STRATEGIES_PARAMETERS = {SmaCrossoverStrategy: {"short_sma": 9, "long_sma": 65}}
+PARAMETERS_SPACE = {"short_sma": Discrete([5, 20]), "long_sma": Discrete([30, 90])}
+
+
+def backtest_config() -> BacktestConfig:
+    return BacktestConfig(
+        assets={ASSET: TIME_UNIT},
+        fee_models=BinanceFeeModel(),
+        start=datetime(2022, 5, 12, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        end=datetime(2022, 5, 14, 0, 0, 0, 0, tzinfo=pytz.UTC),
+        csv_filenames={ASSET: {TIME_UNIT: CSV_FILENAME}},
+    )
+
+
+def test_walk_forward_windows():
+    start = datetime(2022, 1, 1, tzinfo=pytz.UTC)
+    end = datetime(2022, 1, 10, tzinfo=pytz.UTC)
+    windows = walk_forward_windows(start, end, timedelta(days=3), timedelta(days=2))
+    assert [
+        (window.train_start.day, window.train_end.day, window.test_end.day)
+        for window in windows
+    ] == [(1, 4, 6), (3, 6, 8), (5, 8, 10)]
+    assert all(window.test_start == window.train_end for window in windows)
+
+    windows = walk_forward_windows(
+        start, end, timedelta(days=3), timedelta(days=4), anchored=True
+    )
+    assert [
+        (window.train_start.day, window.train_end.day, window.test_end.day)
+        for window in windows
+    ] == [(1, 4, 8), (1, 8, 10)]
+
+    assert walk_forward_windows(start, end, timedelta(days=9), timedelta(days=1)) == []
+
+
+def test_walk_forward_event_loop_keeps_indicators_state():
+    config = backtest_config()
+    backtest = Backtest(assets=config.assets, start=config.start, backtest_config=config)
+    backtest.run_strategies(STRATEGIES_PARAMETERS)
+    expected_signals_df = backtest.event_loop.signals_df[ASSET][TIME_UNIT]
+
+    windows = [
+        (
+            datetime(2022, 5, 13, 4, 58, tzinfo=pytz.UTC),
+            datetime(2022, 5, 13, 7, 58, tzinfo=pytz.UTC),
+        ),
+        (
+            datetime(2022, 5, 13, 7, 58, tzinfo=pytz.UTC),
+            datetime(2022, 5, 13, 10, 58, tzinfo=pytz.UTC),
+        ),
+    ]
+    events = deque()
+    config.feed.events = events
+    config.feed.reset()
+    event_loop = WalkForwardEventLoop(
+        events=events,
+        assets=config.assets,
+        feed=config.feed,
+        order_manager=backtest._create_order_manager(backtest._create_clock(), events),
+        windows_strategies_parameters=[
+            (start, end, STRATEGIES_PARAMETERS) for start, end in windows
+        ],
+        indicator_mode=config.indicator_mode,
+    )
+    event_loop.loop()
+
+    signals_df = event_loop.signals_df[ASSET][TIME_UNIT]
+    start, end = windows[0][0], windows[-1][1]
+    expected_signals_df = expected_signals_df[
+        (expected_signals_df.index >= start) & (expected_signals_df.index <= end)
+    ]
+    # The strategies are warm when their window starts: a signal is emitted on the first bars of the window, before
+    # the 65 bars the long SMA would need to warm up
+    assert expected_signals_df.index[0] < start + timedelta(minutes=65)
+    assert list(signals_df.index) == list(expected_signals_df.index)
+
+    transactions_df = event_loop.transactions_dfs["BINANCE"]
+    assert transactions_df.index.min() >= start
+    assert transactions_df.index.max() <= end + timedelta(minutes=1)
+    equity_df = event_loop.equity_dfs["BINANCE"]
+    assert (equity_df[equity_df.index < start]["Equity"] == 10000.0).all()
+
+
+def test_walk_forward():
+    config = backtest_config()
+    walk_forward = WalkForward(
+        config,
+        SmaCrossoverStrategy,
+        PARAMETERS_SPACE,
+        HyperOptimizer(seed=0),
+        train_period=timedelta(hours=6),
+        test_period=timedelta(hours=6),
+        nb_iter=4,
+        nb_workers=1,
+    )
+    statistics_df = walk_forward.run()
+
+    assert len(walk_forward.windows) == 4
+    for window in walk_forward.windows:
+        assert set(window.best_parameters.keys()) == {"short_sma", "long_sma"}
+        assert window.best_result is not None
+    assert len(walk_forward.windows_df()) == 4
+    equity_df = walk_forward.equity_dfs["BINANCE"]
+    assert equity_df.index[0] >= walk_forward.windows[0].test_start
+    assert "Sortino Ratio" in statistics_df.index
+
+    parallel_walk_forward = WalkForward(
+        backtest_config(),
+        SmaCrossoverStrategy,
+        PARAMETERS_SPACE,
+        HyperOptimizer(seed=0),
+        train_period=timedelta(hours=6),
+        test_period=timedelta(hours=6),
+        nb_iter=4,
+        nb_workers=2,
+    )
+    assert parallel_walk_forward.run().equals(statistics_df)
+    for window, parallel_window in zip(
+        walk_forward.windows, parallel_walk_forward.windows
+    ):
+        assert parallel_window.best_parameters == window.best_parameters
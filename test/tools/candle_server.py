@@ -0,0 +1,42 @@
+import json
+
+import websockets
+
+from trazy_analysis.models.candle import Candle
+
+
+class LocalCandleServer:
+    """
+    Websocket server on localhost standing in for an exchange candles stream. Clients send a subscription message
+    listing asset keys, then receive the published candles of these assets serialized with Candle.to_json.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+        self.subscriptions = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://localhost:{self.port}"
+
+    async def handler(self, websocket) -> None:
+        message = json.loads(await websocket.recv())
+        self.subscriptions[websocket] = set(message["assets"])
+        try:
+            await websocket.wait_closed()
+        finally:
+            del self.subscriptions[websocket]
+
+    async def start(self) -> None:
+        self.server = await websockets.serve(self.handler, "localhost", 0)
+        self.port = list(self.server.sockets)[0].getsockname()[1]
+
+    async def publish(self, candle: Candle) -> None:
+        for websocket, assets in list(self.subscriptions.items()):
+            if candle.asset.key() in assets:
+                await websocket.send(candle.to_json())
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
@@ -0,0 +1,43 @@
+import json
+
+import websockets
+
+from trazy_analysis.broker.user_data_stream import OrderUpdate
+
+
+class LocalUserDataServer:
+    """
+    Websocket server on localhost standing in for an exchange user data stream. Clients send a subscription message
+    listing exchanges, then receive the published order updates of these exchanges serialized with
+    OrderUpdate.to_json.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+        self.subscriptions = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://localhost:{self.port}"
+
+    async def handler(self, websocket) -> None:
+        message = json.loads(await websocket.recv())
+        self.subscriptions[websocket] = set(message["exchanges"])
+        try:
+            await websocket.wait_closed()
+        finally:
+            del self.subscriptions[websocket]
+
+    async def start(self) -> None:
+        self.server = await websockets.serve(self.handler, "localhost", 0)
+        self.port = list(self.server.sockets)[0].getsockname()[1]
+
+    async def publish(self, update: OrderUpdate) -> None:
+        for websocket, exchanges in list(self.subscriptions.items()):
+            if update.exchange in exchanges:
+                await websocket.send(update.to_json())
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()